@@ -1,19 +1,25 @@
 #! /usr/bin/env python3
+import logging as std_logging
 import os
 import uuid
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from schema import SchemaError
 from sqlalchemy.exc import DataError, IntegrityError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.middleware.sessions import SessionMiddleware
 
-from lib import logging
+from lib import logging, roles, static_files
+from lib.compression import BROTLI_QUALITY, GZIP_LEVEL, MIN_COMPRESS_SIZE, CompressionMiddleware
 from lib.config import Config
+from lib.exceptions import PasswordHashingBusy
+from lib.metrics import start_loop_lag_monitor
+from lib.metrics.http import MetricsMiddleware, QueryBudgetMiddleware
 from routers.exceptions import UserMessageError
 
 LOGGER = logging.getLogger(__name__)
@@ -24,8 +30,51 @@ if not _secret_key:
     _secret_key = str(uuid.uuid4())
     LOGGER.warning("No 'app.secret_key' configured. Sessions will not persist across restarts. Set 'app.secret_key' in config for production use.")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare the process for serving requests, API worker processes are started without going through app.py"""
+    if not std_logging.getLogger().handlers:
+        logging.init(config=CONFIG, fmt=logging.DEFAULT_LOG_FMT)
+
+    loop_lag_task = start_loop_lag_monitor() if CONFIG.get("metrics.enabled", False) else None
+
+    # index the SPA build before the first page is requested
+    static_files.get_site()
+
+    from services.reference_data import reference_data
+
+    await reference_data.preload()
+
+    listing_task = None
+    if str(CONFIG.get("uploads.storage_type")).lower() == "s3":
+        from lib.assets import listings
+
+        listing_task = listings.start_reconciler(assets.get_asset_manager(), assets.ALLOWED_IMAGE_TYPES)
+
+    remote_plaato = None
+    if not roles.runs_ingestion() and CONFIG.get("tap_monitors.plaato_keg.enabled"):
+        from lib.devices.plaato_keg import service_handler
+
+        try:
+            await service_handler.connection_handler.start()
+            remote_plaato = service_handler.connection_handler
+        except Exception:
+            LOGGER.error("Unable to listen for the Plaato keg state from the ingest process", exc_info=True)
+
+    yield
+
+    if remote_plaato:
+        await remote_plaato.stop()
+    if loop_lag_task:
+        loop_lag_task.cancel()
+    if listing_task:
+        listing_task.cancel()
+
+
 # Create FastAPI app
 api = FastAPI(
+    lifespan=lifespan,
     title="Brewhouse Manager",
     version="0.8.4",
     docs_url="/api/docs",
@@ -64,6 +113,30 @@ else:
         allow_credentials=True,
     )
 
+# Response compression, event streams and the routes decorated with `no_compression` are sent as they are
+if CONFIG.get("api.compression.enabled", True):
+    api.add_middleware(
+        CompressionMiddleware,
+        minimum_size=CONFIG.get("api.compression.minimum_size", MIN_COMPRESS_SIZE),
+        gzip_level=CONFIG.get("api.compression.gzip_level", GZIP_LEVEL),
+        brotli_quality=CONFIG.get("api.compression.brotli_quality", BROTLI_QUALITY),
+    )
+
+# Query budget, the query count and time headers are returned by default in development
+_query_budget = CONFIG.get("db.query_budget.max_queries", 0)
+_query_headers = CONFIG.get("db.query_budget.headers", CONFIG.get("ENV") in ("development", "test"))
+if _query_budget or _query_headers:
+    api.add_middleware(
+        QueryBudgetMiddleware,
+        max_queries=_query_budget,
+        repeat_threshold=CONFIG.get("db.query_budget.repeat_threshold", 5),
+        headers=_query_headers,
+    )
+
+# Request metrics, added last so the time spent in the other middleware is included
+if CONFIG.get("metrics.enabled", False):
+    api.add_middleware(MetricsMiddleware)
+
 
 # Exception handlers
 @api.exception_handler(UserMessageError)
@@ -99,6 +172,12 @@ async def schema_error_handler(request: Request, exc: SchemaError):
     return JSONResponse(status_code=400, content={"message": f"Schema validation error: {str(exc)}"})
 
 
+@api.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    """Handle too many concurrent password hashing operations"""
+    return JSONResponse(status_code=503, content={"message": exc.message}, headers={"Retry-After": "1"})
+
+
 @api.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
     """Catch-all exception handler"""
@@ -137,6 +216,7 @@ from routers import (
     kegtron,
     kegtron_gen1,
     locations,
+    metrics,
     pages,
     plaato_keg,
     settings,
@@ -166,34 +246,41 @@ api.include_router(assets.router)
 api.include_router(settings.router)
 api.include_router(external_brew_tools.router)
 api.include_router(image_transitions.router)
+api.include_router(metrics.router)
 
 # Register pages router last (has catch-all routes)
 api.include_router(pages.router)
 
 
 # Mount static files (Angular SPA)
-STATIC_DIR = os.path.join(os.getcwd(), "static")
-if os.path.exists(STATIC_DIR):
-    api.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+if os.path.exists(static_files.STATIC_DIR):
+    api.mount("/static", StaticFiles(directory=static_files.STATIC_DIR), name="static")
 
 
 # SPA routing - serve index.html for all unmatched routes
 @api.get("/{full_path:path}", include_in_schema=False)
-async def serve_spa(full_path: str):
+async def serve_spa(full_path: str, request: Request):
     """
     Serve Angular SPA for all unmatched routes.
     This allows Angular to handle client-side routing.
     """
+    site = static_files.get_site()
+
     # Check if it's a file in static directory
-    static_file_path = os.path.join(STATIC_DIR, full_path)
-    resolved = os.path.realpath(static_file_path)
-    if resolved.startswith(os.path.realpath(STATIC_DIR) + os.sep) and os.path.isfile(resolved):
-        return FileResponse(resolved)
+    static_file = site.get(full_path)
+    if static_file:
+        return site.file_response(static_file, request.headers)
+
+    # or an uploaded file, a missing one is not a page of the SPA
+    if full_path.startswith(static_files.UPLOADS_PATH):
+        upload = site.get_upload(full_path)
+        if upload:
+            return site.file_response(upload, request.headers)
+        return JSONResponse(status_code=404, content={"message": "Not found"})
 
     # Otherwise serve index.html (Angular will handle routing)
-    index_path = os.path.join(STATIC_DIR, "index.html")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
+    if site.index is not None:
+        return site.index_response(request.headers)
 
     # If no static directory exists, return 404
     return JSONResponse(status_code=404, content={"message": "Not found"})
@@ -4,7 +4,15 @@ import argparse
 import os
 import sys
 
-from lib import logging
+from lib import startup_profile
+
+# Start recording import times before anything else is imported
+IMPORT_PROFILER = None
+if "--profile-startup" in sys.argv:
+    IMPORT_PROFILER = startup_profile.ImportProfiler()
+    IMPORT_PROFILER.install()
+
+from lib import logging, roles
 from lib.config import Config
 
 # Initialize configuration
@@ -25,11 +33,15 @@ LOGGER = logging.getLogger(__name__)
 class Application:
     """Main application class"""
 
-    def __init__(self, log_level: str = "INFO"):
+    def __init__(self, log_level: str = "INFO", profile_startup: bool = False, role: str = roles.ALL, workers: int = 1):
         self.tcp_task = None
         self.http_server = None
         self.plaato_service = None
+        self.ingest_publisher = None
         self.log_level = log_level
+        self.profile_startup = profile_startup
+        self.role = role
+        self.workers = workers
 
     async def initialize_first_user(self):
         """Create initial user if no users exist"""
@@ -75,37 +87,78 @@ class Application:
 
         self.tcp_task = asyncio.create_task(plaato_service_handler.connection_handler.start_server(host=host, port=port))
 
+        if self.role == roles.INGEST:
+            from lib.devices.plaato_keg.remote import IngestPublisher
+
+            self.ingest_publisher = IngestPublisher(plaato_service_handler.connection_handler)
+            await self.ingest_publisher.start()
+
     async def start_http_server(self):
         """Start the HTTP/WebSocket server"""
         host = CONFIG.get("api.host", "localhost")
         port = CONFIG.get("api.port", 5000)
         LOGGER.info("Serving API on %s:%d", host, port)
 
+        if self.profile_startup:
+            startup_profile.report(f"Starting the HTTP server {startup_profile.since_start():.3f}s after process start")
+            # pylint takes `api` for the api/api.py module rather than the FastAPI app it defines
+            api.add_middleware(  # pylint: disable=no-member
+                startup_profile.FirstRequestTimer,
+                on_first_request=lambda path, elapsed: startup_profile.report(f"First request ({path}) served {elapsed:.3f}s after process start"),
+            )
+
         config = uvicorn.Config(
             app=api,
             host=host,
             port=port,
-            log_level=self.log_level.lower(),
-            log_config=None,  # Disable uvicorn's default logging config; use our root logger
-            proxy_headers=True,  # Handle X-Forwarded-* headers (replaces ProxyFix)
-            forwarded_allow_ips=CONFIG.get("api.forwarded_allow_ips", "*"),
             reload=CONFIG.get("ENV") == "development",  # Auto-reload in development
+            **self._uvicorn_options(),
         )
         self.http_server = uvicorn.Server(config)
         await self.http_server.serve()
 
+    def _uvicorn_options(self) -> dict:
+        return {
+            "log_level": self.log_level.lower(),
+            "log_config": None,  # Disable uvicorn's default logging config; use our root logger
+            "proxy_headers": True,  # Handle X-Forwarded-* headers (replaces ProxyFix)
+            "forwarded_allow_ips": CONFIG.get("api.forwarded_allow_ips", "*"),
+        }
+
+    def run_api_workers(self):
+        """Serve the API from several worker processes.  Only used by the api role, which has no device listeners"""
+        asyncio.run(self.initialize_first_user())
+
+        host = CONFIG.get("api.host", "localhost")
+        port = CONFIG.get("api.port", 5000)
+        LOGGER.info("Serving API on %s:%d with %d workers", host, port, self.workers)
+
+        # the workers import the app themselves, they pick up the role and log level from the environment
+        os.environ["LOG_LEVEL"] = self.log_level
+        uvicorn.run("api:api", host=host, port=port, workers=self.workers, **self._uvicorn_options())
+
     async def run(self):
-        # Initialize first user if needed
-        LOGGER.info("Checking for initial user...")
-        await self.initialize_first_user()
+        # Reload the configuration on SIGHUP
+        CONFIG.install_reload_handler(asyncio.get_running_loop())
+        LOGGER.info("Running with role: %s", self.role)
+
+        if roles.serves_api(self.role):
+            # Initialize first user if needed
+            LOGGER.info("Checking for initial user...")
+            await self.initialize_first_user()
 
         start_plaato_service = CONFIG.get("tap_monitors.plaato_keg.enabled")
-        if start_plaato_service:
+        if start_plaato_service and roles.runs_ingestion(self.role):
             LOGGER.info("Starting the Plaato TCP Service task...")
             await self.start_plaato_service()
 
         try:
-            await self.start_http_server()
+            if roles.serves_api(self.role):
+                await self.start_http_server()
+            elif self.tcp_task:
+                await self.tcp_task
+            else:
+                LOGGER.warning("Running the ingest role but no device ingestion is enabled, exiting")
         except asyncio.CancelledError:
             LOGGER.info("Application shutting down...")
         finally:
@@ -115,6 +168,9 @@ class Application:
         """Cleanup on shutdown"""
         LOGGER.info("Shutting down application...")
 
+        if self.ingest_publisher:
+            await self.ingest_publisher.stop()
+
         if self.plaato_service and self.plaato_service.connection_handler:
             await self.plaato_service.connection_handler.stop_server()
 
@@ -128,7 +184,7 @@ class Application:
         LOGGER.info("Application shutdown complete")
 
 
-if __name__ == "__main__":
+def main():
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "-l",
@@ -138,19 +194,59 @@ if __name__ == "__main__":
         default=(os.environ.get("LOG_LEVEL") or logging.get_def_log_level(CONFIG)).upper(),
         help="Set the logging level",
     )
+    parser.add_argument(
+        "--profile-startup",
+        dest="profile_startup",
+        action="store_true",
+        help="Print the import time of every module and how long it takes to serve the first request",
+    )
+    parser.add_argument(
+        "--role",
+        dest="role",
+        choices=roles.ROLES,
+        default=None,
+        help="Which part of the application to run: the api, the device ingestion or all of it.  Defaults to `app.role`",
+    )
+    parser.add_argument(
+        "--workers",
+        dest="workers",
+        type=int,
+        default=None,
+        help="The number of API worker processes, only allowed with the api role.  Defaults to `api.workers`",
+    )
     args = parser.parse_args()
 
+    if IMPORT_PROFILER:
+        IMPORT_PROFILER.uninstall()
+        startup_profile.report(IMPORT_PROFILER.format_tree())
+        startup_profile.report(f"Imports finished {startup_profile.since_start():.3f}s after process start")
+
     # Update logging level
     logging_level = logging.get_log_level(args.loglevel)
     logging.set_log_level(logging_level)
 
-    app_instance = Application(log_level=args.loglevel)
+    role = args.role or roles.get_role()
+    roles.set_role(role)
+
+    workers = args.workers or CONFIG.get("api.workers", 1)
+    if workers > 1 and role != roles.API:
+        LOGGER.warning("Multiple API workers are only supported with the api role, starting a single worker")
+        workers = 1
+
+    app_instance = Application(log_level=args.loglevel, profile_startup=args.profile_startup, role=role, workers=workers)
 
     try:
-        asyncio.run(app_instance.run())
+        if workers > 1:
+            app_instance.run_api_workers()
+        else:
+            asyncio.run(app_instance.run())
     except KeyboardInterrupt:
         LOGGER.info("Received keyboard interrupt, shutting down...")
         asyncio.run(app_instance.shutdown())
     except Exception:
         LOGGER.error("Unhandled application error", stack_info=True, exc_info=True)
         sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
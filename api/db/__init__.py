@@ -2,8 +2,8 @@ from contextlib import asynccontextmanager, contextmanager
 from functools import wraps
 from urllib.parse import quote
 
+import asyncpg
 import asyncpg.exceptions as asyncpg_exc
-import boto3 as aws
 from psycopg2.errors import InvalidTextRepresentation, NotNullViolation, UniqueViolation  # pylint: disable=no-name-in-module
 from psycopg2.extensions import QuotedString, register_adapter
 from sqlalchemy import DDL, Column, DateTime, String, create_engine, delete, event, func, select, text, update
@@ -19,6 +19,7 @@ from sqlalchemy.orm.session import Session
 
 from lib import exceptions as local_exc
 from lib import json, logging
+from lib.metrics import db as db_metrics
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -41,6 +42,8 @@ __all__ = [
     "batch_overrides",
     "batch_locations",
     "plaato_data",
+    "asset_listings",
+    "asset_listing_reconciles",
 ]
 
 LOGGER = logging.getLogger(__name__)
@@ -88,13 +91,15 @@ def convert_exception(sqla, psycopg2=None, new=None, param_names=None, str_match
 def create_session(config, **kwargs):
     engine_kwargs = {
         "connect_args": {"application_name": config.get("app_id", f"UNKNOWN=>({__name__})")},
-        "json_serializer": json.dumps,
+        "json_serializer": json.fast_dumps,
     }
 
     password = config.get("db.password")
 
     if not password:
         engine_kwargs["connect_args"]["sslmode"] = "require"
+        import boto3 as aws
+
         rds = aws.client("rds")
         password = rds.generate_db_auth_token(config.get("db.host"), config.get("db.port"), config.get("db.username"))
 
@@ -132,7 +137,7 @@ async def create_async_session(config, **kwargs):
         # "connect_args": {
         #     "application_name": config.get("app_id", f"UNKNOWN=>({__name__})"),
         # },
-        "json_serializer": json.dumps,
+        "json_serializer": json.fast_dumps,
     }
 
     password = config.get("db.password")
@@ -151,11 +156,29 @@ async def create_async_session(config, **kwargs):
 
     if conn_str not in _async_engines:
         _async_engines[conn_str] = create_async_engine(conn_str, **engine_kwargs)
+        db_metrics.instrument_engine(_async_engines[conn_str], name=config.get("db.name"))
     engine = _async_engines[conn_str]
 
     return async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)()
 
 
+async def connect_asyncpg(config):
+    """Open a plain asyncpg connection, for the postgres features SQLAlchemy does not expose such as LISTEN/NOTIFY"""
+    password = config.get("db.password")
+
+    if not password:
+        raise ValueError("Password required for async database connections")
+
+    return await asyncpg.connect(
+        user=config.get("db.username"),
+        password=password,
+        host=config.get("db.host"),
+        port=config.get("db.port"),
+        database=config.get("db.name"),
+        server_settings={"application_name": f"{config.get('app_id', 'brewhouse-manager')}-listener"},
+    )
+
+
 @asynccontextmanager
 async def async_session_scope(config, **kwargs):
     """Async context manager for database sessions"""
@@ -0,0 +1,15 @@
+# pylint: disable=wrong-import-position
+TABLE_NAME = "asset_listing_reconciles"
+
+from sqlalchemy import Column, DateTime, String
+
+from db import AsyncQueryMethodsMixin, Base, DictifiableMixin
+
+
+class AssetListingReconciles(Base, DictifiableMixin, AsyncQueryMethodsMixin):
+    """When the image listings of a bucket were last reconciled with it, so the API workers do not each reconcile them"""
+
+    __tablename__ = TABLE_NAME
+
+    bucket = Column(String, primary_key=True)
+    reconciled_on = Column(DateTime(timezone=True), nullable=False)
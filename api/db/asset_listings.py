@@ -0,0 +1,21 @@
+# pylint: disable=wrong-import-position
+TABLE_NAME = "asset_listings"
+
+from sqlalchemy import Column, DateTime, String, func
+from sqlalchemy.schema import Index
+
+from db import AsyncQueryMethodsMixin, Base, DictifiableMixin
+
+
+class AssetListings(Base, DictifiableMixin, AsyncQueryMethodsMixin):
+    """Index of the uploaded images stored in S3, so they can be listed without going through the bucket"""
+
+    __tablename__ = TABLE_NAME
+
+    bucket = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    image_type = Column(String, nullable=False)
+    url = Column(String, nullable=False)
+    created_on = Column(DateTime(timezone=True), server_default=func.current_timestamp(), nullable=False)  # pylint: disable=not-callable
+
+    __table_args__ = (Index("ix_asset_listings_bucket_image_type", bucket, image_type, unique=False),)
@@ -2,13 +2,13 @@
 TABLE_NAME = "users"
 PKEY = "id"
 
-from argon2 import PasswordHasher
 from sqlalchemy import Boolean, Column, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import joinedload, relationship
 from sqlalchemy.schema import Index
 
 from db import AsyncQueryMethodsMixin, AuditedMixin, Base, DictifiableMixin, generate_audit_trail, locations, user_locations
+from lib.passwords import get_password_service
 
 
 @generate_audit_trail
@@ -59,15 +59,13 @@ class Users(Base, DictifiableMixin, AuditedMixin, AsyncQueryMethodsMixin):
     @classmethod
     async def update(cls, session, pkey, password=None, **kwargs):  # pylint: disable=arguments-renamed
         if password and not kwargs.get("password_hash"):
-            ph = PasswordHasher()
-            kwargs["password_hash"] = ph.hash(password)
+            kwargs["password_hash"] = await get_password_service().hash(password)
         return await super().update(session, pkey, **kwargs)
 
     @classmethod
     async def create(cls, session, password=None, **kwargs):  # pylint: disable=arguments-renamed
         if password and not kwargs.get("password_hash"):
-            ph = PasswordHasher()
-            kwargs["password_hash"] = ph.hash(password)
+            kwargs["password_hash"] = await get_password_service().hash(password)
         return await super().create(session, **kwargs)
 
     @classmethod
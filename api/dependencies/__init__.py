@@ -2,6 +2,8 @@
 
 from dependencies.auth import (
     AuthUser,
+    AuthUserCache,
+    auth_user_cache,
     get_current_user_from_api_key,
     get_current_user_from_session,
     get_db_session,
@@ -13,6 +15,8 @@ from dependencies.auth import (
 
 __all__ = [
     "AuthUser",
+    "AuthUserCache",
+    "auth_user_cache",
     "get_db_session",
     "get_current_user_from_api_key",
     "get_current_user_from_session",
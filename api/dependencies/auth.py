@@ -4,13 +4,17 @@ Replaces Flask-Login functionality with FastAPI dependency injection.
 """
 
 import base64
-from typing import Optional
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
 
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db import async_session_scope
+from db import create_async_session
 from db.users import Users as UsersDB
 from lib import logging
 from lib.config import Config
@@ -21,6 +25,9 @@ LOGGER = logging.getLogger(__name__)
 # Optional bearer token security (doesn't raise 401 if not provided)
 security = HTTPBearer(auto_error=False)
 
+DEFAULT_AUTH_CACHE_TTL_SEC = 60
+DEFAULT_AUTH_CACHE_MAX_SIZE = 1000
+
 
 class AuthUser:
     """
@@ -61,24 +68,135 @@ class AuthUser:
         return AuthUser(user.id, user.first_name, user.last_name, user.email, user.profile_pic, user.google_oidc_id, user.api_key, user.admin, user.locations)
 
 
+class AuthUserCache:
+    """
+    Bounded TTL cache of authenticated users, keyed by user id (session auth) and by a hash of the API key (API key auth),
+    so authenticated requests do not need to query the user and its locations every time.
+
+    Anything that changes a user, its API key or its locations must call `invalidate_user_on_commit` (or
+    `clear_on_commit`).  The TTL bounds how stale an entry can get when a change is made by another process.
+    """
+
+    def __init__(self, ttl: float = None, max_size: int = None):
+        if ttl is None:
+            ttl = CONFIG.get("auth.cache.ttl_sec", DEFAULT_AUTH_CACHE_TTL_SEC)
+        if max_size is None:
+            max_size = CONFIG.get("auth.cache.max_size", DEFAULT_AUTH_CACHE_MAX_SIZE)
+
+        self.ttl = ttl or 0
+        self.max_size = max(max_size or 0, 0)
+        self._entries: OrderedDict[str, Tuple[float, AuthUser]] = OrderedDict()
+        self._keys_by_user: Dict[str, Set[str]] = {}
+        # bumped by every invalidation, so a load that was running at the time does not store what it read
+        self.generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    @staticmethod
+    def user_key(user_id) -> str:
+        return f"user:{user_id}"
+
+    @staticmethod
+    def api_key_key(api_key: str) -> str:
+        return f"api_key:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: str) -> Optional[AuthUser]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return user
+
+    def set(self, key: str, user: AuthUser, generation: int = None):
+        """Cache the user, unless the cache was invalidated since `generation`, read before the user was loaded"""
+        if not self.enabled or (generation is not None and generation != self.generation):
+            return
+
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, user)
+        self._keys_by_user.setdefault(str(user.id), set()).add(key)
+
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        user_id = str(entry[1].id)
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+    def invalidate_user(self, user_id):
+        """Drop every cached entry (session and API key) for the user"""
+        self.generation += 1
+        for key in list(self._keys_by_user.get(str(user_id), ())):
+            self._remove(key)
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+        self._keys_by_user.clear()
+
+    @staticmethod
+    def _on_commit(db_session: AsyncSession, fn):
+        # the write may have committed already, the DB helpers commit by default
+        if not db_session.sync_session.in_transaction():
+            fn()
+            return
+        event.listen(db_session.sync_session, "after_commit", lambda _session: fn(), once=True)
+
+    def invalidate_user_on_commit(self, db_session: AsyncSession, user_id):
+        """Invalidate the user once the changes made through `db_session` are committed, so a load running before the
+        commit does not keep the rows as they were"""
+        self._on_commit(db_session, lambda: self.invalidate_user(user_id))
+
+    def clear_on_commit(self, db_session: AsyncSession):
+        """Clear the cache once the changes made through `db_session` are committed"""
+        self._on_commit(db_session, self.clear)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+auth_user_cache = AuthUserCache()
+
+
 async def get_db_session() -> AsyncSession:
     """
     FastAPI dependency that provides an async database session.
     Automatically handles commit/rollback and cleanup.
+
+    The session is shared by every dependency of a request (FastAPI caches it per request), and it only checks out a
+    connection the first time it is used, so a request that never touches the database never opens a transaction.
     """
-    async with async_session_scope(CONFIG) as session:
+    session = await create_async_session(CONFIG)
+    try:
         yield session
+        if session.in_transaction() or session.new or session.dirty or session.deleted:
+            await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
 
 
-async def get_current_user_from_api_key(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    request: Request = None,
-    db_session: AsyncSession = Depends(get_db_session),
-) -> Optional[AuthUser]:
-    """
-    Check for API key authentication via Bearer token or query parameter.
-    Returns AuthUser if valid API key found, None otherwise.
-    """
+def _get_api_key(request: Optional[Request], credentials: Optional[HTTPAuthorizationCredentials]) -> Optional[str]:
+    """Get the API key from the `api_key` query param or the bearer token"""
     api_key = None
 
     # Try query param first (?api_key=...)
@@ -100,11 +218,55 @@ async def get_current_user_from_api_key(
                 # If decode fails, use the key as-is
                 pass
 
+    return api_key
+
+
+async def _get_user_by_api_key(api_key: str, db_session: AsyncSession) -> Optional[AuthUser]:
+    cache_key = AuthUserCache.api_key_key(api_key)
+    auth_user = auth_user_cache.get(cache_key)
+    if auth_user:
+        return auth_user
+
+    generation = auth_user_cache.generation
+    user = await UsersDB.get_by_api_key(db_session, api_key)
+    if user:
+        LOGGER.debug("Authenticated user via API key: %s", user.email)
+        auth_user = await AuthUser.from_user(user)
+        auth_user_cache.set(cache_key, auth_user, generation)
+        return auth_user
+
+    return None
+
+
+async def _get_user_by_id(user_id: str, db_session: AsyncSession) -> Optional[AuthUser]:
+    cache_key = AuthUserCache.user_key(user_id)
+    auth_user = auth_user_cache.get(cache_key)
+    if auth_user:
+        return auth_user
+
+    generation = auth_user_cache.generation
+    user = await UsersDB.get_by_pkey(db_session, user_id)
+    if user:
+        LOGGER.debug("Authenticated user via session: %s", user.email)
+        auth_user = await AuthUser.from_user(user)
+        auth_user_cache.set(cache_key, auth_user, generation)
+        return auth_user
+
+    return None
+
+
+async def get_current_user_from_api_key(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    request: Request = None,
+    db_session: AsyncSession = Depends(get_db_session),
+) -> Optional[AuthUser]:
+    """
+    Check for API key authentication via Bearer token or query parameter.
+    Returns AuthUser if valid API key found, None otherwise.
+    """
+    api_key = _get_api_key(request, credentials)
     if api_key:
-        user = await UsersDB.get_by_api_key(db_session, api_key)
-        if user:
-            LOGGER.debug("Authenticated user via API key: %s", user.email)
-            return await AuthUser.from_user(user)
+        return await _get_user_by_api_key(api_key, db_session)
 
     return None
 
@@ -117,24 +279,32 @@ async def get_current_user_from_session(request: Request, db_session: AsyncSessi
     user_id = request.session.get("user_id")
 
     if user_id:
-        user = await UsersDB.get_by_pkey(db_session, user_id)
-        if user:
-            LOGGER.debug("Authenticated user via session: %s", user.email)
-            return await AuthUser.from_user(user)
+        return await _get_user_by_id(user_id, db_session)
 
     return None
 
 
 async def get_optional_user(
-    api_key_user: Optional[AuthUser] = Depends(get_current_user_from_api_key),
-    session_user: Optional[AuthUser] = Depends(get_current_user_from_session),
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db_session: AsyncSession = Depends(get_db_session),
 ) -> Optional[AuthUser]:
     """
-    Try API key authentication first, then session authentication.
+    Try API key authentication first, then session authentication, stopping at the first one that finds a user.
     Returns AuthUser if authenticated by either method, None otherwise.
     This dependency does NOT raise an error if no authentication is found.
     """
-    return api_key_user or session_user
+    api_key = _get_api_key(request, credentials)
+    if api_key:
+        user = await _get_user_by_api_key(api_key, db_session)
+        if user:
+            return user
+
+    user_id = request.session.get("user_id")
+    if user_id:
+        return await _get_user_by_id(user_id, db_session)
+
+    return None
 
 
 async def require_user(user: Optional[AuthUser] = Depends(get_optional_user)) -> AuthUser:
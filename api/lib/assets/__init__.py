@@ -1,22 +1,70 @@
-from uuid import uuid4
+"""
+Storage for the uploaded assets.
 
-from werkzeug.utils import secure_filename
+Writing an upload to disk or S3 is blocking I/O, so the asset managers run it on a small dedicated thread pool rather
+than on the event loop, and copy the files in chunks instead of reading them into memory.  The number of uploads
+being stored at once is capped by `uploads.max_concurrent`, extra uploads wait for a slot.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 from lib import logging
 from lib.config import Config
 
+CONFIG = Config()
+
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_CHUNK_SIZE_KB = 1024
+
+_executor: Optional[ThreadPoolExecutor] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _max_concurrent() -> int:
+    return max(CONFIG.get("uploads.max_concurrent", DEFAULT_MAX_CONCURRENT) or 1, 1)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_max_concurrent(), thread_name_prefix="asset-io")
+    return _executor
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore  # pylint: disable=global-statement
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(_max_concurrent())
+    return _semaphore
+
+
+def shutdown():
+    """Stop the asset I/O thread pool"""
+    global _executor, _semaphore  # pylint: disable=global-statement
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    _semaphore = None
+
 
 class AssetManagerBase:
     def __init__(self) -> None:
         self.config = Config()
         self.logger = logging.getLogger(self.__class__.__name__)
 
-    @staticmethod
-    def get_file_extension(filename):
-        return filename.rsplit(".", 1)[1].lower()
+    @property
+    def chunk_size(self) -> int:
+        return max(self.config.get("uploads.chunk_size_kb", DEFAULT_CHUNK_SIZE_KB) or 1, 1) * 1024
 
     @staticmethod
-    def generate_random_filename(filename):
-        new_filename = f"{str(uuid4())}.{AssetManagerBase.get_file_extension(filename)}"
+    async def run_io(fn, *args, **kwargs):
+        """Run blocking storage I/O on the asset thread pool, waiting for a free slot first"""
+        async with _get_semaphore():
+            return await asyncio.get_running_loop().run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
 
-        return secure_filename(new_filename)
+    @staticmethod
+    def get_file_extension(filename):
+        return filename.rsplit(".", 1)[1].lower()
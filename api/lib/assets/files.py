@@ -1,9 +1,15 @@
+import glob
+import hashlib
 import os
+from uuid import uuid4
 
 from lib.assets import AssetManagerBase
+from lib.assets.images import DERIVED_DIR
 
 
 class FileAssetManager(AssetManagerBase):
+    serves_files = True
+
     def __init__(self):
         super().__init__()
         self.assets_base_dir = self.config.get("uploads.base_dir")
@@ -11,36 +17,90 @@ class FileAssetManager(AssetManagerBase):
     def get_parent_dir(self, image_type):
         return os.path.join(self.assets_base_dir, "img", image_type)
 
+    def get_derived_dir(self, image_type, image_hash):
+        return os.path.join(self.get_parent_dir(image_type), DERIVED_DIR, image_hash)
+
     def get(self, image_type, filename):
         return f"/assets/uploads/img/{image_type}/{filename}"
 
-    def list(self, image_type):
+    def _list(self, image_type):
         parent_path = self.get_parent_dir(image_type)
         all_files = [f for f in os.listdir(parent_path) if os.path.isfile(os.path.join(parent_path, f))]
         return [self.get(image_type, f) for f in all_files if not f.startswith(".")]
 
-    def save(self, image_type, file):
-        old_filename = file.filename
-        filename = self.generate_random_filename(old_filename)
+    async def list(self, image_type):
+        return await self.run_io(self._list, image_type)
 
-        parent_dir = self.get_parent_dir(image_type)
+    def _ensure_dir(self, parent_dir):
         if not os.path.exists(parent_dir):
             self.logger.debug("Image director `%s` does not exist.  Creating...", parent_dir)
-            os.makedirs(parent_dir)
+            os.makedirs(parent_dir, exist_ok=True)
             self.logger.debug("Successfully created dir '%s'!", parent_dir)
 
-        path = os.path.join(parent_dir, filename)
+    def _write(self, parent_dir, extension, file_obj):
+        # the upload is hashed while written to a temporary name, then moved in place under its hash once complete so
+        # a partial file is never served.  An identical upload already stored is kept as is
+        digest = hashlib.sha256()
+        tmp_path = os.path.join(parent_dir, f".{uuid4()}.part")
+        try:
+            with open(tmp_path, "wb") as f:
+                while chunk := file_obj.read(self.chunk_size):
+                    digest.update(chunk)
+                    f.write(chunk)
 
-        # Handle both werkzeug FileStorage (Flask) and FastAPI UploadFile
-        if hasattr(file, "save"):
-            # Flask werkzeug FileStorage
-            file.save(path)
-        else:
-            # FastAPI UploadFile - write contents to disk
-            with open(path, "wb") as f:
-                contents = file.file.read()
-                f.write(contents)
+            filename = f"{digest.hexdigest()}.{extension}"
+            path = os.path.join(parent_dir, filename)
+            if os.path.exists(path):
+                self.logger.debug("File '%s' was already uploaded", filename)
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
             # Reset file pointer for potential reuse
-            file.file.seek(0)
+            file_obj.seek(0)
+
+        return filename
+
+    async def save(self, image_type, file):
+        old_filename = file.filename
+
+        parent_dir = self.get_parent_dir(image_type)
+        await self.run_io(self._ensure_dir, parent_dir)
+
+        # Handle both werkzeug FileStorage (Flask) and FastAPI UploadFile
+        file_obj = file.file if hasattr(file, "file") else file
+        filename = await self.run_io(self._write, parent_dir, self.get_file_extension(old_filename), file_obj)
 
         return old_filename, filename, self.get(image_type, filename)
+
+    def _read_original(self, image_type, image_hash):
+        for path in glob.glob(os.path.join(self.get_parent_dir(image_type), f"{image_hash}.*")):
+            with open(path, "rb") as f:
+                return f.read()
+        return None
+
+    async def read_original(self, image_type, image_hash):
+        return await self.run_io(self._read_original, image_type, image_hash)
+
+    def _save_derivatives(self, image_type, image_hash, derivatives):
+        derived_dir = self.get_derived_dir(image_type, image_hash)
+        os.makedirs(derived_dir, exist_ok=True)
+        for name, data in derivatives.items():
+            tmp_path = os.path.join(derived_dir, f".{uuid4()}.part")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, os.path.join(derived_dir, name))
+
+    async def save_derivatives(self, image_type, image_hash, derivatives):
+        await self.run_io(self._save_derivatives, image_type, image_hash, derivatives)
+
+    async def get_derivative(self, image_type, image_hash, name):
+        """The path of the derivative, None when it was not rendered"""
+        path = os.path.join(self.get_derived_dir(image_type, image_hash), name)
+        if await self.run_io(os.path.isfile, path):
+            return path
+        return None
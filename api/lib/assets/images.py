@@ -0,0 +1,174 @@
+"""
+Resized derivatives of the uploaded images.
+
+Kiosks show labels as small tiles, so uploaded images are rendered to a few sizes, each as WebP and JPEG.  Decoding
+and resizing a large image is CPU bound, so it runs on a process pool rather than on the event loop.  Uploads are
+stored under the SHA-256 of their contents, identical uploads share their derivatives and a derivative never changes
+once written, so they are served with immutable cache headers.  Images uploaded before were stored under a random
+UUID, their derivatives are rendered from the original the first time they are requested.
+
+With `uploads.images.derivatives.enabled` turned off, or Pillow missing, uploads are only stored as originals.
+"""
+
+import asyncio
+import importlib.util
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Dict, Optional
+
+from lib import logging
+from lib.config import Config
+
+LOGGER = logging.getLogger(__name__)
+CONFIG = Config()
+
+IMAGE_TYPES = ["beer", "user", "beverage"]
+# longest edge, in pixels, of each derivative.  Images are never enlarged
+SIZES = {"thumb": 128, "tile": 400, "full": 1600}
+DEFAULT_SIZE = "full"
+FORMATS = {"webp": "image/webp", "jpg": "image/jpeg"}
+QUALITY = 82
+RASTER_EXTENSIONS = ["jpg", "jpeg", "png", "gif", "webp", "bmp"]
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DERIVED_DIR = "derived"
+HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+LEGACY_ID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}$")
+
+DEFAULT_PROCESSES = 1
+
+
+def is_hash(value: str) -> bool:
+    return bool(HASH_RE.match(value))
+
+
+def is_image_id(value: str) -> bool:
+    """Whether `value` names a stored original, by its hash or by the UUID the earlier uploads were stored under"""
+    return is_hash(value) or bool(LEGACY_ID_RE.match(value))
+
+
+def is_raster(filename: str) -> bool:
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in RASTER_EXTENSIONS
+
+
+def derivative_name(size: str, fmt: str) -> str:
+    return f"{size}.{fmt}"
+
+
+def derivative_url(image_type: str, image_hash: str, size: str) -> str:
+    return f"/api/v1/uploads/images/{image_type}/{image_hash}?size={size}"
+
+
+def upload_derivative_url(manager, url: str, size: str) -> str:
+    """
+    The URL of a derivative of the uploaded image `url` points to.  Any other URL, the ones of images hosted elsewhere
+    or of uploads derivatives are not rendered for, is returned as is.
+    """
+    parts = url.split("?", 1)[0].rsplit("/", 2)
+    if len(parts) != 3:
+        return url
+
+    _, image_type, filename = parts
+    image_id = filename.rsplit(".", 1)[0]
+    if image_type not in IMAGE_TYPES or not is_raster(filename) or not is_image_id(image_id) or manager.get(image_type, filename) != url:
+        return url
+    return derivative_url(image_type, image_id, size)
+
+
+def choose_format(accept: str) -> str:
+    """WebP for the clients accepting it, JPEG for the rest"""
+    return "webp" if "image/webp" in (accept or "") else "jpg"
+
+
+def render(data: bytes) -> Dict[str, bytes]:
+    """Render every size and format of the image, runs in the worker processes"""
+    from PIL import Image, ImageOps
+
+    rendered = {}
+    with Image.open(BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+
+        for size, edge in SIZES.items():
+            resized = img.copy()
+            resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+
+            buf = BytesIO()
+            resized.save(buf, "WEBP", quality=QUALITY, method=4)
+            rendered[derivative_name(size, "webp")] = buf.getvalue()
+
+            if has_alpha:
+                # JPEG has no transparency, so it is flattened onto white like most label backgrounds
+                background = Image.new("RGB", resized.size, (255, 255, 255))
+                background.paste(resized, mask=resized.getchannel("A"))
+                resized = background
+            buf = BytesIO()
+            resized.save(buf, "JPEG", quality=QUALITY, optimize=True, progressive=True)
+            rendered[derivative_name(size, "jpg")] = buf.getvalue()
+
+    return rendered
+
+
+class DerivativeRenderer:
+    def __init__(self, processes: int = None):
+        if processes is None:
+            processes = CONFIG.get("uploads.images.derivatives.processes", DEFAULT_PROCESSES)
+
+        self.processes = max(processes or 1, 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def available() -> bool:
+        return CONFIG.get("uploads.images.derivatives.enabled", True) and importlib.util.find_spec("PIL") is not None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def render(self, data: bytes) -> Optional[Dict[str, bytes]]:
+        """Render the derivatives of an image, None when they cannot be rendered"""
+        if not self.available():
+            return None
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, render, data)
+        except BrokenProcessPool:
+            LOGGER.error("The image derivatives process pool died, it will be restarted", exc_info=True)
+            self._executor = None
+            return None
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.warning("Failed to render the image derivatives", exc_info=True)
+            return None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_renderer: Optional[DerivativeRenderer] = None
+
+
+def get_renderer() -> DerivativeRenderer:
+    global _renderer  # pylint: disable=global-statement
+    if _renderer is None:
+        _renderer = DerivativeRenderer()
+    return _renderer
+
+
+async def create_derivatives(manager, image_type: str, image_hash: str, data: bytes) -> bool:
+    """Render and store the derivatives of an image unless an identical upload already has them"""
+    if await manager.get_derivative(image_type, image_hash, derivative_name(DEFAULT_SIZE, "jpg")):
+        return True
+
+    rendered = await get_renderer().render(data)
+    if not rendered:
+        return False
+
+    await manager.save_derivatives(image_type, image_hash, rendered)
+    return True
@@ -0,0 +1,188 @@
+"""
+Index of the images stored in S3.
+
+Listing a bucket prefix takes a paginated round trip per 1000 objects, so the S3 asset manager lists images from this
+index instead.  The index is kept in memory, backed by the `asset_listings` table so it survives restarts and is shared
+by the API workers, and is updated write-through when an image is uploaded.  Each process reloads its copy from the
+table every `uploads.s3.listings.refresh_sec`, so uploads through another worker show up, and the table is reconciled
+with the bucket every `uploads.s3.listings.reconcile_sec` to pick up the objects added or removed outside the app.  Only
+the worker holding a postgres advisory lock reconciles, the others pick the changes up from the table.  The lock is
+only held while a reconciliation runs, so the time of the last one is kept in `asset_listing_reconciles` and the
+workers waking up after it skip theirs.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from db import async_session_scope
+from db.asset_listing_reconciles import AssetListingReconciles
+from db.asset_listings import AssetListings
+from lib import logging
+from lib.config import Config
+
+LOGGER = logging.getLogger(__name__)
+CONFIG = Config()
+
+DEFAULT_REFRESH_SEC = 30
+DEFAULT_RECONCILE_SEC = 3600
+# key of the advisory lock taken by the worker reconciling the listings
+RECONCILE_LOCK_ID = 4_130_851_117
+
+
+class ListingStore:
+    """The `asset_listings` table"""
+
+    async def load(self, bucket: str, image_type: str) -> Dict[str, str]:
+        async with async_session_scope(CONFIG) as session:
+            rows = await AssetListings.query(session, bucket=bucket, image_type=image_type, q_fn=lambda q: q.order_by(AssetListings.key))
+        return {row.key: row.url for row in rows}
+
+    async def add(self, bucket: str, image_type: str, objects: Dict[str, str]):
+        if not objects:
+            return
+        values = [{"bucket": bucket, "key": key, "image_type": image_type, "url": url} for key, url in objects.items()]
+        async with async_session_scope(CONFIG) as session:
+            await session.execute(insert(AssetListings).values(values).on_conflict_do_nothing())
+
+    async def remove(self, bucket: str, keys):
+        if not keys:
+            return
+        async with async_session_scope(CONFIG) as session:
+            await session.execute(delete(AssetListings).where(AssetListings.bucket == bucket, AssetListings.key.in_(list(keys))))
+
+    @asynccontextmanager
+    async def reconcile_lock(self):
+        """Yields whether this process got the reconciliation lock, it is held until the block exits"""
+        async with async_session_scope(CONFIG) as session:
+            result = await session.execute(text("SELECT pg_try_advisory_xact_lock(:lock_id)"), {"lock_id": RECONCILE_LOCK_ID})
+            yield bool(result.scalar())
+
+    async def seconds_since_reconciled(self, bucket: str) -> Optional[float]:
+        """How long ago the listings of the bucket were reconciled, by the database clock, None if they never were"""
+        elapsed = func.extract("epoch", func.clock_timestamp() - AssetListingReconciles.reconciled_on)  # pylint: disable=not-callable
+        async with async_session_scope(CONFIG) as session:
+            result = await session.execute(select(elapsed).where(AssetListingReconciles.bucket == bucket))
+            seconds = result.scalar()
+        return None if seconds is None else float(seconds)
+
+    async def mark_reconciled(self, bucket: str):
+        now = func.clock_timestamp()  # pylint: disable=not-callable
+        stmt = insert(AssetListingReconciles).values(bucket=bucket, reconciled_on=now)
+        async with async_session_scope(CONFIG) as session:
+            await session.execute(stmt.on_conflict_do_update(index_elements=[AssetListingReconciles.bucket], set_={"reconciled_on": now}))
+
+
+class ListingIndex:
+    def __init__(self, store: ListingStore = None, refresh_sec: float = None):
+        if refresh_sec is None:
+            refresh_sec = CONFIG.get("uploads.s3.listings.refresh_sec", DEFAULT_REFRESH_SEC)
+
+        self.store = store or ListingStore()
+        self.refresh_sec = refresh_sec
+        self._objects: Dict[Tuple[str, str], Dict[str, str]] = {}
+        self._urls: Dict[Tuple[str, str], List[str]] = {}
+        self._loaded_at: Dict[Tuple[str, str], float] = {}
+        self._reconciled = set()
+        self._lock = asyncio.Lock()
+
+    def _set(self, listing, objects: Dict[str, str]):
+        self._objects[listing] = objects
+        self._urls[listing] = list(objects.values())
+        self._loaded_at[listing] = time.monotonic()
+
+    def _is_stale(self, listing) -> bool:
+        loaded_at = self._loaded_at.get(listing)
+        return loaded_at is None or time.monotonic() - loaded_at > self.refresh_sec
+
+    async def list(self, manager, image_type: str) -> List[str]:
+        """The URLs of the images of a type, only reaching the table when the copy in memory is stale"""
+        listing = (manager.bucket, image_type)
+        if self._is_stale(listing):
+            async with self._lock:
+                if self._is_stale(listing):
+                    await self._load(manager, image_type)
+        return self._urls[listing]
+
+    async def _load(self, manager, image_type: str):
+        listing = (manager.bucket, image_type)
+        objects = await self.store.load(manager.bucket, image_type)
+        if not objects and listing not in self._reconciled:
+            # the table is populated from the bucket the first time the images are listed
+            await self.reconcile(manager, image_type)
+            return
+        self._set(listing, objects)
+
+    async def add(self, manager, image_type: str, key: str, url: str):
+        """Add an uploaded image to the index"""
+        listing = (manager.bucket, image_type)
+        if self._is_stale(listing):
+            # so an upload into an empty table does not hide the images already in the bucket
+            await self.list(manager, image_type)
+        if key not in self._objects[listing]:
+            self._objects[listing][key] = url
+            self._urls[listing] = [*self._urls[listing], url]
+        await self.store.add(manager.bucket, image_type, {key: url})
+
+    async def reconcile(self, manager, image_type: str) -> Tuple[int, int]:
+        """Sync the index with the objects in the bucket, returns the number of images added and removed"""
+        listing = (manager.bucket, image_type)
+        # read before the bucket so an image uploaded while it is listed is not taken as removed
+        known = await self.store.load(manager.bucket, image_type)
+        objects = await manager.list_objects(image_type)
+
+        added = {key: url for key, url in objects.items() if key not in known}
+        removed = [key for key in known if key not in objects]
+        await self.store.add(manager.bucket, image_type, added)
+        await self.store.remove(manager.bucket, removed)
+
+        self._reconciled.add(listing)
+        self._set(listing, objects)
+        if added or removed:
+            LOGGER.info("Reconciled the %s image listings with bucket %s: %s added, %s removed", image_type, manager.bucket, len(added), len(removed))
+        return len(added), len(removed)
+
+
+_index: Optional[ListingIndex] = None
+
+
+def get_index() -> ListingIndex:
+    global _index  # pylint: disable=global-statement
+    if _index is None:
+        _index = ListingIndex()
+    return _index
+
+
+async def reconcile_periodically(manager, image_types: List[str], interval: float):
+    index = get_index()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with index.store.reconcile_lock() as acquired:
+                if not acquired:
+                    LOGGER.debug("The image listings are being reconciled by another worker")
+                    continue
+                elapsed = await index.store.seconds_since_reconciled(manager.bucket)
+                if elapsed is not None and elapsed < interval:
+                    LOGGER.debug("The image listings were reconciled by another worker %.0f seconds ago", elapsed)
+                    continue
+                # marked before reconciling, so the next run is an interval after this one started
+                await index.store.mark_reconciled(manager.bucket)
+                for image_type in image_types:
+                    try:
+                        await index.reconcile(manager, image_type)
+                    except Exception:  # pylint: disable=broad-exception-caught
+                        LOGGER.error("Failed to reconcile the %s image listings with the bucket", image_type, exc_info=True)
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.error("Failed to take the image listings reconciliation lock", exc_info=True)
+
+
+def start_reconciler(manager, image_types: List[str], interval: float = None) -> asyncio.Task:
+    """Reconcile the listings with the bucket in the background, from one worker at a time.  The task is cancelled on shutdown"""
+    if interval is None:
+        interval = CONFIG.get("uploads.s3.listings.reconcile_sec", DEFAULT_RECONCILE_SEC)
+    return asyncio.create_task(reconcile_periodically(manager, image_types, interval), name="s3-listing-reconciler")
@@ -1,8 +1,20 @@
+import hashlib
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
 from lib import aws
-from lib.assets import AssetManagerBase
+from lib.assets import AssetManagerBase, listings
+from lib.assets.images import DERIVED_DIR, FORMATS, IMMUTABLE_CACHE_CONTROL
+
+MB = 1024 * 1024
+DEFAULT_MULTIPART_CHUNK_SIZE_MB = 8
+DEFAULT_MAX_CONCURRENCY = 4
 
 
 class S3AssetManager(AssetManagerBase):
+    serves_files = False
+
     def __init__(self):
         super().__init__()
         self.bucket = self.config.get("uploads.s3.bucket.name")
@@ -13,6 +25,12 @@ class S3AssetManager(AssetManagerBase):
             prefix = ""
         self.prefix = prefix
 
+    def _transfer_config(self):
+        # uploads larger than one part are sent as a multipart upload, the parts uploaded by a few threads
+        chunk_size = max(self.config.get("uploads.s3.multipart_chunk_size_mb", DEFAULT_MULTIPART_CHUNK_SIZE_MB) or 5, 5) * MB
+        max_concurrency = max(self.config.get("uploads.s3.max_concurrency", DEFAULT_MAX_CONCURRENCY) or 1, 1)
+        return TransferConfig(multipart_threshold=chunk_size, multipart_chunksize=chunk_size, max_concurrency=max_concurrency)
+
     def _get_object_path(self, image_type, filename):
         return f"{self.prefix}{image_type}/{filename}"
 
@@ -22,13 +40,13 @@ class S3AssetManager(AssetManagerBase):
     def get(self, image_type, filename):
         return self._get(self._get_object_path(image_type, filename))
 
-    def list(self, image_type):
-        urls = []
+    def _list_objects(self, image_type):
+        objects = {}
 
         s3 = aws.client("s3")
 
         pull_more = True
-        prefix = f"{image_type}/"
+        prefix = self._get_object_path(image_type, "")
         data = {"Bucket": self.bucket, "Prefix": prefix}
         while pull_more:
             resp = s3.list_objects_v2(**data)
@@ -38,23 +56,41 @@ class S3AssetManager(AssetManagerBase):
             if contents:
                 for obj in contents:
                     key = obj.get("Key")
-                    if key == prefix:
+                    if key == prefix or f"/{DERIVED_DIR}/" in key:
                         continue
-                    url = self._get(key)
-                    if url:
-                        urls.append(url)
+                    objects[key] = self._get(key)
             data["ContinuationToken"] = resp.get("NextContinuationToken")
 
-        return urls
+        return objects
 
-    def save(self, image_type, file):
-        old_filename = file.filename
-        filename = self.generate_random_filename(old_filename)
+    async def list_objects(self, image_type):
+        """The objects of the images of a type in the bucket, by key.  Goes through the whole prefix"""
+        return await self.run_io(self._list_objects, image_type)
+
+    async def list(self, image_type):
+        return await listings.get_index().list(self, image_type)
+
+    def _upload(self, image_type, extension, file_obj):
+        # the object is named after the hash of the upload, so the upload is read once to hash it before being sent
+        digest = hashlib.sha256()
+        while chunk := file_obj.read(self.chunk_size):
+            digest.update(chunk)
+        file_obj.seek(0)
+
+        filename = f"{digest.hexdigest()}.{extension}"
         obj = self._get_object_path(image_type, filename)
 
-        s3 = aws.client("s3")
         # extra_args = {'ACL': 'public-read'}
-        extra_args = {}
+        extra_args = {"CacheControl": IMMUTABLE_CACHE_CONTROL}
+
+        s3 = aws.client("s3")
+        s3.upload_fileobj(file_obj, self.bucket, obj, ExtraArgs=extra_args, Config=self._transfer_config())
+        file_obj.seek(0)
+
+        return filename
+
+    async def save(self, image_type, file):
+        old_filename = file.filename
 
         # Handle both werkzeug FileStorage (Flask) and FastAPI UploadFile
         if hasattr(file, "file"):
@@ -64,6 +100,49 @@ class S3AssetManager(AssetManagerBase):
             # Flask werkzeug FileStorage - use directly
             file_obj = file
 
-        s3.upload_fileobj(file_obj, self.bucket, obj, ExtraArgs=extra_args)
+        filename = await self.run_io(self._upload, image_type, self.get_file_extension(old_filename), file_obj)
+        url = self.get(image_type, filename)
+        await listings.get_index().add(self, image_type, self._get_object_path(image_type, filename), url)
+
+        return old_filename, filename, url
+
+    def _read_original(self, image_type, image_hash):
+        s3 = aws.client("s3")
+        resp = s3.list_objects_v2(Bucket=self.bucket, Prefix=self._get_object_path(image_type, f"{image_hash}."), MaxKeys=1)
+        for obj in resp.get("Contents") or []:
+            return s3.get_object(Bucket=self.bucket, Key=obj["Key"])["Body"].read()
+        return None
+
+    async def read_original(self, image_type, image_hash):
+        return await self.run_io(self._read_original, image_type, image_hash)
+
+    def _get_derivative_path(self, image_type, image_hash, name):
+        return self._get_object_path(image_type, f"{DERIVED_DIR}/{image_hash}/{name}")
+
+    def _save_derivatives(self, image_type, image_hash, derivatives):
+        s3 = aws.client("s3")
+        for name, data in derivatives.items():
+            s3.put_object(
+                Bucket=self.bucket,
+                Key=self._get_derivative_path(image_type, image_hash, name),
+                Body=data,
+                ContentType=FORMATS[name.rsplit(".", 1)[1]],
+                CacheControl=IMMUTABLE_CACHE_CONTROL,
+            )
+
+    async def save_derivatives(self, image_type, image_hash, derivatives):
+        await self.run_io(self._save_derivatives, image_type, image_hash, derivatives)
+
+    def _get_derivative(self, image_type, image_hash, name):
+        obj = self._get_derivative_path(image_type, image_hash, name)
+        try:
+            aws.client("s3").head_object(Bucket=self.bucket, Key=obj)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return self._get(obj)
 
-        return old_filename, filename, self._get(obj)
+    async def get_derivative(self, image_type, image_hash, name):
+        """The URL of the derivative, None when it was not rendered"""
+        return await self.run_io(self._get_derivative, image_type, image_hash, name)
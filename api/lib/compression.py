@@ -0,0 +1,231 @@
+"""
+Compression of the HTTP responses.
+
+`CompressionMiddleware` compresses the responses of the API with brotli or gzip, picked through the request
+`Accept-Encoding`, at a level fast enough to be done on every request.  Bodies smaller than `minimum_size` are sent as
+they are, the headers and the decompression cost more than the bytes saved.  Responses that are not meant to be
+buffered, event streams and the routes decorated with `no_compression`, responses that already have a
+`Content-Encoding` and partial responses are left alone.
+
+Content served many times unchanged is kept in a `CompressedSnapshot`, compressed once at the best level, so the
+middleware passes its compressed variants through rather than compressing it on every hit.
+"""
+
+import gzip
+import zlib
+from typing import Dict, Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# in order of preference
+ENCODINGS = ("br", "gzip")
+
+COMPRESSIBLE_TYPES = [
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "image/svg+xml",
+    "image/x-icon",
+    "image/vnd.microsoft.icon",
+]
+# sent as they are produced, compressing them would hold the events back
+STREAMING_TYPES = ["text/event-stream"]
+MIN_COMPRESS_SIZE = 1024
+
+# the levels of the responses compressed on every request, snapshots are compressed once at the best ones
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+BEST_LEVELS = {"br": 11, "gzip": 9}
+
+NO_COMPRESSION_ATTR = "__no_compression__"
+
+
+def is_compressible(media_type: str) -> bool:
+    return any(media_type.startswith(t) for t in COMPRESSIBLE_TYPES)
+
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """The encodings accepted by the client with their q-value, those refused with `q=0` left out"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding: str, available: Iterable[str]) -> Optional[str]:
+    """The preferred encoding available and accepted by the client, None to send the body as is"""
+    accepted = accepted_encodings(accept_encoding)
+    candidates = [enc for enc in ENCODINGS if enc in available and (enc in accepted or "*" in accepted)]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda enc: accepted.get(enc, accepted.get("*", 0)))
+
+
+def available_encodings():
+    return [enc for enc in ENCODINGS if enc != "br" or brotli is not None]
+
+
+def compress(data: bytes, encoding: str, level: int = None) -> bytes:
+    """Compress with the encoding, at its best level unless `level` is given"""
+    if level is None:
+        level = BEST_LEVELS[encoding]
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def no_compression(endpoint):
+    """Decorator sending the responses of a route uncompressed, for the ones sent as they are produced"""
+    setattr(endpoint, NO_COMPRESSION_ATTR, True)
+    return endpoint
+
+
+class StreamCompressor:
+    """Compresses a body sent in several chunks"""
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+            self.compress = self._compressor.process
+            self.finish = self._compressor.finish
+        else:
+            # wbits of 16 + 15 writes the gzip header and trailer
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress = self._compressor.compress
+            self.finish = self._compressor.flush
+
+
+class CompressedSnapshot:
+    """A body rendered once, kept along with its compressed variants for the content served many times unchanged"""
+
+    def __init__(self, body: bytes, media_type: str, minimum_size: int = MIN_COMPRESS_SIZE):
+        self.body = body
+        self.media_type = media_type
+        self.variants: Dict[str, bytes] = {}
+        if len(body) >= minimum_size:
+            self.variants = {enc: compress(body, enc) for enc in available_encodings()}
+
+    def choose_encoding(self, headers) -> Optional[str]:
+        return choose_encoding(headers.get("accept-encoding"), self.variants)
+
+    def response(self, headers, encoding: str = None, response_headers: Dict[str, str] = None) -> Response:
+        """The body compressed with `encoding`, the one accepted by the request `headers` by default"""
+        if encoding is None:
+            encoding = self.choose_encoding(headers)
+
+        response_headers = dict(response_headers or {})
+        if self.variants:
+            response_headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+            return Response(self.variants[encoding], media_type=self.media_type, headers=response_headers)
+        return Response(self.body, media_type=self.media_type, headers=response_headers)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing the responses with the encoding accepted by the client"""
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_SIZE, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"br": brotli_quality, "gzip": gzip_level}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"), available_encodings())
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[StreamCompressor] = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if start_message is None:
+                # the headers are sent, the rest of the body goes through the compressor, if it was compressed
+                if compressor is None or message["type"] != "http.response.body":
+                    await send(message)
+                    return
+                more_body = message.get("more_body", False)
+                body = compressor.compress(message.get("body", b""))
+                if not more_body:
+                    body += compressor.finish()
+                if body or not more_body:
+                    await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            start, start_message = start_message, None
+            if message["type"] != "http.response.body" or not self.should_compress(scope, start, message):
+                await send(start)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=list(start["headers"]))
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            # the compressed body is not the same representation as the one the ETag was computed for
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                compressor = StreamCompressor(encoding, self.levels[encoding])
+                body = compressor.compress(body)
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+            else:
+                body = compress(body, encoding, self.levels[encoding])
+                headers["Content-Length"] = str(len(body))
+
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": body, "more_body": message.get("more_body", False)})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def should_compress(self, scope, start, message) -> bool:
+        """Whether to compress the response, decided on its headers and its first body chunk"""
+        if start["status"] < 200 or start["status"] in (204, 206, 304):
+            return False
+        if getattr(scope.get("endpoint"), NO_COMPRESSION_ATTR, False):
+            return False
+
+        headers = Headers(raw=start["headers"])
+        # a range is a slice of the uncompressed body, compressing it would not match the Content-Range sent
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        media_type = headers.get("content-type", "")
+        if not is_compressible(media_type) or any(media_type.startswith(t) for t in STREAMING_TYPES):
+            return False
+
+        if not message.get("more_body", False):
+            return len(message.get("body", b"")) >= self.minimum_size
+        content_length = headers.get("content-length")
+        return content_length is None or int(content_length) >= self.minimum_size
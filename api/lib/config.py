@@ -1,6 +1,9 @@
+import copy
 import json
 import logging
 import os
+import signal
+from types import MappingProxyType
 
 from lib import Error, ThreadSafeSingleton
 from lib.util import flatten_dict
@@ -90,6 +93,8 @@ class Config(metaclass=ThreadSafeSingleton):
 
     def __init__(self, **kwargs):
         self.logger = logging.getLogger("config")
+        self._snapshot = MappingProxyType({})
+        self._lookups = {}
 
         self.setup(**kwargs)
 
@@ -136,6 +141,54 @@ class Config(metaclass=ThreadSafeSingleton):
 
         return {self.gen_key(k): v for k, v in schema.items()}
 
+    def _get_converter(self, _key):
+        conversion_scheme = self.conversion_schema.get(_key)
+        if not conversion_scheme:
+            return None
+
+        parts = conversion_scheme.split("|")
+        conversion_type = parts[0]
+        conversion_args = tuple(parts[1:])
+        converter = self.type_conversions.get(conversion_type)
+
+        if not converter:
+            self.logger.warning("No value converter for type: %s", conversion_type)
+            return None
+
+        if not conversion_args:
+            return converter
+        return lambda val: converter(val, *conversion_args)
+
+    def _freeze(self):
+        """
+        Resolve every known value into an immutable, type converted snapshot.  Explicit configs take precedence over the
+        environment, which takes precedence over the config files.
+        """
+        values = dict(self.data_flat)
+        values.update({k: v for k, v in os.environ.items() if k.startswith(self.key_prefix)})
+        values.update(self.explicit_configs)
+
+        for _key in self.conversion_schema:
+            if values.get(_key) is not None:
+                converter = self._get_converter(_key)
+                if converter:
+                    values[_key] = converter(values[_key])
+
+        self._snapshot = MappingProxyType(values)
+        self._lookups = {}
+
+    def _resolve_lookup(self, key):
+        keys = [key] + self.key_aliases.get(key.upper(), [])
+
+        for k in keys:
+            _key = self.gen_key(k)
+            if self._snapshot.get(_key) is not None:
+                break
+
+        converter = self._get_converter(_key)
+        has_children = converter is None and any(k.startswith(f"{_key}_") for k in self.data_flat)
+        return _key, converter, has_children
+
     def fmt_key(self, key: str) -> str:
         return key.replace(".", "_").replace("-", "_").upper()
 
@@ -152,8 +205,20 @@ class Config(metaclass=ThreadSafeSingleton):
         conversion_schema=None,
         explicit_configs=None,
     ):
+        self._setup_args = {
+            "env_prefix": env_prefix,
+            "config_files": list(config_files or []),
+            "base_dir": base_dir,
+            "required_keys": required_keys,
+            "config_overrides": copy.deepcopy(config_overrides),
+            "conversion_schema": conversion_schema,
+            "explicit_configs": explicit_configs,
+        }
+
         if not config_files:
             config_files = []
+        else:
+            config_files = list(config_files)
 
         if not conversion_schema:
             conversion_schema = {}
@@ -173,61 +238,82 @@ class Config(metaclass=ThreadSafeSingleton):
 
         self.data_flat = {}
         self._load_conf(self.defaults)
-        self._load_conf(config_overrides)
+        self._load_conf(copy.deepcopy(config_overrides))
 
         config_path = os.environ.get(self.gen_key("CONFIG_PATH"))
         if config_path:
             config_files.append(config_path)
 
         base_dir = os.environ.get(self.gen_key("CONFIG_BASE_DIR"), os.path.dirname(os.path.abspath(__file__)) if not base_dir else base_dir)
-        self.set("CONFIG_BASE_DIR", base_dir)
+        self.data_flat[self.gen_key("CONFIG_BASE_DIR")] = base_dir
 
         for config_file in config_files:
             self._load_config_file(config_file, base_dir)
 
         self._verify_required_keys(required_keys)
+        self._freeze()
 
     def get(self, key, default=None, required=False):
-        keys = [key] + self.key_aliases.get(key.upper(), [])
+        lookup = self._lookups.get(key)
+        if lookup is None:
+            lookup = self._lookups[key] = self._resolve_lookup(key)
+        _key, converter, has_children = lookup
 
-        result = None
-        for k in keys:
-            _key = self.gen_key(k)
-            result = self.explicit_configs.get(_key, os.environ.get(_key, self.data_flat.get(_key)))
-            if result is not None:
-                break
-        if result is None:
-            result = default
+        result = self._snapshot.get(_key)
+        if result is not None:
+            return result
 
-        if required and result is None:
+        if required and default is None:
             raise RequiredConfigKeyNotFound(key)
 
-        conversion_scheme = self.conversion_schema.get(_key)
-
-        if conversion_scheme:
-            parts = conversion_scheme.split("|")
-            conversion_type = parts[0]
-            conversion_args = () if len(parts) == 1 else tuple(parts[1:])
-            converter = self.type_conversions.get(conversion_type)
-
-            if not converter:
-                self.logger.warning("No value converter for type: %s", conversion_type)
-            else:
-                return converter(result, *conversion_args)
-
-        if result is None:
-            children = {k: v for k, v in self.data_flat.items() if k.startswith(f"{_key}_")}
-            if children:
-                self.logger.debug("No value found for key '%s', but child values found. Assuming the caller wanted a dict and returning a ConfigHelper", key)
-                return self.get_helper(key)
-
-        return result
+        if converter:
+            return converter(default)
+
+        if default is None and has_children:
+            self.logger.debug("No value found for key '%s', but child values found. Assuming the caller wanted a dict and returning a ConfigHelper", key)
+            return self.get_helper(key)
+
+        return default
+
+    @property
+    def snapshot(self):
+        """The resolved, type converted config values keyed by their environment variable style key"""
+        return self._snapshot
+
+    def reload(self):
+        """
+        Re-read the environment and config files and swap in a new snapshot.  If anything fails, the previous
+        configuration is kept.  Values that were already read and stored by other objects are not updated.
+        """
+        previous = dict(self.__dict__)
+        try:
+            self.setup(**self._setup_args)
+        except Exception:
+            self.__dict__.update(previous)
+            self.logger.error("Failed to reload the configuration, keeping the previous configuration", exc_info=True)
+            return False
+
+        self.logger.info("Configuration reloaded")
+        return True
+
+    def install_reload_handler(self, loop):
+        """Reload the configuration when the process receives SIGHUP"""
+        if not hasattr(signal, "SIGHUP"):
+            return False
+
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self.reload)
+        except (NotImplementedError, RuntimeError):
+            self.logger.warning("Unable to install the SIGHUP handler for reloading the configuration")
+            return False
+        return True
 
     def assert_keys_exist(self, expected_keys):
         self._verify_required_keys(expected_keys)
 
     def set(self, key, value):
         self.data_flat[self.gen_key(key)] = value
+        self._freeze()
 
     def __setitem__(self, key, value):
         self.set(key, value)
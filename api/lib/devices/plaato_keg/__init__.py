@@ -1,12 +1,26 @@
-from lib import ThreadSafeSingleton
+from lib import ThreadSafeSingleton, roles
 from lib.devices.plaato_keg.command_writer import CommandWriter
 from lib.devices.plaato_keg.connection_handler import ConnectionHandler
+from lib.devices.plaato_keg.remote import RemoteConnectionHandler
+from lib.devices.plaato_keg.sharding import ShardedConnectionHandler, is_sharded
 
 
 class PlaatoServiceHandler(metaclass=ThreadSafeSingleton):
     def __init__(self):
-        self.connection_handler = ConnectionHandler()
+        if not roles.runs_ingestion():
+            self.connection_handler = RemoteConnectionHandler()
+        elif is_sharded():
+            self.connection_handler = ShardedConnectionHandler()
+        else:
+            self.connection_handler = ConnectionHandler()
         self.command_writer = CommandWriter(self.connection_handler)
 
 
-service_handler = PlaatoServiceHandler()
+class _LazyServiceHandler:
+    """Stands in for the `PlaatoServiceHandler` so it is only built when Plaato is actually used"""
+
+    def __getattr__(self, name):
+        return getattr(PlaatoServiceHandler(), name)
+
+
+service_handler = _LazyServiceHandler()
@@ -1,6 +1,10 @@
 import struct
 from enum import IntEnum
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
+
+HEADER = struct.Struct(">BHH")
+HEADER_SIZE = HEADER.size
+RESPONSE_HEADER = struct.Struct(">BHHH")
 
 
 class BlynkCommand(IntEnum):
@@ -66,7 +70,14 @@ class BlynkStatus(IntEnum):
     UNKNOWN = -1
 
 
+# lookup tables, so decoding does not go through the (exception raising) enum constructors
+COMMANDS: Dict[int, BlynkCommand] = {c.value: c for c in BlynkCommand}
+STATUSES: Dict[int, BlynkStatus] = {s.value: s for s in BlynkStatus}
+
+
 class BlynkMessage:
+    __slots__ = ("command", "msg_id", "status", "length", "body")
+
     command: BlynkCommand
     msg_id: int
     status: Optional[BlynkStatus]
@@ -91,50 +102,39 @@ class BlynkMessage:
         return self.length
 
 
-def decode(data: bytes) -> List[BlynkMessage]:
+def decode(data: Union[bytes, bytearray, memoryview]) -> List[BlynkMessage]:
     """Decode Blynk protocol messages from binary data"""
     messages = []
     offset = 0
+    # the frames are read through a view, only the bodies are copied out of the buffer
+    view = memoryview(data)
+    data_len = len(view)
+    unpack_from = HEADER.unpack_from
 
-    while offset < len(data):
-        if len(data) - offset < 5:
-            break
+    while data_len - offset >= HEADER_SIZE:
+        cmd, msg_id, length = unpack_from(view, offset)
+        body_start = offset + HEADER_SIZE
 
-        cmd = data[offset]
-        msg_id = struct.unpack(">H", data[offset + 1 : offset + 3])[0]
-        length = struct.unpack(">H", data[offset + 3 : offset + 5])[0]
-
-        try:
-            cmd_enum = BlynkCommand(cmd)
-        except ValueError:
+        cmd_enum = COMMANDS.get(cmd)
+        if cmd_enum is None:
             cmd_enum = f"unknown_cmd_{cmd}"
 
-        if cmd_enum == BlynkCommand.RESPONSE:
-            try:
-                status = BlynkStatus(length)
-            except ValueError:
+        if cmd_enum is BlynkCommand.RESPONSE:
+            status = STATUSES.get(length)
+            if status is None:
                 status = f"unknown_status_{length}"
 
-            body_start = offset + 5
-            if body_start < len(data):
-                body = data[body_start:]
-            else:
-                body = b""
+            body = view[body_start:].tobytes()
 
             messages.append(BlynkMessage(command=cmd_enum, msg_id=msg_id, status=status, body=body))
             break
-        else:
-            body_start = offset + 5
-            body_end = body_start + length
-
-            if body_end > len(data):
-                break
 
-            body = data[body_start:body_end]
-
-            messages.append(BlynkMessage(command=cmd_enum, msg_id=msg_id, length=length, body=body))
+        body_end = body_start + length
+        if body_end > data_len:
+            break
 
-            offset = body_end
+        messages.append(BlynkMessage(command=cmd_enum, msg_id=msg_id, length=length, body=view[body_start:body_end].tobytes()))
+        offset = body_end
 
     return messages
 
@@ -146,8 +146,7 @@ def encode_command(cmd: Union[BlynkCommand, int], msg_id: int, body: bytes = b""
     else:
         cmd_byte = cmd
 
-    length = len(body)
-    return struct.pack(">BHH", cmd_byte, msg_id, length) + body
+    return HEADER.pack(cmd_byte, msg_id, len(body)) + body
 
 
 def encode_response(msg_id: int, status: Union[BlynkStatus, int], body: bytes = b"") -> bytes:
@@ -157,10 +156,9 @@ def encode_response(msg_id: int, status: Union[BlynkStatus, int], body: bytes =
     else:
         status_value = status
 
-    length = len(body)
-    return struct.pack(">BHHH", 0, msg_id, status_value, length) + body
+    return RESPONSE_HEADER.pack(0, msg_id, status_value, len(body)) + body
 
 
 def response_success(msg_id: int = 1) -> bytes:
     """Generate a standard success response"""
-    return struct.pack(">BHH", 0, msg_id, BlynkStatus.SUCCESS.value)
+    return HEADER.pack(0, msg_id, BlynkStatus.SUCCESS.value)
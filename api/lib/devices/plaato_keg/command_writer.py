@@ -1,12 +1,15 @@
 from enum import IntEnum, StrEnum
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from lib import logging
-from lib.devices.plaato_keg.blynk_protocol import BlynkCommand
-from lib.devices.plaato_keg.blynk_protocol import encode_command as encode_blynk_command
+from lib.config import Config
 from lib.devices.plaato_keg.plaato_protocol import PlaatoPin, validate_and_pad_1_and_2
 
 LOGGER = logging.getLogger(__name__)
+CONFIG = Config()
+
+DEFAULT_ACK_TIMEOUT_SEC = 5
+DEFAULT_RETRIES = 1
 
 
 class Commands(StrEnum):
@@ -50,50 +53,79 @@ def sanitize_command(command: str) -> str:
 class CommandWriter:
     """Handles sending commands to Plaato Keg devices"""
 
-    def __init__(self, connection_handler):
+    def __init__(self, connection_handler, ack_timeout: float = None, retries: int = None):
+        if ack_timeout is None:
+            ack_timeout = CONFIG.get("tap_monitors.plaato_keg.commands.ack_timeout_sec", DEFAULT_ACK_TIMEOUT_SEC)
+        if retries is None:
+            retries = CONFIG.get("tap_monitors.plaato_keg.commands.retries", DEFAULT_RETRIES)
+
         self.connection_handler = connection_handler
-        self.msg_id_counter = 1
+        self.ack_timeout = ack_timeout or 0
+        self.retries = max(retries or 0, 0)
+
+    async def _send_hardware_commands(self, device_id: str, pins: List[Tuple[int, str]]) -> bool:
+        """
+        Send hardware commands to a keg in a single write and, when enabled, wait for the keg to acknowledge all of
+        them.  The whole batch is resent, with new message IDs, if the keg does not acknowledge it in time.
+        """
+        for attempt in range(self.retries + 1):
+            LOGGER.debug("Device command details. device_id: %s, pins: %s", device_id, pins)
+            success = await self.connection_handler.send_hardware_commands(device_id, pins, ack_timeout=self.ack_timeout or None)
+
+            if success:
+                LOGGER.info(f"Sent hardware command(s) to keg {device_id}: {pins}")
+                return True
 
-    def _get_next_msg_id(self) -> int:
-        """Get next message ID"""
-        msg_id = self.msg_id_counter
-        self.msg_id_counter += 1
-        if self.msg_id_counter > 65535:
-            self.msg_id_counter = 1
-        return msg_id
+            if attempt < self.retries:
+                LOGGER.warning(f"Hardware command(s) to keg {device_id} not acknowledged, retrying ({attempt + 1}/{self.retries}): {pins}")
+
+        LOGGER.error(f"Failed to send hardware command(s) to keg {device_id}: {pins}")
+        return False
 
     async def _send_hardware_command(self, device_id: str, pin: int, value: str) -> bool:
         """Send a hardware command to a keg"""
-        LOGGER.debug(f"Device command details. device_id: {device_id}, pin: {pin}, data: {value}")
-        body = f"vw\x00{pin}\x00{value}".encode("utf-8")
-        LOGGER.debug(f"formatted command body: {body}")
-        msg_id = self._get_next_msg_id()
-        command = encode_blynk_command(BlynkCommand.HARDWARE, msg_id, body)
-        LOGGER.debug(f"Encoded command: {command}")
-
-        success = await self.connection_handler.send_command_to_keg(device_id, command)
-        if success:
-            LOGGER.info(f"Sent hardware command to keg {device_id}: pin={pin}, value={value}")
-        else:
-            LOGGER.error(f"Failed to send hardware command to keg {device_id}")
-        return success
+        return await self._send_hardware_commands(device_id, [(pin, value)])
 
-    async def send_command(self, device_id: str, command: str, value: Any = None) -> bool:
+    def _resolve_command(self, command: str, value: Any = None) -> Optional[Tuple[int, str]]:
+        """Map a command and value to the pin to write and the value to write to it"""
         command_info = COMMAND_MAPP.get(sanitize_command(command))
 
         if not command_info:
-            return False  # TODO raise exception
+            return None  # TODO raise exception
 
         static_val = command_info.get("value")
         if static_val is not None:
             value = static_val
 
         if value is None or value == "":
-            return False  # TODO raise exception
+            return None  # TODO raise exception
 
         fn = command_info.get("fn")
         if fn:
             value = fn(value)
 
-        LOGGER.debug(f"Sending device command: {command}, data: {value}")
-        return await self._send_hardware_command(device_id, command_info["pin"], str(value))
+        return command_info["pin"], str(value)
+
+    async def send_command(self, device_id: str, command: str, value: Any = None) -> bool:
+        pin_val = self._resolve_command(command, value)
+        if not pin_val:
+            return False
+
+        LOGGER.debug("Sending device command: %s, data: %s", command, pin_val[1])
+        return await self._send_hardware_commands(device_id, [pin_val])
+
+    async def send_commands(self, device_id: str, commands: List[Tuple[str, Any]]) -> bool:
+        """Send several commands to a keg in one write, returns True only if all of them were delivered"""
+        pins = []
+        for command, value in commands:
+            pin_val = self._resolve_command(command, value)
+            if not pin_val:
+                LOGGER.warning(f"Invalid device command: {command}, data: {value}")
+                return False
+            pins.append(pin_val)
+
+        if not pins:
+            return True
+
+        LOGGER.debug("Sending device commands: %s", commands)
+        return await self._send_hardware_commands(device_id, pins)
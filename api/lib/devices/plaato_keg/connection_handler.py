@@ -1,19 +1,25 @@
 import asyncio
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, Optional, Set
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from db import async_session_scope
 from db.plaato_data import PlaatoData as PlaatoDataDB
 from lib import logging
 from lib.config import Config
 from lib.devices.plaato_keg import blynk_protocol, plaato_data, plaato_protocol
+from lib.devices.plaato_keg.blynk_protocol import BlynkCommand, BlynkStatus
 from lib.devices.plaato_keg.command_writer import Commands
 from lib.devices.plaato_keg.data_processor import DataProcessor
+from lib.devices.plaato_keg.ingestion_queue import IngestionQueue
 
 LOGGER = logging.getLogger(__name__)
 CONFIG = Config()
 
+DEFAULT_IDLE_TIMEOUT_SEC = 300
+DEFAULT_REAPER_INTERVAL_SEC = 30
+
 
 @dataclass
 class ConnectionState:
@@ -23,6 +29,9 @@ class ConnectionState:
     processor: Optional[DataProcessor] = None
     reader: Optional[asyncio.StreamReader] = None
     writer: Optional[asyncio.StreamWriter] = None
+    connection_id: Optional[str] = None
+    last_seen: float = field(default_factory=time.monotonic)
+    timed_out: bool = False
 
 
 class ConnectionHandler:
@@ -31,42 +40,77 @@ class ConnectionHandler:
     def __init__(self):
         self.connections: Dict[str, ConnectionState] = {}
         self.socket_registry: Dict[str, ConnectionState] = {}
+        self.device_connections: Dict[str, Set[str]] = {}
+        # message IDs are only allocated here, by the process that owns the sockets the acknowledgements come from
+        self.msg_id_counter = 1
+        self.pending_acks: Dict[Tuple[str, int], asyncio.Future] = {}
+        self.ingestion_queue = IngestionQueue(DataProcessor.persist)
+        self.idle_timeout = CONFIG.get("tap_monitors.plaato_keg.idle_timeout_sec", DEFAULT_IDLE_TIMEOUT_SEC)
+        self.reaper_interval = CONFIG.get("tap_monitors.plaato_keg.reaper_interval_sec", DEFAULT_REAPER_INTERVAL_SEC)
         self._running = False
         self._server: Optional[asyncio.Server] = None
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[str, str, Optional[str]], None]] = []
+        self._background_tasks: Set[asyncio.Task] = set()
+        self.frames_received = 0
+        self.decode_errors = 0
+
+    def add_listener(self, listener: Callable[[str, str, Optional[str]], None]):
+        """Register a callback for connection events, called with (event, connection_id, device_id)"""
+        self._listeners.append(listener)
+
+    def _emit(self, event: str, connection_id: str, device_id: Optional[str] = None):
+        for listener in self._listeners:
+            try:
+                listener(event, connection_id, device_id)
+            except Exception:
+                LOGGER.error("Error notifying listener of %s event for connection %s", event, connection_id, stack_info=True, exc_info=True)
 
     async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
         """Handle a new device connection"""
         addr = writer.get_extra_info("peername")
         LOGGER.info(f"New connection from {addr}")
 
-        processor = DataProcessor()
-        state = ConnectionState(processor=processor, reader=reader, writer=writer)
-
+        processor = DataProcessor(ingestion_queue=self.ingestion_queue)
         connection_id = f"{addr[0]}:{addr[1]}"
+        state = ConnectionState(processor=processor, reader=reader, writer=writer, connection_id=connection_id)
+
         self.connections[connection_id] = state
+        self._emit("connected", connection_id)
 
         try:
             while True:
                 LOGGER.debug("Reading data...")
-                data = await asyncio.wait_for(reader.read(1024), timeout=300)
-                LOGGER.debug(f"data read: {data}")
+                # idle connections are closed by the reaper task, which ends this read with EOF
+                data = await reader.read(1024)
+                LOGGER.debug("data read: %s", data)
 
                 if not data:
-                    LOGGER.debug("no data, bailing and closing the connection")
+                    if state.timed_out:
+                        LOGGER.warning(f"Connection timed out: {addr}")
+                    else:
+                        LOGGER.debug("no data, bailing and closing the connection")
                     break
 
+                state.last_seen = time.monotonic()
+
                 messages = blynk_protocol.decode(data)
+                self.frames_received += len(messages)
                 for msg in messages:
+                    if msg.command == BlynkCommand.RESPONSE and state.device_id:
+                        self._resolve_ack(state.device_id, msg.msg_id, msg.status)
                     writer.write(blynk_protocol.response_success(msg.msg_id))
                 await writer.drain()
 
-                await processor.process_data(data)
+                if not await processor.process_data(data, messages):
+                    self.decode_errors += 1
 
                 if self._register_new_socket(data, state):
-                    await self._send_user_override_commands(state.device_id)
+                    # the keg's acknowledgements arrive through this read loop, so the commands cannot be awaited here
+                    task = asyncio.create_task(self._send_user_override_commands(state.device_id))
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._background_tasks.discard)
 
-        except asyncio.TimeoutError:
-            LOGGER.warning(f"Connection timed out: {addr}")
         except asyncio.CancelledError:
             LOGGER.info(f"Connection cancelled: {addr}")
         except Exception as e:
@@ -76,64 +120,84 @@ class ConnectionHandler:
 
     async def _send_user_override_commands(self, device_id):
 
-        commands = []
-        async with async_session_scope(CONFIG) as db_session:
-            dev = await PlaatoDataDB.get_by_pkey(db_session, device_id)
-            if dev:
-                if dev.user_keg_mode_c02_beer:
-                    commands.append((Commands.SET_MODE, dev.user_keg_mode_c02_beer))
-                if dev.user_unit:
-                    commands.append((Commands.SET_UNIT, dev.user_unit))
-                if dev.user_measure_unit:
-                    commands.append((Commands.SET_MEASURE_UNIT, dev.user_measure_unit))
-
-        if commands:
-            from lib.devices.plaato_keg import service_handler
-
-            command_writer = service_handler.command_writer
-            LOGGER.info(f"Sending user overrideable commands to keg {device_id}: {commands}")
-            for cmd, val in commands:
-                await command_writer.send_command(device_id, cmd, val)
+        try:
+            commands = []
+            async with async_session_scope(CONFIG) as db_session:
+                dev = await PlaatoDataDB.get_by_pkey(db_session, device_id)
+                if dev:
+                    if dev.user_keg_mode_c02_beer:
+                        commands.append((Commands.SET_MODE, dev.user_keg_mode_c02_beer))
+                    if dev.user_unit:
+                        commands.append((Commands.SET_UNIT, dev.user_unit))
+                    if dev.user_measure_unit:
+                        commands.append((Commands.SET_MEASURE_UNIT, dev.user_measure_unit))
+
+            if commands:
+                from lib.devices.plaato_keg import service_handler
+
+                command_writer = service_handler.command_writer
+                LOGGER.info(f"Sending user overrideable commands to keg {device_id}: {commands}")
+                await command_writer.send_commands(device_id, commands)
+        except Exception:
+            LOGGER.error(f"Error sending user overrideable commands to keg {device_id}", stack_info=True, exc_info=True)
 
     async def _cleanup_connection(self, connection_id: str, state: ConnectionState):
         """Clean up a closed connection"""
-        LOGGER.debug(f"Attempting to clean up connection id: {connection_id}")
-
-        if state.device_id and state.device_id in self.socket_registry:
-            found = False
-            for conn_id, conn_state in self.connections.items():
-                if conn_id == connection_id:
-                    continue
-                if conn_state.device_id and state.device_id == conn_state.device_id:
-                    found = True
-                    break
-            if not found:
-                LOGGER.info(f"Keg {state.device_id} disconnected")
-                del self.socket_registry[state.device_id]
+        LOGGER.debug("Attempting to clean up connection id: %s", connection_id)
+
+        if state.device_id:
+            self._unregister_device_connection(state.device_id, connection_id)
 
-        if connection_id in self.connections:
-            del self.connections[connection_id]
+        if self.connections.pop(connection_id, None) is not None:
+            self._emit("disconnected", connection_id, state.device_id)
 
         if state.writer:
             state.writer.close()
             await state.writer.wait_closed()
 
+    def _register_device_connection(self, device_id: str, state: ConnectionState):
+        """Index the connection under its device id, the newest connection is the one commands are sent to"""
+        self.device_connections.setdefault(device_id, set()).add(state.connection_id)
+        self.socket_registry[device_id] = state
+        self._emit("registered", state.connection_id, device_id)
+
+    def _unregister_device_connection(self, device_id: str, connection_id: str):
+        """Remove the connection from the device index, dropping the device once its last connection is gone"""
+        conn_ids = self.device_connections.get(device_id)
+        if conn_ids is None:
+            return
+
+        conn_ids.discard(connection_id)
+        if not conn_ids:
+            LOGGER.info(f"Keg {device_id} disconnected")
+            del self.device_connections[device_id]
+            self.socket_registry.pop(device_id, None)
+            self._fail_pending_acks(device_id)
+            return
+
+        registered = self.socket_registry.get(device_id)
+        if registered is None or registered.connection_id == connection_id:
+            # the registered socket closed, but the keg is still connected through another one
+            remaining = self.connections.get(next(iter(conn_ids)))
+            if remaining:
+                self.socket_registry[device_id] = remaining
+
     def _register_new_socket(self, data: bytes, state: ConnectionState) -> bool:
         """Register socket if keg ID is found in data"""
-        LOGGER.debug(f"Attempting to register new device connection...")
+        LOGGER.debug("Attempting to register new device connection...")
         if state.device_id:
-            LOGGER.debug(f"Connection already registered, device_id: {state.device_id}")
+            LOGGER.debug("Connection already registered, device_id: %s", state.device_id)
             return False
 
         device_id = state.device_id
         if not device_id:
-            LOGGER.debug(f"extracting keg id....")
+            LOGGER.debug("extracting keg id....")
             device_id = self._extract_device_id(data)
 
         if device_id:
             LOGGER.info(f"Registering socket for keg {device_id}")
             state.device_id = device_id
-            self.socket_registry[device_id] = state
+            self._register_device_connection(device_id, state)
             return True
 
         return False
@@ -156,8 +220,44 @@ class ConnectionHandler:
             LOGGER.error(f"Error extracting keg ID: {e}", stack_info=True, exc_info=True)
             return None
 
-    async def send_command_to_keg(self, device_id: str, command: bytes) -> bool:
-        """Send a command to a specific keg"""
+    def _get_next_msg_id(self) -> int:
+        """Get next message ID"""
+        msg_id = self.msg_id_counter
+        self.msg_id_counter += 1
+        if self.msg_id_counter > 65535:
+            self.msg_id_counter = 1
+        return msg_id
+
+    def _encode_hardware_command(self, pin: int, value: str) -> Tuple[int, bytes]:
+        """Encode a hardware (virtual pin write) command, returning its message ID along with the frame"""
+        body = f"vw\x00{pin}\x00{value}".encode("utf-8")
+        LOGGER.debug("formatted command body: %s", body)
+        msg_id = self._get_next_msg_id()
+        command = blynk_protocol.encode_command(BlynkCommand.HARDWARE, msg_id, body)
+        LOGGER.debug("Encoded command: %s", command)
+        return msg_id, command
+
+    async def send_hardware_commands(self, device_id: str, pins: List[Tuple[int, str]], ack_timeout: Optional[float] = None) -> bool:
+        """
+        Write values to the virtual pins of a keg in a single write.  With an `ack_timeout`, wait for the keg to
+        acknowledge every command and only report success if all of them were acknowledged successfully.
+        """
+        msg_ids = []
+        frames = []
+        for pin, value in pins:
+            msg_id, frame = self._encode_hardware_command(pin, value)
+            msg_ids.append(msg_id)
+            frames.append(frame)
+
+        if ack_timeout:
+            return await self.send_command_to_keg(device_id, b"".join(frames), ack_msg_ids=msg_ids, ack_timeout=ack_timeout)
+        return await self.send_command_to_keg(device_id, b"".join(frames))
+
+    async def send_command_to_keg(self, device_id: str, command: bytes, ack_msg_ids: Optional[List[int]] = None, ack_timeout: Optional[float] = None) -> bool:
+        """
+        Send a command to a specific keg.  When `ack_msg_ids` is given, wait up to `ack_timeout` seconds for the keg to
+        acknowledge each of those message IDs and only report success if all of them were acknowledged successfully.
+        """
         if device_id not in self.socket_registry:
             LOGGER.warning(f"No connection found for keg {device_id}")
             return False
@@ -167,13 +267,48 @@ class ConnectionHandler:
             LOGGER.warning(f"No writer available for keg {device_id}")
             return False
 
+        acks = {}
+        if ack_msg_ids:
+            loop = asyncio.get_running_loop()
+            for msg_id in ack_msg_ids:
+                acks[(device_id, msg_id)] = self.pending_acks[(device_id, msg_id)] = loop.create_future()
+
         try:
             state.writer.write(command)
             await state.writer.drain()
-            return True
+            if not acks:
+                return True
+
+            done, pending = await asyncio.wait(acks.values(), timeout=ack_timeout)
+            if pending:
+                LOGGER.warning(f"Timed out waiting for keg {device_id} to acknowledge {len(pending)} of {len(acks)} command(s)")
+                return False
+            return all(future.result() for future in done)
         except Exception as e:
             LOGGER.error(f"Error sending command to keg {device_id}", stack_info=True, exc_info=True)
             return False
+        finally:
+            for key, future in acks.items():
+                if self.pending_acks.get(key) is future:
+                    del self.pending_acks[key]
+                future.cancel()
+
+    def _resolve_ack(self, device_id: str, msg_id: int, status: Any):
+        """Complete the command waiting on the keg's response to `msg_id`"""
+        future = self.pending_acks.get((device_id, msg_id))
+        if future is None or future.done():
+            return
+
+        success = status == BlynkStatus.SUCCESS
+        if not success:
+            LOGGER.warning(f"Keg {device_id} rejected command {msg_id}, status: {status}")
+        future.set_result(success)
+
+    def _fail_pending_acks(self, device_id: str):
+        """Fail the commands still waiting on a keg that is no longer connected"""
+        for (ack_device_id, _), future in list(self.pending_acks.items()):
+            if ack_device_id == device_id and not future.done():
+                future.set_result(False)
 
     def get_registered_device_ids(self) -> Set[str]:
         """Get list of currently connected keg IDs"""
@@ -183,12 +318,45 @@ class ConnectionHandler:
         """Get list of currently connected keg IDs"""
         return set(self.connections.keys())
 
-    async def start_server(self, host: str, port: int):
+    def get_ingestion_stats(self) -> Dict[str, Any]:
+        """Get the ingestion queue depth and counters, along with the frames received and the data that failed to decode"""
+        return {**self.ingestion_queue.stats(), "frames_received": self.frames_received, "decode_errors": self.decode_errors}
+
+    async def _reap_idle_connections(self):
+        """Close every connection that has not sent any data within the idle timeout"""
+        while True:
+            await asyncio.sleep(self.reaper_interval)
+            self.close_idle_connections()
+
+    def close_idle_connections(self, now: Optional[float] = None) -> int:
+        """Close the idle connections, the read loop of each connection sees EOF and cleans up after itself"""
+        if now is None:
+            now = time.monotonic()
+
+        cutoff = now - self.idle_timeout
+        cnt = 0
+        for connection_id, state in list(self.connections.items()):
+            if state.timed_out or state.last_seen > cutoff:
+                continue
+
+            LOGGER.debug("Closing idle connection %s, last seen %.0f seconds ago", connection_id, now - state.last_seen)
+            state.timed_out = True
+            if state.writer:
+                state.writer.close()
+            cnt += 1
+        return cnt
+
+    async def start_server(self, host: str, port: int, reuse_port: bool = False):
         """Start the TCP server"""
         LOGGER.info(f"Starting TCP server on {host}:{port}")
         self._running = True
+        self.ingestion_queue.start()
+        self._reaper_task = asyncio.create_task(self._reap_idle_connections(), name="plaato-idle-connection-reaper")
 
-        self._server = await asyncio.start_server(self.handle_connection, host, port)
+        kwargs = {}
+        if reuse_port:
+            kwargs["reuse_port"] = True
+        self._server = await asyncio.start_server(self.handle_connection, host, port, **kwargs)
 
         async with self._server:
             await self._server.serve_forever()
@@ -198,9 +366,19 @@ class ConnectionHandler:
         LOGGER.info("Stopping TCP server")
         self._running = False
 
+        if self._reaper_task:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+
         if self._server:
             self._server.close()
             await self._server.wait_closed()
 
         for connection_id, state in list(self.connections.items()):
             await self._cleanup_connection(connection_id, state)
+
+        await self.ingestion_queue.stop()
@@ -1,5 +1,6 @@
+import asyncio
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
 from db import async_session_scope
 from db.plaato_data import PlaatoData as PlaatoDataDB
@@ -7,6 +8,7 @@ from lib import logging, time
 from lib.config import Config
 from lib.devices.plaato_keg import blynk_protocol, plaato_data, plaato_protocol
 from lib.devices.plaato_keg.command_writer import command_from_pin
+from lib.devices.plaato_keg.ingestion_queue import IngestionQueue, IngestionRecord
 
 LOGGER = logging.getLogger(__name__)
 CONFIG = Config()
@@ -15,33 +17,42 @@ CONFIG = Config()
 class DataProcessor:
     """Processes incoming keg data and distributes to various handlers"""
 
-    def __init__(self):
+    # the override commands being sent, they wait for the keg to acknowledge them and are not waited for
+    _command_tasks: Set[asyncio.Task] = set()
+
+    def __init__(self, ingestion_queue: Optional[IngestionQueue] = None):
         self.state: Dict[str, Any] = {}
         self.device_id: Optional[str] = None
+        self.ingestion_queue = ingestion_queue
 
-    async def process_data(self, raw_data: bytes):
-        """Process incoming raw data from keg"""
+    async def process_data(self, raw_data: bytes, messages: Optional[List[blynk_protocol.BlynkMessage]] = None) -> bool:
+        """
+        Process incoming raw data from keg, `messages` can be passed when the blynk frames were already decoded.
+        Returns False when the data could not be processed
+        """
         try:
-            decoded_data = self._decode(raw_data)
+            decoded_data = self._decode(raw_data, messages)
             await self._process_decoded(decoded_data)
+            return True
         except Exception:
-            LOGGER.error(f"Error processing keg data.  Raw data: {raw_data}", stack_info=True, exc_info=True)
+            LOGGER.error("Error processing keg data.  Raw data: %s", raw_data, stack_info=True, exc_info=True)
+            return False
 
-    def _decode(self, data: bytes) -> List[tuple]:
+    def _decode(self, data: bytes, messages: Optional[List[blynk_protocol.BlynkMessage]] = None) -> List[tuple]:
         """Decode raw data through the protocol layers"""
-        messages = blynk_protocol.decode(data)
+        if messages is None:
+            messages = blynk_protocol.decode(data)
         processed = plaato_protocol.decode_list(messages)
         decoded = plaato_data.decode_list(processed)
         return decoded
 
     async def _process_decoded(self, decoded_data: List[tuple]):
-        """Process decoded data and publish to handlers"""
-        LOGGER.debug(f"processing decoded keg data: {decoded_data}")
+        """Process decoded data and hand it off to be persisted"""
+        LOGGER.debug("processing decoded keg data: %s", decoded_data)
         if not decoded_data:
             LOGGER.debug("no data to process")
             return
 
-        # data_dict = dict(decoded_data)
         data_dict = {}
         user_overrideable = {}
         for i in decoded_data:
@@ -55,51 +66,74 @@ class DataProcessor:
                     data_dict[key] = data
 
         if not self.device_id:
-            LOGGER.warning(f"No keg ID found for decoded data: {decoded_data}")
+            LOGGER.warning("No keg ID found for decoded data: %s", decoded_data)
             return
 
-        if user_overrideable:
-            commands = {}
-            async with async_session_scope(CONFIG) as db_session:
-                dev = await PlaatoDataDB.get_by_pkey(db_session, self.device_id)
-                if dev:
-                    dev_data = dev.to_dict()
-                    for key, d_val in user_overrideable.items():
-                        u_key = plaato_data.USER_OVERRIDEABLE.get(key)
-                        u_val = dev_data.get(u_key)
-                        if u_val and u_val != d_val:
-                            LOGGER.info(
-                                f"Device data for user overrideable value for {key} does not match the override.  Dev value: {d_val}, User val: {u_val}"
-                            )
-                            commands[key] = u_val
-            if commands:
-                from lib.devices.plaato_keg import service_handler
-
-                command_writer = service_handler.command_writer
-                LOGGER.info(f"Sending user override commands to keg {self.device_id}: {commands}")
-                for pin, val in commands.items():
-                    cmd = command_from_pin(pin)
-                    if cmd is None:
-                        LOGGER.warning("No command mapping found for pin %s, skipping", pin)
-                        continue
-                    await command_writer.send_command(self.device_id, cmd, val)
-
-        LOGGER.debug(f"Decoded keg data: {decoded_data}")
-        await self._save_to_db(self.device_id, data_dict)
-
-    async def _save_to_db(self, device_id: str, data: Dict[str, Any]):
+        record = IngestionRecord(self.device_id, data_dict, user_overrideable)
+        if self.ingestion_queue:
+            await self.ingestion_queue.put(record)
+        else:
+            await self.persist(record)
+
+    @staticmethod
+    async def persist(record: IngestionRecord):
+        """Write the record to the database and apply the user overrides"""
+        await DataProcessor._save_to_db(record.device_id, record.data)
+
+        if record.user_overrideable:
+            await DataProcessor._apply_user_overrides(record.device_id, record.user_overrideable)
+
+    @staticmethod
+    def _spawn(coro):
+        task = asyncio.create_task(coro)
+        DataProcessor._command_tasks.add(task)
+        task.add_done_callback(DataProcessor._command_tasks.discard)
+
+    @staticmethod
+    async def _apply_user_overrides(device_id: str, user_overrideable: Dict[str, Any]):
+        commands = {}
+        async with async_session_scope(CONFIG) as db_session:
+            dev = await PlaatoDataDB.get_by_pkey(db_session, device_id)
+            if dev:
+                dev_data = dev.to_dict()
+                for key, d_val in user_overrideable.items():
+                    u_key = plaato_data.USER_OVERRIDEABLE.get(key)
+                    u_val = dev_data.get(u_key)
+                    if u_val and u_val != d_val:
+                        LOGGER.info(
+                            "Device data for user overrideable value for %s does not match the override.  Dev value: %s, User val: %s", key, d_val, u_val
+                        )
+                        commands[key] = u_val
+        if commands:
+            from lib.devices.plaato_keg import service_handler
+
+            command_writer = service_handler.command_writer
+            LOGGER.info("Sending user override commands to keg %s: %s", device_id, commands)
+            cmds = []
+            for pin, val in commands.items():
+                cmd = command_from_pin(pin)
+                if cmd is None:
+                    LOGGER.warning("No command mapping found for pin %s, skipping", pin)
+                    continue
+                cmds.append((cmd, val))
+            if cmds:
+                # sent in the background, waiting for the acknowledgements would hold the ingestion worker
+                DataProcessor._spawn(command_writer.send_commands(device_id, cmds))
+
+    @staticmethod
+    async def _save_to_db(device_id: str, data: Dict[str, Any]):
         """Publish data to all registered handlers"""
 
-        LOGGER.debug(f"saving to database.  device_id: {device_id}, data: {data}")
+        LOGGER.debug("saving to database.  device_id: %s, data: %s", device_id, data)
         if not data:
-            LOGGER.debug(f"ignoring, nothing to write to DB.  device_id: {device_id}, data: {data}")
+            LOGGER.debug("ignoring, nothing to write to DB.  device_id: %s, data: %s", device_id, data)
             return
 
         data["last_updated_on"] = datetime.now(timezone.utc)
         async with async_session_scope(CONFIG) as db_session:
-            LOGGER.debug(f"Updating DB record for keg {device_id}.  Data: {data}")
+            LOGGER.debug("Updating DB record for keg %s.  Data: %s", device_id, data)
             rowcnt = await PlaatoDataDB.update(db_session, device_id, **data)
-            LOGGER.debug(f"Rows affected: {rowcnt}")
+            LOGGER.debug("Rows affected: %s", rowcnt)
             if rowcnt == 0:
                 LOGGER.warning(f"No record update for keg {device_id}, attempting to insert new record.")
                 await PlaatoDataDB.create(db_session, id=device_id, **data)
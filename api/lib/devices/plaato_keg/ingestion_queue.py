@@ -0,0 +1,187 @@
+import asyncio
+from enum import StrEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from lib import logging
+from lib.config import Config
+
+LOGGER = logging.getLogger(__name__)
+CONFIG = Config()
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_WORKERS = 4
+
+
+class OverflowPolicy(StrEnum):
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+
+DEFAULT_OVERFLOW_POLICY = OverflowPolicy.DROP_OLDEST
+
+
+class IngestionRecord:
+    """Pending keg data waiting to be persisted"""
+
+    __slots__ = ("device_id", "data", "user_overrideable")
+
+    def __init__(self, device_id: str, data: Dict[str, Any], user_overrideable: Optional[Dict[str, Any]] = None):
+        self.device_id = device_id
+        self.data = data
+        self.user_overrideable = user_overrideable or {}
+
+    def merge(self, other: "IngestionRecord"):
+        """Merge a newer record into this one, the newest value for each key wins"""
+        self.data.update(other.data)
+        self.user_overrideable.update(other.user_overrideable)
+
+    def __repr__(self):
+        return f"IngestionRecord(device_id={self.device_id}, data={self.data}, user_overrideable={self.user_overrideable})"
+
+
+class IngestionQueue:
+    """
+    Bounded queue between the device sockets and the database.
+
+    Sockets `put` decoded records and return immediately, a pool of workers drains the queue and persists the records.
+    Records are coalesced per device so only the latest values for a keg are ever waiting to be written, which means
+    the queue depth is bound by the number of kegs with pending data rather than the number of frames received.
+    """
+
+    def __init__(
+        self,
+        persist_fn: Callable[[IngestionRecord], Awaitable[Any]],
+        max_size: int = None,
+        workers: int = None,
+        overflow_policy: str = None,
+    ):
+        if max_size is None:
+            max_size = CONFIG.get("tap_monitors.plaato_keg.ingestion.queue_size", DEFAULT_QUEUE_SIZE)
+        if workers is None:
+            workers = CONFIG.get("tap_monitors.plaato_keg.ingestion.workers", DEFAULT_WORKERS)
+        if overflow_policy is None:
+            overflow_policy = CONFIG.get("tap_monitors.plaato_keg.ingestion.overflow_policy", DEFAULT_OVERFLOW_POLICY)
+
+        self.persist_fn = persist_fn
+        self.max_size = max(int(max_size), 1)
+        self.worker_count = max(int(workers), 1)
+        self.overflow_policy = OverflowPolicy(str(overflow_policy).lower())
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[str, IngestionRecord] = {}
+        self._in_flight: Set[str] = set()
+        self._workers: List[asyncio.Task] = []
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.processed = 0
+        self.errors = 0
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        return self._queue
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def start(self):
+        """Start the persistence workers"""
+        if self.running:
+            return
+
+        LOGGER.info("Starting %s Plaato keg ingestion workers.  queue size: %s, overflow policy: %s", self.worker_count, self.max_size, self.overflow_policy)
+        self._workers = [asyncio.create_task(self._worker(i), name=f"plaato-ingestion-worker-{i}") for i in range(self.worker_count)]
+
+    async def stop(self, drain_timeout: float = 5):
+        """Stop the workers, giving them up to `drain_timeout` seconds to flush pending records"""
+        if not self.running:
+            return
+
+        if drain_timeout:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                LOGGER.warning("Timed out draining Plaato keg ingestion queue, %s record(s) will be discarded", self.depth())
+
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def put(self, record: IngestionRecord):
+        """Queue a record for persistence, applying the overflow policy when the queue is full"""
+        device_id = record.device_id
+
+        pending = self._pending.get(device_id)
+        if pending:
+            pending.merge(record)
+            self.coalesced += 1
+            return
+
+        self._pending[device_id] = record
+        self.enqueued += 1
+
+        if device_id in self._in_flight:
+            # a worker is writing this keg right now and will pick the pending record up when it is done
+            return
+
+        if self.overflow_policy == OverflowPolicy.BLOCK:
+            await self.queue.put(device_id)
+            return
+
+        if self.queue.full():
+            if self.overflow_policy == OverflowPolicy.DROP_NEWEST:
+                del self._pending[device_id]
+                self._record_drop(device_id)
+                return
+
+            oldest = self.queue.get_nowait()
+            self.queue.task_done()
+            self._pending.pop(oldest, None)
+            self._record_drop(oldest)
+
+        self.queue.put_nowait(device_id)
+
+    def _record_drop(self, device_id: str):
+        self.dropped += 1
+        LOGGER.warning("Plaato keg ingestion queue full (%s), dropped pending data for keg %s", self.max_size, device_id)
+
+    async def _worker(self, worker_id: int):
+        LOGGER.debug("Plaato keg ingestion worker %s started", worker_id)
+        while True:
+            device_id = await self.queue.get()
+            self._in_flight.add(device_id)
+            try:
+                # keep writing the keg until no newer data arrived while the previous write was in progress
+                while device_id in self._pending:
+                    record = self._pending.pop(device_id)
+                    try:
+                        await self.persist_fn(record)
+                        self.processed += 1
+                    except Exception:
+                        self.errors += 1
+                        LOGGER.error("Error persisting keg data for %s", device_id, stack_info=True, exc_info=True)
+            finally:
+                self._in_flight.discard(device_id)
+                self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth(),
+            "max_size": self.max_size,
+            "workers": self.worker_count,
+            "overflow_policy": str(self.overflow_policy),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "errors": self.errors,
+        }
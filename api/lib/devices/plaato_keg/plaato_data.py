@@ -62,9 +62,18 @@ def decode_list(msgs: List[PlaatoMessage]) -> List[Tuple[str, Any]]:
 def decode(msg: PlaatoMessage) -> Optional[Tuple[str, Any]]:
     """Decode a single Plaato data message"""
 
-    LOGGER.debug(
-        f"processing plaato message to plaato data: {msg}.  cmd_type: {msg.command}, msg_id: {msg.msg_id}, status: {msg.status}, length: {msg.length}, kind: {msg.kind}, id_val: {msg.id_val}, dataL {msg.data}"
-    )
+    if LOGGER.isEnabledFor(logging.DEBUG):
+        LOGGER.debug(
+            "processing plaato message to plaato data: %s.  cmd_type: %s, msg_id: %s, status: %s, length: %s, kind: %s, id_val: %s, data: %s",
+            msg,
+            msg.command,
+            msg.msg_id,
+            msg.status,
+            msg.length,
+            msg.kind,
+            msg.id_val,
+            msg.data,
+        )
 
     if msg.command == BlynkCommand.GET_SHARED_DASH:
         return ("id", msg.data, msg.id_val)
@@ -73,7 +82,7 @@ def decode(msg: PlaatoMessage) -> Optional[Tuple[str, Any]]:
     elif msg.command == BlynkCommand.HARDWARE or msg.command == BlynkCommand.PROPERTY:
         return _decode_hardware_property(msg)
 
-    LOGGER.debug(f"Unknown data kind: {msg}")
+    LOGGER.debug("Unknown data kind: %s", msg)
     return None
 
 
@@ -88,7 +97,7 @@ def _decode_hardware_property(msg: PlaatoMessage, include_unknown_data: bool = F
         name = PLAATO_DATA_MAP[key]
         return (name, msg.data, msg.id_val)
     else:
-        LOGGER.debug(f"Unknown data type: {msg}")
+        LOGGER.debug("Unknown data type: %s", msg)
 
         if include_unknown_data:
             return (f"_{cmd}_{msg.kind}_{msg.id_val}", msg.data, msg.id_val)
@@ -2,7 +2,7 @@ from enum import IntEnum
 from typing import Any, Dict, List, Optional
 
 from lib import logging
-from lib.devices.plaato_keg.blynk_protocol import BlynkCommand, BlynkMessage
+from lib.devices.plaato_keg.blynk_protocol import BlynkCommand, BlynkMessage, BlynkStatus
 from lib.devices.plaato_keg.blynk_protocol import encode_command as encode_blynk_command
 
 LOGGER = logging.getLogger(__name__)
@@ -11,7 +11,8 @@ LOGGER = logging.getLogger(__name__)
 # NOTES on the the different pin values
 #
 # MODE:   PIN 88
-#   Not sure why but I cannot get the device to send this value... however, when in beer mode, you get the OG and FG values, when in CO2 mode, these valkues are empty
+#   Not sure why but I cannot get the device to send this value... however, when in beer mode, you get the OG and FG values,
+#   when in CO2 mode, these valkues are empty
 #   This can be used to help determine which mode is set
 #   01 - Set mode = Beer
 #   02 - Set moe = CO2
@@ -72,17 +73,45 @@ class PlaatoPin(IntEnum):
     FIRMWARE_VERSION = 93
 
 
-class PlaatoMessage(BlynkMessage):
+class PlaatoMessage:
+    """A blynk message with its body decoded, the blynk fields are read from the wrapped message"""
+
+    __slots__ = ("msg", "kind", "id_val", "data")
+
+    msg: BlynkMessage
     kind: Optional[str]
     id_val: Optional[str]
     data: Optional[Any]
 
     def __init__(self, msg: BlynkMessage, kind: str = None, id_val: str = None, data=None, **kwargs):
-        super().__init__(command=msg.command, msg_id=msg.msg_id, status=msg.status, length=msg.length, body=msg.body)
+        self.msg = msg
         self.kind = kind
         self.id_val = id_val
         self.data = data
 
+    @property
+    def command(self) -> BlynkCommand:
+        return self.msg.command
+
+    @property
+    def msg_id(self) -> int:
+        return self.msg.msg_id
+
+    @property
+    def status(self) -> Optional[BlynkStatus]:
+        return self.msg.status
+
+    @property
+    def length(self) -> Optional[int]:
+        return self.msg.length
+
+    @property
+    def body(self) -> bytes:
+        return self.msg.body
+
+    def __len__(self):
+        return len(self.msg)
+
     def __repr__(self):
         if self.command == BlynkCommand.RESPONSE:
             return f"PlaatoMessage(command=RESPONSE, msg_id={self.msg_id}, status={self.status}, data={self.data})"
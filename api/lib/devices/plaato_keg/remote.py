@@ -0,0 +1,307 @@
+"""
+Plaato keg access for processes running the `api` role.
+
+The keg sockets are owned by the single `ingest` process, so API processes reach them through postgres:
+
+- `IngestPublisher` runs in the ingest process.  It publishes the connection state on `STATE_CHANNEL`, whenever a keg
+  connects or disconnects, every `STATE_INTERVAL_SEC` and whenever an API process asks for it on
+  `STATE_REQUEST_CHANNEL`.  It encodes and sends the pin values sent on `COMMAND_CHANNEL`, and replies on
+  `RESULT_CHANNEL`.  The commands are encoded here so the message IDs the kegs acknowledge are only allocated by the
+  process that owns their sockets.
+- `RemoteConnectionHandler` runs in the API processes as a drop-in for the `ConnectionHandler`.  It keeps the last
+  published state and routes commands to the ingest process.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from lib import logging
+from lib.config import Config
+from lib.devices.plaato_keg.sharding import COMMAND_TIMEOUT_SEC
+
+LOGGER = logging.getLogger(__name__)
+CONFIG = Config()
+
+COMMAND_CHANNEL = "plaato_keg_commands"
+RESULT_CHANNEL = "plaato_keg_command_results"
+STATE_CHANNEL = "plaato_keg_state"
+STATE_REQUEST_CHANNEL = "plaato_keg_state_requests"
+
+STATE_INTERVAL_SEC = 5
+# the state is considered stale, and the kegs disconnected, when the ingest process misses this many updates
+STALE_STATE_INTERVALS = 3
+PUBLISH_DEBOUNCE_SEC = 0.5
+# postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+RECONNECT_MIN_DELAY_SEC = 1
+RECONNECT_MAX_DELAY_SEC = 30
+
+
+def _connect():
+    from db import connect_asyncpg
+
+    return connect_asyncpg(CONFIG)
+
+
+class _Channel:
+    """
+    A postgres connection used to LISTEN and NOTIFY.  asyncpg runs one query at a time per connection.
+
+    When the connection is lost, it is reopened in the background, waiting longer between each failed attempt, and
+    the listeners are added to the new connection.  The notifications sent while it was down are lost, so
+    `on_reconnect` is called once it is back to catch up.
+    """
+
+    def __init__(self, connect: Callable = None, on_reconnect: Callable[[], Awaitable] = None):
+        self._connect = connect or _connect
+        self._on_reconnect = on_reconnect
+        self.conn = None
+        self._listeners: Dict[str, Callable] = {}
+        self._lock = asyncio.Lock()
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def _open(self):
+        conn = await self._connect()
+        try:
+            for channel, callback in self._listeners.items():
+                await conn.add_listener(channel, callback)
+        except Exception:
+            conn.terminate()
+            raise
+        conn.add_termination_listener(self._on_terminated)
+        self.conn = conn
+
+    async def open(self, listeners: Dict[str, Callable]):
+        self._listeners = dict(listeners)
+        self._closed = False
+        await self._open()
+
+    def _on_terminated(self, conn):
+        if conn is self.conn and not self._closed:
+            LOGGER.warning("Lost the postgres connection listening for Plaato notifications, reconnecting")
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        self.conn = None
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        delay = RECONNECT_MIN_DELAY_SEC
+        while not self._closed:
+            try:
+                await self._open()
+            except Exception:
+                LOGGER.warning("Failed to reconnect the Plaato notifications, retrying in %s seconds", delay, exc_info=True)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY_SEC)
+                continue
+
+            LOGGER.info("Reconnected the Plaato notifications")
+            if self._on_reconnect:
+                try:
+                    await self._on_reconnect()
+                except Exception:
+                    LOGGER.error("Failed to catch up after reconnecting the Plaato notifications", exc_info=True)
+            return
+
+    async def notify(self, channel: str, payload: dict):
+        data = json.dumps(payload, separators=(",", ":"))
+        async with self._lock:
+            conn = self.conn
+            if conn is None:
+                raise ConnectionError("The postgres connection for the Plaato notifications is reconnecting")
+            try:
+                await conn.execute("SELECT pg_notify($1, $2)", channel, data)
+            except Exception:
+                # the termination listener is not always called, e.g. when the server went away without a word
+                if conn.is_closed() and conn is self.conn and not self._closed:
+                    LOGGER.warning("The postgres connection for the Plaato notifications is closed, reconnecting")
+                    self._schedule_reconnect()
+                raise
+
+    async def close(self):
+        self._closed = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+            self._reconnect_task = None
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+
+
+class IngestPublisher:
+    """Bridges the ingest process' connection handler and the API processes"""
+
+    def __init__(self, connection_handler, connect: Callable = None):
+        self.connection_handler = connection_handler
+        # the state requests sent while the connection was down are lost
+        self.channel = _Channel(connect, on_reconnect=self.publish_state)
+        self._tasks: Set[asyncio.Task] = set()
+        self._publish_handle: Optional[asyncio.TimerHandle] = None
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def get_state(self) -> Dict[str, Any]:
+        state = {
+            "pid": os.getpid(),
+            "published_at": time.time(),
+            "registered": sorted(self.connection_handler.get_registered_device_ids()),
+            "connections": sorted(self.connection_handler.get_connection_ids()),
+            "stats": self.connection_handler.get_ingestion_stats(),
+        }
+        if len(json.dumps(state, separators=(",", ":"))) > MAX_PAYLOAD_BYTES:
+            LOGGER.warning("Plaato state is too large to publish in full, leaving out the connection ids and stats")
+            state["connections"] = []
+            state["stats"] = {}
+        return state
+
+    async def publish_state(self):
+        try:
+            await self.channel.notify(STATE_CHANNEL, self.get_state())
+        except Exception:
+            LOGGER.error("Failed to publish the Plaato connection state", exc_info=True)
+
+    def _schedule_publish(self, *_):
+        # connection events tend to come in bursts, so they are published together
+        if self._publish_handle is None:
+            self._publish_handle = asyncio.get_running_loop().call_later(PUBLISH_DEBOUNCE_SEC, self._publish_now)
+
+    def _publish_now(self):
+        self._publish_handle = None
+        self._spawn(self.publish_state())
+
+    def _on_command(self, _conn, _pid, _channel, payload: str):
+        try:
+            msg = json.loads(payload)
+            req_id = msg["req_id"]
+            pins = [(int(pin), str(value)) for pin, value in msg["pins"]]
+        except (ValueError, KeyError, TypeError):
+            LOGGER.warning("Ignoring malformed Plaato command: %s", payload)
+            return
+        self._spawn(self._send_hardware_commands(req_id, msg.get("device_id"), pins, msg.get("ack_timeout")))
+
+    async def _send_hardware_commands(self, req_id: str, device_id: str, pins: List[Tuple[int, str]], ack_timeout: Optional[float]):
+        try:
+            success = await self.connection_handler.send_hardware_commands(device_id, pins, ack_timeout=ack_timeout)
+        except Exception:
+            LOGGER.error("Error sending command to keg %s for an API process", device_id, exc_info=True)
+            success = False
+        try:
+            await self.channel.notify(RESULT_CHANNEL, {"req_id": req_id, "success": success})
+        except Exception:
+            LOGGER.error("Failed to send the result of command %s to the API processes", req_id, exc_info=True)
+
+    async def _publish_periodically(self):
+        while True:
+            await self.publish_state()
+            await asyncio.sleep(STATE_INTERVAL_SEC)
+
+    async def start(self):
+        await self.channel.open({COMMAND_CHANNEL: self._on_command, STATE_REQUEST_CHANNEL: self._schedule_publish})
+        if hasattr(self.connection_handler, "add_listener"):
+            self.connection_handler.add_listener(self._schedule_publish)
+        self._spawn(self._publish_periodically())
+        LOGGER.info("Publishing the Plaato connection state to the API processes")
+
+    async def stop(self):
+        if self._publish_handle:
+            self._publish_handle.cancel()
+            self._publish_handle = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.channel.close()
+
+
+class RemoteConnectionHandler:
+    """Drop-in replacement for the `ConnectionHandler` in API processes, reaching the kegs through the ingest process"""
+
+    def __init__(self, connect: Callable = None):
+        # the states published while the connection was down are lost
+        self.channel = _Channel(connect, on_reconnect=self.request_state)
+        self.state: Dict[str, Any] = {}
+        self._pending_commands: Dict[str, asyncio.Future] = {}
+
+    def _on_state(self, _conn, _pid, _channel, payload: str):
+        try:
+            self.state = json.loads(payload)
+        except ValueError:
+            LOGGER.warning("Ignoring malformed Plaato state: %s", payload)
+
+    def _on_result(self, _conn, _pid, _channel, payload: str):
+        try:
+            msg = json.loads(payload)
+        except ValueError:
+            LOGGER.warning("Ignoring malformed Plaato command result: %s", payload)
+            return
+        future = self._pending_commands.get(msg.get("req_id"))
+        if future and not future.done():
+            future.set_result(bool(msg.get("success")))
+
+    def _current_state(self) -> Dict[str, Any]:
+        published_at = self.state.get("published_at")
+        if published_at is None or time.time() - published_at > STATE_INTERVAL_SEC * STALE_STATE_INTERVALS:
+            return {}
+        return self.state
+
+    def get_registered_device_ids(self) -> Set[str]:
+        """Get list of the kegs connected to the ingest process"""
+        return set(self._current_state().get("registered", []))
+
+    def get_connection_ids(self) -> Set[str]:
+        """Get list of the connections held by the ingest process"""
+        return set(self._current_state().get("connections", []))
+
+    def get_ingestion_stats(self) -> Dict[str, Any]:
+        """Get the ingestion stats last published by the ingest process"""
+        state = self._current_state()
+        return {**state.get("stats", {}), "ingest_pid": state.get("pid"), "published_at": state.get("published_at")}
+
+    async def send_hardware_commands(self, device_id: str, pins: List[Tuple[int, str]], ack_timeout: Optional[float] = None) -> bool:
+        """Write values to the virtual pins of a keg through the ingest process, which encodes the commands"""
+        if device_id not in self.get_registered_device_ids():
+            LOGGER.warning(f"No connection found for keg {device_id}")
+            return False
+
+        req_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        self._pending_commands[req_id] = future
+        try:
+            msg = {"req_id": req_id, "device_id": device_id, "pins": [[int(pin), value] for pin, value in pins], "ack_timeout": ack_timeout}
+            await self.channel.notify(COMMAND_CHANNEL, msg)
+            return await asyncio.wait_for(future, timeout=COMMAND_TIMEOUT_SEC + (ack_timeout or 0))
+        except asyncio.TimeoutError:
+            LOGGER.error(f"Timed out waiting for the ingest process to send command to keg {device_id}")
+            return False
+        except Exception:
+            LOGGER.error(f"Error routing command to keg {device_id} through the ingest process", stack_info=True, exc_info=True)
+            return False
+        finally:
+            self._pending_commands.pop(req_id, None)
+
+    async def request_state(self):
+        """Ask the ingest process to publish its current state"""
+        await self.channel.notify(STATE_REQUEST_CHANNEL, {"pid": os.getpid()})
+
+    async def start(self):
+        """Start listening for the state published by the ingest process and ask for the current state"""
+        await self.channel.open({STATE_CHANNEL: self._on_state, RESULT_CHANNEL: self._on_result})
+        await self.request_state()
+        LOGGER.info("Listening for the Plaato connection state from the ingest process")
+
+    async def stop(self):
+        await self.channel.close()
+        for future in self._pending_commands.values():
+            if not future.done():
+                future.set_result(False)
+        self._pending_commands.clear()
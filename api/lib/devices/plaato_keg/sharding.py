@@ -0,0 +1,322 @@
+"""
+Horizontally sharded Plaato keg ingestion.
+
+The parent process spawns N shard processes that all listen on the same port with `SO_REUSEPORT`, so the kernel
+spreads the keg connections across them.  Each shard runs a regular `ConnectionHandler` and reports its connection
+events to the parent over a pipe.  The parent keeps the device -> shard registry and routes commands to the shard
+that owns the keg's socket, which encodes them and allocates their message IDs.
+"""
+
+import asyncio
+import itertools
+import multiprocessing
+import os
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from lib import logging
+from lib.config import Config
+
+LOGGER = logging.getLogger(__name__)
+CONFIG = Config()
+
+SHARD_ID_ENV = "PLAATO_KEG_SHARD_ID"
+STATS_INTERVAL_SEC = 5
+COMMAND_TIMEOUT_SEC = 10
+STOP_TIMEOUT_SEC = 10
+
+
+def get_shard_id() -> Optional[int]:
+    """Get the id of the shard this process is running as, or None when not running as a shard"""
+    shard_id = os.environ.get(SHARD_ID_ENV)
+    if shard_id is None:
+        return None
+    return int(shard_id)
+
+
+def get_process_count() -> int:
+    return max(CONFIG.get("tap_monitors.plaato_keg.ingestion.processes", 1) or 1, 1)
+
+
+def is_sharded() -> bool:
+    """Whether ingestion is spread across shard processes and this process is the one coordinating them"""
+    return get_shard_id() is None and get_process_count() > 1
+
+
+class ShardWorker:
+    """Runs inside a shard process, bridging the local connection handler and the parent process"""
+
+    def __init__(self, shard_id: int, conn: Connection, connection_handler=None):
+        if connection_handler is None:
+            from lib.devices.plaato_keg import service_handler
+
+            connection_handler = service_handler.connection_handler
+
+        self.shard_id = shard_id
+        self.conn = conn
+        self.connection_handler = connection_handler
+        self._stopped: Optional[asyncio.Event] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _send(self, *msg):
+        try:
+            self.conn.send(msg)
+        except (BrokenPipeError, EOFError, OSError):
+            LOGGER.error("Plaato shard %s lost the connection to the parent process", self.shard_id)
+            self._stop()
+
+    def _on_event(self, event: str, connection_id: str, device_id: Optional[str]):
+        self._send(event, connection_id, device_id)
+
+    def _stop(self):
+        if self._stopped:
+            self._stopped.set()
+
+    def _on_readable(self):
+        try:
+            msg = self.conn.recv()
+        except (EOFError, OSError):
+            LOGGER.error("Plaato shard %s lost the connection to the parent process", self.shard_id)
+            self._stop()
+            return
+
+        kind = msg[0]
+        if kind == "hardware_commands":
+            _, req_id, device_id, pins, ack_timeout = msg
+            self._spawn(self._send_hardware_commands(req_id, device_id, pins, ack_timeout))
+        elif kind == "stop":
+            self._stop()
+        else:
+            LOGGER.warning("Plaato shard %s received unknown message: %s", self.shard_id, kind)
+
+    async def _send_hardware_commands(self, req_id: int, device_id: str, pins: List[Tuple[int, str]], ack_timeout: Optional[float] = None):
+        try:
+            success = await self.connection_handler.send_hardware_commands(device_id, pins, ack_timeout=ack_timeout)
+        except Exception:
+            LOGGER.error("Plaato shard %s failed to send commands to keg %s", self.shard_id, device_id, exc_info=True)
+            success = False
+        self._send("command_result", req_id, success)
+
+    async def _report_stats(self):
+        while True:
+            self._send("stats", self.connection_handler.get_ingestion_stats())
+            await asyncio.sleep(STATS_INTERVAL_SEC)
+
+    async def run(self, host: str, port: int):
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+
+        self.connection_handler.add_listener(self._on_event)
+        loop.add_reader(self.conn.fileno(), self._on_readable)
+
+        server_task = asyncio.create_task(self.connection_handler.start_server(host=host, port=port, reuse_port=True))
+        stats_task = asyncio.create_task(self._report_stats())
+        LOGGER.info("Plaato shard %s (pid %s) listening on %s:%s", self.shard_id, os.getpid(), host, port)
+
+        try:
+            await self._stopped.wait()
+        finally:
+            loop.remove_reader(self.conn.fileno())
+            stats_task.cancel()
+            for task in list(self._tasks):
+                task.cancel()
+            await self.connection_handler.stop_server()
+            server_task.cancel()
+            await asyncio.gather(server_task, stats_task, *self._tasks, return_exceptions=True)
+            LOGGER.info("Plaato shard %s stopped", self.shard_id)
+
+
+def shard_main(shard_id: int, host: str, port: int, conn: Connection):
+    """Entry point of a shard process"""
+    try:
+        asyncio.run(ShardWorker(shard_id, conn).run(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+class _Shard:
+    def __init__(self, shard_id: int, process: multiprocessing.Process, conn: Connection):
+        self.shard_id = shard_id
+        self.process = process
+        self.conn = conn
+        self.connection_ids: Set[str] = set()
+        self.stats: Dict[str, Any] = {}
+        self.alive = True
+
+
+class ShardedConnectionHandler:
+    """
+    Drop-in replacement for the `ConnectionHandler` in the process coordinating the shards.
+
+    It does not accept any keg connections itself, it keeps an aggregated view of the connections held by every
+    shard and forwards commands to the shard owning the keg's socket.
+    """
+
+    def __init__(self, processes: int = None):
+        if processes is None:
+            processes = get_process_count()
+
+        self.processes = processes
+        self.shards: Dict[int, _Shard] = {}
+        self.device_connections: Dict[str, Dict[str, int]] = {}
+        self.device_owner: Dict[str, int] = {}
+        self._pending_commands: Dict[int, asyncio.Future] = {}
+        self._req_ids = itertools.count(1)
+        self._stopped: Optional[asyncio.Event] = None
+
+    def _spawn(self, shard_id: int, host: str, port: int) -> _Shard:
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=shard_main, args=(shard_id, host, port, child_conn), name=f"plaato-shard-{shard_id}", daemon=True)
+
+        # the shard reads its id from the environment while it is importing, so it knows to run a local handler
+        os.environ[SHARD_ID_ENV] = str(shard_id)
+        try:
+            process.start()
+        finally:
+            os.environ.pop(SHARD_ID_ENV, None)
+        child_conn.close()
+
+        shard = _Shard(shard_id, process, parent_conn)
+        asyncio.get_running_loop().add_reader(parent_conn.fileno(), self._on_readable, shard)
+        LOGGER.info("Started Plaato shard %s (pid %s)", shard_id, process.pid)
+        return shard
+
+    def _on_readable(self, shard: _Shard):
+        try:
+            msg = shard.conn.recv()
+        except (EOFError, OSError):
+            self._shard_exited(shard)
+            return
+        self.handle_message(shard.shard_id, msg)
+
+    def _shard_exited(self, shard: _Shard):
+        asyncio.get_running_loop().remove_reader(shard.conn.fileno())
+        shard.alive = False
+        if self._stopped and not self._stopped.is_set():
+            LOGGER.error("Plaato shard %s exited unexpectedly (exit code: %s)", shard.shard_id, shard.process.exitcode)
+        for connection_id in list(shard.connection_ids):
+            self._remove_connection(shard, connection_id)
+
+    def handle_message(self, shard_id: int, msg: tuple):
+        """Apply a message received from a shard"""
+        shard = self.shards.get(shard_id)
+        if not shard:
+            return
+
+        kind = msg[0]
+        if kind == "connected":
+            shard.connection_ids.add(msg[1])
+        elif kind == "registered":
+            _, connection_id, device_id = msg
+            self.device_connections.setdefault(device_id, {})[connection_id] = shard_id
+            self.device_owner[device_id] = shard_id
+        elif kind == "disconnected":
+            self._remove_connection(shard, msg[1])
+        elif kind == "stats":
+            shard.stats = msg[1]
+        elif kind == "command_result":
+            _, req_id, success = msg
+            future = self._pending_commands.pop(req_id, None)
+            if future and not future.done():
+                future.set_result(success)
+        else:
+            LOGGER.warning("Received unknown message from Plaato shard %s: %s", shard_id, kind)
+
+    def _remove_connection(self, shard: _Shard, connection_id: str):
+        shard.connection_ids.discard(connection_id)
+        for device_id, conns in list(self.device_connections.items()):
+            if conns.pop(connection_id, None) is None:
+                continue
+            if not conns:
+                LOGGER.info("Keg %s disconnected from shard %s", device_id, shard.shard_id)
+                del self.device_connections[device_id]
+                self.device_owner.pop(device_id, None)
+            elif self.device_owner.get(device_id) == shard.shard_id and shard.shard_id not in conns.values():
+                self.device_owner[device_id] = next(iter(conns.values()))
+
+    async def send_hardware_commands(self, device_id: str, pins: List[Tuple[int, str]], ack_timeout: Optional[float] = None) -> bool:
+        """Write values to the virtual pins of a keg through the shard that owns its socket, which encodes the commands"""
+        shard = self.shards.get(self.device_owner.get(device_id))
+        if not shard or not shard.alive:
+            LOGGER.warning(f"No connection found for keg {device_id}")
+            return False
+
+        req_id = next(self._req_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending_commands[req_id] = future
+        try:
+            shard.conn.send(("hardware_commands", req_id, device_id, pins, ack_timeout))
+            return await asyncio.wait_for(future, timeout=COMMAND_TIMEOUT_SEC + (ack_timeout or 0))
+        except asyncio.TimeoutError:
+            LOGGER.error(f"Timed out waiting for shard {shard.shard_id} to send command to keg {device_id}")
+            return False
+        except Exception:
+            LOGGER.error(f"Error routing command to keg {device_id} through shard {shard.shard_id}", stack_info=True, exc_info=True)
+            return False
+        finally:
+            self._pending_commands.pop(req_id, None)
+
+    def get_registered_device_ids(self) -> Set[str]:
+        """Get list of currently connected keg IDs across all shards"""
+        return set(self.device_connections.keys())
+
+    def get_connection_ids(self) -> Set[str]:
+        """Get list of the connections held by all shards"""
+        ids = set()
+        for shard in self.shards.values():
+            ids.update(shard.connection_ids)
+        return ids
+
+    def get_ingestion_stats(self) -> Dict[str, Any]:
+        """Get the ingestion stats summed across the shards, along with the stats of each shard"""
+        totals: Dict[str, Any] = {}
+        per_shard = {}
+        for shard_id, shard in self.shards.items():
+            per_shard[shard_id] = {**shard.stats, "alive": shard.alive, "pid": shard.process.pid}
+            for key, val in shard.stats.items():
+                if isinstance(val, (int, float)) and not isinstance(val, bool):
+                    totals[key] = totals.get(key, 0) + val
+        return {**totals, "shards": per_shard}
+
+    async def start_server(self, host: str, port: int):
+        """Spawn the shard processes and wait until the shards are stopped"""
+        LOGGER.info("Starting %s Plaato shard processes on %s:%s", self.processes, host, port)
+        self._stopped = asyncio.Event()
+        for shard_id in range(self.processes):
+            self.shards[shard_id] = self._spawn(shard_id, host, port)
+
+        await self._stopped.wait()
+
+    async def stop_server(self):
+        """Stop all the shard processes"""
+        LOGGER.info("Stopping Plaato shard processes")
+        if self._stopped:
+            self._stopped.set()
+
+        shards: List[_Shard] = list(self.shards.values())
+        for shard in shards:
+            if shard.alive:
+                try:
+                    shard.conn.send(("stop",))
+                except (BrokenPipeError, OSError):
+                    pass
+
+        for shard in shards:
+            await asyncio.to_thread(shard.process.join, STOP_TIMEOUT_SEC)
+            if shard.process.is_alive():
+                LOGGER.warning("Plaato shard %s did not stop in time, terminating", shard.shard_id)
+                shard.process.terminate()
+            if shard.alive:
+                self._shard_exited(shard)
+            shard.conn.close()
+
+        for future in self._pending_commands.values():
+            if not future.done():
+                future.set_result(False)
+        self._pending_commands.clear()
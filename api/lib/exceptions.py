@@ -52,3 +52,11 @@ class InvalidTapMonitorType(Error):
 
         super().__init__(message)
         self.monitor_type = monitor_type
+
+
+class PasswordHashingBusy(Error):
+    def __init__(self, message=None):
+        if not message:
+            message = "Too many password operations in progress, try again shortly."
+
+        super().__init__(message)
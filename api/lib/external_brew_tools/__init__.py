@@ -1,7 +1,10 @@
+import importlib
+
 from lib import logging
 from lib.config import Config
 
 TOOLS = {}
+TOOL_TYPES = {}
 
 
 class ExternalBrewToolBase:
@@ -11,18 +14,21 @@ class ExternalBrewToolBase:
 
 
 def _init_tools():
-    if not TOOLS:
-        from lib.external_brew_tools.brewfather import Brewfather
-
-        TOOLS["brewfather"] = Brewfather()
+    # the tool modules, and the http client they depend on, are only imported when the tool is first used
+    if not TOOL_TYPES:
+        TOOL_TYPES["brewfather"] = ("lib.external_brew_tools.brewfather", "Brewfather")
 
 
 def get_types():
-    return TOOLS.keys()
+    return TOOL_TYPES.keys()
 
 
 def get_tool(_type):
-    return TOOLS.get(_type)
+    tool = TOOLS.get(_type)
+    if tool is None and _type in TOOL_TYPES:
+        module, class_name = TOOL_TYPES[_type]
+        tool = TOOLS.setdefault(_type, getattr(importlib.import_module(module), class_name)())
+    return tool
 
 
 _init_tools()
@@ -5,6 +5,9 @@ from db.batches import Batches as BatchesDB
 from db.beers import Beers as BeersDB
 from lib.external_brew_tools import ExternalBrewToolBase
 from lib.external_brew_tools.exceptions import ResourceNotFoundError
+from lib.metrics import upstream as upstream_metrics
+
+API_URL = "https://api.brewfather.app"
 
 
 class Brewfather(ExternalBrewToolBase):
@@ -116,9 +119,10 @@ class Brewfather(ExternalBrewToolBase):
         return data
 
     async def _get(self, path, meta, params=None):
-        url = f"https://api.brewfather.app/{path}"
+        api_url = self.config.get("external_brew_tools.brewfather.api_url") or API_URL
+        url = f"{api_url.rstrip('/')}/{path}"
         self.logger.debug("GET Request: %s, params: %s", url, params)
-        async with AsyncClient() as client:
+        async with AsyncClient(transport=upstream_metrics.transport("brewfather")) as client:
             try:
                 kwargs = {}
                 timeout = self.config.get("external_brew_tools.brewfather.timeout_sec")
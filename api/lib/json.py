@@ -2,16 +2,27 @@
 # by importing these names, we're exposing the standard lib JSON functionality to library clients
 
 import json
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from enum import Enum
 from json import dump
 from json import dumps as _dumps
 from json import load, loads
+from pathlib import PurePath
 from uuid import UUID
 
 import simplejson
 
 from lib import UsefulEnum
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# dict keys that are not strings (ints, enums, UUIDs) are converted like jsonable_encoder does
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
 
 class CloudCommonJsonEncoder(simplejson.JSONEncoder):
     def default(self, o):  # pylint: disable=method-hidden
@@ -30,3 +41,42 @@ class CloudCommonJsonEncoder(simplejson.JSONEncoder):
 def dumps(data, *_, **kwargs):
     kwargs["cls"] = CloudCommonJsonEncoder
     return _dumps(data, **kwargs)
+
+
+def _fast_default(o):
+    """The types neither orjson nor the json module serialize, converted like FastAPI's jsonable_encoder does"""
+    if hasattr(o, "_json_repr_"):
+        return o._json_repr_()  # pylint: disable=protected-access
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, Enum):
+        return o.value
+    if isinstance(o, (UUID, PurePath)):
+        return str(o)
+    if isinstance(o, Decimal):
+        return int(o) if o.as_tuple().exponent >= 0 else float(o)
+    if isinstance(o, timedelta):
+        return o.total_seconds()
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if isinstance(o, bytes):
+        return o.decode()
+    if hasattr(o, "model_dump"):
+        return o.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps_bytes(data) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON in a single pass, with orjson when it is installed.  Datetimes, dates, UUIDs and
+    enums are serialized natively, as ISO 8601 strings, dashed UUID strings and enum values.
+    """
+    if orjson:
+        return orjson.dumps(data, default=_fast_default, option=ORJSON_OPTIONS)
+
+    return _dumps(data, default=_fast_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_dumps(data) -> str:
+    """`dumps_bytes` as a string, the JSON serializer of the database columns"""
+    return dumps_bytes(data).decode("utf-8")
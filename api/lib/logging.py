@@ -1,8 +1,13 @@
 # pylint: disable=unused-wildcard-import
 
+import atexit
 import logging
+import queue
 import sys
+import threading
+import time
 from logging import *  # pylint: disable=wildcard-import
+from logging.handlers import QueueHandler, QueueListener
 
 from lib.config import Config
 
@@ -10,6 +15,8 @@ DEFAULT_LOG_FMT = "%(levelname)s:     %(asctime)-15s [%(name)s]: %(message)s"
 DEFAULT_COLORED_LOG_FMT = "%(log_color)s%(levelname)s:     %(asctime)-15s [%(name)s]:%(reset)s %(message)s"
 DEFAULT_JSON_LOG_FMT = "%(asctime)s %(levelname)s %(name)s %(message)s"
 
+DEFAULT_QUEUE_SIZE = 10000
+
 DEFAULT_LOG_COLORS = {
     "DEBUG": "cyan",
     "INFO": "green",
@@ -30,7 +37,7 @@ def set_log_level(logging_level: int) -> None:
 def get_def_log_level(config, log_levels=None) -> str:
     if not log_levels:
         log_levels = config.get("logging.levels", {})
-    default_log_level_fallback = log_levels.pop("default", "INFO")
+    default_log_level_fallback = log_levels.get("default", "INFO")
 
     return config.get("log_level", config.get("logging.level", default_log_level_fallback))
 
@@ -75,6 +82,143 @@ def _enforce_root_propagation():
             logger.propagate = True
 
 
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to a background `QueueListener` which formats and writes them, so a slow log consumer never blocks
+    the caller.  When the queue is full the record is dropped and counted instead of waiting for room.
+
+    The message is rendered before the record is queued, like `QueueHandler` does, so arguments the caller mutates
+    after logging them, or that are not safe to read from another thread, are logged as they were.
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+        self._unreported = 0
+
+    def enqueue(self, record):
+        try:
+            if self._unreported:
+                self.queue.put_nowait(self._dropped_record())
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+
+    def _dropped_record(self):
+        dropped, self._unreported = self._unreported, 0
+        return logging.LogRecord(__name__, WARNING, __file__, 0, "Dropped %s log records because the log queue was full", (dropped,), None)
+
+    def get_stats(self):
+        return {"depth": self.queue.qsize(), "max_size": self.queue.maxsize, "dropped": self.dropped}
+
+
+class SamplingFilter(Filter):
+    """
+    Thins out a high-volume logger.  Records at or below `level` are sampled, keeping one in every `1 / sample_rate`,
+    and capped at `max_per_sec`.  Records above `level` always pass.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, max_per_sec: int = None, level: int = DEBUG):
+        super().__init__()
+        self.every = int(round(1 / sample_rate)) if sample_rate > 0 else 0
+        self.max_per_sec = max_per_sec
+        self.level = level
+        self.suppressed = 0
+        self._count = 0
+        self._window = 0
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > self.level:
+            return True
+
+        with self._lock:
+            keep = self._sample() and self._within_rate()
+            if not keep:
+                self.suppressed += 1
+            return keep
+
+    def _sample(self):
+        if self.every == 1:
+            return True
+        if not self.every:
+            return False
+
+        self._count += 1
+        return self._count % self.every == 1
+
+    def _within_rate(self):
+        if self.max_per_sec is None:
+            return True
+
+        window = int(time.monotonic())
+        if window != self._window:
+            self._window = window
+            self._window_count = 0
+
+        if self._window_count >= self.max_per_sec:
+            return False
+        self._window_count += 1
+        return True
+
+
+_queue_handler: NonBlockingQueueHandler = None
+_queue_listener: QueueListener = None
+_sampling_filters = {}
+
+
+def get_queue_stats() -> dict:
+    """Get the depth and drop counts of the background log queue, along with the records suppressed by sampling"""
+    stats = {"enabled": _queue_handler is not None, "depth": 0, "max_size": 0, "dropped": 0}
+    if _queue_handler:
+        stats.update(_queue_handler.get_stats())
+    stats["suppressed"] = {name: f.suppressed for name, f in _sampling_filters.items()}
+    return stats
+
+
+def stop_queue_listener():
+    """Flush the queued records and stop the background log thread"""
+    global _queue_handler, _queue_listener  # pylint: disable=global-statement
+
+    if _queue_listener:
+        _queue_listener.stop()
+    _queue_handler = None
+    _queue_listener = None
+
+
+def _create_root_handler(config, formatter):
+    global _queue_handler, _queue_listener  # pylint: disable=global-statement
+
+    stream_handler = StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    stop_queue_listener()
+    if not config.get("logging.queue.enabled", True):
+        return stream_handler
+
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(config.get("logging.queue.max_size", DEFAULT_QUEUE_SIZE)))
+    _queue_listener = QueueListener(_queue_handler.queue, stream_handler)
+    _queue_listener.start()
+    return _queue_handler
+
+
+def _install_sampling_filters(config):
+    for name, f in _sampling_filters.items():
+        getLogger(name).removeFilter(f)
+    _sampling_filters.clear()
+
+    sample_rates = config.get("logging.sampling", {}) or {}
+    rate_limits = config.get("logging.rate_limits", {}) or {}
+    for name in set(sample_rates) | set(rate_limits):
+        sample_rate = float(sample_rates.get(name, 1.0))
+        max_per_sec = rate_limits.get(name)
+        f = SamplingFilter(sample_rate=sample_rate, max_per_sec=int(max_per_sec) if max_per_sec is not None else None)
+        getLogger(name).addFilter(f)
+        _sampling_filters[name] = f
+
+
 def init(config=None, fmt=DEFAULT_LOG_FMT):
     if not config:
         config = Config()
@@ -87,21 +231,26 @@ def init(config=None, fmt=DEFAULT_LOG_FMT):
     root_logger = getLogger()
     root_logger.setLevel(log_level)
 
-    # Replace all root handlers with a single consistently-formatted handler
+    # Replace all root handlers with a single consistently-formatted handler.  Unless disabled, records are handed to
+    # a background thread which formats and writes them so a slow stderr never blocks the event loop
     root_logger.handlers.clear()
-    handler = StreamHandler(sys.stderr)
-    handler.setFormatter(formatter)
-    root_logger.addHandler(handler)
+    root_logger.addHandler(_create_root_handler(config, formatter))
 
     # Force all existing loggers to propagate through root
     _enforce_root_propagation()
+    _install_sampling_filters(config)
 
     # Route Python warnings (e.g. SAWarning) through the logging system
     # so they use the same formatter instead of writing raw text to stderr
     logging.captureWarnings(True)
 
     for l, level in log_levels.items():
+        if l == "default":
+            continue
         root_logger.debug("Setting log level for %s to %s", l, level)
         getLogger(l).setLevel(get_log_level(level))
 
     root_logger.debug("logging initialization complete.")
+
+
+atexit.register(stop_queue_listener)
@@ -0,0 +1,157 @@
+"""Database query and connection pool metrics, and the queries run by each request"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lib.metrics import REGISTRY
+
+QUERIES = REGISTRY.counter("db_queries_total", "Number of database queries executed")
+QUERY_DURATION = REGISTRY.histogram("db_query_duration_seconds", "Time spent executing database queries")
+QUERY_ERRORS = REGISTRY.counter("db_query_errors_total", "Number of database queries that failed")
+POOL_CONNECTIONS = REGISTRY.gauge("db_pool_connections", "Database connections held by the connection pool", ["engine", "state"])
+POOL_SIZE = REGISTRY.gauge("db_pool_size", "Configured size of the database connection pool", ["engine"])
+
+# the directory holding the application packages, the call sites are reported relative to it
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+_METRICS_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+CALL_SITE_DEPTH = 3
+
+
+def _app_frames(frame) -> Iterator:
+    """
+    Walk the frames from `frame` outwards.  Async sessions run the queries in a greenlet, so the walk continues in
+    the greenlet that started it, where the application code awaiting the query is.
+    """
+    while frame is not None:
+        yield frame
+        frame = frame.f_back
+    greenlet = sys.modules.get("greenlet")
+    parent = greenlet.getcurrent().parent if greenlet else None
+    frame = parent.gr_frame if parent is not None else None
+    while frame is not None:
+        yield frame
+        frame = frame.f_back
+
+
+def call_site(depth: int = CALL_SITE_DEPTH) -> str:
+    """The innermost application frames running the current query, ex: `services/taps.py:80 in transform_response`"""
+    sites = []
+    for frame in _app_frames(sys._getframe()):  # pylint: disable=protected-access
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_APP_DIR) or filename.startswith(_METRICS_DIR):
+            continue
+        sites.append(f"{filename[len(_APP_DIR):]}:{frame.f_lineno} in {frame.f_code.co_name}")
+        if len(sites) == depth:
+            break
+    return " <- ".join(sites) or "<unknown>"
+
+
+class RequestQueries:
+    """The queries run while serving a request.  The call site of a statement is captured once it repeats `repeat_threshold` times"""
+
+    __slots__ = ("count", "seconds", "statements", "call_sites", "repeat_threshold")
+
+    def __init__(self, repeat_threshold: Optional[int] = None):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Dict[str, int] = {}
+        self.call_sites: Dict[str, str] = {}
+        self.repeat_threshold = repeat_threshold
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.seconds += elapsed
+        runs = self.statements[statement] = self.statements.get(statement, 0) + 1
+        if runs == self.repeat_threshold:
+            self.call_sites[statement] = call_site()
+
+    def repeated(self) -> List[Tuple[str, int, str]]:
+        """The statements run at least `repeat_threshold` times, most repeated first, with their call site"""
+        if not self.repeat_threshold:
+            return []
+        repeated = [
+            (statement, runs, self.call_sites.get(statement, "<unknown>")) for statement, runs in self.statements.items() if runs >= self.repeat_threshold
+        ]
+        return sorted(repeated, key=lambda r: r[1], reverse=True)
+
+
+request_queries: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+@contextmanager
+def track_queries(repeat_threshold: Optional[int] = None) -> Iterator[RequestQueries]:
+    """Record the queries run within the block.  Nested blocks share the outermost tracker"""
+    current = request_queries.get()
+    if current is not None:
+        if repeat_threshold and not current.repeat_threshold:
+            current.repeat_threshold = repeat_threshold
+        yield current
+        return
+
+    queries = RequestQueries(repeat_threshold)
+    token = request_queries.set(queries)
+    try:
+        yield queries
+    finally:
+        request_queries.reset(token)
+
+
+_QUERY_START = "metrics_query_start"
+
+_engines = {}
+
+
+def _before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+    conn.info.setdefault(_QUERY_START, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, _cursor, statement, _parameters, _context, _executemany):
+    starts = conn.info.get(_QUERY_START)
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    QUERIES.inc()
+    QUERY_DURATION.observe(elapsed)
+
+    queries = request_queries.get()
+    if queries is not None:
+        queries.record(statement, elapsed)
+
+
+def _handle_error(context):
+    conn = context.connection
+    if conn is not None and conn.info.get(_QUERY_START):
+        conn.info[_QUERY_START].pop()
+    QUERY_ERRORS.inc()
+
+
+def _collect_pools():
+    for name, engine in list(_engines.items()):
+        pool = engine.pool
+        # pools that do not keep connections (NullPool, StaticPool) have no size to report
+        if not hasattr(pool, "checkedout"):
+            continue
+        POOL_SIZE.set(pool.size(), engine=name)
+        POOL_CONNECTIONS.set(pool.checkedout(), engine=name, state="checked_out")
+        POOL_CONNECTIONS.set(pool.checkedin(), engine=name, state="idle")
+        POOL_CONNECTIONS.set(max(pool.overflow(), 0), engine=name, state="overflow")
+
+
+def instrument_engine(engine, name: str = "default"):
+    """Time every query run through the engine and report its pool usage, accepts sync and async engines"""
+    # imported here so this module does not pull in SQLAlchemy for the processes not using it
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if _engines.get(name) is sync_engine:
+        return
+
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+    _engines[name] = sync_engine
+    REGISTRY.add_collector(_collect_pools)
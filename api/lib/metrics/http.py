@@ -0,0 +1,118 @@
+"""HTTP request metrics and the per-request query budget"""
+
+import time
+
+from lib import logging
+from lib.metrics import REGISTRY
+from lib.metrics.db import track_queries
+
+LOGGER = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+QUERY_COUNT_HEADER = b"x-db-queries"
+QUERY_TIME_HEADER = b"x-db-time"
+
+REQUESTS = REGISTRY.counter("http_requests_total", "Number of HTTP requests served", ["method", "route", "status"])
+REQUEST_DURATION = REGISTRY.histogram("http_request_duration_seconds", "Time spent serving HTTP requests", ["method", "route"])
+REQUESTS_IN_PROGRESS = REGISTRY.gauge("http_requests_in_progress", "Number of HTTP requests being served")
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries", "Number of database queries run by each HTTP request", ["route"], buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+REQUEST_DB_DURATION = REGISTRY.histogram("http_request_db_duration_seconds", "Time each HTTP request spent in database queries", ["route"])
+QUERY_BUDGET_EXCEEDED = REGISTRY.counter("http_query_budget_exceeded_total", "Number of HTTP requests running more queries than the budget", ["route"])
+
+
+def route_template(scope) -> str:
+    """The path template of the route that served the request, so every item shares one series"""
+    # routes from included routers only know their path without the prefix, FastAPI keeps the full one alongside
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None)
+    if not path:
+        path = getattr(scope.get("route"), "path", None)
+    return path or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency and database usage of every HTTP request, per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        with track_queries() as queries:
+            REQUESTS_IN_PROGRESS.inc()
+            start = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - start
+                REQUESTS_IN_PROGRESS.inc(-1)
+
+                method = scope["method"]
+                route = route_template(scope)
+                REQUESTS.inc(method=method, route=route, status=status[0])
+                REQUEST_DURATION.observe(elapsed, method=method, route=route)
+                REQUEST_DB_QUERIES.observe(queries.count, route=route)
+                REQUEST_DB_DURATION.observe(queries.seconds, route=route)
+
+
+class QueryBudgetMiddleware:
+    """
+    ASGI middleware counting the queries run by every HTTP request.  The requests running more than `max_queries`
+    are logged along with the statements they repeated, which usually point at an N+1 query, and where those ran from.
+    With `headers`, the query count and time are returned in the `X-DB-Queries` and `X-DB-Time` (ms) headers.
+    """
+
+    def __init__(self, app, max_queries: int = 0, repeat_threshold: int = 5, headers: bool = False):
+        self.app = app
+        self.max_queries = max_queries
+        self.repeat_threshold = repeat_threshold
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(self.repeat_threshold) as queries:
+
+            async def send_wrapper(message):
+                if self.headers and message["type"] == "http.response.start":
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (QUERY_COUNT_HEADER, str(queries.count).encode()),
+                        (QUERY_TIME_HEADER, f"{queries.seconds * 1000:.1f}".encode()),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if self.max_queries and queries.count > self.max_queries:
+                    self._report(scope, queries)
+
+    def _report(self, scope, queries):
+        route = route_template(scope)
+        QUERY_BUDGET_EXCEEDED.inc(route=route)
+        LOGGER.warning(
+            "%s %s ran %s queries in %.1f ms, over the budget of %s",
+            scope["method"],
+            scope["path"],
+            queries.count,
+            queries.seconds * 1000,
+            self.max_queries,
+        )
+        for statement, runs, site in queries.repeated():
+            LOGGER.warning("Statement repeated %s times, from %s: %s", runs, site, " ".join(statement.split())[:300])
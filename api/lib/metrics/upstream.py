@@ -0,0 +1,43 @@
+"""Metrics for the calls made to upstream services (tap monitor APIs, Brewfather)"""
+
+import time
+
+from httpx import AsyncBaseTransport, AsyncHTTPTransport
+
+from lib.metrics import REGISTRY
+
+UPSTREAM_REQUESTS = REGISTRY.counter("upstream_requests_total", "Number of requests made to upstream services", ["upstream", "status"])
+UPSTREAM_DURATION = REGISTRY.histogram("upstream_request_duration_seconds", "Time until upstream services sent the response headers", ["upstream"])
+UPSTREAM_ERRORS = REGISTRY.counter("upstream_errors_total", "Number of upstream requests that failed, by exception type or `http_5xx`", ["upstream", "reason"])
+
+
+class UpstreamTransport(AsyncBaseTransport):
+    """httpx transport recording the latency and errors of the requests to an upstream service"""
+
+    def __init__(self, upstream: str, wrapped: AsyncBaseTransport = None, **transport_kwargs):
+        self.upstream = upstream
+        self._transport = wrapped or AsyncHTTPTransport(**transport_kwargs)
+
+    async def handle_async_request(self, request):
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception as exc:
+            UPSTREAM_DURATION.observe(time.perf_counter() - start, upstream=self.upstream)
+            UPSTREAM_REQUESTS.inc(upstream=self.upstream, status="error")
+            UPSTREAM_ERRORS.inc(upstream=self.upstream, reason=type(exc).__name__)
+            raise
+
+        UPSTREAM_DURATION.observe(time.perf_counter() - start, upstream=self.upstream)
+        UPSTREAM_REQUESTS.inc(upstream=self.upstream, status=response.status_code)
+        if response.status_code >= 500:
+            UPSTREAM_ERRORS.inc(upstream=self.upstream, reason="http_5xx")
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def transport(upstream: str, verify: bool = True) -> UpstreamTransport:
+    """Create the transport for an `httpx.AsyncClient` calling `upstream`"""
+    return UpstreamTransport(upstream, verify=verify)
@@ -0,0 +1,112 @@
+"""
+Password hashing and verification.
+
+Argon2 is deliberately slow, so the work is done on a small dedicated thread pool (argon2-cffi releases the GIL while
+hashing) instead of on the event loop.  The number of operations allowed to wait for the pool is capped so a burst of
+logins cannot tie up memory and the pool indefinitely, callers past the cap get `PasswordHashingBusy` after waiting
+`queue_timeout_sec`.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
+
+from lib import logging
+from lib.config import Config
+from lib.exceptions import PasswordHashingBusy
+
+LOGGER = logging.getLogger(__name__)
+CONFIG = Config()
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 16
+DEFAULT_QUEUE_TIMEOUT_SEC = 10
+
+
+class PasswordService:
+    def __init__(self, workers: int = None, max_pending: int = None, queue_timeout: float = None, hasher: PasswordHasher = None):
+        if workers is None:
+            workers = CONFIG.get("auth.passwords.workers", DEFAULT_WORKERS)
+        if max_pending is None:
+            max_pending = CONFIG.get("auth.passwords.max_pending", DEFAULT_MAX_PENDING)
+        if queue_timeout is None:
+            queue_timeout = CONFIG.get("auth.passwords.queue_timeout_sec", DEFAULT_QUEUE_TIMEOUT_SEC)
+        if hasher is None:
+            hasher = self._create_hasher()
+
+        self.workers = max(workers or 1, 1)
+        self.max_pending = max(max_pending or 1, 1)
+        self.queue_timeout = queue_timeout
+        self.hasher = hasher
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def _create_hasher() -> PasswordHasher:
+        """Create the argon2 hasher, any parameter not configured keeps the argon2-cffi default"""
+        params = {}
+        for key in ["time_cost", "memory_cost", "parallelism", "hash_len", "salt_len"]:
+            val = CONFIG.get(f"auth.passwords.argon2.{key}")
+            if val is not None:
+                params[key] = int(val)
+        return PasswordHasher(**params)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hasher")
+        return self._executor
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        return self._semaphore
+
+    async def _run(self, fn, *args):
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError as e:
+            LOGGER.warning("Timed out waiting for a password hashing slot, %s operations already pending", self.max_pending)
+            raise PasswordHashingBusy() from e
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        """Hash a password"""
+        return await self._run(self.hasher.hash, password)
+
+    async def verify(self, password_hash: str, password: str) -> bool:
+        """Verify a password against its hash, returns False rather than raising when they do not match"""
+        try:
+            return await self._run(self.hasher.verify, password_hash, password)
+        except (VerifyMismatchError, VerificationError, InvalidHashError):
+            return False
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether the hash was created with different argon2 parameters than the ones currently configured"""
+        try:
+            return self.hasher.check_needs_rehash(password_hash)
+        except InvalidHashError:
+            return False
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_password_service: Optional[PasswordService] = None
+
+
+def get_password_service() -> PasswordService:
+    global _password_service  # pylint: disable=global-statement
+    if _password_service is None:
+        _password_service = PasswordService()
+    return _password_service
@@ -0,0 +1,45 @@
+"""
+Process roles.
+
+- `all`: serve the API and run the device ingestion in a single process (the default)
+- `api`: only serve the API, optionally with several worker processes.  Plaato kegs are reached through the ingest
+  process, coordinated through postgres
+- `ingest`: only run the device ingestion (the Plaato TCP server and its background tasks).  There should only ever
+  be one process running this role
+"""
+
+import os
+
+from lib.config import Config
+
+CONFIG = Config()
+
+ROLE_ENV = "APP_ROLE"
+
+ALL = "all"
+API = "api"
+INGEST = "ingest"
+ROLES = (ALL, API, INGEST)
+
+
+def get_role() -> str:
+    """Get the role of this process.  API worker processes inherit it from the process that started them"""
+    role = (os.environ.get(ROLE_ENV) or CONFIG.get("app.role") or ALL).lower()
+    if role not in ROLES:
+        raise ValueError(f"Invalid role '{role}', valid roles are: {', '.join(ROLES)}")
+    return role
+
+
+def set_role(role: str):
+    """Set the role of this process and of any worker processes it starts"""
+    if role not in ROLES:
+        raise ValueError(f"Invalid role '{role}', valid roles are: {', '.join(ROLES)}")
+    os.environ[ROLE_ENV] = role
+
+
+def serves_api(role: str = None) -> bool:
+    return (role or get_role()) in (ALL, API)
+
+
+def runs_ingestion(role: str = None) -> bool:
+    return (role or get_role()) in (ALL, INGEST)
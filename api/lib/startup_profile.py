@@ -0,0 +1,151 @@
+"""
+Startup profiling, enabled with `app.py --profile-startup`.
+
+`ImportProfiler` records how long every module takes to import as a tree, and `FirstRequestTimer` reports how long it
+took from the process starting to the first request being served.  This module only uses the standard library so it
+can be loaded before anything else is imported.
+"""
+
+import importlib.abc
+import sys
+import time
+from typing import Callable, List, Optional
+
+PROCESS_START = time.perf_counter()
+
+
+def since_start() -> float:
+    """Seconds elapsed since this module was loaded, which is the first thing `app.py` does"""
+    return time.perf_counter() - PROCESS_START
+
+
+class ImportNode:
+    __slots__ = ("name", "elapsed", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.elapsed = 0.0
+        self.children: List["ImportNode"] = []
+
+
+class _TimedLoader:
+    """Wraps a module loader to time executing the module"""
+
+    def __init__(self, loader, profiler: "ImportProfiler", name: str):
+        self._loader = loader
+        self._profiler = profiler
+        self._name = name
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # hand the module its real loader so nothing downstream ever sees the wrapper
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+
+        node = self._profiler.push(self._name)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler.pop(node, time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """Meta path finder recording the cumulative import time of every module, nested under the module importing it"""
+
+    def __init__(self):
+        self.root = ImportNode("<imports>")
+        self._stack = [self.root]
+        self._resolving = set()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self._resolving:
+            return None
+
+        self._resolving.add(fullname)
+        try:
+            spec = None
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+        finally:
+            self._resolving.discard(fullname)
+
+        if spec is None or spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+
+        spec.loader = _TimedLoader(spec.loader, self, fullname)
+        return spec
+
+    def push(self, name: str) -> ImportNode:
+        node = ImportNode(name)
+        self._stack[-1].children.append(node)
+        self._stack.append(node)
+        return node
+
+    def pop(self, node: ImportNode, elapsed: float):
+        node.elapsed = elapsed
+        if self._stack[-1] is node:
+            self._stack.pop()
+
+    def total(self) -> float:
+        return sum(child.elapsed for child in self.root.children)
+
+    def format_tree(self, min_ms: float = 5.0, max_depth: Optional[int] = None) -> str:
+        """Render the import tree, slowest first, leaving out the imports faster than `min_ms`"""
+        lines = [f"{self.total() * 1000:10.1f} ms  {self.root.name}"]
+
+        def walk(node: ImportNode, depth: int):
+            if max_depth is not None and depth > max_depth:
+                return
+            for child in sorted(node.children, key=lambda n: n.elapsed, reverse=True):
+                if child.elapsed * 1000 < min_ms:
+                    continue
+                lines.append(f"{child.elapsed * 1000:10.1f} ms  {'  ' * depth}{child.name}")
+                walk(child, depth + 1)
+
+        walk(self.root, 1)
+        return "\n".join(lines)
+
+
+class FirstRequestTimer:
+    """ASGI middleware calling `on_first_request` with the seconds since process start once the first response is sent"""
+
+    def __init__(self, app, on_first_request: Callable[[str, float], None]):
+        self.app = app
+        self.on_first_request = on_first_request
+        self.reported = False
+
+    async def __call__(self, scope, receive, send):
+        if self.reported or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body") and not self.reported:
+                self.reported = True
+                self.on_first_request(scope.get("path", ""), since_start())
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def report(message: str):
+    print(message, file=sys.stderr, flush=True)
@@ -0,0 +1,205 @@
+"""
+Serving of the Angular SPA build.
+
+The build directory is indexed once, the first time it is used, so serving an asset is a dictionary lookup rather than
+a few filesystem calls.  Compressible files are served from the `.br`/`.gz` files `precompress` writes next to them
+when the docker image is built, picked through the request `Accept-Encoding`.  Angular names its bundles after their
+content hash, those are cached by browsers for good, everything else is revalidated with its ETag.  `index.html` is
+small and served for every page, so it is kept in memory as a snapshot along with its compressed variants.
+
+The uploads stored on the local filesystem, under `assets/uploads/`, are added while the site is served, so they are
+left out of the index and looked up in `uploads.base_dir` on every request instead.
+
+Run as a module to precompress a build directory:  python -m lib.static_files static/
+"""
+
+import mimetypes
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from typing import Dict, Optional
+
+from starlette.responses import FileResponse, Response
+
+from lib import logging
+from lib.compression import MIN_COMPRESS_SIZE, CompressedSnapshot, available_encodings, choose_encoding, compress, is_compressible
+from lib.config import Config
+
+LOGGER = logging.getLogger(__name__)
+CONFIG = Config()
+
+STATIC_DIR = os.path.join(os.getcwd(), "static")
+INDEX_FILE = "index.html"
+UPLOADS_PATH = "assets/uploads/"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Angular appends an 8 character hash to the name of every file it emits, e.g. main-2KLUPYG5.js
+HASHED_NAME_RE = re.compile(r"-[A-Z0-9]{8}\.[a-z0-9]+$")
+# the extension of the compressed variants of a file
+EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+
+@dataclass
+class StaticFile:
+    path: str
+    media_type: str
+    etag: str
+    last_modified: str
+    immutable: bool
+    variants: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def cache_control(self) -> str:
+        return IMMUTABLE_CACHE_CONTROL if self.immutable else REVALIDATE_CACHE_CONTROL
+
+
+class StaticSite:
+    def __init__(self, directory: str = STATIC_DIR, uploads_dir: str = None):
+        self.directory = directory
+        self.uploads_dir = uploads_dir or os.path.join(directory, UPLOADS_PATH)
+        self.files: Dict[str, StaticFile] = {}
+        self.index: Optional[CompressedSnapshot] = None
+        self.index_etag = None
+
+    def load(self):
+        """Index the files of the build directory"""
+        files = {}
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if any(filename.endswith(ext) for ext in EXTENSIONS.values()):
+                    continue
+
+                path = os.path.join(root, filename)
+                rel_path = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                if rel_path.startswith(UPLOADS_PATH):
+                    continue
+                files[rel_path] = self._index_file(path, rel_path, filenames)
+
+        self.files = files
+        self._load_index()
+        LOGGER.info("Indexed %s static files from %s", len(files), self.directory)
+        return self
+
+    @staticmethod
+    def _index_file(path, rel_path, siblings) -> StaticFile:
+        stat = os.stat(path)
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type = f"{media_type}; charset=utf-8"
+
+        filename = os.path.basename(path)
+        variants = {enc: f"{path}{ext}" for enc, ext in EXTENSIONS.items() if f"{filename}{ext}" in siblings}
+        return StaticFile(
+            path=path,
+            media_type=media_type,
+            etag=f'"{int(stat.st_mtime):x}-{stat.st_size:x}"',
+            last_modified=formatdate(stat.st_mtime, usegmt=True),
+            immutable=bool(HASHED_NAME_RE.search(rel_path)) and not rel_path.startswith("assets/"),
+            variants=variants,
+        )
+
+    def _load_index(self):
+        index = self.files.pop(INDEX_FILE, None)
+        if not index:
+            self.index = None
+            return
+
+        with open(index.path, "rb") as f:
+            self.index = CompressedSnapshot(f.read(), "text/html", minimum_size=0)
+        self.index_etag = index.etag
+
+    def get(self, path: str) -> Optional[StaticFile]:
+        # only indexed files are served, so paths escaping the directory are never found
+        return self.files.get(path.lstrip("/"))
+
+    def get_upload(self, path: str) -> Optional[StaticFile]:
+        """An uploaded file, looked up on every request as the uploads are added while the site is served"""
+        rel_path = path.lstrip("/")
+        if not rel_path.startswith(UPLOADS_PATH):
+            return None
+
+        uploads_dir = os.path.realpath(self.uploads_dir)
+        resolved = os.path.realpath(os.path.join(uploads_dir, rel_path[len(UPLOADS_PATH) :]))
+        # the files being written and the hidden ones are not served
+        if not resolved.startswith(uploads_dir + os.sep) or os.path.basename(resolved).startswith(".") or not os.path.isfile(resolved):
+            return None
+        return self._index_file(resolved, rel_path, ())
+
+    @staticmethod
+    def _not_modified(headers, etag) -> bool:
+        # If-None-Match compares weakly, the compression middleware weakens the ETag of the responses it compresses
+        if_none_match = headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    def file_response(self, static_file: StaticFile, headers) -> Response:
+        encoding = choose_encoding(headers.get("accept-encoding"), static_file.variants)
+        etag = static_file.etag if not encoding else f'{static_file.etag[:-1]}-{encoding}"'
+        resp_headers = {"Cache-Control": static_file.cache_control, "ETag": etag, "Last-Modified": static_file.last_modified}
+        if static_file.variants:
+            resp_headers["Vary"] = "Accept-Encoding"
+
+        if self._not_modified(headers, etag):
+            return Response(status_code=304, headers=resp_headers)
+
+        if encoding:
+            resp_headers["Content-Encoding"] = encoding
+            return FileResponse(static_file.variants[encoding], media_type=static_file.media_type, headers=resp_headers)
+        return FileResponse(static_file.path, media_type=static_file.media_type, headers=resp_headers)
+
+    def index_response(self, headers) -> Response:
+        encoding = self.index.choose_encoding(headers)
+        etag = self.index_etag if not encoding else f'{self.index_etag[:-1]}-{encoding}"'
+        resp_headers = {"Cache-Control": REVALIDATE_CACHE_CONTROL, "ETag": etag, "Vary": "Accept-Encoding"}
+
+        if self._not_modified(headers, etag):
+            return Response(status_code=304, headers=resp_headers)
+
+        return self.index.response(headers, encoding=encoding, response_headers=resp_headers)
+
+
+_site: Optional[StaticSite] = None
+
+
+def get_site() -> StaticSite:
+    global _site  # pylint: disable=global-statement
+    if _site is None:
+        _site = StaticSite(uploads_dir=CONFIG.get("uploads.base_dir")).load()
+    return _site
+
+
+def precompress(directory: str) -> int:
+    """Write the compressed variants of the compressible files of a build directory, returns how many were written"""
+    written = 0
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if any(filename.endswith(ext) for ext in EXTENSIONS.values()):
+                continue
+
+            path = os.path.join(root, filename)
+            media_type = mimetypes.guess_type(path)[0] or ""
+            if not is_compressible(media_type) or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+
+            with open(path, "rb") as f:
+                data = f.read()
+            for encoding in available_encodings():
+                compressed = compress(data, encoding)
+                # not worth the decompression when it barely saves anything
+                if len(compressed) > len(data) * 0.9:
+                    continue
+                with open(f"{path}{EXTENSIONS[encoding]}", "wb") as f:
+                    f.write(compressed)
+                written += 1
+    return written
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else STATIC_DIR
+    print(f"Wrote {precompress(target)} compressed files in {target}")
@@ -1,3 +1,4 @@
+import importlib
 from typing import Dict, List
 
 from db import async_session_scope
@@ -9,6 +10,9 @@ CONFIG = Config()
 LOGGER = logging.getLogger(__name__)
 
 TAP_MONITORS = {}
+TAP_MONITOR_TYPES = {}
+# the types listing, for the registered types it was built from
+_types = (None, [])
 
 
 class InvalidDataType(Error):
@@ -41,80 +45,90 @@ class TapMonitorBase:
         return meta
 
 
+def _register(monitor_type, module, class_name):
+    TAP_MONITOR_TYPES[monitor_type] = (module, class_name)
+
+
 def _init_tap_monitors():
+    """
+    Register the enabled tap monitor types.  The monitors are only created when the type is first used, the modules
+    of the other monitors, and the libraries they depend on, are only imported then as well.
+    """
     LOGGER.info("Initializing Tap Monitors")
-    if not TAP_MONITORS:
+    if not TAP_MONITOR_TYPES:
         if CONFIG.get("tap_monitors.plaato_blynk.enabled", False):
             LOGGER.info("Enabling plaato-blynk tap monitors type")
-            from lib.tap_monitors.plaato_blynk import PlaatoBlynk
-
-            TAP_MONITORS["plaato-blynk"] = PlaatoBlynk()
+            _register("plaato-blynk", "lib.tap_monitors.plaato_blynk", "PlaatoBlynk")
         else:
             LOGGER.info("Disabling plaato-blynk tap monitors")
 
         if CONFIG.get("tap_monitors.kegtron.pro.enabled", False):
             LOGGER.info("Enabling kegtron pro tap monitors ")
             from lib.tap_monitors.kegtron import MONITOR_TYPE as kegtron_monitor_type
-            from lib.tap_monitors.kegtron import KegtronPro
 
-            TAP_MONITORS[kegtron_monitor_type] = KegtronPro()
+            _register(kegtron_monitor_type, "lib.tap_monitors.kegtron", "KegtronPro")
         else:
             LOGGER.info("Disabling kegtron pro tap monitors")
 
         if CONFIG.get("tap_monitors.keg_volume_monitors.enabled", False):
-            from lib.tap_monitors.keg_volume_monitor import KegVolumeMonitor
-
             LOGGER.info("Enabling keg_volume_monitors tap monitor types")
 
             if CONFIG.get("tap_monitors.keg_volume_monitors.weight.enabled", False):
                 LOGGER.info("Enabling keg_volume_monitors weight tap monitors")
-                TAP_MONITORS["keg-volume-monitor-weight"] = KegVolumeMonitor()
+                _register("keg-volume-monitor-weight", "lib.tap_monitors.keg_volume_monitor", "KegVolumeMonitor")
             else:
                 LOGGER.info("Disabling keg_volume_monitors weight tap monitors")
 
             if CONFIG.get("tap_monitors.keg_volume_monitors.flow.enabled", False):
                 LOGGER.info("Enabling keg_volume_monitors flow tap monitors")
-                TAP_MONITORS["keg-volume-monitor-flow"] = KegVolumeMonitor()
+                _register("keg-volume-monitor-flow", "lib.tap_monitors.keg_volume_monitor", "KegVolumeMonitor")
             else:
                 LOGGER.info("Disabling keg_volume_monitors flow tap monitors")
         else:
             LOGGER.info("Disabling keg_volume_monitors tap monitor types")
 
         if CONFIG.get("tap_monitors.open_plaato_keg.enabled", False):
-            from lib.tap_monitors.open_plaato_keg import OpenPlaatoKeg
-
             LOGGER.info("Enabling open_plaato_keg tap monitor type")
-            TAP_MONITORS["open-plaato-keg"] = OpenPlaatoKeg()
+            _register("open-plaato-keg", "lib.tap_monitors.open_plaato_keg", "OpenPlaatoKeg")
         else:
             LOGGER.info("Disabling open_plaato_keg tap monitor types")
 
         if CONFIG.get("tap_monitors.plaato_keg.enabled", False):
-            from lib.tap_monitors.plaato_keg import PlaatoKeg
-
             LOGGER.info("Enabling plaato_keg tap monitor type")
-            TAP_MONITORS["plaato-keg"] = PlaatoKeg()
+            _register("plaato-keg", "lib.tap_monitors.plaato_keg", "PlaatoKeg")
         else:
             LOGGER.info("Disabling plaato_keg tap monitor types")
 
         if CONFIG.get("tap_monitors.kegtron.gen1.enabled", False):
             LOGGER.info("Enabling kegtron gen1 tap monitors")
             from lib.tap_monitors.kegtron_gen1 import MONITOR_TYPE as kegtron_gen1_monitor_type
-            from lib.tap_monitors.kegtron_gen1 import KegtronGen1
 
-            TAP_MONITORS[kegtron_gen1_monitor_type] = KegtronGen1()
+            _register(kegtron_gen1_monitor_type, "lib.tap_monitors.kegtron_gen1", "KegtronGen1")
         else:
             LOGGER.info("Disabling kegtron gen1 tap monitors")
 
 
 def get_types() -> List[Dict]:
-    res = []
-    for k, v in TAP_MONITORS.items():
-        res.append({"type": k, "supports_discovery": v.supports_discovery(), "reports_online_status": v.reports_online_status()})
-    return res
+    """The registered types and their capabilities, built once as they only change when types are registered"""
+    global _types  # pylint: disable=global-statement
+
+    registered = tuple(TAP_MONITOR_TYPES.items())
+    if _types[0] != registered:
+        res = []
+        for k in TAP_MONITOR_TYPES:
+            v = get_tap_monitor_lib(k)
+            res.append({"type": k, "supports_discovery": v.supports_discovery(), "reports_online_status": v.reports_online_status()})
+        _types = (registered, res)
+    return [dict(t) for t in _types[1]]
 
 
 def get_tap_monitor_lib(_type):
-    return TAP_MONITORS.get(_type)
+    monitor = TAP_MONITORS.get(_type)
+    if monitor is None and _type in TAP_MONITOR_TYPES:
+        module, class_name = TAP_MONITOR_TYPES[_type]
+        LOGGER.debug("Loading %s tap monitor from %s", _type, module)
+        monitor = TAP_MONITORS.setdefault(_type, getattr(importlib.import_module(module), class_name)())
+    return monitor
 
 
 _init_tap_monitors()
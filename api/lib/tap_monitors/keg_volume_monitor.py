@@ -4,6 +4,7 @@ from httpx import AsyncClient
 
 from db import async_session_scope
 from db.tap_monitors import TapMonitors as TapMonitorsDB
+from lib.metrics import upstream as upstream_metrics
 from lib.tap_monitors import TapMonitorBase
 from lib.tap_monitors.exceptions import TapMonitorDependencyError
 
@@ -77,7 +78,7 @@ class KegVolumeMonitor(TapMonitorBase):
         url = f"{base_url}/api/v1/{path}"
         self.logger.debug("GET Request: %s, params: %s", url, params)
 
-        async with AsyncClient() as client:
+        async with AsyncClient(transport=upstream_metrics.transport("keg-volume-monitor")) as client:
             resp = await client.get(url, params=params, headers=headers)
             self.logger.debug("GET response code: %s", resp.status_code)
 
@@ -2,11 +2,13 @@ from typing import Dict
 
 from httpx import AsyncClient, BasicAuth
 
+from lib.metrics import upstream as upstream_metrics
 from lib.tap_monitors import TapMonitorBase
 from lib.tap_monitors.exceptions import TapMonitorDependencyError
 from lib.units import from_ml
 
 MONITOR_TYPE = "kegtron-pro"
+API_URL = "https://mdash.net"
 
 
 class KegtronPro(TapMonitorBase):
@@ -29,6 +31,11 @@ class KegtronPro(TapMonitorBase):
         self.kegtron_username = self.config.get("tap_monitors.kegtron.pro.auth.username")
         self.kegtron_password = self.config.get("tap_monitors.kegtron.pro.auth.password")
 
+    def _url(self, path):
+        # configurable so the tests can point the monitor to a fake server
+        api_url = self.config.get("tap_monitors.kegtron.pro.api_url") or API_URL
+        return f"{api_url.rstrip('/')}{path}"
+
     @staticmethod
     def supports_discovery():
         return True
@@ -131,9 +138,9 @@ class KegtronPro(TapMonitorBase):
 
         access_token = self._get_device_access_token(meta)
         params["access_token"] = access_token
-        url = "https://mdash.net/api/v2/m/device"
+        url = self._url("/api/v2/m/device")
         self.logger.debug("Retrieving device data. GET Request: %s", url)
-        async with AsyncClient() as client:
+        async with AsyncClient(transport=upstream_metrics.transport(MONITOR_TYPE)) as client:
             resp = await client.get(url, params=params)
             self.logger.debug("GET response code: %s", resp.status_code)
             if resp.status_code == 401:
@@ -210,7 +217,7 @@ class KegtronPro(TapMonitorBase):
         if not params:
             params = {}
         kwargs = {}
-        url = "https://mdash.net/customer"
+        url = self._url("/customer")
         if self.kegtron_customer_api_key:
             self.logger.debug("Discovering kegtron pro devices - using customer api key auth")
             params["access_token"] = self.kegtron_customer_api_key
@@ -218,7 +225,7 @@ class KegtronPro(TapMonitorBase):
             self.logger.debug("Discovering kegtron pro devices - using username/password auth")
             kwargs["auth"] = BasicAuth(self.kegtron_username, self.kegtron_password)
 
-        async with AsyncClient() as client:
+        async with AsyncClient(transport=upstream_metrics.transport(MONITOR_TYPE)) as client:
             self.logger.debug("GET Request: %s, params: %s", url, params)
             resp = await client.get(url, params=params, **kwargs)
             self.logger.debug("GET response code: %s", resp.status_code)
@@ -321,9 +328,9 @@ class KegtronPro(TapMonitorBase):
             params = {}
         access_token = self._get_device_access_token(meta)
         params["access_token"] = access_token
-        url = f"https://mdash.net/api/v2/m/device{path}"
+        url = self._url(f"/api/v2/m/device{path}")
         self.logger.debug("POST Request: %s, params: %s, data: %s", url, params, data)
-        async with AsyncClient() as client:
+        async with AsyncClient(transport=upstream_metrics.transport(MONITOR_TYPE)) as client:
             resp = await client.post(url, json=data, params=params, timeout=10)
             self.logger.debug("GET response code: %s", resp.status_code)
 
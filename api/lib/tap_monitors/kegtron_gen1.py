@@ -3,6 +3,7 @@ from typing import Any, Dict, List
 
 from httpx import AsyncClient
 
+from lib.metrics import upstream as upstream_metrics
 from lib.tap_monitors import TapMonitorBase
 from lib.tap_monitors.exceptions import TapMonitorDependencyError
 
@@ -37,6 +38,9 @@ class KegtronGen1(TapMonitorBase):
         if self.insecure and self.base_url and self.base_url.startswith("https"):
             self.client_args["verify"] = False
 
+    def _client(self) -> AsyncClient:
+        return AsyncClient(transport=upstream_metrics.transport(MONITOR_TYPE, **self.client_args), **self.client_args)
+
     @staticmethod
     def supports_discovery():
         return True
@@ -55,7 +59,7 @@ class KegtronGen1(TapMonitorBase):
         url = f"{self.base_url}/api/v1/devices/{device_id}/online"
         self.logger.debug("GET Request: %s", url)
 
-        async with AsyncClient(**self.client_args) as client:
+        async with self._client() as client:
             resp = await client.get(url, timeout=10)
             self.logger.debug("GET response code: %s", resp.status_code)
 
@@ -148,7 +152,7 @@ class KegtronGen1(TapMonitorBase):
         self.logger.debug("POST Request: %s, data: %s", url, data)
         headers = {"Authorization": f"Bearer {self.bearer_token}"}
 
-        async with AsyncClient(**self.client_args) as client:
+        async with self._client() as client:
             resp = await client.post(url, json=data, headers=headers, timeout=10)
             self.logger.debug("POST response code: %s", resp.status_code)
 
@@ -171,7 +175,7 @@ class KegtronGen1(TapMonitorBase):
         url = f"{self.base_url}/api/v1/devices"
         self.logger.debug("GET Request: %s", url)
 
-        async with AsyncClient(**self.client_args) as client:
+        async with self._client() as client:
             resp = await client.get(url, timeout=10)
             self.logger.debug("GET response code: %s", resp.status_code)
 
@@ -193,7 +197,7 @@ class KegtronGen1(TapMonitorBase):
         url = f"{self.base_url}/api/v1/devices/{device_id}"
         self.logger.debug("GET Request: %s", url)
 
-        async with AsyncClient(**self.client_args) as client:
+        async with self._client() as client:
             resp = await client.get(url, timeout=10)
             self.logger.debug("GET response code: %s", resp.status_code)
 
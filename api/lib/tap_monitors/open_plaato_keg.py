@@ -2,6 +2,7 @@ from httpx import AsyncClient
 
 from db import async_session_scope
 from db.tap_monitors import TapMonitors as TapMonitorsDB
+from lib.metrics import upstream as upstream_metrics
 from lib.tap_monitors import InvalidDataType, TapMonitorBase
 
 KEYMAP = {
@@ -73,7 +74,7 @@ class OpenPlaatoKeg(TapMonitorBase):
         url = f"{base_url}/api/{path}"
         self.logger.debug("GET Request: %s, params: %s", url, params)
 
-        async with AsyncClient(**client_kwargs) as client:
+        async with AsyncClient(transport=upstream_metrics.transport("open-plaato-keg", **client_kwargs), **client_kwargs) as client:
             resp = await client.get(url, params=params, **kwargs)
             self.logger.debug("GET response code: %s", resp.status_code)
 
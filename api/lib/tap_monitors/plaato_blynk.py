@@ -2,6 +2,7 @@ from httpx import AsyncClient
 
 from db import async_session_scope
 from db.tap_monitors import TapMonitors as TapMonitorsDB
+from lib.metrics import upstream as upstream_metrics
 from lib.tap_monitors import InvalidDataType, TapMonitorBase
 
 
@@ -69,7 +70,7 @@ class PlaatoBlynk(TapMonitorBase):
         base_url = self.config.get("tap_monitors.plaato_blynk.base_url", "http://plaato.blynk.cc")
         url = f"{base_url}/{auth_token}/get/{pin}"
         self.logger.debug("GET Request: %s, params: %s", url, params)
-        async with AsyncClient() as client:
+        async with AsyncClient(transport=upstream_metrics.transport("plaato-blynk")) as client:
             resp = await client.get(url, params=params, timeout=10)
             self.logger.debug("GET response code: %s", resp.status_code)
             if resp.status_code != 200:
@@ -1,9 +1,19 @@
 """FastAPI routers"""
 
+import functools
+import inspect
+from typing import Any, Dict, List
+
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.dependencies.utils import get_typed_return_annotation
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from fastapi.utils import is_body_allowed_for_status_code
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
 
-from lib import util
+from lib import json, util
 
 __all__ = [
     "auth",
@@ -25,6 +35,46 @@ __all__ = [
 ]
 
 
+# response models that do not describe the response, validating against them only copies it
+UNTYPED_RESPONSE_MODELS = (None, Any, dict, Dict, Dict[str, Any], List[dict], List[Dict], List[Dict[str, Any]])
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Renders the content with `lib.json.dumps_bytes`, datetimes, UUIDs and enums included, in a single pass.  Datetimes
+    are rendered with `isoformat()`, so UTC ones end with +00:00 rather than the Z of the responses pydantic serializes.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json.dumps_bytes(content)
+
+
+class FastJSONRoute(APIRoute):
+    """
+    Route whose untyped responses (a `dict` or `List[dict]` response model, or none) are rendered by FastJSONResponse as
+    the endpoint returns them.  FastAPI would otherwise validate and copy them against the model, or run them through
+    `jsonable_encoder` when there is no model.  The responses of typed models are still validated and serialized by
+    pydantic.
+    """
+
+    def __init__(self, path: str, endpoint, *, response_model: Any = Default(None), status_code: int = None, **kwargs):
+        model = get_typed_return_annotation(endpoint) if isinstance(response_model, DefaultPlaceholder) else response_model
+        if model in UNTYPED_RESPONSE_MODELS and inspect.iscoroutinefunction(endpoint) and is_body_allowed_for_status_code(status_code):
+            endpoint = _render_untyped(endpoint, status_code or 200)
+        super().__init__(path, endpoint, response_model=response_model, status_code=status_code, **kwargs)
+
+
+def _render_untyped(endpoint, status_code: int):
+    @functools.wraps(endpoint)
+    async def render(*args, **kwargs):
+        content = await endpoint(*args, **kwargs)
+        if isinstance(content, Response):
+            return content
+        return FastJSONResponse(content, status_code=status_code)
+
+    return render
+
+
 class StringValueRequest(BaseModel):
     value: str
 
@@ -34,10 +84,6 @@ async def get_location_id(location_identifier: str, db_session: AsyncSession) ->
     if util.is_valid_uuid(location_identifier):
         return location_identifier
 
-    from db.locations import Locations as LocationsDB
-
-    locations = await LocationsDB.query(db_session, name=location_identifier)
-    if locations:
-        return locations[0].id
+    from services.reference_data import reference_data
 
-    return None
+    return await reference_data.get_location_id(location_identifier, db_session)
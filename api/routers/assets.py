@@ -1,28 +1,32 @@
 """Assets router for FastAPI"""
 
-import asyncio
 from typing import List
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, RedirectResponse
 
 from dependencies.auth import AuthUser, require_user
 from lib import logging
+from lib.assets import images
 from lib.assets.files import FileAssetManager
-from lib.assets.s3 import S3AssetManager
 from lib.config import Config
+from routers import FastJSONRoute
 
-router = APIRouter(prefix="/api/v1/uploads", tags=["assets"])
+router = APIRouter(prefix="/api/v1/uploads", tags=["assets"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 CONFIG = Config()
 
-ALLOWED_IMAGE_TYPES = ["beer", "user", "beverage"]
+ALLOWED_IMAGE_TYPES = images.IMAGE_TYPES
 
 
 def get_asset_manager():
     """Get the configured asset manager (file or S3)"""
     storage_type = CONFIG.get("uploads.storage_type")
     if storage_type and storage_type.lower() == "s3":
+        # boto3 is slow to import, so it is only loaded when S3 storage is used
+        from lib.assets.s3 import S3AssetManager
+
         return S3AssetManager()
     return FileAssetManager()
 
@@ -45,7 +49,7 @@ async def list_images(
         raise HTTPException(status_code=400, detail=f"Invalid image type '{image_type}'. Must be either 'beer', 'beverage' or 'user'")
 
     manager = get_asset_manager()
-    return await asyncio.to_thread(manager.list, image_type)
+    return await manager.list(image_type)
 
 
 @router.post("/images/{image_type}", response_model=dict)
@@ -67,7 +71,55 @@ async def upload_image(
         raise HTTPException(status_code=400, detail=f"Invalid file type. Must be one of: {', '.join(allowed_extensions)}")
 
     LOGGER.info("Saving uploaded file '%s'", file.filename)
-    of, df, dp = await asyncio.to_thread(manager.save, image_type, file)
+    of, df, dp = await manager.save(image_type, file)
     LOGGER.debug("Successfully saved file '%s' as '%s'", of, df)
 
-    return {"sourceFilename": of, "destinationPath": dp}
+    resp = {"sourceFilename": of, "destinationPath": dp}
+    if images.is_raster(df):
+        image_hash = df.rsplit(".", 1)[0]
+        data = await manager.run_io(read_upload, file)
+        if await images.create_derivatives(manager, image_type, image_hash, data):
+            resp["hash"] = image_hash
+            resp["derivatives"] = {size: images.derivative_url(image_type, image_hash, size) for size in images.SIZES}
+
+    return resp
+
+
+def read_upload(file: UploadFile) -> bytes:
+    """Read the spooled upload, leaving it rewound"""
+    try:
+        return file.file.read()
+    finally:
+        file.file.seek(0)
+
+
+@router.get("/images/{image_type}/{image_hash}", include_in_schema=False)
+async def get_image(image_type: str, image_hash: str, request: Request, size: str = images.DEFAULT_SIZE):
+    """Serve a resized derivative of an uploaded image, as WebP when the client accepts it"""
+    if image_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid image type '{image_type}'. Must be either 'beer', 'beverage' or 'user'")
+
+    if size not in images.SIZES:
+        raise HTTPException(status_code=400, detail=f"Invalid size '{size}'. Must be one of: {', '.join(images.SIZES)}")
+
+    if not images.is_image_id(image_hash):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    fmt = images.choose_format(request.headers.get("accept"))
+    name = images.derivative_name(size, fmt)
+    manager = get_asset_manager()
+
+    location = await manager.get_derivative(image_type, image_hash, name)
+    if not location:
+        # the image was uploaded before derivatives were rendered, or rendering them failed at the time
+        data = await manager.read_original(image_type, image_hash)
+        if data and await images.create_derivatives(manager, image_type, image_hash, data):
+            location = await manager.get_derivative(image_type, image_hash, name)
+
+    if not location:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    headers = {"Cache-Control": images.IMMUTABLE_CACHE_CONTROL, "Vary": "Accept"}
+    if manager.serves_files:
+        return FileResponse(location, media_type=images.FORMATS[fmt], headers=headers)
+    return RedirectResponse(location, headers=headers)
@@ -5,22 +5,20 @@ Handles login, logout, and Google OAuth flows.
 
 import asyncio
 
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
-from google_auth_oauthlib.flow import Flow
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.users import Users as UsersDB
-from dependencies.auth import get_db_session
+from dependencies.auth import auth_user_cache, get_db_session
 from lib import logging
 from lib.config import Config
+from lib.exceptions import PasswordHashingBusy
+from lib.passwords import get_password_service
+from routers import FastJSONRoute
 
-router = APIRouter(tags=["auth"], include_in_schema=False)
+router = APIRouter(tags=["auth"], include_in_schema=False, route_class=FastJSONRoute)
 CONFIG = Config()
 LOGGER = logging.getLogger(__name__)
 
@@ -55,12 +53,20 @@ async def login(request: Request, login_data: LoginRequest, db_session: AsyncSes
             detail="The user does not have a password set. Please try logging in with google.",
         )
 
-    ph = PasswordHasher()
+    password_service = get_password_service()
     try:
-        if not ph.verify(user.password_hash, login_data.password):
+        if not await password_service.verify(user.password_hash, login_data.password):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authorized")
-    except VerifyMismatchError as e:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authorized") from e
+    except PasswordHashingBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=e.message) from e
+
+    if password_service.needs_rehash(user.password_hash):
+        # the argon2 parameters changed since the password was set, upgrade the hash while we have the plain password
+        LOGGER.info("Rehashing password for user %s with the current argon2 parameters", user.email)
+        try:
+            await UsersDB.update(db_session, user.id, password=login_data.password)
+        except Exception:
+            LOGGER.error("Failed to rehash password for user %s", user.email, stack_info=True, exc_info=True)
 
     # Set session cookie (replaces Flask-Login's login_user)
     request.session["user_id"] = str(user.id)
@@ -86,6 +92,9 @@ async def google_login(request: Request):
 
     redirect_url = build_google_redir_uri(request)
 
+    # the google libraries are slow to import, so they are only loaded once google sign in is used
+    from google_auth_oauthlib.flow import Flow
+
     # Create flow instance to manage the OAuth 2.0 Authorization Grant Flow
     flow = Flow.from_client_config(
         client_config={
@@ -132,6 +141,10 @@ async def google_callback(request: Request, code: str, state: str, db_session: A
 
     redirect_url = build_google_redir_uri(request)
 
+    from google.auth.transport import requests as google_requests
+    from google.oauth2 import id_token
+    from google_auth_oauthlib.flow import Flow
+
     # Create flow instance
     flow = Flow.from_client_config(
         client_config={
@@ -228,6 +241,7 @@ async def google_callback(request: Request, code: str, state: str, db_session: A
     if update_data:
         LOGGER.debug("Updating user account '%s' with missing data: %s", users_email, update_data)
         await UsersDB.update(db_session, user.id, **update_data)
+        auth_user_cache.invalidate_user_on_commit(db_session, user.id)
         # Refresh user after update
         user = await UsersDB.get_by_pkey(db_session, user.id)
 
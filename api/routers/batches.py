@@ -14,10 +14,11 @@ from db.batch_locations import BatchLocations as BatchLocationsDB
 # fmt: on
 from dependencies.auth import AuthUser, get_db_session, require_user
 from lib import logging
+from routers import FastJSONRoute
 from schemas.batches import BatchCreate, BatchUpdate
 from services.batches import BatchService
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 
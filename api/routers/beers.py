@@ -17,11 +17,12 @@ from db.image_transitions import ImageTransitions as ImageTransitionsDB
 from db.on_tap import OnTap as OnTapDB
 from dependencies.auth import AuthUser, get_db_session, require_user
 from lib import logging
+from routers import FastJSONRoute
 from schemas.beers import BeerCreate, BeerUpdate
 from services.beers import BeerService
 from services.taps import TapService
 
-router = APIRouter(prefix="/api/v1/beers", tags=["beers"])
+router = APIRouter(prefix="/api/v1/beers", tags=["beers"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 
@@ -17,11 +17,12 @@ from db.image_transitions import ImageTransitions as ImageTransitionsDB
 from db.on_tap import OnTap as OnTapDB
 from dependencies.auth import AuthUser, get_db_session, require_user
 from lib import logging
+from routers import FastJSONRoute
 from schemas.beverages import BeverageCreate, BeverageUpdate
 from services.beverages import BeverageService
 from services.taps import TapService
 
-router = APIRouter(prefix="/api/v1/beverages", tags=["beverages"])
+router = APIRouter(prefix="/api/v1/beverages", tags=["beverages"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 
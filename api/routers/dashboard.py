@@ -12,16 +12,20 @@ from db.tap_monitors import TapMonitors as TapMonitorsDB
 from db.taps import Taps as TapsDB
 from dependencies.auth import get_db_session
 from lib import logging
+from lib.config import Config
 from lib.tap_monitors import get_tap_monitor_lib
-from routers import get_location_id
+from routers import FastJSONRoute, get_location_id
 from services.beers import BeerService
 from services.beverages import BeverageService
+from services.dashboard import DashboardService
 from services.locations import LocationService
+from services.reference_data import reference_data
 from services.tap_monitors import TapMonitorService
 from services.taps import TapService
 
-router = APIRouter(prefix="/api/v1/dashboard", tags=["dashboard"])
+router = APIRouter(prefix="/api/v1/dashboard", tags=["dashboard"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
+CONFIG = Config()
 
 
 @router.get("/locations", response_model=List[dict])
@@ -29,7 +33,7 @@ async def list_dashboard_locations(
     db_session: AsyncSession = Depends(get_db_session),
 ):
     """List all locations for dashboard"""
-    locations = await LocationsDB.query(db_session)
+    locations = await reference_data.get_locations(db_session)
     return [await LocationService.transform_response(l, db_session=db_session) for l in locations]
 
 
@@ -99,21 +103,21 @@ async def get_dashboard(
     if not location_id:
         raise HTTPException(status_code=404, detail="Location not found")
 
-    locations = await LocationsDB.query(db_session)
-    taps = await TapsDB.query(db_session, locations=[location_id])
-
-    # Find the current location
-    current_location = None
-    for l in locations:
-        if l.id == location_id:
-            current_location = l
-            break
+    locations = await reference_data.get_locations(db_session)
+    if CONFIG.get("dashboard.read_model.enabled", False):
+        taps = await DashboardService.get_location_taps(location_id, db_session)
+    else:
+        taps = [
+            await TapService.transform_response(t, db_session=db_session, include_location=False, filter_unsupported_tap_monitor=True)
+            for t in await TapsDB.query(db_session, locations=[location_id])
+        ]
 
+    current_location = await reference_data.get_location(location_id, db_session)
     if not current_location:
         current_location = await LocationsDB.get_by_pkey(db_session, location_id)
 
     return {
-        "taps": [await TapService.transform_response(t, db_session=db_session, include_location=False, filter_unsupported_tap_monitor=True) for t in taps],
+        "taps": taps,
         "locations": [await LocationService.transform_response(l, db_session=db_session) for l in locations],
         "location": await LocationService.transform_response(current_location, db_session=db_session) if current_location else None,
     }
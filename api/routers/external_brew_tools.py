@@ -6,9 +6,10 @@ from fastapi import APIRouter, Depends, HTTPException
 
 from dependencies.auth import AuthUser, require_user
 from lib import external_brew_tools, logging
+from routers import FastJSONRoute
 from services.base import transform_dict_to_camel_case
 
-router = APIRouter(prefix="/api/v1/external_brew_tools", tags=["external_brew_tools"])
+router = APIRouter(prefix="/api/v1/external_brew_tools", tags=["external_brew_tools"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 
@@ -6,8 +6,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from db.image_transitions import ImageTransitions as ImageTransitionsDB
 from dependencies.auth import AuthUser, get_db_session, require_user
 from lib import logging
+from routers import FastJSONRoute
 
-router = APIRouter(prefix="/api/v1/image_transitions", tags=["image_transitions"])
+router = APIRouter(prefix="/api/v1/image_transitions", tags=["image_transitions"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 
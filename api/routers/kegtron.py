@@ -12,11 +12,14 @@ from db.batches import Batches as BatchesDB
 from db.tap_monitors import TapMonitors as TapMonitorsDB
 from dependencies.auth import AuthUser, get_db_session, require_admin
 from lib import logging
+from lib.assets import images
 from lib.tap_monitors import get_tap_monitor_lib
 from lib.units import to_ml
+from routers import FastJSONRoute
+from routers.assets import get_asset_manager
 from schemas.base import CamelCaseModel
 
-router = APIRouter(prefix="/api/v1/devices/kegtron", tags=["kegtron_device_management"])
+router = APIRouter(prefix="/api/v1/devices/kegtron", tags=["kegtron_device_management"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 VALID_VOLUME_UNITS = ["gal", "l", "ml"]
@@ -65,6 +68,11 @@ async def get_monitor_from_device_and_port(device_id: str, port_num: int, db_ses
     return monitor
 
 
+def label_url(url: str) -> str:
+    """The kegtron shows the label as a small tile, so uploaded labels are sent as their tile derivative"""
+    return images.upload_derivative_url(get_asset_manager(), url, "tile")
+
+
 @router.post("/{device_id}/{port_num}", response_model=bool)
 async def reset_port(
     device_id: str,
@@ -135,7 +143,7 @@ async def reset_port(
                 port_data["userName"] = name
             labelUrl = get_beer_data(batch_d, beer_d, "img_url")
             if labelUrl:
-                port_data["labelUrl"] = labelUrl
+                port_data["labelUrl"] = label_url(labelUrl)
         elif batch.beverage_id:
             await batch.awaitable_attrs.beverage
             port_data["abv"] = 0.0
@@ -146,7 +154,7 @@ async def reset_port(
             port_data["userName"] = batch.beverage.name
             labelUrl = port_data["labelUrl"] = batch.img_url if batch.img_url else batch.beverage.img_url
             if labelUrl:
-                port_data["labelUrl"] = labelUrl
+                port_data["labelUrl"] = label_url(labelUrl)
 
     if port_data:
         tasks.append(kegtron_lib.update_port(port_data, meta=monitor.meta))
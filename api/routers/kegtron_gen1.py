@@ -8,9 +8,10 @@ from db.tap_monitors import TapMonitors as TapMonitorsDB
 from dependencies.auth import AuthUser, get_db_session, require_admin
 from lib import logging
 from lib.tap_monitors import get_tap_monitor_lib
+from routers import FastJSONRoute
 from schemas.base import CamelCaseModel
 
-router = APIRouter(prefix="/api/v1/devices/kegtron_gen1", tags=["kegtron_gen1_device_management"])
+router = APIRouter(prefix="/api/v1/devices/kegtron_gen1", tags=["kegtron_gen1_device_management"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 VALID_VOLUME_UNITS = ["gal", "l", "ml"]
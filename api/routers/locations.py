@@ -9,13 +9,14 @@ from db.batch_locations import BatchLocations as BatchLocationsDB
 from db.locations import Locations as LocationsDB
 from db.taps import Taps as TapsDB
 from db.user_locations import UserLocations as UserLocationsDB
-from dependencies.auth import AuthUser, get_db_session, require_admin, require_user
+from dependencies.auth import AuthUser, auth_user_cache, get_db_session, require_admin, require_user
 from lib import logging
-from routers import get_location_id
+from routers import FastJSONRoute, get_location_id
 from schemas.locations import LocationCreate, LocationUpdate
 from services.locations import LocationService
+from services.reference_data import reference_data
 
-router = APIRouter(prefix="/api/v1/locations", tags=["locations"])
+router = APIRouter(prefix="/api/v1/locations", tags=["locations"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 
@@ -44,6 +45,7 @@ async def create_location(
 
     LOGGER.debug("Creating location with: %s", data)
     location = await LocationsDB.create(db_session, **data)
+    reference_data.invalidate_locations_on_commit(db_session)
 
     return await LocationService.transform_response(location, db_session=db_session)
 
@@ -92,6 +94,7 @@ async def update_location(
 
     if data:
         await LocationsDB.update(db_session, location_id, **data)
+        reference_data.invalidate_locations_on_commit(db_session)
 
     loc = await LocationsDB.get_by_pkey(db_session, location_id)
     await db_session.refresh(loc)
@@ -117,4 +120,7 @@ async def delete_location(
     await BatchLocationsDB.delete_by(db_session, location_id=location_id)
     await UserLocationsDB.delete_by(db_session, location_id=location_id)
     await LocationsDB.delete(db_session, location_id)
+    reference_data.invalidate_locations_on_commit(db_session)
+    # any number of users may have had access to the location
+    auth_user_cache.clear_on_commit(db_session)
     return
@@ -0,0 +1,73 @@
+"""Prometheus metrics endpoint"""
+
+import secrets
+
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+from lib import logging, metrics
+from lib.config import Config
+from lib.logging import get_queue_stats
+from routers import FastJSONRoute
+
+router = APIRouter(tags=["metrics"], route_class=FastJSONRoute)
+LOGGER = logging.getLogger(__name__)
+
+CONFIG = Config()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+PLAATO_KEGS = metrics.gauge("plaato_connected_kegs", "Number of Plaato kegs connected and registered")
+PLAATO_CONNECTIONS = metrics.gauge("plaato_connections", "Number of open Plaato keg sockets")
+PLAATO_FRAMES = metrics.counter("plaato_frames_received_total", "Number of blynk frames received from the Plaato kegs")
+PLAATO_DECODE_ERRORS = metrics.counter("plaato_decode_errors_total", "Number of Plaato keg reads that could not be decoded")
+PLAATO_QUEUE_DEPTH = metrics.gauge("plaato_ingestion_queue_depth", "Number of Plaato keg readings waiting to be saved")
+PLAATO_DROPPED = metrics.counter("plaato_ingestion_dropped_total", "Number of Plaato keg readings dropped because the ingestion queue was full")
+LOG_QUEUE_DEPTH = metrics.gauge("log_queue_depth", "Number of log records waiting to be written")
+LOG_DROPPED = metrics.counter("log_records_dropped_total", "Number of log records dropped because the log queue was full")
+LOG_SUPPRESSED = metrics.counter("log_records_suppressed_total", "Number of DEBUG log records left out by sampling and rate limits", ["logger"])
+
+
+def _collect_plaato():
+    if not CONFIG.get("tap_monitors.plaato_keg.enabled"):
+        return
+
+    from lib.devices.plaato_keg import service_handler
+
+    handler = service_handler.connection_handler
+    stats = handler.get_ingestion_stats()
+    PLAATO_KEGS.set(len(handler.get_registered_device_ids()))
+    PLAATO_CONNECTIONS.set(len(handler.get_connection_ids()))
+    PLAATO_FRAMES.set(stats.get("frames_received", 0))
+    PLAATO_DECODE_ERRORS.set(stats.get("decode_errors", 0))
+    PLAATO_QUEUE_DEPTH.set(stats.get("depth", 0))
+    PLAATO_DROPPED.set(stats.get("dropped", 0))
+
+
+def _collect_logging():
+    stats = get_queue_stats()
+    LOG_QUEUE_DEPTH.set(stats.get("depth", 0))
+    LOG_DROPPED.set(stats.get("dropped", 0))
+    for name, suppressed in stats.get("suppressed", {}).items():
+        LOG_SUPPRESSED.set(suppressed, logger=name)
+
+
+metrics.add_collector(_collect_plaato)
+metrics.add_collector(_collect_logging)
+
+
+def _authorized(request: Request) -> bool:
+    token = CONFIG.get("metrics.auth_token")
+    if not token:
+        return True
+    return secrets.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    """Get the metrics of this process in the Prometheus text format"""
+    if not CONFIG.get("metrics.enabled", False):
+        return PlainTextResponse("Not found", status_code=404)
+    if not _authorized(request):
+        return PlainTextResponse("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
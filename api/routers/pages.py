@@ -3,23 +3,21 @@ Page router for serving Angular SPA.
 Handles UI routes and redirects.
 """
 
-import os
-
-from fastapi import APIRouter, Depends
-from fastapi.responses import FileResponse, RedirectResponse
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import RedirectResponse
 
 from dependencies.auth import AuthUser, get_optional_user
+from lib import static_files
+from routers import FastJSONRoute
 
-router = APIRouter(tags=["pages"], include_in_schema=False)
-
-STATIC_DIR = os.path.join(os.getcwd(), "static")
+router = APIRouter(tags=["pages"], include_in_schema=False, route_class=FastJSONRoute)
 
 
-async def serve_spa():
-    """Serve the Angular SPA index.html"""
-    index_path = os.path.join(STATIC_DIR, "index.html")
-    if os.path.exists(index_path):
-        return FileResponse(index_path)
+async def serve_spa(request: Request):
+    """Serve the Angular SPA index.html, kept in memory"""
+    site = static_files.get_site()
+    if site.index is not None:
+        return site.index_response(request.headers)
     return {"error": "Static files not found"}
 
 
@@ -28,8 +26,8 @@ async def serve_spa():
 @router.get("/login")
 @router.get("/view/{location}")
 @router.get("/tools/volume_calculator")
-async def ui():
-    return await serve_spa()
+async def ui(request: Request):
+    return await serve_spa(request)
 
 
 # Protected pages
@@ -38,16 +36,16 @@ async def ui():
 @router.get("/manage/beverages")
 @router.get("/manage/tap_monitors")
 @router.get("/manage/taps")
-async def auth_required(current_user: AuthUser = Depends(get_optional_user)):
+async def auth_required(request: Request, current_user: AuthUser = Depends(get_optional_user)):
     if current_user and current_user.is_authenticated:
-        return await serve_spa()
+        return await serve_spa(request)
     return RedirectResponse(url="/login")
 
 
 # Admin pages
 @router.get("/manage/locations")
 @router.get("/manage/plaato_kegs")
-async def admin(current_user: AuthUser = Depends(get_optional_user)):
+async def admin(request: Request, current_user: AuthUser = Depends(get_optional_user)):
     if current_user and current_user.is_authenticated and current_user.admin:
-        return await serve_spa()
+        return await serve_spa(request)
     return RedirectResponse(url="/forbidden")
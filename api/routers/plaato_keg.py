@@ -11,11 +11,11 @@ from dependencies.auth import AuthUser, get_db_session, require_admin
 from lib import logging, util
 from lib.devices.plaato_keg import service_handler
 from lib.devices.plaato_keg.command_writer import COMMAND_MAPP, Commands, sanitize_command
-from routers import StringValueRequest
+from routers import FastJSONRoute, StringValueRequest
 from schemas.plaato_keg import PlaatoKegBase, PlaatoKegCreate, PlaatoKegUpdate
 from services.plaato_keg import PlaatoKegService
 
-router = APIRouter(prefix="/api/v1/devices/plaato_keg", tags=["plaato_keg_device_management"])
+router = APIRouter(prefix="/api/v1/devices/plaato_keg", tags=["plaato_keg_device_management"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 
@@ -61,6 +61,15 @@ async def get_all_connected(
     }
 
 
+@router.get("/ingestion", response_model=Dict[str, Any])
+async def get_ingestion_stats(
+    current_user: AuthUser = Depends(require_admin),
+):
+    """Get the ingestion queue depth and drop counters"""
+
+    return service_handler.connection_handler.get_ingestion_stats()
+
+
 @router.get("/{device_id}", response_model=PlaatoKegBase)
 async def get(
     device_id: str,
@@ -205,9 +214,7 @@ async def set_unit_type(
 
     LOGGER.debug("Setting: Unit = 01, measure_unit = 01")
     await PlaatoDataDB.update(db_session, device_id, user_unit=unit_val, user_measure_unit=measure_unit_val)
-    await command_writer.send_command(device_id, Commands.SET_UNIT, unit_val)
-    await command_writer.send_command(device_id, Commands.SET_MEASURE_UNIT, measure_unit_val)
-    return True
+    return await command_writer.send_commands(device_id, [(Commands.SET_UNIT, unit_val), (Commands.SET_MEASURE_UNIT, measure_unit_val)])
 
 
 @router.post("/{device_id}/set/unit_mode", response_model=bool)
@@ -251,9 +258,7 @@ async def set_unit_mode(
         measure_unit_val = "1"
 
     await PlaatoDataDB.update(db_session, device_id, user_unit=unit_val, user_measure_unit=measure_unit_val)
-    await command_writer.send_command(device_id, Commands.SET_UNIT, unit_val)
-    await command_writer.send_command(device_id, Commands.SET_MEASURE_UNIT, measure_unit_val)
-    return True
+    return await command_writer.send_commands(device_id, [(Commands.SET_UNIT, unit_val), (Commands.SET_MEASURE_UNIT, measure_unit_val)])
 
 
 @router.post("/{device_id}/set/{key}", response_model=bool)
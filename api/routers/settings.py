@@ -1,19 +1,34 @@
 """Settings router for FastAPI"""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
+from dependencies.auth import AuthUser, require_admin
 from lib import logging
 from lib.config import Config
+from lib.logging import get_queue_stats
+from routers import FastJSONRoute
 
-router = APIRouter(prefix="/api/v1/settings", tags=["settings"])
+router = APIRouter(prefix="/api/v1/settings", tags=["settings"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 CONFIG = Config()
 
+# the settings, for the config snapshot they were built from
+_settings = (None, None)
+
 
 @router.get("", response_model=dict)
 async def get_settings():
     """Get application settings (no auth required)"""
+    global _settings  # pylint: disable=global-statement
+
+    snapshot = CONFIG.snapshot
+    if _settings[0] is not snapshot:
+        _settings = (snapshot, _build_settings())
+    return _settings[1]
+
+
+def _build_settings():
     data = {
         "googleSSOEnabled": CONFIG.get("auth.oidc.google.enabled"),
         "taps": {"refresh": {"baseSec": CONFIG.get("taps.refresh.base_sec"), "variable": CONFIG.get("taps.refresh.variable")}},
@@ -31,3 +46,11 @@ async def get_settings():
     data["plaato_keg_devices"] = plaato
 
     return data
+
+
+@router.get("/logging", response_model=dict)
+async def get_logging_stats(
+    current_user: AuthUser = Depends(require_admin),
+):
+    """Get the background log queue depth, dropped records and records suppressed by sampling"""
+    return get_queue_stats()
@@ -12,12 +12,12 @@ from dependencies.auth import AuthUser, get_db_session, require_user
 from lib import logging
 from lib.tap_monitors import InvalidDataType, get_tap_monitor_lib
 from lib.tap_monitors import get_types as get_tap_monitor_types
-from routers import get_location_id
+from routers import FastJSONRoute, get_location_id
 from schemas.tap_monitors import TapMonitorCreate, TapMonitorData, TapMonitorTypeBase, TapMonitorUpdate
 from services.base import transform_dict_to_camel_case
 from services.tap_monitors import TapMonitorService, TapMonitorTypeService
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 KEGTRON_PRO_REQUIRED_META_KEYS = ["port_num", "device_id", "access_token"]
@@ -13,11 +13,11 @@ from db.taps import Taps as TapsDB
 from dependencies.auth import AuthUser, get_db_session, require_user
 from lib import logging
 from lib.tap_monitors import get_tap_monitor_lib
-from routers import get_location_id
+from routers import FastJSONRoute, get_location_id
 from schemas.taps import TapCreate, TapUpdate
 from services.taps import TapService
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 
@@ -8,13 +8,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.user_locations import UserLocations as UserLocationsDB
 from db.users import Users as UsersDB
-from dependencies.auth import AuthUser, get_db_session, require_admin, require_user
+from dependencies.auth import AuthUser, auth_user_cache, get_db_session, require_admin, require_user
 from lib import logging
+from routers import FastJSONRoute
 from schemas.users import UserCreate, UserLocationsUpdate, UserUpdate
 from services.locations import LocationService
 from services.users import UserService
 
-router = APIRouter(prefix="/api/v1/users", tags=["users"])
+router = APIRouter(prefix="/api/v1/users", tags=["users"], route_class=FastJSONRoute)
 LOGGER = logging.getLogger(__name__)
 
 
@@ -90,6 +91,7 @@ async def update_user(
 
     if data:
         await UsersDB.update(db_session, user_id, **data)
+        auth_user_cache.invalidate_user_on_commit(db_session, user_id)
 
     user = await UsersDB.get_by_pkey(db_session, user_id)
     await db_session.refresh(user)
@@ -108,6 +110,7 @@ async def delete_user(
         raise HTTPException(status_code=404, detail="User not found")
 
     await UsersDB.delete(db_session, user.id)
+    auth_user_cache.invalidate_user_on_commit(db_session, user.id)
     return
 
 
@@ -147,6 +150,7 @@ async def generate_user_api_key(
     # Generate new API key
     new_api_key = str(uuid.uuid4())
     await UsersDB.update(db_session, user_id, api_key=new_api_key)
+    auth_user_cache.invalidate_user_on_commit(db_session, user_id)
 
     return {"apiKey": new_api_key}
 
@@ -167,6 +171,7 @@ async def delete_user_api_key(
         raise HTTPException(status_code=404, detail="User not found")
 
     await UsersDB.update(db_session, user_id, api_key=None)
+    auth_user_cache.invalidate_user_on_commit(db_session, user_id)
     return True
 
 
@@ -206,4 +211,5 @@ async def update_user_locations(
         LOGGER.debug("Creating user location %s for user id: %s", location_id, user_id)
         await UserLocationsDB.create(db_session, user_id=user_id, location_id=location_id)
 
+    auth_user_cache.invalidate_user_on_commit(db_session, user_id)
     return True
@@ -1,6 +1,7 @@
 """Batch service with business logic and transformations"""
 
 from datetime import date, datetime, timedelta
+from typing import Optional
 
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -64,43 +65,10 @@ class BatchService:
             meta = data.get("external_brewing_tool_meta", {})
 
             if tool_type and meta:
-                refresh_data = False
-                refresh_reason = "UNKNOWN"
-                refresh_buffer = CONFIG.get(f"external_brew_tools.{tool_type}.refresh_buffer_sec.soft")
                 now = utcnow_aware()
+                refresh_reason = BatchService.get_refresh_reason(tool_type, meta, batch_id=batch.id, force_refresh=force_refresh, now=now)
 
-                ex_details = meta.get("details", {})
-
-                if not ex_details:
-                    refresh_data = True
-                    refresh_reason = "No cached details exist in DB."
-                elif force_refresh:
-                    refresh_data = True
-                    refresh_reason = "Forced refresh requested via query string parameter."
-                elif ex_details.get("_refresh_on_next_check", False):
-                    refresh_data = True
-                    refresh_reason = ex_details.get("_refresh_reason", "The batch was marked by the external brewing tool for refresh, reason unknown.")
-
-                if not refresh_data:
-                    last_refresh = ex_details.get("_last_refreshed_on")
-                    if last_refresh:
-                        skip_until = parse_iso8601_utc(last_refresh) + timedelta(seconds=refresh_buffer)
-
-                        LOGGER.debug("Checking is last refresh date '%s' > now '%s'", skip_until.isoformat(), now.isoformat())
-                        if skip_until < now:
-                            LOGGER.info(
-                                "Refresh skip buffer exceeded, refreshing data. Tool: %s, batch_id: %s, skip_until: %s",
-                                tool_type,
-                                batch.id,
-                                skip_until.isoformat(),
-                            )
-                            refresh_data = True
-                            refresh_reason = "Refresh skip buffer exceeded"
-                    else:
-                        refresh_data = True
-                        refresh_reason = "No _last_refreshed_on date recorded, refreshing."
-
-                if refresh_data:
+                if refresh_reason:
                     LOGGER.info("Refreshing data from %s for %s. Reason: %s", tool_type, batch.id, refresh_reason)
                     tool = get_external_brewing_tool(tool_type)
                     ex_details = await tool.get_batch_details(batch=batch)
@@ -126,6 +94,41 @@ class BatchService:
 
         return transform_dict_to_camel_case(data)
 
+    @staticmethod
+    def get_refresh_reason(tool_type, meta, batch_id=None, force_refresh=False, now=None) -> Optional[str]:
+        """Why the external brewing tool details of a batch must be refreshed, or None if the cached ones are current"""
+        if not tool_type or not meta:
+            return None
+
+        ex_details = meta.get("details", {})
+
+        if not ex_details:
+            return "No cached details exist in DB."
+        if force_refresh:
+            return "Forced refresh requested via query string parameter."
+        if ex_details.get("_refresh_on_next_check", False):
+            return ex_details.get("_refresh_reason", "The batch was marked by the external brewing tool for refresh, reason unknown.")
+
+        last_refresh = ex_details.get("_last_refreshed_on")
+        if not last_refresh:
+            return "No _last_refreshed_on date recorded, refreshing."
+
+        if now is None:
+            now = utcnow_aware()
+        refresh_buffer = CONFIG.get(f"external_brew_tools.{tool_type}.refresh_buffer_sec.soft")
+        skip_until = parse_iso8601_utc(last_refresh) + timedelta(seconds=refresh_buffer)
+
+        LOGGER.debug("Checking is last refresh date '%s' > now '%s'", skip_until.isoformat(), now.isoformat())
+        if skip_until < now:
+            LOGGER.info(
+                "Refresh skip buffer exceeded, refreshing data. Tool: %s, batch_id: %s, skip_until: %s",
+                tool_type,
+                batch_id,
+                skip_until.isoformat(),
+            )
+            return "Refresh skip buffer exceeded"
+        return None
+
     @staticmethod
     async def can_user_see_batch(user, batch=None, location_ids=None):
         """Check if user has access to batch based on locations"""
@@ -0,0 +1,181 @@
+"""
+Read model of the location dashboard.
+
+`TapService.transform_response` loads the on tap, batch, beer, beverage, tap monitor and image transitions of each tap
+with their own queries, and assembles the response in python.  This builds the same taps with a single statement:
+postgres returns the JSON of every tap with camelCase keys and without null values, and only what postgres does not
+know is added here, the tap monitor capabilities of the monitor type libraries, and the camelCase keys of the free form
+JSON metadata.  Batches whose external brewing tool details are stale are still read and refreshed by BatchService.
+
+Used by the dashboard when `dashboard.read_model.enabled` is set.
+"""
+
+from typing import Dict, List, Optional
+
+from sqlalchemy import Date, DateTime, Float, Table, bindparam, case, cast, extract, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# isort: off
+# fmt: off
+from db.batches import Batches as BatchesDB  # pylint: disable=wrong-import-position
+from db.batch_locations import BatchLocations as BatchLocationsDB
+# isort: on
+# fmt: on
+from db.beers import Beers as BeersDB
+from db.beverages import Beverages as BeveragesDB
+from db.image_transitions import ImageTransitions as ImageTransitionsDB
+from db.on_tap import OnTap as OnTapDB
+from db.tap_monitors import TapMonitors as TapMonitorsDB
+from db.taps import Taps as TapsDB
+from lib import logging
+from lib.tap_monitors import get_tap_monitor_lib
+from services.base import to_camel_case, transform_dict_to_camel_case
+from services.batches import BatchService
+
+LOGGER = logging.getLogger(__name__)
+
+# the free form JSON columns, their keys are camelCased here rather than in SQL
+META_KEYS = {"batch": "externalBrewingToolMeta", "beer": "externalBrewingToolMeta", "beverage": "meta", "tapMonitor": "meta"}
+
+EMPTY_JSON_ARRAY = literal_column("'[]'::json")
+
+
+def _key(name: str):
+    # a literal, postgres can not infer the type of a parameter passed to json_build_object
+    return literal_column(f"'{to_camel_case(name)}'")
+
+
+def _iso_timestamp(column):
+    """A timestamptz formatted like the `isoformat()` of the UTC datetime asyncpg returns for it"""
+    utc = func.timezone(literal_column("'UTC'"), column)
+    return case(
+        (func.date_trunc(literal_column("'second'"), column) == column, func.to_char(utc, literal_column('\'YYYY-MM-DD"T"HH24:MI:SS"+00:00"\''))),
+        else_=func.to_char(utc, literal_column('\'YYYY-MM-DD"T"HH24:MI:SS.US"+00:00"\'')),
+    )
+
+
+def _json_object(table: Table, exclude=(), dates_as_timestamps=False, extra=None):
+    """json_build_object of every column of the table, like `to_dict()`, followed by the `extra` keys and values"""
+    args = []
+    for column in table.columns:
+        if column.name in exclude:
+            continue
+
+        value = column
+        if isinstance(column.type, DateTime) and column.type.timezone:
+            value = _iso_timestamp(column)
+        elif dates_as_timestamps and isinstance(column.type, Date):
+            # BatchService returns the dates as the timestamp of their midnight
+            value = cast(extract("epoch", cast(column, DateTime)), Float)
+        args += [_key(column.name), value]
+
+    for key, value in (extra or {}).items():
+        args += [_key(key), value]
+    return func.json_build_object(*args)
+
+
+def _image_transitions(fkey_column, owner_id):
+    return (
+        select(func.json_agg(aggregate_order_by(_json_object(ImageTransitionsDB.__table__), ImageTransitionsDB.created_on, ImageTransitionsDB.id)))
+        .where(fkey_column == owner_id)
+        .scalar_subquery()
+    )
+
+
+def _taps_statement(where):
+    """The JSON array of the taps matching `where`, each one as TapService returns it for the dashboard"""
+    location_ids = (
+        select(func.coalesce(func.json_agg(aggregate_order_by(BatchLocationsDB.location_id, BatchLocationsDB.location_id)), EMPTY_JSON_ARRAY))
+        .where(BatchLocationsDB.batch_id == BatchesDB.id)
+        .scalar_subquery()
+    )
+    batch = _json_object(BatchesDB.__table__, dates_as_timestamps=True, extra={"location_ids": location_ids, "locations": EMPTY_JSON_ARRAY})
+    beer = _json_object(BeersDB.__table__, extra={"image_transitions": _image_transitions(ImageTransitionsDB.beer_id, BeersDB.id)})
+    beverage = _json_object(BeveragesDB.__table__, extra={"image_transitions": _image_transitions(ImageTransitionsDB.beverage_id, BeveragesDB.id)})
+
+    tap = _json_object(
+        TapsDB.__table__,
+        exclude=("on_tap_id",),
+        extra={
+            "batch": case((BatchesDB.id.isnot(None), batch)),
+            "batch_id": OnTapDB.batch_id,
+            "beer": case((BeersDB.id.isnot(None), beer)),
+            "beer_id": BeersDB.id,
+            "beverage": case((BeveragesDB.id.isnot(None), beverage)),
+            "beverage_id": BeveragesDB.id,
+            "tap_monitor": case((TapMonitorsDB.id.isnot(None), _json_object(TapMonitorsDB.__table__))),
+        },
+    )
+
+    return (
+        select(func.coalesce(func.json_agg(aggregate_order_by(func.json_strip_nulls(tap), TapsDB.tap_number, TapsDB.id)), EMPTY_JSON_ARRAY))
+        .select_from(TapsDB)
+        .outerjoin(OnTapDB, OnTapDB.id == TapsDB.on_tap_id)
+        .outerjoin(BatchesDB, BatchesDB.id == OnTapDB.batch_id)
+        .outerjoin(BeersDB, BeersDB.id == BatchesDB.beer_id)
+        .outerjoin(BeveragesDB, BeveragesDB.id == BatchesDB.beverage_id)
+        .outerjoin(TapMonitorsDB, TapMonitorsDB.id == TapsDB.tap_monitor_id)
+        .where(where)
+    )
+
+
+LOCATION_TAPS = _taps_statement(TapsDB.location_id == bindparam("location_id"))
+TAP = _taps_statement(TapsDB.id == bindparam("tap_id"))
+
+
+def finish_tap(tap: Dict) -> Dict:
+    """Add to a tap built by postgres what only the application knows"""
+    for key, meta_key in META_KEYS.items():
+        obj = tap.get(key)
+        if obj and isinstance(obj.get(meta_key), (dict, list)):
+            obj[meta_key] = transform_dict_to_camel_case(obj[meta_key])
+
+    tap_monitor = tap.get("tapMonitor")
+    if tap_monitor:
+        tap_monitor_lib = get_tap_monitor_lib(tap_monitor.get("monitorType"))
+        if not tap_monitor_lib:
+            LOGGER.warning("Unsupported tap monitor type: %s", tap_monitor.get("monitorType"))
+            del tap["tapMonitor"]
+            tap.pop("tapMonitorId", None)
+        else:
+            tap_monitor["reportsOnlineStatus"] = tap_monitor_lib.reports_online_status()
+
+    return tap
+
+
+class DashboardService:
+    """Service for the dashboard read model"""
+
+    @staticmethod
+    async def refresh_batch(tap: Dict, db_session: AsyncSession):
+        """
+        Replace the batch of the tap by the one BatchService returns when its external brewing tool details are stale,
+        the dashboard refreshes them like every other batch read does
+        """
+        batch = tap.get("batch")
+        if not batch:
+            return
+
+        if BatchService.get_refresh_reason(batch.get("externalBrewingTool"), batch.get("externalBrewingToolMeta"), batch_id=batch["id"]):
+            tap["batch"] = await BatchService.transform_response(
+                await BatchesDB.get_by_pkey(db_session, batch["id"]), db_session=db_session, include_location=False
+            )
+
+    @staticmethod
+    async def finish_taps(taps: List[Dict], db_session: AsyncSession) -> List[Dict]:
+        for tap in taps:
+            await DashboardService.refresh_batch(tap, db_session)
+        return [finish_tap(tap) for tap in taps]
+
+    @staticmethod
+    async def get_location_taps(location_id, db_session: AsyncSession) -> List[Dict]:
+        """The taps of the location, as `TapService.transform_response` returns them for the dashboard"""
+        result = await db_session.execute(LOCATION_TAPS, {"location_id": str(location_id)})
+        return await DashboardService.finish_taps(result.scalar(), db_session)
+
+    @staticmethod
+    async def get_tap(tap_id, db_session: AsyncSession) -> Optional[Dict]:
+        result = await db_session.execute(TAP, {"tap_id": str(tap_id)})
+        taps = await DashboardService.finish_taps(result.scalar(), db_session)
+        return taps[0] if taps else None
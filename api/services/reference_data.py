@@ -0,0 +1,130 @@
+"""
+Reference data cache.
+
+The locations are read on almost every request, to resolve the location slug of the URL and by the dashboard, and
+rarely change.  They are loaded once, at startup or on first use, and served from memory until a location is written
+(`invalidate_locations_on_commit`) or the TTL, which bounds how long a change made by another process goes unnoticed,
+expires.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db import async_session_scope
+from db.locations import Locations as LocationsDB
+from lib import logging
+from lib.config import Config
+
+CONFIG = Config()
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_REFERENCE_DATA_TTL_SEC = 300
+
+
+class LocationSnapshot:
+    """A read only copy of a location row, transformed like the model by `LocationService.transform_response`"""
+
+    __slots__ = ("id", "name", "_data")
+
+    def __init__(self, data: Dict):
+        self.id = data["id"]
+        self.name = data["name"]
+        self._data = data
+
+    def to_dict(self) -> Dict:
+        return dict(self._data)
+
+
+class LocationIndex:
+    """The locations by id and by lowercased name, the same way the `locations_name_lower_ix` index resolves them"""
+
+    def __init__(self, locations: List[LocationSnapshot]):
+        self.locations = locations
+        self.by_id = {str(l.id): l for l in locations}
+        self.ids_by_name = {l.name.lower(): l.id for l in locations if isinstance(l.name, str)}
+
+
+class ReferenceDataCache:
+    """Caches the locations, anything that writes a location must call `invalidate_locations`"""
+
+    def __init__(self, ttl: float = None):
+        if ttl is None:
+            ttl = CONFIG.get("reference_data.ttl_sec", DEFAULT_REFERENCE_DATA_TTL_SEC)
+
+        self.ttl = ttl or 0
+        self._locations: Optional[LocationIndex] = None
+        self._expires_at = 0.0
+        # bumped by every invalidation, so a load that was running at the time does not store what it read
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def load(self, db_session: AsyncSession) -> LocationIndex:
+        generation = self._generation
+        index = LocationIndex([LocationSnapshot(l.to_dict()) for l in await LocationsDB.query(db_session)])
+
+        if self.enabled and generation == self._generation:
+            self._locations = index
+            self._expires_at = time.monotonic() + self.ttl
+        return index
+
+    async def preload(self):
+        """Load the locations at startup, the first request loads them instead if the database can not be reached"""
+        if not self.enabled:
+            return
+
+        try:
+            async with async_session_scope(CONFIG) as db_session:
+                index = await self.load(db_session)
+            LOGGER.info("Loaded %d locations into the reference data cache", len(index.locations))
+        except Exception:
+            LOGGER.warning("Unable to preload the reference data, it will be loaded on first use", exc_info=True)
+
+    async def _get_index(self, db_session: AsyncSession) -> LocationIndex:
+        if self._locations is not None and self._expires_at > time.monotonic():
+            return self._locations
+        return await self.load(db_session)
+
+    async def get_locations(self, db_session: AsyncSession) -> List[LocationSnapshot]:
+        return (await self._get_index(db_session)).locations
+
+    async def get_location(self, location_id, db_session: AsyncSession) -> Optional[LocationSnapshot]:
+        return (await self._get_index(db_session)).by_id.get(str(location_id))
+
+    async def get_location_id(self, name: str, db_session: AsyncSession):
+        """The id of the location named `name`, case insensitively, or None"""
+        if self.enabled:
+            location_id = (await self._get_index(db_session)).ids_by_name.get(name.lower())
+            if location_id is not None:
+                return location_id
+
+        # not cached, it may have been created by another process.  Look it up alone so unknown names do not reload
+        # every location
+        locations = await LocationsDB.query(db_session, q_fn=lambda q: q.where(func.lower(LocationsDB.name) == name.lower()))
+        if not locations:
+            return None
+
+        if self.enabled:
+            self.invalidate_locations()
+        return locations[0].id
+
+    def invalidate_locations(self):
+        self._generation += 1
+        self._locations = None
+        self._expires_at = 0.0
+
+    def invalidate_locations_on_commit(self, db_session: AsyncSession):
+        """Invalidate the locations once the changes made through `db_session` are committed, so a load running before
+        the commit does not keep the rows as they were.  Called after the write, which may have committed already"""
+        if not db_session.sync_session.in_transaction():
+            self.invalidate_locations()
+            return
+        event.listen(db_session.sync_session, "after_commit", lambda _session: self.invalidate_locations(), once=True)
+
+
+reference_data = ReferenceDataCache()
@@ -10,7 +10,7 @@ import subprocess
 import sys
 import threading
 import time
-from typing import Generator
+from typing import Callable, Generator, Sequence
 
 import pytest
 import requests
@@ -21,6 +21,7 @@ API_BASE_URL = "http://localhost:5050/api/v1"
 API_HEALTHZ_URL = f"{API_BASE_URL}/healthz"
 STARTUP_TIMEOUT = 120  # seconds
 HEALTH_CHECK_INTERVAL = 2  # seconds
+QUERY_COUNT_HEADER = "X-DB-Queries"
 
 
 class DockerComposeManager:
@@ -275,6 +276,35 @@ def user_api_client(docker_services: DockerComposeManager) -> requests.Session:
     return session
 
 
+@pytest.fixture
+def assert_constant_queries(api_client: requests.Session):
+    """
+    Fixture asserting an endpoint runs the same number of queries however many rows it returns, which catches N+1
+    queries.  Call it with the endpoint URL and a function adding `n` rows the endpoint returns:
+
+        assert_constant_queries(f"{api_base_url}/beers", lambda n: [create_beer() for _ in range(n)])
+
+    The query count is read from the `X-DB-Queries` header, returned because the test API runs with `ENV=test`.
+    """
+
+    def check(url: str, add_rows: Callable[[int], None], grow_by: Sequence[int] = (2, 5), client: requests.Session = None, **kwargs):
+        client = client or api_client
+
+        def count_queries() -> int:
+            response = client.get(url, **kwargs)
+            assert response.status_code == 200, response.text
+            assert QUERY_COUNT_HEADER in response.headers, f"{QUERY_COUNT_HEADER} header missing, is db.query_budget.headers enabled?"
+            return int(response.headers[QUERY_COUNT_HEADER])
+
+        baseline = count_queries()
+        for rows in grow_by:
+            add_rows(rows)
+            queries = count_queries()
+            assert queries == baseline, f"GET {url} ran {baseline} queries, then {queries} after adding {rows} rows, likely an N+1 query"
+
+    return check
+
+
 @pytest.fixture(scope="session")
 def stream_server_logs(docker_services: DockerComposeManager) -> Generator[None, None, None]:
     """
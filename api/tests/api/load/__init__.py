@@ -0,0 +1,7 @@
+"""
+Load generator for the dockerized API test stack.
+
+Runs scenarios of virtual clients against the API started by `api/tests/api/docker-compose.yml`, with the upstream
+Kegtron and Brewfather APIs replaced by local fake servers, and reports the latency percentiles, throughput and database
+queries of each endpoint.  See the README of this directory.
+"""
@@ -0,0 +1,89 @@
+"""
+Run a load test against the dockerized API test stack, started with the load test override so the API reaches the fake
+upstreams served by this process:
+
+    docker compose -f tests/api/docker-compose.yml -f tests/api/docker-compose.load.yml up -d --wait
+    python -m tests.api.load --duration 60 --kiosks 20 --admins 2 --fanout 1 --save run.json
+    python -m tests.api.load --duration 60 --kiosks 20 --admins 2 --fanout 1 --compare run.json
+
+or `make load-test LOAD_ARGS="..."` from the repository root, which also starts and stops the stack.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+from .fake_upstreams import Latency, UpstreamServer, brewfather_app, kegtron_app
+from .report import Recorder, load_report, print_report, save_report
+from .scenarios import LoadContext, make_client, run_scenarios, set_up, tear_down
+
+API_BASE_URL = "http://localhost:5050/api/v1"
+KEGTRON_PORT = 5060
+BREWFATHER_PORT = 5061
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tests.api.load", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=API_BASE_URL, help="The API base URL")
+    parser.add_argument("--duration", type=float, default=30, help="How long to run the scenarios for, in seconds")
+    parser.add_argument("--interval", type=float, default=1, help="The polling interval and think time of the clients, in seconds")
+    parser.add_argument("--kiosks", type=int, default=10, help="Number of kiosk walls polling the dashboard")
+    parser.add_argument("--admins", type=int, default=2, help="Number of admins browsing the batches")
+    parser.add_argument("--fanout", type=int, default=1, help="Number of clients reading the data of every monitor at once")
+    parser.add_argument("--monitors", type=int, default=8, help="Number of Kegtron monitors, with a tap each, to create")
+    parser.add_argument("--batches", type=int, default=10, help="Number of Brewfather batches to create")
+    parser.add_argument("--kegtron-latency-ms", type=float, default=150, help="Mean latency of the fake Kegtron API")
+    parser.add_argument("--brewfather-latency-ms", type=float, default=300, help="Mean latency of the fake Brewfather API")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Latency jitter of the fake upstreams")
+    parser.add_argument("--kegtron-port", type=int, default=KEGTRON_PORT, help="Port of the fake Kegtron API")
+    parser.add_argument("--brewfather-port", type=int, default=BREWFATHER_PORT, help="Port of the fake Brewfather API")
+    parser.add_argument("--save", help="Save the report as JSON to compare the next runs with")
+    parser.add_argument("--compare", help="A saved report to compare the latencies with")
+    return parser.parse_args(argv)
+
+
+async def run(args) -> dict:
+    clients = {"kiosk": args.kiosks, "admin": args.admins, "monitor_fanout": args.fanout}
+    concurrency = max(10, sum(clients.values()) * max(1, args.monitors))
+
+    async with make_client(args.base_url, concurrency) as client:
+        created = await set_up(client, args.monitors, args.batches)
+        try:
+            recorder = Recorder()
+            ctx = LoadContext(client=client, recorder=recorder, deadline=time.monotonic() + args.duration, **created)
+            await run_scenarios(ctx, clients, args.interval)
+            recorder.finish()
+        finally:
+            await tear_down(client, created)
+
+    params = {k: v for k, v in vars(args).items() if k not in ["save", "compare"]}
+    return recorder.report(params)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    upstreams = [
+        UpstreamServer(kegtron_app(Latency(args.kegtron_latency_ms, args.jitter_ms)), port=args.kegtron_port).start(),
+        UpstreamServer(brewfather_app(Latency(args.brewfather_latency_ms, args.jitter_ms)), port=args.brewfather_port).start(),
+    ]
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        for upstream in upstreams:
+            upstream.stop()
+
+    report["upstream_requests"] = {"kegtron": upstreams[0].counter.counts, "brewfather": upstreams[1].counter.counts}
+    print_report(report, load_report(args.compare) if args.compare else None)
+    print(f"upstream requests: {report['upstream_requests']}")
+
+    if args.save:
+        save_report(report, args.save)
+        print(f"Saved the report to {args.save}")
+
+    if report["total"]["requests"] == 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
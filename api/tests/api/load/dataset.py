@@ -0,0 +1,341 @@
+"""
+Synthetic dataset generator for the performance tests.
+
+The seeds create a handful of rows, too few for an N+1 query or a missing index to show.  This generates a large,
+realistic and deterministic (for a given --seed and --scale) dataset and loads it with COPY.  At --scale 1:
+
+- 300 locations with 10 taps each, most of them with a tap monitor and a batch on tap
+- 2,000 beers and 200 beverages, 40% of the beers linked to Brewfather
+- 30,000 batches, 60% of them with Brewfather meta, spread over the locations
+- a plaato_data row per Plaato keg monitor, and 1,000,000 data_changes rows, mostly the audit of their readings
+
+The rows are added to the database, on top of the seed of the API test stack so the load tests (python -m
+tests.api.load) run against it, and the names carry the seed so datasets of different seeds can be loaded together.
+The audit triggers are disabled while loading, the audit of the readings is generated with the rest.  Run from the api
+directory, the defaults target the postgres of the API test stack:
+
+    python -m tests.api.load.dataset --scale 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Tuple
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+# the postgres of tests/api/docker-compose.yml
+TEST_STACK_DB = {"DB_HOST": "localhost", "DB_PORT": "5433", "DB_NAME": "brewhouse_test", "DB_USERNAME": "brewhouse_test", "DB_PASSWORD": "brewhouse_test"}
+
+APPLICATION_NAME = "brewhouse-manager-dataset"
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+LOCATIONS = 300
+TAPS_PER_LOCATION = 10
+BEERS = 2000
+BEVERAGES = 200
+BATCHES = 30000
+DATA_CHANGES = 1_000_000
+
+MONITORED_TAPS = 0.7
+TAPS_ON = 0.8
+BREWFATHER_BEERS = 0.4
+BREWFATHER_BATCHES = 0.6
+ARCHIVED_BATCHES = 0.6
+READINGS = 0.9
+
+MONITOR_TYPES = [("open-plaato-keg", 0.5), ("kegtron-pro", 0.3), ("keg-volume-monitor-weight", 0.2)]
+BEVERAGE_TYPES = ["cold-brew", "soda", "kombucha"]
+STYLES = [
+    ("American IPA", 6.5, 60, 7),
+    ("Irish Stout", 4.5, 40, 40),
+    ("Munich Helles", 5.0, 20, 4),
+    ("Hefeweizen", 5.2, 12, 5),
+    ("Hazy IPA", 6.8, 45, 5),
+    ("Belgian Tripel", 8.5, 30, 6),
+    ("Porter", 5.8, 35, 30),
+    ("Saison", 6.2, 28, 6),
+]
+BREWFATHER_STATUSES = ["Planning", "Brewing", "Fermenting", "Conditioning", "Completed", "Archived"]
+
+
+@dataclass
+class Table:
+    name: str
+    columns: List[str]
+    rows: Iterable[Tuple] = field(default_factory=list)
+
+
+class DatasetGenerator:
+    """Generates the rows of every table, in the order of their foreign keys"""
+
+    def __init__(self, seed: int = 1, scale: float = 1, data_changes: int = None):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.scale = scale
+        self.data_changes = int(DATA_CHANGES * scale) if data_changes is None else data_changes
+
+        self.location_ids: List[str] = []
+        self.beer_ids: List[str] = []
+        self.beverage_ids: List[str] = []
+        self.batches_by_location: Dict[str, List[str]] = {}
+        self.plaato_devices: List[str] = []
+
+    def count(self, base: int) -> int:
+        return max(1, int(base * self.scale))
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def day(self, max_days_ago: int) -> date:
+        return (EPOCH - timedelta(days=self.rng.randrange(max_days_ago))).date()
+
+    def tables(self) -> List[Table]:
+        # the generators depend on the ids collected by the previous ones, so the tables are built in order
+        locations = self.locations()
+        beers = self.beers()
+        beverages = self.beverages()
+        monitors, taps_plan = self.tap_monitors()
+        plaato_data = self.plaato_data()
+        batches, batch_locations = self.batches()
+        on_tap, taps = self.taps(taps_plan)
+        return [locations, beers, beverages, monitors, plaato_data, batches, batch_locations, on_tap, taps, self.audit()]
+
+    def locations(self) -> Table:
+        rows = []
+        for i in range(self.count(LOCATIONS)):
+            _id = self.uuid()
+            self.location_ids.append(_id)
+            rows.append((_id, f"perf-taproom-{self.seed}-{i:04d}", f"Performance Taproom {i} ({TAPS_PER_LOCATION} taps)"))
+        return Table("locations", ["id", "name", "description"], rows)
+
+    def recipe_details(self, style) -> Dict:
+        name, abv, ibu, srm = style
+        return {
+            "name": f"{name} #{self.rng.randrange(1, 500)}",
+            "abv": round(abv + self.rng.uniform(-0.5, 0.5), 1),
+            "img_url": None,
+            "style": name,
+            "ibu": ibu + self.rng.randrange(-5, 6),
+            "srm": srm,
+            "_last_refreshed_on": (EPOCH - timedelta(minutes=self.rng.randrange(60 * 24 * 30))).isoformat(),
+        }
+
+    def beers(self) -> Table:
+        rows = []
+        for i in range(self.count(BEERS)):
+            _id = self.uuid()
+            self.beer_ids.append(_id)
+            style = self.rng.choice(STYLES)
+            tool, meta = None, None
+            if self.rng.random() < BREWFATHER_BEERS:
+                tool = "brewfather"
+                meta = json.dumps({"recipe_id": self.uuid().replace("-", "")[:30], "details": self.recipe_details(style)})
+            rows.append((_id, f"Perf {style[0]} {self.seed}-{i}", "Brewhouse", style[0], style[1], style[2], style[3], tool, meta, False))
+        return Table(
+            "beers",
+            ["id", "name", "brewery", "style", "abv", "ibu", "srm", "external_brewing_tool", "external_brewing_tool_meta", "image_transitions_enabled"],
+            rows,
+        )
+
+    def beverages(self) -> Table:
+        rows = []
+        for i in range(self.count(BEVERAGES)):
+            _id = self.uuid()
+            self.beverage_ids.append(_id)
+            _type = self.rng.choice(BEVERAGE_TYPES)
+            rows.append(
+                (_id, f"Perf {_type.title()} {self.seed}-{i}", "Brewhouse", _type, json.dumps({"roast": "medium"} if _type == "cold-brew" else {}), False)
+            )
+        return Table("beverages", ["id", "name", "brewery", "type", "meta", "image_transitions_enabled"], rows)
+
+    def monitor_type(self) -> str:
+        pick = self.rng.random()
+        for monitor_type, share in MONITOR_TYPES:
+            if pick < share:
+                return monitor_type
+            pick -= share
+        return MONITOR_TYPES[-1][0]
+
+    def tap_monitors(self) -> Tuple[Table, List[Tuple[str, int, str]]]:
+        """The tap monitors, and the plan of the taps as (location_id, tap_number, tap_monitor_id)"""
+        rows, taps_plan = [], []
+        for location_id in self.location_ids:
+            for tap_number in range(1, TAPS_PER_LOCATION + 1):
+                monitor_id = None
+                if self.rng.random() < MONITORED_TAPS:
+                    monitor_id = self.uuid()
+                    monitor_type = self.monitor_type()
+                    device_id = f"perf-{monitor_id}"
+                    if monitor_type == "open-plaato-keg":
+                        self.plaato_devices.append(device_id)
+                        meta = {
+                            "device_id": device_id,
+                            "empty_keg_weight": 4400,
+                            "empty_keg_weight_unit": "g",
+                            "max_keg_volume": 5,
+                            "max_keg_volume_unit": "gal",
+                        }
+                    elif monitor_type == "kegtron-pro":
+                        meta = {"device_id": device_id, "port_num": (tap_number - 1) % 4, "access_token": f"token-{device_id}"}
+                    else:
+                        meta = {"device_id": device_id}
+                    rows.append((monitor_id, f"Monitor {tap_number}", location_id, monitor_type, json.dumps(meta)))
+                taps_plan.append((location_id, tap_number, monitor_id))
+        return Table("tap_monitors", ["id", "name", "location_id", "monitor_type", "meta"], rows), taps_plan
+
+    def plaato_reading(self, device_id: str) -> Dict[str, str]:
+        left = self.rng.uniform(0, 100)
+        return {
+            "id": device_id,
+            "percent_of_beer_left": f"{left:.1f}",
+            "is_pouring": self.rng.choice(["0", "0", "0", "1"]),
+            "amount_left": f"{left * 0.19:.2f}",
+            "keg_temperature": f"{self.rng.uniform(2, 6):.2f}",
+            "last_pour": f"{self.rng.uniform(0.2, 0.6):.2f}",
+            "empty_keg_weight": "4.4",
+            "max_keg_volume": "19.0",
+            "beer_left_unit": "kg",
+            "volume_unit": "L",
+            "temperature_unit": "°C",
+            "wifi_signal_strength": str(self.rng.randrange(-80, -40)),
+            "firmware_version": "2.1.0",
+        }
+
+    def plaato_data(self) -> Table:
+        columns = list(self.plaato_reading("").keys()) + ["last_updated_on"]
+        rows = []
+        for device_id in self.plaato_devices:
+            reading = self.plaato_reading(device_id)
+            rows.append(tuple(reading.values()) + (EPOCH - timedelta(seconds=self.rng.randrange(3600)),))
+        return Table("plaato_data", columns, rows)
+
+    def batches(self) -> Tuple[Table, Table]:
+        rows, location_rows = [], []
+        for i in range(self.count(BATCHES)):
+            _id = self.uuid()
+            is_beer = self.rng.random() < 0.9
+            beer_id = self.rng.choice(self.beer_ids) if is_beer else None
+            beverage_id = None if is_beer else self.rng.choice(self.beverage_ids)
+            style = self.rng.choice(STYLES)
+            brew_date = self.day(5 * 365)
+            keg_date = brew_date + timedelta(days=self.rng.randrange(14, 40))
+            archived_on = keg_date + timedelta(days=self.rng.randrange(30, 120)) if self.rng.random() < ARCHIVED_BATCHES else None
+
+            tool, meta = None, None
+            if is_beer and self.rng.random() < BREWFATHER_BATCHES:
+                tool = "brewfather"
+                details = self.recipe_details(style)
+                details.update(
+                    {
+                        "status": "Archived" if archived_on else self.rng.choice(BREWFATHER_STATUSES),
+                        "brew_date": int(datetime.combine(brew_date, datetime.min.time()).timestamp() * 1000),
+                        "keg_date": int(datetime.combine(keg_date, datetime.min.time()).timestamp() * 1000),
+                        "batch_number": str(i),
+                    }
+                )
+                meta = json.dumps({"batch_id": self.uuid().replace("-", "")[:30], "details": details})
+
+            rows.append((_id, f"Batch {i}", str(i), beer_id, beverage_id, tool, meta, style[1], style[2], style[3], brew_date, keg_date, archived_on))
+
+            batch_locations = [self.rng.choice(self.location_ids)]
+            if self.rng.random() < 0.1:
+                batch_locations.append(self.rng.choice(self.location_ids))
+            for location_id in set(batch_locations):
+                location_rows.append((self.uuid(), _id, location_id))
+                if not archived_on:
+                    self.batches_by_location.setdefault(location_id, []).append(_id)
+
+        columns = ["id", "name", "batch_number", "beer_id", "beverage_id", "external_brewing_tool", "external_brewing_tool_meta"]
+        columns += ["abv", "ibu", "srm", "brew_date", "keg_date", "archived_on"]
+        return Table("batches", columns, rows), Table("batch_locations", ["id", "batch_id", "location_id"], location_rows)
+
+    def taps(self, taps_plan) -> Tuple[Table, Table]:
+        on_tap_rows, tap_rows = [], []
+        for location_id, tap_number, monitor_id in taps_plan:
+            on_tap_id = None
+            batches = self.batches_by_location.get(location_id)
+            if batches and self.rng.random() < TAPS_ON:
+                on_tap_id = self.uuid()
+                on_tap_rows.append((on_tap_id, self.rng.choice(batches), self.day(90)))
+            tap_rows.append((self.uuid(), tap_number, f"Tap {tap_number}", location_id, monitor_id, on_tap_id))
+        on_tap = Table("on_tap", ["id", "batch_id", "tapped_on"], on_tap_rows)
+        taps = Table("taps", ["id", "tap_number", "description", "location_id", "tap_monitor_id", "on_tap_id"], tap_rows)
+        return on_tap, taps
+
+    def audit(self) -> Table:
+        """The data_changes rows, mostly the updates of the Plaato readings, generated while they are copied"""
+
+        def rows():
+            devices = self.plaato_devices or ["perf-none"]
+            previous = {device_id: self.plaato_reading(device_id) for device_id in devices}
+            for i in range(self.data_changes):
+                created_on = EPOCH - timedelta(seconds=self.data_changes - i)
+                if self.rng.random() < READINGS:
+                    device_id = devices[i % len(devices)]
+                    old, new = previous[device_id], self.plaato_reading(device_id)
+                    previous[device_id] = new
+                    yield (self.uuid(), "public", "plaato_data", "UPDATE", json.dumps(new), json.dumps(old), created_on, created_on)
+                else:
+                    row = {"id": self.uuid(), "tap_number": self.rng.randrange(1, TAPS_PER_LOCATION + 1), "on_tap_id": self.uuid()}
+                    yield (self.uuid(), "public", "taps", "UPDATE", json.dumps(row), json.dumps({**row, "on_tap_id": None}), created_on, created_on)
+
+        return Table("data_changes", ["id", "schema", "table_name", "operation", "new", "old", "created_on", "updated_on"], rows())
+
+
+async def load(conn, tables: List[Table]) -> Dict[str, int]:
+    """COPY the tables in a transaction, with their audit triggers disabled"""
+    counts = {}
+    async with conn.transaction():
+        for table in tables:
+            start = time.monotonic()
+            await conn.execute(f"ALTER TABLE {table.name} DISABLE TRIGGER USER")
+            status = await conn.copy_records_to_table(table.name, records=table.rows, columns=table.columns)
+            await conn.execute(f"ALTER TABLE {table.name} ENABLE TRIGGER USER")
+            counts[table.name] = int(status.split()[-1])
+            print(f"{table.name:<16} {counts[table.name]:>10,} rows in {time.monotonic() - start:6.1f}s")
+
+    for table in tables:
+        await conn.execute(f"ANALYZE {table.name}")
+    return counts
+
+
+async def main(args):
+    for key, val in TEST_STACK_DB.items():
+        os.environ.setdefault(key, val)
+    os.environ.setdefault("CONFIG_BASE_DIR", os.path.join(os.path.dirname(API_DIR), "config"))
+
+    # pylint: disable=import-outside-toplevel
+    from db import connect_asyncpg
+    from lib.config import Config
+
+    config = Config()
+    config.setup(config_files=["default.json"])
+
+    conn = await connect_asyncpg(config)
+    try:
+        await conn.execute(f"SET application_name TO '{APPLICATION_NAME}'")
+        start = time.monotonic()
+        generator = DatasetGenerator(seed=args.seed, scale=args.scale, data_changes=args.data_changes)
+        counts = await load(conn, generator.tables())
+        print(f"Loaded {sum(counts.values()):,} rows in {time.monotonic() - start:.1f}s")
+    finally:
+        await conn.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tests.api.load.dataset", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1, help="Multiplies the number of rows of every table")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the generator, the same seed and scale give the same dataset")
+    parser.add_argument("--data-changes", type=int, help=f"Number of data_changes rows, {DATA_CHANGES:,} times the scale by default")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
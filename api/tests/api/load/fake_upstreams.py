@@ -0,0 +1,158 @@
+"""
+Fake Kegtron (mdash.net) and Brewfather APIs for the load tests.
+
+Each fake answers the requests the API makes with canned data after a configurable latency, so the time the API spends
+waiting on its upstreams is part of the load test without depending on, or hammering, the real services.  The API is
+pointed to them through `tap_monitors.kegtron.pro.api_url` and `external_brew_tools.brewfather.api_url`.
+"""
+
+import asyncio
+import copy
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+KEGTRON_SAMPLE = os.path.join(os.path.dirname(__file__), "..", "..", "_resources", "kegtron_pro_sample.json")
+
+
+@dataclass
+class Latency:
+    """The time a fake takes to answer: `mean_ms` give or take up to `jitter_ms`"""
+
+    mean_ms: float = 0
+    jitter_ms: float = 0
+
+    async def wait(self):
+        delay = max(0.0, self.mean_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class RequestCounter:
+    """The requests a fake received, by route"""
+
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, route: str):
+        self.counts[route] = self.counts.get(route, 0) + 1
+
+
+def kegtron_app(latency: Latency, counter: RequestCounter = None) -> Starlette:
+    """The mdash.net device API: every access token is a device, reporting the shadow of the sample device"""
+    counter = counter or RequestCounter()
+    with open(KEGTRON_SAMPLE, encoding="utf-8") as f:
+        sample = json.load(f)
+
+    def device(access_token: str) -> Dict:
+        data = copy.deepcopy(sample)
+        data["id"] = access_token
+        return data
+
+    async def get_device(request: Request):
+        counter.add("GET /api/v2/m/device")
+        await latency.wait()
+        return JSONResponse(device(request.query_params.get("access_token", "unknown")))
+
+    async def update_device(request: Request):
+        counter.add("POST /api/v2/m/device")
+        await latency.wait()
+        return JSONResponse({})
+
+    async def customer(request: Request):
+        counter.add("GET /customer")
+        await latency.wait()
+        return JSONResponse({"pubkeys": {}})
+
+    routes = [
+        Route("/api/v2/m/device", get_device, methods=["GET"]),
+        Route("/api/v2/m/device/{path:path}", update_device, methods=["POST"]),
+        Route("/api/v2/m/device", update_device, methods=["POST"]),
+        Route("/customer", customer, methods=["GET"]),
+    ]
+    app = Starlette(routes=routes)
+    app.state.counter = counter
+    return app
+
+
+def brewfather_batch(batch_id: str) -> Dict:
+    """A Brewfather batch, the ones numbered odd are still fermenting so the API refreshes them on every read"""
+    number = int("".join(c for c in batch_id if c.isdigit()) or 0)
+    return {
+        "_id": batch_id,
+        "batchNo": number,
+        "status": "Fermenting" if number % 2 else "Completed",
+        "measuredAbv": 6.2,
+        "estimatedIbu": 55,
+        "estimatedColor": 7.5,
+        "brewDate": 1767225600000,
+        "bottlingDate": 1768435200000,
+        "recipe": {"name": f"Load Test Recipe {number}", "img_url": None, "style": {"name": "American IPA", "type": "Ale"}},
+    }
+
+
+def brewfather_app(latency: Latency, counter: RequestCounter = None) -> Starlette:
+    """The Brewfather v2 API, every batch id exists"""
+    counter = counter or RequestCounter()
+
+    async def get_batch(request: Request):
+        counter.add("GET /v2/batches/{batch_id}")
+        await latency.wait()
+        return JSONResponse(brewfather_batch(request.path_params["batch_id"]))
+
+    async def list_batches(request: Request):
+        counter.add("GET /v2/batches")
+        await latency.wait()
+        return JSONResponse([brewfather_batch(f"load-batch-{i}") for i in range(10)])
+
+    async def get_recipe(request: Request):
+        counter.add("GET /v2/recipes/{recipe_id}")
+        await latency.wait()
+        return JSONResponse({"name": "Load Test Recipe", "abv": 6.2, "ibu": 55, "color": 7.5, "style": {"name": "American IPA"}})
+
+    routes = [
+        Route("/v2/batches", list_batches, methods=["GET"]),
+        Route("/v2/batches/{batch_id}", get_batch, methods=["GET"]),
+        Route("/v2/recipes/{recipe_id}", get_recipe, methods=["GET"]),
+    ]
+    app = Starlette(routes=routes)
+    app.state.counter = counter
+    return app
+
+
+class UpstreamServer:
+    """Serves a fake in a background thread, with its own event loop so it is not slowed down by the load generator"""
+
+    def __init__(self, app: Starlette, host: str = "0.0.0.0", port: int = 0):
+        self.app = app
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", access_log=False))
+        self._thread = None
+
+    @property
+    def counter(self) -> RequestCounter:
+        return self.app.state.counter
+
+    def start(self, timeout: float = 10):
+        self._thread = threading.Thread(target=self.server.run, name="fake-upstream", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"The fake upstream did not start on port {self.server.config.port}")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=10)
@@ -0,0 +1,120 @@
+"""Latency, throughput and query count statistics of a load test run, and their comparison with a previous run"""
+
+import json
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+QUERY_COUNT_HEADER = "X-DB-Queries"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class EndpointStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, duration_sec: float) -> Dict:
+        latencies = sorted(self.latencies_ms)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "rps": len(latencies) / duration_sec if duration_sec else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": latencies[-1] if latencies else 0.0,
+            "queries_per_request": sum(self.queries) / len(self.queries) if self.queries else None,
+        }
+
+
+class Recorder:
+    """Collects the outcome of every request, keyed by the route template so ids do not split the statistics"""
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+
+    def record(self, endpoint: str, latency_ms: float, status_code: int, headers=None):
+        stats = self.endpoints.setdefault(endpoint, EndpointStats())
+        if status_code >= 400:
+            stats.errors += 1
+        stats.latencies_ms.append(latency_ms)
+        queries = (headers or {}).get(QUERY_COUNT_HEADER)
+        if queries is not None:
+            stats.queries.append(int(queries))
+
+    def record_error(self, endpoint: str):
+        """A request that did not get a response"""
+        self.endpoints.setdefault(endpoint, EndpointStats()).errors += 1
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    @property
+    def duration_sec(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def report(self, params: Dict = None) -> Dict:
+        total = EndpointStats()
+        for stats in self.endpoints.values():
+            total.latencies_ms.extend(stats.latencies_ms)
+            total.queries.extend(stats.queries)
+            total.errors += stats.errors
+
+        return {
+            "params": params or {},
+            "duration_sec": self.duration_sec,
+            "total": total.summary(self.duration_sec),
+            "endpoints": {name: stats.summary(self.duration_sec) for name, stats in sorted(self.endpoints.items())},
+        }
+
+
+def _fmt_queries(val) -> str:
+    return "-" if val is None else f"{val:.1f}"
+
+
+def _fmt_change(current: float, previous: Optional[float]) -> str:
+    if not previous:
+        return ""
+    return f" ({current / previous - 1:+.0%})"
+
+
+def print_report(report: Dict, previous: Dict = None):
+    """Print the statistics of each endpoint, with the change of the latencies against a previous run"""
+    previous_endpoints = (previous or {}).get("endpoints", {})
+    header = f"{'endpoint':<48} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>14} {'p95 ms':>14} {'p99 ms':>14} {'queries':>8}"
+    print(header)
+    print("-" * len(header))
+
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for name, stats in rows:
+        prev = previous_endpoints.get(name, {}) if name != "TOTAL" else (previous or {}).get("total", {})
+        p50 = f"{stats['p50_ms']:.1f}{_fmt_change(stats['p50_ms'], prev.get('p50_ms'))}"
+        p95 = f"{stats['p95_ms']:.1f}{_fmt_change(stats['p95_ms'], prev.get('p95_ms'))}"
+        p99 = f"{stats['p99_ms']:.1f}{_fmt_change(stats['p99_ms'], prev.get('p99_ms'))}"
+        print(
+            f"{name:<48} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8.1f} {p50:>14} {p95:>14} {p99:>14} "
+            f"{_fmt_queries(stats['queries_per_request']):>8}"
+        )
+
+
+def save_report(report: Dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_report(path: str) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
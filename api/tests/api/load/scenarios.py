@@ -0,0 +1,141 @@
+"""
+The load test scenarios, each run by a number of concurrent virtual clients until the end of the run.
+
+- kiosk: a dashboard wall polling its location and the data of the monitors of its taps, like the UI does
+- admin: an admin browsing the batches and beers, with think time between the pages
+- monitor_fanout: reads of the data of every Kegtron monitor at once, each one a request to the fake upstream
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from ..seed_data import BEER_IPA_ID, LOCATION_MAIN_ID
+from .report import Recorder
+
+ADMIN_API_KEY = "test-admin-api-key-12345"  # From seed_data.py
+FIRST_TAP_NUMBER = 200
+KEGTRON_PORTS = 4
+
+
+@dataclass
+class LoadContext:
+    client: httpx.AsyncClient
+    recorder: Recorder
+    deadline: float
+    monitor_ids: List[str] = field(default_factory=list)
+    tap_ids: List[str] = field(default_factory=list)
+    batch_ids: List[str] = field(default_factory=list)
+
+    @property
+    def running(self) -> bool:
+        return time.monotonic() < self.deadline
+
+    async def request(self, method: str, endpoint: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        """Send a request and record it under `endpoint`, None when it did not get a response"""
+        start = time.perf_counter()
+        try:
+            resp = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record_error(endpoint)
+            return None
+        self.recorder.record(endpoint, (time.perf_counter() - start) * 1000, resp.status_code, resp.headers)
+        return resp
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(min(seconds, max(0.0, self.deadline - time.monotonic())))
+
+
+def make_client(base_url: str, concurrency: int) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(base_url=base_url, headers={"X-API-Key": ADMIN_API_KEY}, limits=limits, timeout=30)
+
+
+async def set_up(client: httpx.AsyncClient, monitors: int, batches: int) -> Dict[str, List[str]]:
+    """Create the Kegtron monitors, their taps and the Brewfather batches the scenarios use"""
+    created = {"monitor_ids": [], "tap_ids": [], "batch_ids": []}
+    for i in range(monitors):
+        device = i // KEGTRON_PORTS
+        monitor = {
+            "name": f"Load Test Kegtron {device}-p{i % KEGTRON_PORTS}",
+            "monitorType": "kegtron-pro",
+            "locationId": LOCATION_MAIN_ID,
+            "meta": {"portNum": i % KEGTRON_PORTS, "deviceId": f"load-device-{device}", "accessToken": f"load-token-{device}"},
+        }
+        resp = await client.post("/tap_monitors", json=monitor)
+        resp.raise_for_status()
+        created["monitor_ids"].append(resp.json()["id"])
+
+        tap = {"tapNumber": FIRST_TAP_NUMBER + i, "description": f"Load Test Tap {i}", "locationId": LOCATION_MAIN_ID, "tapMonitorId": resp.json()["id"]}
+        resp = await client.post("/taps", json=tap)
+        resp.raise_for_status()
+        created["tap_ids"].append(resp.json()["id"])
+
+    for i in range(batches):
+        batch = {
+            "beerId": BEER_IPA_ID,
+            "externalBrewingTool": "brewfather",
+            "externalBrewingToolMeta": {"batchId": f"load-batch-{i}"},
+            "locationIds": [LOCATION_MAIN_ID],
+        }
+        resp = await client.post("/batches", json=batch)
+        resp.raise_for_status()
+        created["batch_ids"].append(resp.json()["id"])
+
+    return created
+
+
+async def tear_down(client: httpx.AsyncClient, created: Dict[str, List[str]]):
+    """Delete what `set_up` created, the taps first as they reference the monitors"""
+    for path, key in [("/taps", "tap_ids"), ("/tap_monitors", "monitor_ids"), ("/batches", "batch_ids")]:
+        for _id in created.get(key, []):
+            await client.delete(f"{path}/{_id}")
+
+
+async def kiosk(ctx: LoadContext, interval: float):
+    while ctx.running:
+        resp = await ctx.request("GET", "GET /dashboard/locations/{location}", f"/dashboard/locations/{LOCATION_MAIN_ID}")
+        if resp is not None and resp.status_code == 200:
+            monitor_ids = [tap["tapMonitorId"] for tap in resp.json().get("taps", []) if tap.get("tapMonitorId")]
+            await asyncio.gather(*[ctx.request("GET", "GET /tap_monitors/{id}/data", f"/tap_monitors/{monitor_id}/data") for monitor_id in monitor_ids])
+        await ctx.sleep(interval)
+
+
+async def admin(ctx: LoadContext, interval: float):
+    while ctx.running:
+        resp = await ctx.request("GET", "GET /batches", "/batches")
+        batches = resp.json() if resp is not None and resp.status_code == 200 else []
+        await ctx.sleep(interval)
+
+        if batches:
+            batch = random.choice(batches)
+            await ctx.request("GET", "GET /batches/{id}", f"/batches/{batch['id']}")
+            await ctx.sleep(interval)
+
+        await ctx.request("GET", "GET /beers", "/beers")
+        await ctx.request("GET", "GET /beers/{id}", f"/beers/{BEER_IPA_ID}")
+        await ctx.sleep(interval)
+
+
+async def monitor_fanout(ctx: LoadContext, interval: float):
+    while ctx.running:
+        await asyncio.gather(*[ctx.request("GET", "GET /tap_monitors/{id}/data", f"/tap_monitors/{_id}/data") for _id in ctx.monitor_ids])
+        await ctx.sleep(interval)
+
+
+SCENARIOS: Dict[str, Callable] = {"kiosk": kiosk, "admin": admin, "monitor_fanout": monitor_fanout}
+
+
+async def run_scenarios(ctx: LoadContext, clients: Dict[str, int], interval: float):
+    """Run the virtual clients of every scenario, their start is spread over the first interval so they do not run in step"""
+
+    async def start(scenario, delay):
+        await asyncio.sleep(delay)
+        await scenario(ctx, interval)
+
+    tasks = [start(SCENARIOS[name], random.uniform(0, interval)) for name, count in clients.items() for _ in range(count)]
+    await asyncio.gather(*tasks)
@@ -68,6 +68,20 @@ class TestGetBeerById:
         assert response.status_code == 404
 
 
+class TestBeersQueryCount:
+    """Tests for the number of queries run by the beers endpoints."""
+
+    def test_list_queries_do_not_grow_with_beers(self, api_client: requests.Session, api_base_url: str, assert_constant_queries):
+        """Test listing the beers runs the same queries however many beers there are."""
+
+        def add_beers(count):
+            for i in range(count):
+                response = api_client.post(f"{api_base_url}/beers", json={"name": f"Query Count Beer {i}"})
+                assert response.status_code == 201
+
+        assert_constant_queries(f"{api_base_url}/beers", add_beers)
+
+
 class TestCreateBeer:
     """Tests for POST /beers endpoint."""
 
@@ -0,0 +1,193 @@
+"""
+Functional tests for the dashboard read model.
+
+Checks the taps built by postgres with a single JSON query are the same as the taps `TapService` builds from the
+models, for every location of the seeded database plus a Brewfather batch and beer, with free form metadata, and image
+transitions added for the test and rolled back after it.  Connects to the postgres of the functional test stack.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import date
+
+import pytest
+
+pytestmark = pytest.mark.functional
+
+from .load.dataset import TEST_STACK_DB
+from .seed_data import LOCATIONS, TAP_1_ID
+
+# api/tests/api/test_dashboard_read_model.py -> project root
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# the tap monitor types the API of the functional test stack enables
+ENABLED_TAP_MONITORS = [
+    "TAP_MONITORS_PLAATO_KEG_ENABLED",
+    "TAP_MONITORS_OPEN_PLAATO_KEG_ENABLED",
+    "TAP_MONITORS_KEG_VOLUME_MONITORS_ENABLED",
+    "TAP_MONITORS_KEG_VOLUME_MONITORS_WEIGHT_ENABLED",
+    "TAP_MONITORS_KEGTRON_PRO_ENABLED",
+]
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def normalize(taps):
+    """The order of the taps and of their locations and image transitions is not part of the response contract"""
+    taps = sorted(taps, key=lambda t: t["id"])
+    for tap in taps:
+        batch = tap.get("batch") or {}
+        if "locationIds" in batch:
+            batch["locationIds"] = sorted(batch["locationIds"])
+        for key in ("beer", "beverage"):
+            obj = tap.get(key) or {}
+            if "imageTransitions" in obj:
+                obj["imageTransitions"] = sorted(obj["imageTransitions"], key=lambda it: it["id"])
+    return taps
+
+
+@pytest.fixture(scope="module")
+def config(docker_services):
+    for key, val in TEST_STACK_DB.items():
+        os.environ.setdefault(key, val)
+    for key in ENABLED_TAP_MONITORS:
+        os.environ.setdefault(key, "true")
+    os.environ.setdefault("CONFIG_BASE_DIR", os.path.join(_PROJECT_ROOT, "config"))
+
+    # pylint: disable=import-outside-toplevel
+    from lib.config import Config
+
+    config = Config()
+    config.setup(config_files=["default.json"])
+    return config
+
+
+@pytest.fixture
+def utc_timezone():
+    """BatchService converts the batch dates to timestamps in the local timezone, the API container runs in UTC"""
+    tz = os.environ.get("TZ")
+    os.environ["TZ"] = "UTC"
+    time.tzset()
+    yield
+    if tz is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = tz
+    time.tzset()
+
+
+@pytest.fixture
+def db_session(config, utc_timezone):
+    # pylint: disable=import-outside-toplevel
+    from db import create_async_session
+
+    session = run_async(create_async_session(config))
+    yield session
+    run_async(session.rollback())
+    run_async(session.close())
+
+
+async def add_brewfather_batch(db_session):
+    """Put a Brewfather batch, with fresh details so it is not refreshed, of a beer with image transitions on tap 1"""
+    # pylint: disable=import-outside-toplevel
+    from db.batch_locations import BatchLocations as BatchLocationsDB
+    from db.batches import Batches as BatchesDB
+    from db.beers import Beers as BeersDB
+    from db.image_transitions import ImageTransitions as ImageTransitionsDB
+    from db.on_tap import OnTap as OnTapDB
+    from db.taps import Taps as TapsDB
+    from lib.time import utcnow_aware
+
+    details = {"_last_refreshed_on": utcnow_aware().isoformat(), "batch_number": 42, "fermentation_steps": [{"step_temp": 19.5, "notes": None}]}
+    beer = BeersDB(
+        id=str(uuid.uuid4()),
+        name="Read Model Pale Ale",
+        external_brewing_tool="brewfather",
+        external_brewing_tool_meta={"recipe_id": "read-model-recipe", "details": {"style_name": "Pale Ale", "og": None}},
+        image_transitions_enabled=True,
+    )
+    batch = BatchesDB(
+        id=str(uuid.uuid4()),
+        name="Read Model Batch",
+        beer_id=beer.id,
+        external_brewing_tool="brewfather",
+        external_brewing_tool_meta={"batch_id": "read-model-batch", "details": details},
+        brew_date=date(2026, 3, 1),
+        keg_date=date(2026, 3, 21),
+    )
+    on_tap = OnTapDB(id=str(uuid.uuid4()), batch_id=batch.id, tapped_on=date(2026, 3, 22))
+    db_session.add_all([beer, batch, on_tap])
+    await db_session.flush()
+
+    db_session.add_all(
+        [BatchLocationsDB(batch_id=batch.id, location_id=location["id"]) for location in LOCATIONS[:2]]
+        + [ImageTransitionsDB(beer_id=beer.id, img_url=f"https://example.com/{percent}.png", change_percent=percent) for percent in (25, 50)]
+    )
+    tap = await TapsDB.get_by_pkey(db_session, TAP_1_ID)
+    tap.on_tap_id = on_tap.id
+    await db_session.flush()
+    db_session.expire_all()
+
+
+async def get_model_taps(location_id, db_session):
+    # pylint: disable=import-outside-toplevel
+    from db.taps import Taps as TapsDB
+    from lib import json
+    from services.taps import TapService
+
+    taps = await TapsDB.query(db_session, locations=[location_id])
+    return json.loads(
+        json.dumps_bytes(
+            [await TapService.transform_response(t, db_session=db_session, include_location=False, filter_unsupported_tap_monitor=True) for t in taps]
+        )
+    )
+
+
+async def get_read_model_taps(location_id, db_session):
+    # pylint: disable=import-outside-toplevel
+    from lib import json
+    from services.dashboard import DashboardService
+
+    return json.loads(json.dumps_bytes(await DashboardService.get_location_taps(location_id, db_session)))
+
+
+class TestDashboardReadModel:
+    """Tests the read model builds the same taps as TapService."""
+
+    @pytest.mark.parametrize("location", LOCATIONS, ids=[l["name"] for l in LOCATIONS])
+    def test_seeded_location_taps(self, db_session, location):
+        """Test the taps of every seeded location are the same with the read model."""
+        expected = run_async(get_model_taps(location["id"], db_session))
+        actual = run_async(get_read_model_taps(location["id"], db_session))
+
+        assert normalize(actual) == normalize(expected)
+
+    def test_brewfather_batch_with_metadata(self, db_session):
+        """Test a batch and beer with free form metadata, locations and image transitions are the same with the read model."""
+        run_async(add_brewfather_batch(db_session))
+        location_id = LOCATIONS[0]["id"]
+
+        expected = run_async(get_model_taps(location_id, db_session))
+        actual = run_async(get_read_model_taps(location_id, db_session))
+
+        tap = next(t for t in actual if t["id"] == TAP_1_ID)
+        assert tap["batch"]["externalBrewingToolMeta"]["details"]["fermentationSteps"] == [{"stepTemp": 19.5}]
+        assert len(tap["beer"]["imageTransitions"]) == 2
+        assert normalize(actual) == normalize(expected)
+
+    def test_single_tap(self, db_session):
+        """Test a single tap is the same as the one of the location taps."""
+        # pylint: disable=import-outside-toplevel
+        from services.dashboard import DashboardService
+
+        location_id = LOCATIONS[0]["id"]
+        taps = run_async(get_read_model_taps(location_id, db_session))
+        tap = run_async(DashboardService.get_tap(taps[0]["id"], db_session))
+
+        assert tap == taps[0]
+        assert run_async(DashboardService.get_tap(str(uuid.uuid4()), db_session)) is None
@@ -0,0 +1,213 @@
+"""
+Micro-benchmark suite for the hot functions of the API.
+
+Times each benchmark with `timeit`, the best of a few rounds, and compares the results with a baseline stored in JSON.
+A benchmark slower than its baseline by more than the threshold is flagged as a regression and the run exits non-zero,
+so a change can be measured by saving a baseline before it and running the suite after:
+
+    python api/tests/benchmarks/suite.py --save        # or: make bench-baseline
+    python api/tests/benchmarks/suite.py               # or: make bench
+
+The baseline is only comparable on the machine it was recorded on, so it is not committed.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+from db import *  # noqa: E402,F401,F403  pylint: disable=wrong-import-position,wildcard-import,unused-wildcard-import
+from db.beers import Beers  # noqa: E402  pylint: disable=wrong-import-position
+from db.types.nested import NestedMutableDict  # noqa: E402  pylint: disable=wrong-import-position
+from lib import units  # noqa: E402  pylint: disable=wrong-import-position
+from lib.devices.plaato_keg import blynk_protocol, plaato_data, plaato_protocol  # noqa: E402  pylint: disable=wrong-import-position
+from lib.devices.plaato_keg.blynk_protocol import BlynkCommand  # noqa: E402  pylint: disable=wrong-import-position
+from lib.devices.plaato_keg.data_processor import DataProcessor  # noqa: E402  pylint: disable=wrong-import-position
+from lib.devices.plaato_keg.plaato_protocol import PlaatoPin  # noqa: E402  pylint: disable=wrong-import-position
+from lib.json import dumps_bytes  # noqa: E402  pylint: disable=wrong-import-position
+from lib.tap_monitors.kegtron import KegtronPro  # noqa: E402  pylint: disable=wrong-import-position
+from services.base import transform_dict_to_camel_case  # noqa: E402  pylint: disable=wrong-import-position
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+KEGTRON_SAMPLE = os.path.join(BENCHMARK_DIR, "..", "_resources", "kegtron_pro_sample.json")
+
+DEFAULT_THRESHOLD = 0.25
+ROUNDS = 7
+
+# the pins of a realistic keg report, sent after its id frame
+PIN_VALUES = {
+    PlaatoPin.PERCENT_BEER_LEFT: "72.5",
+    PlaatoPin.IS_POURING: "0",
+    PlaatoPin.AMOUNT_LEFT: "13.41",
+    PlaatoPin.TEMPERATURE: "4.31",
+    PlaatoPin.LAST_POUR: "0.47",
+    PlaatoPin.EMPTY_KEG_WEIGHT: "4.2",
+    PlaatoPin.TEMPERATURE_STR: "4.31°C",
+    PlaatoPin.UNIT: "1",
+    PlaatoPin.BEER_LEFT_UNIT: "kg",
+    PlaatoPin.MEASURE_UNIT: "1",
+    PlaatoPin.MAX_KEG_VOLUME: "19.0",
+    PlaatoPin.WIFI_SIGNAL_STRENGTH: "-61",
+    PlaatoPin.VOLUME_UNIT: "L",
+    PlaatoPin.LEAK_DETECTION: "0",
+    PlaatoPin.MODE: "1",
+    PlaatoPin.FIRMWARE_VERSION: "2.1.0",
+}
+
+VOLUME_UNITS = ["l", "gal", "gal (imperial)", "pt", "p (imperial)", "qt", "qt (imperial)", "cup", "cup (imperial)", "oz", "oz (imperial)"]
+
+
+def build_report() -> bytes:
+    """A keg report as read from its socket, an id frame followed by a burst of pin writes"""
+    frames = [blynk_protocol.encode_command(BlynkCommand.GET_SHARED_DASH, 1, b"0123456789abcdef0123456789abcdef")]
+    for i, (pin, val) in enumerate(PIN_VALUES.items(), start=2):
+        frames.append(blynk_protocol.encode_command(BlynkCommand.HARDWARE, i, f"vw\x00{int(pin)}\x00{val}".encode("utf-8")))
+    return b"".join(frames)
+
+
+def build_meta(ingredients: int = 100) -> Dict:
+    """A brewing tool batch meta the size of the ones stored in the JSONB columns"""
+    return {
+        "batch_id": "bf-4c1d2e",
+        "recipe": {
+            "name": "West Coast IPA",
+            "style": {"name": "American IPA", "category": "21A", "og_min": 1.056, "og_max": 1.07},
+            "fermentables": [{"name": f"Malt {i}", "amount": 0.25 * i, "color": i % 40, "potential": 1.036} for i in range(ingredients)],
+            "hops": [{"name": f"Hop {i}", "amount": 14 + i, "alpha": 12.5, "use": "Boil", "time": i % 60} for i in range(ingredients)],
+            "mash": {"steps": [{"name": f"Step {i}", "temp": 64 + i, "time": 15} for i in range(4)]},
+        },
+        "readings": [{"time": 1700000000 + i * 900, "sg": 1.06 - i * 0.0001, "temp": 19.5} for i in range(ingredients * 2)],
+        "notes": {"brew_day": "Mash ran 5 minutes long", "tasting": None},
+    }
+
+
+def build_beer_payload(beers: int = 50) -> List[Dict]:
+    """The snake_case payload of a beer list response, before it is converted to camelCase"""
+    return [
+        {
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "name": f"Beer {i}",
+            "brewery": "Brewhouse",
+            "abv": 6.5,
+            "img_url": None,
+            "image_transitions_enabled": False,
+            "external_brewing_tool_meta": {"batch_id": f"bf-{i}", "recipe_name": f"Recipe {i}", "fermentation_steps": [{"step_temp": 19}]},
+            "batches": [{"id": f"batch-{j}", "batch_number": j, "keg_date": None, "on_tap_count": 1} for j in range(3)],
+        }
+        for i in range(beers)
+    ]
+
+
+def build_beer() -> Beers:
+    meta = build_meta(ingredients=10)
+    return Beers(id="00000000-0000-0000-0000-000000000001", name="West Coast IPA", brewery="Brewhouse", abv=6.5, ibu=65, external_brewing_tool_meta=meta)
+
+
+def build_kegtron_shadow() -> Dict:
+    with open(KEGTRON_SAMPLE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def convert_units():
+    for unit in VOLUME_UNITS:
+        units.from_ml(units.to_ml(19000, unit), unit)
+
+
+def benchmarks() -> List[Tuple[str, Callable[[], object]]]:
+    """The benchmarks, by name.  The inputs are built once, only the call is timed"""
+    report = build_report()
+    frames = blynk_protocol.decode(report)
+    plaato_frames = plaato_protocol.decode_list(frames)
+    command = f"vw\x0051\x00{'1' * 32}".encode("utf-8")
+    payload = build_beer_payload()
+    beer = build_beer()
+    kegtron = KegtronPro()
+    shadow = build_kegtron_shadow()
+    processor = DataProcessor()
+    meta = build_meta()
+
+    return [
+        ("services.transform_dict_to_camel_case", lambda: transform_dict_to_camel_case(payload)),
+        ("db.DictifiableMixin.to_dict", beer.to_dict),
+        ("plaato.blynk_protocol.decode", lambda: blynk_protocol.decode(report)),
+        ("plaato.plaato_protocol.decode_list", lambda: plaato_protocol.decode_list(frames)),
+        ("plaato.plaato_data.decode_list", lambda: plaato_data.decode_list(plaato_frames)),
+        ("plaato.blynk_protocol.encode_command", lambda: blynk_protocol.encode_command(BlynkCommand.HARDWARE, 1, command)),
+        ("plaato.DataProcessor._decode", lambda: processor._decode(report)),  # pylint: disable=protected-access
+        ("plaato.DataProcessor._decode (pre-decoded frames)", lambda: processor._decode(report, frames)),  # pylint: disable=protected-access
+        ("kegtron.KegtronPro.parse_resp", lambda: kegtron.parse_resp(shadow)),
+        ("lib.units volume round trips", convert_units),
+        ("db.NestedMutableDict.coerce (large meta)", lambda: NestedMutableDict.coerce("meta", meta)),
+        ("lib.json.dumps_bytes", lambda: dumps_bytes(payload)),
+    ]
+
+
+def measure(fn: Callable[[], object], rounds: int = ROUNDS) -> float:
+    """The best time of a call in microseconds"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=rounds, number=number)) / number * 1e6
+
+
+def environment() -> Dict:
+    return {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor()}
+
+
+def load_baseline(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float]) -> Dict[str, float]:
+    """The change against the baseline of each benchmark, positive when slower"""
+    return {name: (us / baseline[name]) - 1 for name, us in results.items() if baseline.get(name)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="The baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="The slowdown flagged as a regression, 0.25 for 25%%")
+    parser.add_argument("--filter", default="", help="Only run the benchmarks whose name contains this")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    if baseline and baseline.get("environment") != environment():
+        print(f"warning: the baseline was recorded on a different environment: {baseline.get('environment')}")
+
+    results = {}
+    for name, fn in benchmarks():
+        if args.filter in name:
+            results[name] = measure(fn)
+
+    changes = compare(results, baseline.get("results", {}))
+    regressions = [name for name, change in changes.items() if change > args.threshold]
+    for name, us in results.items():
+        change = f"{changes[name]:+7.1%}" if name in changes else "    new"
+        flag = "  REGRESSION" if name in regressions else ""
+        print(f"{name:<52} {us:>12,.2f} us/call  {change}{flag}")
+
+    if args.save:
+        saved = baseline.get("results", {}) if args.filter else {}
+        saved.update(results)
+        data = {"recorded_on": datetime.now(timezone.utc).isoformat(), "environment": environment(), "results": saved}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved the baseline to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -70,3 +70,21 @@ def mock_logging(monkeypatch):
         monkeypatch.setattr(lib, "logging", MockLoggingModule())
     except (ImportError, AttributeError):
         pass
+
+
+@pytest.fixture(autouse=True)
+def clear_auth_user_cache():
+    """Make sure authenticated users cached by one test do not leak into the next"""
+    yield
+    auth = sys.modules.get("dependencies.auth")
+    if auth is not None:
+        auth.auth_user_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_reference_data():
+    """Make sure locations cached by one test do not leak into the next"""
+    yield
+    reference = sys.modules.get("services.reference_data")
+    if reference is not None:
+        reference.reference_data.invalidate_locations()
@@ -47,10 +47,10 @@ class TestUsersCreate:
         """Test that create hashes password when provided"""
         mock_session = AsyncMock()
 
-        with patch.object(Users, "__init__", return_value=None), patch("db.users.PasswordHasher") as mock_hasher_class:
+        with patch.object(Users, "__init__", return_value=None), patch("db.users.get_password_service") as mock_get_service:
             mock_hasher = MagicMock()
-            mock_hasher.hash.return_value = "hashed_password"
-            mock_hasher_class.return_value = mock_hasher
+            mock_hasher.hash = AsyncMock(return_value="hashed_password")
+            mock_get_service.return_value = mock_hasher
 
             # Mock the parent create method
             with patch("db.AsyncQueryMethodsMixin.create", new_callable=AsyncMock) as mock_create:
@@ -69,22 +69,22 @@ class TestUsersCreate:
         """Test that create uses provided password_hash directly"""
         mock_session = AsyncMock()
 
-        with patch("db.users.PasswordHasher") as mock_hasher_class, patch("db.AsyncQueryMethodsMixin.create", new_callable=AsyncMock) as mock_create:
+        with patch("db.users.get_password_service") as mock_hasher_class, patch("db.AsyncQueryMethodsMixin.create", new_callable=AsyncMock) as mock_create:
             mock_create.return_value = MagicMock()
             run_async(Users.create(mock_session, email="test@test.com", password="mypassword", password_hash="existing_hash"))
 
-            # Verify PasswordHasher was never instantiated
+            # Verify the password was never hashed
             mock_hasher_class.assert_not_called()
 
     def test_create_without_password(self):
         """Test that create works without password"""
         mock_session = AsyncMock()
 
-        with patch("db.users.PasswordHasher") as mock_hasher_class, patch("db.AsyncQueryMethodsMixin.create", new_callable=AsyncMock) as mock_create:
+        with patch("db.users.get_password_service") as mock_hasher_class, patch("db.AsyncQueryMethodsMixin.create", new_callable=AsyncMock) as mock_create:
             mock_create.return_value = MagicMock()
             run_async(Users.create(mock_session, email="test@test.com"))
 
-            # Verify PasswordHasher was never instantiated
+            # Verify the password was never hashed
             mock_hasher_class.assert_not_called()
 
 
@@ -95,10 +95,10 @@ class TestUsersUpdate:
         """Test that update hashes password when provided"""
         mock_session = AsyncMock()
 
-        with patch("db.users.PasswordHasher") as mock_hasher_class:
+        with patch("db.users.get_password_service") as mock_get_service:
             mock_hasher = MagicMock()
-            mock_hasher.hash.return_value = "new_hashed_password"
-            mock_hasher_class.return_value = mock_hasher
+            mock_hasher.hash = AsyncMock(return_value="new_hashed_password")
+            mock_get_service.return_value = mock_hasher
 
             with patch("db.AsyncQueryMethodsMixin.update", new_callable=AsyncMock) as mock_update:
                 mock_update.return_value = 1
@@ -112,7 +112,7 @@ class TestUsersUpdate:
         """Test that update works without password"""
         mock_session = AsyncMock()
 
-        with patch("db.users.PasswordHasher") as mock_hasher_class, patch("db.AsyncQueryMethodsMixin.update", new_callable=AsyncMock) as mock_update:
+        with patch("db.users.get_password_service") as mock_hasher_class, patch("db.AsyncQueryMethodsMixin.update", new_callable=AsyncMock) as mock_update:
             mock_update.return_value = 1
             run_async(Users.update(mock_session, "user-id", first_name="John"))
 
@@ -20,11 +20,15 @@ class _AwaitableValue:
 
 import pytest
 from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
 
 from dependencies.auth import (
     AuthUser,
+    AuthUserCache,
+    auth_user_cache,
     get_current_user_from_api_key,
     get_current_user_from_session,
+    get_db_session,
     get_optional_user,
     require_admin,
     require_location_access,
@@ -365,34 +369,238 @@ class TestGetCurrentUserFromSession:
         assert result is None
 
 
+class TestAuthUserCache:
+    """Tests for the authenticated user cache"""
+
+    def _auth_user(self, id_="user-1"):
+        return AuthUser(id_, "Test", "User", "test@test.com", None, None, None, False, [])
+
+    def test_get_set(self):
+        """Test a cached user is returned until it expires"""
+        cache = AuthUserCache(ttl=60, max_size=10)
+        user = self._auth_user()
+        cache.set("user:user-1", user)
+
+        assert cache.get("user:user-1") is user
+
+        with patch("dependencies.auth.time.monotonic", return_value=10**9):
+            assert cache.get("user:user-1") is None
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently used entry is evicted once the cache is full"""
+        cache = AuthUserCache(ttl=60, max_size=2)
+        cache.set("user:user-1", self._auth_user("user-1"))
+        cache.set("user:user-2", self._auth_user("user-2"))
+        cache.get("user:user-1")
+        cache.set("user:user-3", self._auth_user("user-3"))
+
+        assert cache.get("user:user-1") is not None
+        assert cache.get("user:user-2") is None
+        assert cache.get("user:user-3") is not None
+
+    def test_invalidate_user_drops_session_and_api_key_entries(self):
+        """Test invalidating a user drops every entry cached for it"""
+        cache = AuthUserCache(ttl=60, max_size=10)
+        user = self._auth_user()
+        cache.set(AuthUserCache.user_key("user-1"), user)
+        cache.set(AuthUserCache.api_key_key("my-api-key"), user)
+        cache.set(AuthUserCache.user_key("user-2"), self._auth_user("user-2"))
+
+        cache.invalidate_user("user-1")
+
+        assert len(cache) == 1
+        assert cache.get(AuthUserCache.user_key("user-2")) is not None
+
+    def test_stale_load_is_not_stored(self):
+        """Test a user loaded before an invalidation is not cached"""
+        cache = AuthUserCache(ttl=60, max_size=10)
+        generation = cache.generation
+
+        cache.invalidate_user("user-1")
+        cache.set("user:user-1", self._auth_user(), generation)
+
+        assert cache.get("user:user-1") is None
+
+    def test_invalidated_once_committed(self):
+        """Test a user written through a session is only invalidated once the changes are committed"""
+        cache = AuthUserCache(ttl=60, max_size=10)
+        cache.set("user:user-1", self._auth_user())
+        db_session = MagicMock()
+        db_session.sync_session = Session()
+        db_session.sync_session.begin()
+
+        cache.invalidate_user_on_commit(db_session, "user-1")
+        assert cache.get("user:user-1") is not None
+
+        db_session.sync_session.commit()
+        assert cache.get("user:user-1") is None
+
+    def test_invalidated_when_already_committed(self):
+        """Test the user is invalidated right away when the write committed itself"""
+        cache = AuthUserCache(ttl=60, max_size=10)
+        cache.set("user:user-1", self._auth_user())
+        cache.set("user:user-2", self._auth_user("user-2"))
+        db_session = MagicMock()
+        db_session.sync_session = Session()
+
+        cache.clear_on_commit(db_session)
+
+        assert len(cache) == 0
+
+    def test_disabled(self):
+        """Test nothing is cached when the ttl is 0"""
+        cache = AuthUserCache(ttl=0, max_size=10)
+        cache.set("user:user-1", self._auth_user())
+
+        assert cache.get("user:user-1") is None
+
+    def test_api_key_is_hashed(self):
+        """Test the raw API key is not used as the cache key"""
+        assert "my-api-key" not in AuthUserCache.api_key_key("my-api-key")
+
+    def test_session_auth_is_cached(self):
+        """Test the user is only loaded from the database the first time"""
+        mock_request = MagicMock()
+        mock_request.session = {"user_id": "user-123"}
+        mock_session = AsyncMock()
+
+        with patch("dependencies.auth.UsersDB") as mock_users_db:
+            mock_users_db.get_by_pkey = AsyncMock(return_value=create_mock_db_user(id_="user-123"))
+            first = run_async(get_current_user_from_session(request=mock_request, db_session=mock_session))
+            second = run_async(get_current_user_from_session(request=mock_request, db_session=mock_session))
+
+        assert first is second
+        mock_users_db.get_by_pkey.assert_called_once()
+
+    def test_api_key_auth_is_cached(self):
+        """Test the API key is only looked up in the database the first time"""
+        mock_request = MagicMock()
+        mock_request.query_params = {"api_key": "my-api-key"}
+        mock_session = AsyncMock()
+
+        with patch("dependencies.auth.UsersDB") as mock_users_db:
+            mock_users_db.get_by_api_key = AsyncMock(return_value=create_mock_db_user(api_key="my-api-key"))
+            run_async(get_current_user_from_api_key(credentials=None, request=mock_request, db_session=mock_session))
+            run_async(get_current_user_from_api_key(credentials=None, request=mock_request, db_session=mock_session))
+
+            auth_user_cache.invalidate_user("user-1")
+            run_async(get_current_user_from_api_key(credentials=None, request=mock_request, db_session=mock_session))
+
+        assert mock_users_db.get_by_api_key.call_count == 2
+
+
 class TestGetOptionalUser:
     """Tests for get_optional_user dependency"""
 
+    def _request(self, api_key=None, user_id=None):
+        mock_request = MagicMock()
+        mock_request.query_params = {"api_key": api_key} if api_key else {}
+        mock_request.session = {"user_id": user_id} if user_id else {}
+        return mock_request
+
     def test_returns_api_key_user_if_present(self):
-        """Test prefers API key user over session user"""
-        api_user = MagicMock()
-        api_user.email = "api@test.com"
-        session_user = MagicMock()
-        session_user.email = "session@test.com"
+        """Test prefers API key user over session user, without looking up the session user"""
+        mock_session = AsyncMock()
 
-        result = run_async(get_optional_user(api_key_user=api_user, session_user=session_user))
+        with patch("dependencies.auth.UsersDB") as mock_users_db:
+            mock_users_db.get_by_api_key = AsyncMock(return_value=create_mock_db_user(email="api@test.com"))
+            mock_users_db.get_by_pkey = AsyncMock()
+            result = run_async(get_optional_user(self._request(api_key="my-api-key", user_id="user-2"), credentials=None, db_session=mock_session))
 
-        assert result == api_user
+        assert result.email == "api@test.com"
+        mock_users_db.get_by_pkey.assert_not_called()
 
     def test_returns_session_user_if_no_api_key_user(self):
         """Test falls back to session user when no API key user"""
-        session_user = MagicMock()
-        session_user.email = "session@test.com"
+        mock_session = AsyncMock()
 
-        result = run_async(get_optional_user(api_key_user=None, session_user=session_user))
+        with patch("dependencies.auth.UsersDB") as mock_users_db:
+            mock_users_db.get_by_api_key = AsyncMock(return_value=None)
+            mock_users_db.get_by_pkey = AsyncMock(return_value=create_mock_db_user(id_="user-2", email="session@test.com"))
+            result = run_async(get_optional_user(self._request(api_key="bad-key", user_id="user-2"), credentials=None, db_session=mock_session))
 
-        assert result == session_user
+        assert result.email == "session@test.com"
 
     def test_returns_none_when_no_user(self):
-        """Test returns None when neither auth method provides user"""
-        result = run_async(get_optional_user(api_key_user=None, session_user=None))
+        """Test returns None when neither auth method provides user, without querying the database"""
+        mock_session = AsyncMock()
+
+        with patch("dependencies.auth.UsersDB") as mock_users_db:
+            result = run_async(get_optional_user(self._request(), credentials=None, db_session=mock_session))
 
         assert result is None
+        mock_users_db.get_by_api_key.assert_not_called()
+        mock_users_db.get_by_pkey.assert_not_called()
+
+    def test_cached_user_does_not_touch_session(self):
+        """Test a cached user is returned without using the database session"""
+        auth_user_cache.set(AuthUserCache.user_key("user-2"), AuthUser("user-2", "A", "B", "c@d.com", None, None, None, False, []))
+        mock_session = MagicMock()
+
+        with patch("dependencies.auth.UsersDB") as mock_users_db:
+            result = run_async(get_optional_user(self._request(user_id="user-2"), credentials=None, db_session=mock_session))
+
+        assert result.id == "user-2"
+        mock_users_db.get_by_pkey.assert_not_called()
+        assert mock_session.mock_calls == []
+
+
+class TestGetDbSession:
+    """Tests for get_db_session dependency"""
+
+    def _session(self, in_transaction=False):
+        session = MagicMock()
+        session.in_transaction.return_value = in_transaction
+        session.new = set()
+        session.dirty = set()
+        session.deleted = set()
+        session.commit = AsyncMock()
+        session.rollback = AsyncMock()
+        session.close = AsyncMock()
+        return session
+
+    def _run(self, session, fail=False):
+        async def _inner():
+            gen = get_db_session()
+            await gen.__anext__()
+            if fail:
+                with pytest.raises(ValueError):
+                    await gen.athrow(ValueError("boom"))
+            else:
+                with pytest.raises(StopAsyncIteration):
+                    await gen.__anext__()
+
+        with patch("dependencies.auth.create_async_session", AsyncMock(return_value=session)):
+            run_async(_inner())
+
+    def test_unused_session_is_not_committed(self):
+        """Test a session that was never used does not commit"""
+        session = self._session(in_transaction=False)
+
+        self._run(session)
+
+        session.commit.assert_not_called()
+        session.close.assert_awaited_once()
+
+    def test_used_session_is_committed(self):
+        """Test a session with an open transaction is committed"""
+        session = self._session(in_transaction=True)
+
+        self._run(session)
+
+        session.commit.assert_awaited_once()
+        session.close.assert_awaited_once()
+
+    def test_rolls_back_on_error(self):
+        """Test the session is rolled back when the request fails"""
+        session = self._session(in_transaction=True)
+
+        self._run(session, fail=True)
+
+        session.rollback.assert_awaited_once()
+        session.commit.assert_not_called()
+        session.close.assert_awaited_once()
 
 
 class TestRequireUser:
@@ -1,14 +1,21 @@
 """Tests for lib/assets/files.py module (FileAssetManager)"""
 
+import asyncio
+import hashlib
 import os
 from io import BytesIO
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 
 from lib.assets.files import FileAssetManager
 
 
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
 class TestFileAssetManager:
     """Tests for FileAssetManager class"""
 
@@ -16,7 +23,7 @@ class TestFileAssetManager:
     def mock_config(self):
         """Create a mock config"""
         config = MagicMock()
-        config.get.return_value = "/tmp/uploads"
+        config.get.side_effect = lambda key, default=None: {"uploads.base_dir": "/tmp/uploads", "uploads.chunk_size_kb": 1}.get(key, default)
         return config
 
     @pytest.fixture
@@ -50,7 +57,7 @@ class TestFileAssetManager:
         mock_listdir.return_value = ["file1.png", "file2.jpg", ".hidden", "file3.gif"]
         mock_isfile.return_value = True
 
-        result = manager.list("beer")
+        result = run_async(manager.list("beer"))
 
         assert len(result) == 3
         assert "/assets/uploads/img/beer/file1.png" in result
@@ -66,59 +73,127 @@ class TestFileAssetManager:
         mock_listdir.return_value = ["file.png", "subdir"]
         mock_isfile.side_effect = lambda p: "file.png" in p
 
-        result = manager.list("beer")
+        result = run_async(manager.list("beer"))
 
         assert len(result) == 1
         assert "file.png" in result[0]
 
-    @patch("os.path.exists")
-    @patch("os.makedirs")
-    def test_save_flask_file(self, mock_makedirs, mock_exists, manager):
+    def test_save_flask_file(self, manager, tmp_path):
         """Test save with Flask werkzeug FileStorage"""
-        mock_exists.return_value = True
+        manager.assets_base_dir = str(tmp_path)
 
-        mock_file = MagicMock()
+        # FileStorage proxies read/seek to its stream
+        mock_file = MagicMock(spec=["filename", "read", "seek", "save"])
         mock_file.filename = "original.png"
-        mock_file.save = MagicMock()
+        stream = BytesIO(b"file content")
+        mock_file.read.side_effect = stream.read
+        mock_file.seek.side_effect = stream.seek
 
-        with patch.object(manager, "generate_random_filename", return_value="uuid.png"):
-            old_name, new_name, url = manager.save("beer", mock_file)
+        old_name, new_name, url = run_async(manager.save("beer", mock_file))
 
         assert old_name == "original.png"
-        assert new_name == "uuid.png"
-        assert url == "/assets/uploads/img/beer/uuid.png"
-        mock_file.save.assert_called_once()
+        assert new_name == f"{hashlib.sha256(b'file content').hexdigest()}.png"
+        assert url == f"/assets/uploads/img/beer/{new_name}"
+        assert (tmp_path / "img" / "beer" / new_name).read_bytes() == b"file content"
 
-    @patch("os.path.exists")
-    @patch("os.makedirs")
-    @patch("builtins.open", new_callable=mock_open)
-    def test_save_fastapi_file(self, mock_file_open, mock_makedirs, mock_exists, manager):
-        """Test save with FastAPI UploadFile"""
-        mock_exists.return_value = True
+    def test_save_fastapi_file(self, manager, tmp_path):
+        """Test save with FastAPI UploadFile streams the contents to disk in chunks, named after their hash"""
+        manager.assets_base_dir = str(tmp_path)
+        contents = os.urandom(5000)
+        expected_name = f"{hashlib.sha256(contents).hexdigest()}.jpg"
 
         # FastAPI UploadFile doesn't have .save() method
         mock_file = MagicMock(spec=["filename", "file"])
         mock_file.filename = "original.jpg"
-        mock_file.file = BytesIO(b"file content")
+        mock_file.file = MagicMock(wraps=BytesIO(contents))
 
-        with patch.object(manager, "generate_random_filename", return_value="uuid.jpg"):
-            old_name, new_name, url = manager.save("beer", mock_file)
+        old_name, new_name, url = run_async(manager.save("beer", mock_file))
 
         assert old_name == "original.jpg"
-        assert new_name == "uuid.jpg"
-        mock_file_open.assert_called_once()
+        assert new_name == expected_name
+        assert url == f"/assets/uploads/img/beer/{expected_name}"
+        assert (tmp_path / "img" / "beer" / expected_name).read_bytes() == contents
+        assert os.listdir(tmp_path / "img" / "beer") == [expected_name]
+        # read 1 KB at a time rather than all at once, then rewound
+        assert all(c.args == (1024,) for c in mock_file.file.read.call_args_list)
+        mock_file.file.seek.assert_called_with(0)
+
+    def test_save_identical_upload(self, manager, tmp_path):
+        """Test an identical upload is stored once"""
+        manager.assets_base_dir = str(tmp_path)
+
+        names = []
+        for filename in ["first.png", "second.png"]:
+            mock_file = MagicMock(spec=["filename", "file"])
+            mock_file.filename = filename
+            mock_file.file = BytesIO(b"same content")
+            names.append(run_async(manager.save("beer", mock_file))[1])
+
+        assert names[0] == names[1]
+        assert os.listdir(tmp_path / "img" / "beer") == [names[0]]
+
+    def test_save_failure_removes_partial_file(self, manager, tmp_path):
+        """Test a failed upload does not leave a partial file behind"""
+        manager.assets_base_dir = str(tmp_path)
+
+        mock_file = MagicMock(spec=["filename", "file"])
+        mock_file.filename = "original.jpg"
+        mock_file.file = MagicMock()
+        mock_file.file.read.side_effect = [b"partial", OSError("connection reset")]
 
-    @patch("os.path.exists")
-    @patch("os.makedirs")
-    def test_save_creates_directory_if_not_exists(self, mock_makedirs, mock_exists, manager):
+        with pytest.raises(OSError):
+            run_async(manager.save("beer", mock_file))
+
+        assert os.listdir(tmp_path / "img" / "beer") == []
+
+    def test_save_creates_directory_if_not_exists(self, manager, tmp_path):
         """Test save creates directory if it doesn't exist"""
-        mock_exists.return_value = False
+        manager.assets_base_dir = str(tmp_path)
 
-        mock_file = MagicMock()
+        mock_file = MagicMock(spec=["filename", "file"])
         mock_file.filename = "test.png"
-        mock_file.save = MagicMock()
+        mock_file.file = BytesIO(b"file content")
+
+        run_async(manager.save("newtype", mock_file))
+
+        assert os.path.isdir(tmp_path / "img" / "newtype")
+
+
+class TestFileDerivatives:
+    """Tests for the storage of the image derivatives on disk"""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        """Create a FileAssetManager storing under a temporary directory"""
+        manager = FileAssetManager.__new__(FileAssetManager)
+        manager.config = MagicMock()
+        manager.logger = MagicMock()
+        manager.assets_base_dir = str(tmp_path)
+        return manager
+
+    def test_save_and_get_derivatives(self, manager, tmp_path):
+        """Test derivatives are stored under the hash of the original and found again"""
+        image_hash = "a" * 64
+        run_async(manager.save_derivatives("beer", image_hash, {"tile.webp": b"webp", "tile.jpg": b"jpg"}))
+
+        path = run_async(manager.get_derivative("beer", image_hash, "tile.webp"))
+
+        assert path == str(tmp_path / "img" / "beer" / "derived" / image_hash / "tile.webp")
+        assert (tmp_path / "img" / "beer" / "derived" / image_hash / "tile.jpg").read_bytes() == b"jpg"
+        assert run_async(manager.get_derivative("beer", image_hash, "thumb.webp")) is None
+
+    def test_derivatives_not_listed(self, manager):
+        """Test the derivatives are not listed with the uploaded images"""
+        os.makedirs(manager.get_parent_dir("beer"))
+        run_async(manager.save_derivatives("beer", "a" * 64, {"tile.webp": b"webp"}))
+
+        assert run_async(manager.list("beer")) == []
 
-        with patch.object(manager, "generate_random_filename", return_value="uuid.png"):
-            manager.save("newtype", mock_file)
+    def test_read_original(self, manager, tmp_path):
+        """Test the original is found by its hash, whatever its extension"""
+        image_hash = "b" * 64
+        os.makedirs(tmp_path / "img" / "beer")
+        (tmp_path / "img" / "beer" / f"{image_hash}.png").write_bytes(b"original")
 
-        mock_makedirs.assert_called_once()
+        assert run_async(manager.read_original("beer", image_hash)) == b"original"
+        assert run_async(manager.read_original("beer", "c" * 64)) is None
@@ -0,0 +1,196 @@
+"""Tests for lib/assets/images.py module (image derivatives)"""
+
+import asyncio
+from io import BytesIO
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from lib.assets import images
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def make_image(size, mode="RGB", fmt="PNG"):
+    """Encode a blank image of the given size"""
+    pil_image = pytest.importorskip("PIL.Image")
+    buf = BytesIO()
+    pil_image.new(mode, size, (200, 100, 50, 0) if mode == "RGBA" else (200, 100, 50)).save(buf, fmt)
+    return buf.getvalue()
+
+
+class TestHelpers:
+    """Tests for the naming and format helpers"""
+
+    def test_choose_format(self):
+        """Test WebP is only chosen for clients accepting it"""
+        assert images.choose_format("image/avif,image/webp,*/*") == "webp"
+        assert images.choose_format("image/jpeg,*/*") == "jpg"
+        assert images.choose_format(None) == "jpg"
+
+    def test_is_hash(self):
+        """Test only SHA-256 hex digests are accepted as hashes"""
+        assert images.is_hash("a" * 64)
+        assert not images.is_hash("A" * 64)
+        assert not images.is_hash("../" + "a" * 61)
+        assert not images.is_hash("a" * 63)
+
+    def test_is_image_id(self):
+        """Test the UUID names of the earlier uploads are accepted along with hashes"""
+        assert images.is_image_id("a" * 64)
+        assert images.is_image_id("0b6f1a3c-5d2e-4f7a-9c8b-1e2d3f4a5b6c")
+        assert not images.is_image_id("0b6f1a3c-5d2e-4f7a-9c8b-1e2d3f4a5b6c.png")
+        assert not images.is_image_id("../0b6f1a3c-5d2e-4f7a-9c8b-1e2d3f4a5b")
+
+    def test_is_raster(self):
+        """Test vector images are not rendered"""
+        assert images.is_raster("label.PNG")
+        assert images.is_raster("label.jpeg")
+        assert not images.is_raster("label.svg")
+        assert not images.is_raster("label")
+
+    def test_upload_derivative_url(self):
+        """Test the URL of an upload, stored under its hash or a UUID, is mapped to its derivative"""
+        manager = MagicMock()
+        manager.get.side_effect = lambda image_type, filename: f"/assets/uploads/img/{image_type}/{filename}"
+        image_hash = "a" * 64
+
+        assert images.upload_derivative_url(manager, f"/assets/uploads/img/beer/{image_hash}.png", "tile") == images.derivative_url("beer", image_hash, "tile")
+        assert images.upload_derivative_url(manager, "/assets/uploads/img/beverage/0b6f1a3c-5d2e-4f7a-9c8b-1e2d3f4a5b6c.jpg", "thumb") == images.derivative_url(
+            "beverage", "0b6f1a3c-5d2e-4f7a-9c8b-1e2d3f4a5b6c", "thumb"
+        )
+
+    def test_upload_derivative_url_keeps_other_urls(self):
+        """Test the URLs of images hosted elsewhere, or that derivatives are not rendered for, are kept as they are"""
+        manager = MagicMock()
+        manager.get.side_effect = lambda image_type, filename: f"/assets/uploads/img/{image_type}/{filename}"
+        image_hash = "a" * 64
+
+        for url in [
+            f"https://example.com/beer/{image_hash}.png",
+            f"/assets/uploads/img/beer/{image_hash}.svg",
+            "/assets/uploads/img/beer/label.png",
+            f"/assets/uploads/img/other/{image_hash}.png",
+            "label.png",
+        ]:
+            assert images.upload_derivative_url(manager, url, "tile") == url
+
+
+class TestRender:
+    """Tests for render"""
+
+    def test_renders_every_size_and_format(self):
+        """Test every size is rendered as WebP and JPEG, fitting within its longest edge"""
+        Image = pytest.importorskip("PIL.Image")
+
+        rendered = images.render(make_image((2000, 1000)))
+
+        assert set(rendered) == {f"{size}.{fmt}" for size in images.SIZES for fmt in images.FORMATS}
+        with Image.open(BytesIO(rendered["tile.webp"])) as img:
+            assert img.format == "WEBP"
+            assert img.size == (400, 200)
+        with Image.open(BytesIO(rendered["thumb.jpg"])) as img:
+            assert img.format == "JPEG"
+            assert img.size == (128, 64)
+
+    def test_does_not_enlarge(self):
+        """Test images smaller than a size are kept at their size"""
+        Image = pytest.importorskip("PIL.Image")
+
+        rendered = images.render(make_image((300, 200)))
+
+        with Image.open(BytesIO(rendered["full.jpg"])) as img:
+            assert img.size == (300, 200)
+
+    def test_transparency(self):
+        """Test the transparency is kept in WebP and flattened onto white in JPEG"""
+        Image = pytest.importorskip("PIL.Image")
+
+        rendered = images.render(make_image((50, 50), mode="RGBA"))
+
+        with Image.open(BytesIO(rendered["thumb.webp"])) as img:
+            assert img.mode == "RGBA"
+        with Image.open(BytesIO(rendered["thumb.jpg"])) as img:
+            assert img.mode == "RGB"
+            assert all(c > 250 for c in img.getpixel((25, 25)))
+
+
+class TestDerivativeRenderer:
+    """Tests for DerivativeRenderer"""
+
+    def test_renders_in_process_pool(self):
+        """Test the derivatives are rendered by the worker processes"""
+        data = make_image((500, 500))
+        renderer = images.DerivativeRenderer(processes=1)
+        try:
+            rendered = run_async(renderer.render(data))
+        finally:
+            renderer.shutdown()
+
+        assert "full.webp" in rendered
+
+    def test_unavailable(self):
+        """Test nothing is rendered when derivatives are disabled"""
+        renderer = images.DerivativeRenderer(processes=1)
+
+        with patch.object(images.DerivativeRenderer, "available", return_value=False):
+            assert run_async(renderer.render(b"data")) is None
+
+        assert renderer._executor is None
+
+    def test_invalid_image(self):
+        """Test an image that cannot be decoded is logged rather than failing the upload"""
+        renderer = images.DerivativeRenderer(processes=1)
+        renderer._executor = MagicMock()
+
+        with patch.object(images.DerivativeRenderer, "available", return_value=True), patch.object(images, "LOGGER") as mock_logger:
+            with patch("asyncio.get_running_loop") as mock_loop:
+                mock_loop.return_value.run_in_executor = AsyncMock(side_effect=ValueError("cannot identify image file"))
+                assert run_async(renderer.render(b"not an image")) is None
+
+        mock_logger.warning.assert_called_once()
+
+
+class TestCreateDerivatives:
+    """Tests for create_derivatives"""
+
+    def test_renders_and_stores(self):
+        """Test the rendered derivatives are stored by the asset manager"""
+        manager = MagicMock()
+        manager.get_derivative = AsyncMock(return_value=None)
+        manager.save_derivatives = AsyncMock()
+        renderer = MagicMock()
+        renderer.render = AsyncMock(return_value={"full.jpg": b"jpg"})
+
+        with patch.object(images, "get_renderer", return_value=renderer):
+            assert run_async(images.create_derivatives(manager, "beer", "a" * 64, b"data")) is True
+
+        manager.save_derivatives.assert_awaited_once_with("beer", "a" * 64, {"full.jpg": b"jpg"})
+
+    def test_identical_upload(self):
+        """Test an image whose derivatives already exist is not rendered again"""
+        manager = MagicMock()
+        manager.get_derivative = AsyncMock(return_value="/path/full.jpg")
+        renderer = MagicMock()
+        renderer.render = AsyncMock()
+
+        with patch.object(images, "get_renderer", return_value=renderer):
+            assert run_async(images.create_derivatives(manager, "beer", "a" * 64, b"data")) is True
+
+        renderer.render.assert_not_called()
+
+    def test_not_rendered(self):
+        """Test nothing is stored when the derivatives could not be rendered"""
+        manager = MagicMock()
+        manager.get_derivative = AsyncMock(return_value=None)
+        manager.save_derivatives = AsyncMock()
+        renderer = MagicMock()
+        renderer.render = AsyncMock(return_value=None)
+
+        with patch.object(images, "get_renderer", return_value=renderer):
+            assert run_async(images.create_derivatives(manager, "beer", "a" * 64, b"data")) is False
+
+        manager.save_derivatives.assert_not_called()
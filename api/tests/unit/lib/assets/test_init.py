@@ -1,12 +1,21 @@
 """Tests for lib/assets/__init__.py module (AssetManagerBase)"""
 
+import asyncio
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+import lib.assets
 from lib.assets import AssetManagerBase
 
 
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
 class TestAssetManagerBase:
     """Tests for AssetManagerBase class"""
 
@@ -42,31 +51,46 @@ class TestGetFileExtension:
         assert AssetManagerBase.get_file_extension("archive.tar.gz") == "gz"
 
 
-class TestGenerateRandomFilename:
-    """Tests for generate_random_filename static method"""
-
-    def test_preserves_extension(self):
-        """Test that extension is preserved"""
-        result = AssetManagerBase.generate_random_filename("myfile.png")
-        assert result.endswith(".png")
-
-    def test_generates_uuid_filename(self):
-        """Test that filename contains UUID-like string"""
-        result = AssetManagerBase.generate_random_filename("test.jpg")
-        # UUID format: 8-4-4-4-12 = 36 chars + .jpg = 40 chars
-        assert len(result) == 40
-        assert result.endswith(".jpg")
-
-    def test_different_calls_produce_different_names(self):
-        """Test that each call produces a different name"""
-        result1 = AssetManagerBase.generate_random_filename("file.txt")
-        result2 = AssetManagerBase.generate_random_filename("file.txt")
-        assert result1 != result2
-
-    def test_secure_filename(self):
-        """Test that result is a secure filename"""
-        # secure_filename should sanitize any special characters
-        result = AssetManagerBase.generate_random_filename("test.png")
-        # Result should only contain safe characters
-        assert "/" not in result
-        assert ".." not in result
+class TestRunIO:
+    """Tests for the asset I/O thread pool"""
+
+    @pytest.fixture(autouse=True)
+    def pool(self):
+        """Use a pool of 2 threads, reset after the test"""
+        lib.assets.shutdown()
+        with patch.object(lib.assets, "CONFIG") as mock_config:
+            mock_config.get.side_effect = lambda key, default=None: {"uploads.max_concurrent": 2}.get(key, default)
+            yield
+        lib.assets.shutdown()
+
+    def test_runs_off_the_event_loop(self):
+        """Test the blocking call runs on the asset thread pool and its result is returned"""
+
+        def blocking(value, suffix=""):
+            return threading.current_thread().name, f"{value}{suffix}"
+
+        thread, result = run_async(AssetManagerBase.run_io(blocking, "a", suffix="b"))
+
+        assert thread.startswith("asset-io")
+        assert result == "ab"
+
+    def test_bounds_concurrency(self):
+        """Test no more than `uploads.max_concurrent` calls run at once"""
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def blocking():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+        async def run_all():
+            await asyncio.gather(*[AssetManagerBase.run_io(blocking) for _ in range(6)])
+
+        run_async(run_all())
+
+        assert max(peak) == 2
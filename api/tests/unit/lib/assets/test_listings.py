@@ -0,0 +1,259 @@
+"""Tests for lib/assets/listings.py module (S3 image listings index)"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from io import BytesIO
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from lib.assets import listings
+from lib.assets.listings import ListingIndex
+from lib.assets.s3 import S3AssetManager
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+class FakeS3:
+    """An in-memory stand-in for the S3 client, counting the list calls"""
+
+    def __init__(self, page_size=2):
+        self.objects = {}
+        self.page_size = page_size
+        self.list_calls = 0
+
+    def list_objects_v2(self, Bucket, Prefix="", ContinuationToken=None):  # pylint: disable=invalid-name
+        self.list_calls += 1
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start : start + self.page_size]
+        resp = {"Contents": [{"Key": key} for key in page], "IsTruncated": start + self.page_size < len(keys)}
+        if resp["IsTruncated"]:
+            resp["NextContinuationToken"] = str(start + self.page_size)
+        return resp
+
+    def upload_fileobj(self, file_obj, bucket, key, **kwargs):
+        self.objects[key] = file_obj.read()
+
+
+class FakeStore:
+    """A dict backed stand-in for the asset_listings table"""
+
+    def __init__(self, lock_acquired=True, reconciled_ago=None):
+        self.rows = {}
+        self.lock_acquired = lock_acquired
+        self.reconciled_ago = reconciled_ago
+
+    async def load(self, bucket, image_type):
+        return {key: url for (b, t, key), url in sorted(self.rows.items()) if b == bucket and t == image_type}
+
+    async def add(self, bucket, image_type, objects):
+        for key, url in objects.items():
+            self.rows.setdefault((bucket, image_type, key), url)
+
+    async def remove(self, bucket, keys):
+        for row in [row for row in self.rows if row[0] == bucket and row[2] in keys]:
+            del self.rows[row]
+
+    @asynccontextmanager
+    async def reconcile_lock(self):
+        yield self.lock_acquired
+
+    async def seconds_since_reconciled(self, bucket):
+        return self.reconciled_ago
+
+    async def mark_reconciled(self, bucket):
+        self.reconciled_ago = 0.0
+
+
+def url(key):
+    """The URL of an object of the test bucket"""
+    return f"https://my-bucket.s3.amazonaws.com/{key}"
+
+
+@pytest.fixture
+def s3():
+    """The fake S3 client, with a few images already in the bucket"""
+    fake = FakeS3()
+    fake.objects = {
+        "assets/beer/a.png": b"a",
+        "assets/beer/b.png": b"b",
+        "assets/beer/c.png": b"c",
+        "assets/beer/derived/" + "a" * 64 + "/tile.webp": b"tile",
+        "assets/brewery/d.png": b"d",
+    }
+    with patch("lib.assets.s3.aws") as mock_aws:
+        mock_aws.client.return_value = fake
+        yield fake
+
+
+@pytest.fixture
+def store():
+    """The fake listings table"""
+    return FakeStore()
+
+
+@pytest.fixture
+def index(store):
+    """A listing index on the fake table, replacing the process wide one"""
+    index = ListingIndex(store=store, refresh_sec=60)
+    with patch.object(listings, "get_index", return_value=index):
+        yield index
+
+
+@pytest.fixture
+@patch("lib.assets.s3.AssetManagerBase.__init__")
+def manager(mock_init):
+    """Create an S3AssetManager on the test bucket"""
+    mock_init.return_value = None
+    manager = S3AssetManager.__new__(S3AssetManager)
+    manager.config = MagicMock()
+    manager.config.get.side_effect = lambda key, default=None: default
+    manager.logger = MagicMock()
+    manager.bucket = "my-bucket"
+    manager.prefix = "assets/"
+    return manager
+
+
+class TestListingIndex:
+    """Tests for ListingIndex"""
+
+    def test_first_list_populates_from_bucket(self, s3, store, index, manager):
+        """Test the first listing goes through the bucket pages, the following ones are served from memory"""
+        first = run_async(manager.list("beer"))
+        list_calls = s3.list_calls
+        second = run_async(manager.list("beer"))
+
+        assert first == [url("assets/beer/a.png"), url("assets/beer/b.png"), url("assets/beer/c.png")]
+        assert second == first
+        assert list_calls == 2
+        assert s3.list_calls == list_calls
+        assert len(store.rows) == 3
+
+    def test_upload_is_written_through(self, s3, store, index, manager):
+        """Test an uploaded image is listed without listing the bucket again"""
+        run_async(manager.list("beer"))
+        list_calls = s3.list_calls
+        file = MagicMock()
+        file.filename = "label.png"
+        file.file = BytesIO(b"label")
+
+        _, filename, new_url = run_async(manager.save("beer", file))
+
+        assert new_url in run_async(manager.list("beer"))
+        assert ("my-bucket", "beer", f"assets/beer/{filename}") in store.rows
+        assert s3.list_calls == list_calls
+
+    def test_upload_into_empty_table(self, s3, store, index, manager):
+        """Test the first upload into an empty table keeps the images already in the bucket"""
+        file = MagicMock()
+        file.filename = "label.png"
+        file.file = BytesIO(b"label")
+
+        _, _, new_url = run_async(manager.save("beer", file))
+
+        assert sorted(run_async(manager.list("beer"))) == sorted([url("assets/beer/a.png"), url("assets/beer/b.png"), url("assets/beer/c.png"), new_url])
+
+    def test_reconcile_picks_up_out_of_band_changes(self, s3, store, index, manager):
+        """Test the objects added and removed outside the app are reconciled"""
+        run_async(manager.list("beer"))
+        del s3.objects["assets/beer/a.png"]
+        s3.objects["assets/beer/e.png"] = b"e"
+
+        assert run_async(index.reconcile(manager, "beer")) == (1, 1)
+        assert run_async(manager.list("beer")) == [url("assets/beer/b.png"), url("assets/beer/c.png"), url("assets/beer/e.png")]
+        assert ("my-bucket", "beer", "assets/beer/a.png") not in store.rows
+
+    def test_stale_listing_reloads_from_table(self, s3, store, index, manager):
+        """Test a stale listing is reloaded from the table, picking up the uploads of the other workers"""
+        run_async(manager.list("beer"))
+        list_calls = s3.list_calls
+        run_async(store.add("my-bucket", "beer", {"assets/beer/f.png": url("assets/beer/f.png")}))
+        index.refresh_sec = 0
+
+        assert url("assets/beer/f.png") in run_async(manager.list("beer"))
+        assert s3.list_calls == list_calls
+
+    def test_listings_are_per_type(self, s3, store, index, manager):
+        """Test the images of each type are listed separately"""
+        assert run_async(manager.list("brewery")) == [url("assets/brewery/d.png")]
+        assert len(run_async(manager.list("beer"))) == 3
+
+
+class TestReconcilePeriodically:
+    """Tests for reconcile_periodically"""
+
+    def test_logs_errors_and_continues(self, manager):
+        """Test a failed reconciliation is logged and the next types are still reconciled"""
+        index = MagicMock()
+        index.store = FakeStore()
+        # so the second run is not skipped as a recent reconciliation
+        index.store.mark_reconciled = AsyncMock()
+        index.reconcile = AsyncMock(side_effect=[Exception("boom"), (0, 0), asyncio.CancelledError()])
+
+        with patch.object(listings, "get_index", return_value=index), patch.object(listings, "LOGGER") as mock_logger:
+            with patch("asyncio.sleep", AsyncMock()):
+                with pytest.raises(asyncio.CancelledError):
+                    run_async(listings.reconcile_periodically(manager, ["beer", "brewery"], 1))
+
+        assert index.reconcile.await_count == 3
+        mock_logger.error.assert_called_once()
+
+    def test_skipped_without_the_lock(self, manager):
+        """Test the listings are left to the worker holding the reconciliation lock"""
+        index = MagicMock()
+        index.store = FakeStore(lock_acquired=False)
+        index.reconcile = AsyncMock()
+
+        with patch.object(listings, "get_index", return_value=index):
+            with patch("asyncio.sleep", AsyncMock(side_effect=[None, asyncio.CancelledError()])):
+                with pytest.raises(asyncio.CancelledError):
+                    run_async(listings.reconcile_periodically(manager, ["beer"], 1))
+
+        index.reconcile.assert_not_awaited()
+
+    def test_skipped_when_recently_reconciled(self, manager):
+        """Test a worker taking the lock after another one reconciled within the interval leaves the listings alone"""
+        index = MagicMock()
+        index.store = FakeStore(reconciled_ago=5.0)
+        index.reconcile = AsyncMock()
+
+        with patch.object(listings, "get_index", return_value=index):
+            with patch("asyncio.sleep", AsyncMock(side_effect=[None, asyncio.CancelledError()])):
+                with pytest.raises(asyncio.CancelledError):
+                    run_async(listings.reconcile_periodically(manager, ["beer"], 60))
+
+        index.reconcile.assert_not_awaited()
+        assert index.store.reconciled_ago == 5.0
+
+    def test_records_the_reconciliation(self, manager):
+        """Test the time of the reconciliation is recorded once the last one is older than the interval"""
+        index = MagicMock()
+        index.store = FakeStore(reconciled_ago=61.0)
+        index.reconcile = AsyncMock()
+
+        with patch.object(listings, "get_index", return_value=index):
+            with patch("asyncio.sleep", AsyncMock(side_effect=[None, None, asyncio.CancelledError()])):
+                with pytest.raises(asyncio.CancelledError):
+                    run_async(listings.reconcile_periodically(manager, ["beer"], 60))
+
+        # the second run finds the time recorded by the first one
+        index.reconcile.assert_awaited_once_with(manager, "beer")
+        assert index.store.reconciled_ago == 0.0
+
+    def test_lock_errors_are_logged(self, manager):
+        """Test the reconciler keeps running when the lock can not be taken"""
+        index = MagicMock()
+        index.store.reconcile_lock.side_effect = Exception("database is down")
+        index.reconcile = AsyncMock()
+
+        with patch.object(listings, "get_index", return_value=index), patch.object(listings, "LOGGER") as mock_logger:
+            with patch("asyncio.sleep", AsyncMock(side_effect=[None, asyncio.CancelledError()])):
+                with pytest.raises(asyncio.CancelledError):
+                    run_async(listings.reconcile_periodically(manager, ["beer"], 1))
+
+        mock_logger.error.assert_called_once()
+        index.reconcile.assert_not_awaited()
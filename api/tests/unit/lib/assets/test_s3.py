@@ -1,21 +1,37 @@
 """Tests for lib/assets/s3.py module (S3AssetManager)"""
 
+import asyncio
+import hashlib
 from io import BytesIO
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from botocore.exceptions import ClientError
 
 from lib.assets.s3 import S3AssetManager
 
 
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
 class TestS3AssetManager:
     """Tests for S3AssetManager class"""
 
+    @pytest.fixture(autouse=True)
+    def mock_listings(self):
+        """Keep the listing index out of the database"""
+        with patch("lib.assets.s3.listings") as mock_listings:
+            mock_listings.get_index.return_value.add = AsyncMock()
+            mock_listings.get_index.return_value.list = AsyncMock(return_value=[])
+            yield mock_listings
+
     @pytest.fixture
     def mock_config(self):
         """Create a mock config"""
         config = MagicMock()
-        config.get.side_effect = lambda key: {"uploads.s3.bucket.name": "my-bucket", "uploads.s3.bucket.prefix": "assets"}.get(key)
+        config.get.side_effect = lambda key, default=None: {"uploads.s3.bucket.name": "my-bucket", "uploads.s3.bucket.prefix": "assets"}.get(key, default)
         return config
 
     @pytest.fixture
@@ -37,7 +53,7 @@ class TestS3AssetManager:
         mock_init.return_value = None
         manager = S3AssetManager.__new__(S3AssetManager)
         config = MagicMock()
-        config.get.side_effect = lambda key: {"uploads.s3.bucket.name": "my-bucket", "uploads.s3.bucket.prefix": None}.get(key)
+        config.get.side_effect = lambda key, default=None: {"uploads.s3.bucket.name": "my-bucket", "uploads.s3.bucket.prefix": None}.get(key, default)
         manager.config = config
         manager.logger = MagicMock()
         manager.bucket = "my-bucket"
@@ -72,16 +88,18 @@ class TestS3AssetManager:
         mock_s3.list_objects_v2.return_value = {
             "IsTruncated": False,
             "Contents": [
-                {"Key": "beer/image1.png"},
-                {"Key": "beer/image2.jpg"},
+                {"Key": "assets/beer/image1.png"},
+                {"Key": "assets/beer/image2.jpg"},
             ],
         }
 
-        result = manager.list("beer")
+        result = run_async(manager.list_objects("beer"))
 
-        assert len(result) == 2
-        assert "https://my-bucket.s3.amazonaws.com/beer/image1.png" in result
-        assert "https://my-bucket.s3.amazonaws.com/beer/image2.jpg" in result
+        assert mock_s3.list_objects_v2.call_args.kwargs["Prefix"] == "assets/beer/"
+        assert result == {
+            "assets/beer/image1.png": "https://my-bucket.s3.amazonaws.com/assets/beer/image1.png",
+            "assets/beer/image2.jpg": "https://my-bucket.s3.amazonaws.com/assets/beer/image2.jpg",
+        }
 
     @patch("lib.assets.s3.aws")
     def test_list_excludes_prefix_only(self, mock_aws, manager):
@@ -91,15 +109,14 @@ class TestS3AssetManager:
         mock_s3.list_objects_v2.return_value = {
             "IsTruncated": False,
             "Contents": [
-                {"Key": "beer/"},  # Prefix-only entry
-                {"Key": "beer/image.png"},
+                {"Key": "assets/beer/"},  # Prefix-only entry
+                {"Key": "assets/beer/image.png"},
             ],
         }
 
-        result = manager.list("beer")
+        result = run_async(manager.list_objects("beer"))
 
-        assert len(result) == 1
-        assert "image.png" in result[0]
+        assert list(result) == ["assets/beer/image.png"]
 
     @patch("lib.assets.s3.aws")
     def test_list_pagination(self, mock_aws, manager):
@@ -117,7 +134,7 @@ class TestS3AssetManager:
             },
         ]
 
-        result = manager.list("beer")
+        result = run_async(manager.list_objects("beer"))
 
         assert len(result) == 2
         assert mock_s3.list_objects_v2.call_count == 2
@@ -129,9 +146,9 @@ class TestS3AssetManager:
         mock_aws.client.return_value = mock_s3
         mock_s3.list_objects_v2.return_value = {"IsTruncated": False, "Contents": None}
 
-        result = manager.list("beer")
+        result = run_async(manager.list_objects("beer"))
 
-        assert result == []
+        assert result == {}
 
     @patch("lib.assets.s3.aws")
     def test_save_flask_file(self, mock_aws, manager):
@@ -143,12 +160,15 @@ class TestS3AssetManager:
         mock_file = MagicMock(spec=["filename", "read", "seek"])
         mock_file.filename = "original.png"
 
-        with patch.object(manager, "generate_random_filename", return_value="uuid.png"):
-            old_name, new_name, url = manager.save("beer", mock_file)
+        stream = BytesIO(b"file content")
+        mock_file.read.side_effect = stream.read
+        mock_file.seek.side_effect = stream.seek
+
+        old_name, new_name, url = run_async(manager.save("beer", mock_file))
 
         assert old_name == "original.png"
-        assert new_name == "uuid.png"
-        assert "uuid.png" in url
+        assert new_name == f"{hashlib.sha256(b'file content').hexdigest()}.png"
+        assert url == f"https://my-bucket.s3.amazonaws.com/assets/beer/{new_name}"
         mock_s3.upload_fileobj.assert_called_once()
 
     @patch("lib.assets.s3.aws")
@@ -162,12 +182,94 @@ class TestS3AssetManager:
         mock_file.filename = "original.jpg"
         mock_file.file = BytesIO(b"file content")
 
-        with patch.object(manager, "generate_random_filename", return_value="uuid.jpg"):
-            old_name, new_name, url = manager.save("beer", mock_file)
+        old_name, new_name, url = run_async(manager.save("beer", mock_file))
 
         assert old_name == "original.jpg"
-        assert new_name == "uuid.jpg"
+        assert new_name == f"{hashlib.sha256(b'file content').hexdigest()}.jpg"
         # Should use the .file attribute for FastAPI
         mock_s3.upload_fileobj.assert_called_once()
         call_args = mock_s3.upload_fileobj.call_args
         assert call_args[0][0] == mock_file.file
+        assert call_args[0][2] == f"assets/beer/{new_name}"
+        assert call_args.kwargs["ExtraArgs"] == {"CacheControl": "public, max-age=31536000, immutable"}
+
+    @patch("lib.assets.s3.aws")
+    def test_save_adds_to_listings(self, mock_aws, manager, mock_listings):
+        """Test uploads are written through to the listing index"""
+        mock_aws.client.return_value = MagicMock()
+        mock_file = MagicMock()
+        mock_file.filename = "original.jpg"
+        mock_file.file = BytesIO(b"file content")
+
+        _, new_name, url = run_async(manager.save("beer", mock_file))
+
+        mock_listings.get_index.return_value.add.assert_awaited_once_with(manager, "beer", f"assets/beer/{new_name}", url)
+
+    def test_list_uses_listings(self, manager, mock_listings):
+        """Test images are listed from the listing index rather than the bucket"""
+        mock_listings.get_index.return_value.list.return_value = ["https://my-bucket.s3.amazonaws.com/assets/beer/image.png"]
+
+        result = run_async(manager.list("beer"))
+
+        assert result == ["https://my-bucket.s3.amazonaws.com/assets/beer/image.png"]
+        mock_listings.get_index.return_value.list.assert_awaited_once_with(manager, "beer")
+
+    @patch("lib.assets.s3.aws")
+    def test_save_uses_multipart_upload(self, mock_aws, manager):
+        """Test uploads are sent as multipart uploads of the configured part size"""
+        mock_s3 = MagicMock()
+        mock_aws.client.return_value = mock_s3
+        manager.config.get.side_effect = lambda key, default=None: {"uploads.s3.multipart_chunk_size_mb": 16, "uploads.s3.max_concurrency": 2}.get(key, default)
+
+        mock_file = MagicMock()
+        mock_file.filename = "original.jpg"
+        mock_file.file = BytesIO(b"file content")
+
+        run_async(manager.save("beer", mock_file))
+
+        transfer_config = mock_s3.upload_fileobj.call_args.kwargs["Config"]
+        assert transfer_config.multipart_threshold == 16 * 1024 * 1024
+        assert transfer_config.multipart_chunksize == 16 * 1024 * 1024
+        assert transfer_config.max_concurrency == 2
+
+    @patch("lib.assets.s3.aws")
+    def test_save_derivatives(self, mock_aws, manager):
+        """Test derivatives are stored next to the originals, with their content type and immutable cache headers"""
+        mock_s3 = MagicMock()
+        mock_aws.client.return_value = mock_s3
+
+        run_async(manager.save_derivatives("beer", "a" * 64, {"tile.webp": b"webp"}))
+
+        mock_s3.put_object.assert_called_once_with(
+            Bucket="my-bucket",
+            Key=f"assets/beer/derived/{'a' * 64}/tile.webp",
+            Body=b"webp",
+            ContentType="image/webp",
+            CacheControl="public, max-age=31536000, immutable",
+        )
+
+    @patch("lib.assets.s3.aws")
+    def test_get_derivative(self, mock_aws, manager):
+        """Test the URL of a stored derivative is returned, None when it is missing"""
+        mock_s3 = MagicMock()
+        mock_aws.client.return_value = mock_s3
+
+        url = run_async(manager.get_derivative("beer", "a" * 64, "tile.webp"))
+        assert url == f"https://my-bucket.s3.amazonaws.com/assets/beer/derived/{'a' * 64}/tile.webp"
+
+        mock_s3.head_object.side_effect = ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        assert run_async(manager.get_derivative("beer", "a" * 64, "tile.webp")) is None
+
+    @patch("lib.assets.s3.aws")
+    def test_list_excludes_derivatives(self, mock_aws, manager):
+        """Test the derivatives are not listed with the uploaded images"""
+        mock_s3 = MagicMock()
+        mock_aws.client.return_value = mock_s3
+        mock_s3.list_objects_v2.return_value = {
+            "IsTruncated": False,
+            "Contents": [{"Key": "assets/beer/image.png"}, {"Key": f"assets/beer/derived/{'a' * 64}/tile.webp"}],
+        }
+
+        result = run_async(manager.list_objects("beer"))
+
+        assert list(result) == ["assets/beer/image.png"]
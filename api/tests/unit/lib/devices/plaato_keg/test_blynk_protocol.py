@@ -118,6 +118,20 @@ class TestDecode:
         assert messages[0].command == BlynkCommand.HARDWARE
         assert messages[1].command == BlynkCommand.PROPERTY
 
+    def test_decode_from_buffer(self):
+        """Test decoding from a bytearray or a view, the bodies are copied out as bytes"""
+        body = b"vw\x0048\x0050"
+        frame = struct.pack(">BHH", BlynkCommand.HARDWARE, 1, len(body)) + body
+
+        for wrap in (bytearray, lambda data: memoryview(bytearray(data))):
+            buffer = wrap(frame)
+            messages = decode(buffer)
+            # the buffer is reused for the next read
+            buffer[-1] = ord("1")
+
+            assert type(messages[0].body) is bytes
+            assert messages[0].body == body
+
     def test_decode_internal_message(self):
         """Test decoding an internal message"""
         body = b"ver\x001.0.0\x00dev\x00plaato"
@@ -265,3 +279,31 @@ class TestRoundTrip:
         assert messages[0].command == BlynkCommand.HARDWARE
         assert messages[0].msg_id == 123
         assert messages[0].body == original_body
+
+
+class TestDecodeLookups:
+    """Tests for the table driven command/status lookups in decode"""
+
+    def test_decode_unknown_status(self):
+        """Test an unknown response status is kept as a string"""
+        data = struct.pack(">BHH", BlynkCommand.RESPONSE, 7, 999)
+
+        messages = decode(data)
+
+        assert messages[0].status == "unknown_status_999"
+
+    def test_decode_memoryview(self):
+        """Test frames can be decoded from a memoryview without copying the buffer first"""
+        body = b"vw\x0048\x0050"
+        data = struct.pack(">BHH", BlynkCommand.HARDWARE, 1, len(body)) + body
+
+        messages = decode(memoryview(data))
+
+        assert messages[0].command == BlynkCommand.HARDWARE
+        assert bytes(messages[0].body) == body
+
+    def test_message_is_slotted(self):
+        """Test messages do not carry a per instance __dict__"""
+        msg = BlynkMessage(command=BlynkCommand.HARDWARE, msg_id=1)
+
+        assert not hasattr(msg, "__dict__")
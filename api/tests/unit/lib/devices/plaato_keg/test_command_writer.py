@@ -1,12 +1,10 @@
 """Tests for command_writer module"""
 
 import asyncio
-import struct
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from lib.devices.plaato_keg.blynk_protocol import BlynkCommand
 from lib.devices.plaato_keg.command_writer import COMMAND_MAPP, Commands, CommandWriter, command_from_pin, sanitize_command
 from lib.devices.plaato_keg.plaato_protocol import PlaatoPin
 
@@ -122,7 +120,7 @@ class TestCommandWriter:
     def mock_connection_handler(self):
         """Create a mock connection handler"""
         handler = MagicMock()
-        handler.send_command_to_keg = AsyncMock(return_value=True)
+        handler.send_hardware_commands = AsyncMock(return_value=True)
         return handler
 
     @pytest.fixture
@@ -133,51 +131,28 @@ class TestCommandWriter:
     def test_init(self, command_writer, mock_connection_handler):
         """Test CommandWriter initialization"""
         assert command_writer.connection_handler == mock_connection_handler
-        assert command_writer.msg_id_counter == 1
-
-    def test_get_next_msg_id(self, command_writer):
-        """Test message ID counter increments"""
-        assert command_writer._get_next_msg_id() == 1
-        assert command_writer._get_next_msg_id() == 2
-        assert command_writer._get_next_msg_id() == 3
-
-    def test_get_next_msg_id_wraps(self, command_writer):
-        """Test message ID counter wraps at 65535"""
-        command_writer.msg_id_counter = 65535
-        assert command_writer._get_next_msg_id() == 65535
-        assert command_writer._get_next_msg_id() == 1  # Wraps
 
     def test_send_hardware_command(self, command_writer, mock_connection_handler):
         """Test sending hardware command"""
         result = run_async(command_writer._send_hardware_command("device123", PlaatoPin.MODE, "01"))
 
         assert result is True
-        mock_connection_handler.send_command_to_keg.assert_called_once()
-
-        # Verify the command was encoded correctly
-        call_args = mock_connection_handler.send_command_to_keg.call_args
-        device_id = call_args[0][0]
-        command_bytes = call_args[0][1]
-
-        assert device_id == "device123"
-
-        # Verify it's a valid Blynk HARDWARE command
-        cmd, msg_id, length = struct.unpack(">BHH", command_bytes[:5])
-        assert cmd == BlynkCommand.HARDWARE
+        mock_connection_handler.send_hardware_commands.assert_called_once()
+        assert mock_connection_handler.send_hardware_commands.call_args[0] == ("device123", [(PlaatoPin.MODE, "01")])
 
     def test_send_command_set_mode(self, command_writer, mock_connection_handler):
         """Test sending SET_MODE command"""
         result = run_async(command_writer.send_command("device123", Commands.SET_MODE, "1"))
 
         assert result is True
-        mock_connection_handler.send_command_to_keg.assert_called_once()
+        mock_connection_handler.send_hardware_commands.assert_called_once()
 
     def test_send_command_sanitizes(self, command_writer, mock_connection_handler):
         """Test that send_command sanitizes command name"""
         result = run_async(command_writer.send_command("device123", "SET_MODE", "1"))
 
         assert result is True
-        mock_connection_handler.send_command_to_keg.assert_called_once()
+        mock_connection_handler.send_hardware_commands.assert_called_once()
 
     def test_send_command_unknown_returns_false(self, command_writer):
         """Test sending unknown command returns False"""
@@ -199,7 +174,7 @@ class TestCommandWriter:
 
     def test_send_hardware_command_failure(self, command_writer, mock_connection_handler):
         """Test handling send failure"""
-        mock_connection_handler.send_command_to_keg = AsyncMock(return_value=False)
+        mock_connection_handler.send_hardware_commands = AsyncMock(return_value=False)
 
         result = run_async(command_writer._send_hardware_command("device123", PlaatoPin.MODE, "01"))
 
@@ -218,40 +193,71 @@ class TestCommandWriter:
         result = run_async(command_writer.send_command("device123", Commands.SET_EMPTY_KEG_WEIGHT, 5.0))
 
         assert result is True
-
-        # Verify the command was sent
-        call_args = mock_connection_handler.send_command_to_keg.call_args
-        command_bytes = call_args[0][1]
-
-        # The body should contain the string "5.0"
-        assert b"5.0" in command_bytes
+        assert mock_connection_handler.send_hardware_commands.call_args[0][1] == [(PlaatoPin.EMPTY_KEG_WEIGHT, "5.0")]
 
 
-class TestCommandWriterMessageIdSequence:
-    """Tests for message ID sequence in CommandWriter"""
+class TestCommandWriterDelivery:
+    """Tests for acknowledged and batched command delivery"""
 
     @pytest.fixture
     def mock_connection_handler(self):
         """Create a mock connection handler"""
         handler = MagicMock()
-        handler.send_command_to_keg = AsyncMock(return_value=True)
+        handler.send_hardware_commands = AsyncMock(return_value=True)
         return handler
 
-    def test_sequential_commands_have_different_ids(self, mock_connection_handler):
-        """Test that sequential commands have different message IDs"""
-        writer = CommandWriter(mock_connection_handler)
+    def test_waits_for_acks(self, mock_connection_handler):
+        """Test the acknowledgement timeout is passed along to the connection handler"""
+        writer = CommandWriter(mock_connection_handler, ack_timeout=3, retries=0)
+
+        result = run_async(writer.send_command("device", Commands.SET_MODE, "1"))
+
+        assert result is True
+        assert mock_connection_handler.send_hardware_commands.call_args[1] == {"ack_timeout": 3}
+
+    def test_no_ack_timeout_does_not_wait(self, mock_connection_handler):
+        """Test acknowledgements are not waited on when the timeout is disabled"""
+        writer = CommandWriter(mock_connection_handler, ack_timeout=0, retries=0)
 
         run_async(writer.send_command("device", Commands.SET_MODE, "1"))
-        run_async(writer.send_command("device", Commands.SET_UNIT, "1"))
-        run_async(writer.send_command("device", Commands.SET_MEASURE_UNIT, "1"))
-
-        # Extract message IDs from the calls
-        msg_ids = []
-        for call in mock_connection_handler.send_command_to_keg.call_args_list:
-            command_bytes = call[0][1]
-            _, msg_id, _ = struct.unpack(">BHH", command_bytes[:5])
-            msg_ids.append(msg_id)
-
-        # All message IDs should be unique
-        assert len(msg_ids) == len(set(msg_ids))
-        assert msg_ids == [1, 2, 3]
+
+        assert mock_connection_handler.send_hardware_commands.call_args[1] == {"ack_timeout": None}
+
+    def test_send_commands_batches_into_one_write(self, mock_connection_handler):
+        """Test several commands are sent together"""
+        writer = CommandWriter(mock_connection_handler, ack_timeout=3, retries=0)
+
+        result = run_async(writer.send_commands("device", [(Commands.SET_UNIT, "1"), (Commands.SET_MEASURE_UNIT, "2")]))
+
+        assert result is True
+        mock_connection_handler.send_hardware_commands.assert_called_once()
+        assert mock_connection_handler.send_hardware_commands.call_args[0][1] == [(PlaatoPin.UNIT, "01"), (PlaatoPin.MEASURE_UNIT, "02")]
+
+    def test_send_commands_invalid_command(self, mock_connection_handler):
+        """Test nothing is sent when one of the commands is invalid"""
+        writer = CommandWriter(mock_connection_handler, ack_timeout=3, retries=0)
+
+        result = run_async(writer.send_commands("device", [(Commands.SET_UNIT, "1"), ("unknown-command", "2")]))
+
+        assert result is False
+        mock_connection_handler.send_hardware_commands.assert_not_called()
+
+    def test_retries(self, mock_connection_handler):
+        """Test commands that were not acknowledged are sent again"""
+        mock_connection_handler.send_hardware_commands = AsyncMock(side_effect=[False, True])
+        writer = CommandWriter(mock_connection_handler, ack_timeout=3, retries=2)
+
+        result = run_async(writer.send_command("device", Commands.SET_MODE, "1"))
+
+        assert result is True
+        assert mock_connection_handler.send_hardware_commands.call_count == 2
+
+    def test_retries_exhausted(self, mock_connection_handler):
+        """Test failure is reported once all retries are used"""
+        mock_connection_handler.send_hardware_commands = AsyncMock(return_value=False)
+        writer = CommandWriter(mock_connection_handler, ack_timeout=3, retries=1)
+
+        result = run_async(writer.send_command("device", Commands.SET_MODE, "1"))
+
+        assert result is False
+        assert mock_connection_handler.send_hardware_commands.call_count == 2
@@ -0,0 +1,254 @@
+"""Tests for connection_handler module"""
+
+import asyncio
+import struct
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from lib.devices.plaato_keg import blynk_protocol
+from lib.devices.plaato_keg.blynk_protocol import BlynkCommand, BlynkStatus
+from lib.devices.plaato_keg.connection_handler import ConnectionHandler, ConnectionState
+from lib.devices.plaato_keg.plaato_protocol import PlaatoPin
+
+
+# Helper to run async functions in sync tests
+def run_async(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def create_state(connection_id, device_id=None, last_seen=0.0):
+    writer = MagicMock()
+    writer.wait_closed = AsyncMock()
+    return ConnectionState(device_id=device_id, writer=writer, connection_id=connection_id, last_seen=last_seen)
+
+
+@pytest.fixture
+def handler():
+    return ConnectionHandler()
+
+
+def add_connection(handler, connection_id, device_id=None, last_seen=0.0):
+    state = create_state(connection_id, last_seen=last_seen)
+    handler.connections[connection_id] = state
+    if device_id:
+        state.device_id = device_id
+        handler._register_device_connection(device_id, state)
+    return state
+
+
+class TestDeviceRegistry:
+    """Tests for the device id -> connection ids index"""
+
+    def test_register(self, handler):
+        """Test registering a connection indexes it by device id"""
+        state = add_connection(handler, "1.1.1.1:1", "keg1")
+
+        assert handler.device_connections == {"keg1": {"1.1.1.1:1"}}
+        assert handler.socket_registry["keg1"] is state
+        assert handler.get_registered_device_ids() == {"keg1"}
+
+    def test_cleanup_last_connection_unregisters_device(self, handler):
+        """Test the device is removed when its only connection closes"""
+        state = add_connection(handler, "1.1.1.1:1", "keg1")
+
+        run_async(handler._cleanup_connection("1.1.1.1:1", state))
+
+        assert handler.device_connections == {}
+        assert handler.socket_registry == {}
+        assert handler.connections == {}
+        state.writer.close.assert_called_once()
+
+    def test_cleanup_keeps_device_with_other_connection(self, handler):
+        """Test the device stays registered while another connection for it is open"""
+        old_state = add_connection(handler, "1.1.1.1:1", "keg1")
+        new_state = add_connection(handler, "1.1.1.1:2", "keg1")
+
+        run_async(handler._cleanup_connection("1.1.1.1:1", old_state))
+
+        assert handler.device_connections == {"keg1": {"1.1.1.1:2"}}
+        assert handler.socket_registry["keg1"] is new_state
+
+    def test_cleanup_registered_socket_falls_back_to_remaining(self, handler):
+        """Test commands are routed to the remaining connection when the registered one closes"""
+        first_state = add_connection(handler, "1.1.1.1:1", "keg1")
+        second_state = add_connection(handler, "1.1.1.1:2", "keg1")
+        handler.socket_registry["keg1"] = first_state
+
+        run_async(handler._cleanup_connection("1.1.1.1:1", first_state))
+
+        assert handler.socket_registry["keg1"] is second_state
+
+    def test_cleanup_unregistered_connection(self, handler):
+        """Test cleaning up a connection that never identified its device"""
+        state = add_connection(handler, "1.1.1.1:1")
+
+        run_async(handler._cleanup_connection("1.1.1.1:1", state))
+
+        assert handler.connections == {}
+        assert handler.device_connections == {}
+
+    def test_cleanup_is_idempotent(self, handler):
+        """Test cleaning up the same connection twice is harmless"""
+        state = add_connection(handler, "1.1.1.1:1", "keg1")
+
+        run_async(handler._cleanup_connection("1.1.1.1:1", state))
+        run_async(handler._cleanup_connection("1.1.1.1:1", state))
+
+        assert handler.device_connections == {}
+
+
+class TestIdleReaper:
+    """Tests for closing idle connections"""
+
+    def test_closes_only_idle_connections(self, handler):
+        """Test connections past the idle timeout are closed"""
+        handler.idle_timeout = 300
+        idle = add_connection(handler, "1.1.1.1:1", "keg1", last_seen=0.0)
+        active = add_connection(handler, "1.1.1.1:2", "keg2", last_seen=900.0)
+
+        cnt = handler.close_idle_connections(now=1000.0)
+
+        assert cnt == 1
+        assert idle.timed_out is True
+        idle.writer.close.assert_called_once()
+        assert active.timed_out is False
+        active.writer.close.assert_not_called()
+
+    def test_does_not_close_twice(self, handler):
+        """Test an already timed out connection is not closed again"""
+        handler.idle_timeout = 300
+        idle = add_connection(handler, "1.1.1.1:1", "keg1", last_seen=0.0)
+
+        handler.close_idle_connections(now=1000.0)
+        cnt = handler.close_idle_connections(now=2000.0)
+
+        assert cnt == 0
+        idle.writer.close.assert_called_once()
+
+
+class TestCommandAcks:
+    """Tests for waiting on the keg to acknowledge commands"""
+
+    def test_ack_success(self, handler):
+        """Test the command succeeds once the keg acknowledges every message"""
+        state = add_connection(handler, "1.1.1.1:1", "keg1")
+        state.writer.drain = AsyncMock()
+
+        async def _run():
+            task = asyncio.create_task(handler.send_command_to_keg("keg1", b"cmd", ack_msg_ids=[1, 2], ack_timeout=1))
+            await asyncio.sleep(0)
+            handler._resolve_ack("keg1", 1, BlynkStatus.SUCCESS)
+            handler._resolve_ack("keg1", 2, BlynkStatus.SUCCESS)
+            return await task
+
+        assert run_async(_run()) is True
+        state.writer.write.assert_called_once_with(b"cmd")
+        assert handler.pending_acks == {}
+
+    def test_ack_failure_status(self, handler):
+        """Test the command fails when the keg responds with an error status"""
+        state = add_connection(handler, "1.1.1.1:1", "keg1")
+        state.writer.drain = AsyncMock()
+
+        async def _run():
+            task = asyncio.create_task(handler.send_command_to_keg("keg1", b"cmd", ack_msg_ids=[1], ack_timeout=1))
+            await asyncio.sleep(0)
+            handler._resolve_ack("keg1", 1, BlynkStatus.ILLEGAL_COMMAND)
+            return await task
+
+        assert run_async(_run()) is False
+
+    def test_ack_timeout(self, handler):
+        """Test the command fails when the keg never acknowledges it"""
+        state = add_connection(handler, "1.1.1.1:1", "keg1")
+        state.writer.drain = AsyncMock()
+
+        assert run_async(handler.send_command_to_keg("keg1", b"cmd", ack_msg_ids=[1], ack_timeout=0.01)) is False
+        assert handler.pending_acks == {}
+
+    def test_disconnect_fails_pending_acks(self, handler):
+        """Test commands waiting on a keg fail as soon as the keg disconnects"""
+        state = add_connection(handler, "1.1.1.1:1", "keg1")
+        state.writer.drain = AsyncMock()
+
+        async def _run():
+            task = asyncio.create_task(handler.send_command_to_keg("keg1", b"cmd", ack_msg_ids=[1], ack_timeout=10))
+            await asyncio.sleep(0)
+            await handler._cleanup_connection("1.1.1.1:1", state)
+            return await task
+
+        assert run_async(_run()) is False
+
+
+class TestHardwareCommands:
+    """Tests for encoding hardware commands, with the message IDs allocated by the process owning the sockets"""
+
+    def test_get_next_msg_id(self, handler):
+        """Test message ID counter increments"""
+        assert handler._get_next_msg_id() == 1
+        assert handler._get_next_msg_id() == 2
+        assert handler._get_next_msg_id() == 3
+
+    def test_get_next_msg_id_wraps(self, handler):
+        """Test message ID counter wraps at 65535"""
+        handler.msg_id_counter = 65535
+        assert handler._get_next_msg_id() == 65535
+        assert handler._get_next_msg_id() == 1
+
+    def test_encodes_commands_into_one_write(self, handler):
+        """Test the pin values are encoded as Blynk HARDWARE commands sent in a single write and acknowledged by their message IDs"""
+        handler.send_command_to_keg = AsyncMock(return_value=True)
+
+        result = run_async(handler.send_hardware_commands("keg1", [(PlaatoPin.UNIT, "01"), (PlaatoPin.EMPTY_KEG_WEIGHT, "5.0")], ack_timeout=3))
+
+        assert result is True
+        device_id, command = handler.send_command_to_keg.call_args[0]
+        assert device_id == "keg1"
+        cmd, first_id, first_len = struct.unpack(">BHH", command[:5])
+        _, second_id, _ = struct.unpack(">BHH", command[5 + first_len : 10 + first_len])
+        assert cmd == BlynkCommand.HARDWARE
+        assert command[5 : 5 + first_len] == f"vw\x00{PlaatoPin.UNIT}\x0001".encode()
+        assert b"5.0" in command
+        assert handler.send_command_to_keg.call_args[1] == {"ack_msg_ids": [first_id, second_id], "ack_timeout": 3}
+
+    def test_without_ack_timeout(self, handler):
+        """Test acknowledgements are not waited on without a timeout"""
+        handler.send_command_to_keg = AsyncMock(return_value=True)
+
+        run_async(handler.send_hardware_commands("keg1", [(PlaatoPin.MODE, "01")]))
+
+        assert handler.send_command_to_keg.call_args[1] == {}
+
+    def test_sends_have_unique_msg_ids(self, handler):
+        """Test every command sent, including a batch resent after a missing acknowledgement, gets a new message ID"""
+        handler.send_command_to_keg = AsyncMock(return_value=False)
+
+        run_async(handler.send_hardware_commands("keg1", [(PlaatoPin.MODE, "01")], ack_timeout=1))
+        run_async(handler.send_hardware_commands("keg1", [(PlaatoPin.MODE, "01")], ack_timeout=1))
+        run_async(handler.send_hardware_commands("keg2", [(PlaatoPin.UNIT, "01")], ack_timeout=1))
+
+        ack_ids = [call[1]["ack_msg_ids"] for call in handler.send_command_to_keg.call_args_list]
+        assert ack_ids == [[1], [2], [3]]
+
+
+class TestIngestionStats:
+    """Tests for the frame and decode error counters"""
+
+    def test_counts_frames_and_decode_errors(self, handler):
+        """Test the frames read and the reads that could not be processed are counted"""
+        frames = blynk_protocol.encode_command(BlynkCommand.PING, 1) + blynk_protocol.encode_command(BlynkCommand.PING, 2)
+        reader = MagicMock()
+        reader.read = AsyncMock(side_effect=[frames, b""])
+        writer = MagicMock()
+        writer.get_extra_info.return_value = ("1.1.1.1", 1)
+        writer.drain = AsyncMock()
+        writer.wait_closed = AsyncMock()
+
+        with patch("lib.devices.plaato_keg.connection_handler.DataProcessor") as mock_processor:
+            mock_processor.return_value.process_data = AsyncMock(return_value=False)
+            run_async(handler.handle_connection(reader, writer))
+
+        stats = handler.get_ingestion_stats()
+        assert stats["frames_received"] == 2
+        assert stats["decode_errors"] == 1
@@ -0,0 +1,93 @@
+"""Tests for data_processor module"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from lib.devices.plaato_keg.data_processor import DataProcessor
+from lib.devices.plaato_keg.ingestion_queue import IngestionRecord
+from lib.devices.plaato_keg.plaato_protocol import PlaatoPin
+
+
+# Helper to run async functions in sync tests
+def run_async(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@asynccontextmanager
+async def fake_session_scope(_config):
+    yield MagicMock()
+
+
+class TestPersist:
+    """Tests for DataProcessor.persist"""
+
+    def test_reading_saved_before_the_overrides(self):
+        """Test the reading is written before the user overrides are applied"""
+        calls = []
+        record = IngestionRecord("keg1", {"amount_left": "10"}, {str(PlaatoPin.UNIT): "1"})
+
+        with patch.object(DataProcessor, "_save_to_db", AsyncMock(side_effect=lambda *_: calls.append("save"))), patch.object(
+            DataProcessor, "_apply_user_overrides", AsyncMock(side_effect=lambda *_: calls.append("overrides"))
+        ):
+            run_async(DataProcessor.persist(record))
+
+        assert calls == ["save", "overrides"]
+
+    def test_no_overrides(self):
+        """Test the overrides are not looked up when the reading has none"""
+        record = IngestionRecord("keg1", {"amount_left": "10"})
+
+        with patch.object(DataProcessor, "_save_to_db", AsyncMock()) as mock_save, patch.object(
+            DataProcessor, "_apply_user_overrides", AsyncMock()
+        ) as mock_apply:
+            run_async(DataProcessor.persist(record))
+
+        mock_save.assert_awaited_once_with("keg1", {"amount_left": "10"})
+        mock_apply.assert_not_called()
+
+
+class TestApplyUserOverrides:
+    """Tests for DataProcessor._apply_user_overrides"""
+
+    def test_commands_sent_in_the_background(self):
+        """Test the override commands are not waited for and are tracked until they are acknowledged"""
+        acked = asyncio.Event()
+
+        async def send_commands(_device_id, _cmds):
+            await acked.wait()
+            return True
+
+        command_writer = MagicMock()
+        command_writer.send_commands = AsyncMock(side_effect=send_commands)
+        dev = MagicMock()
+        dev.to_dict.return_value = {"user_unit": "2"}
+
+        async def _run():
+            with patch("lib.devices.plaato_keg.data_processor.async_session_scope", fake_session_scope), patch(
+                "lib.devices.plaato_keg.data_processor.PlaatoDataDB.get_by_pkey", AsyncMock(return_value=dev)
+            ), patch("lib.devices.plaato_keg.service_handler") as service_handler:
+                service_handler.command_writer = command_writer
+                await DataProcessor._apply_user_overrides("keg1", {str(PlaatoPin.UNIT): "1"})
+
+            assert len(DataProcessor._command_tasks) == 1
+            acked.set()
+            await asyncio.gather(*DataProcessor._command_tasks)
+
+        run_async(_run())
+
+        assert not DataProcessor._command_tasks
+        command_writer.send_commands.assert_awaited_once_with("keg1", [("set-unit", "2")])
+
+    def test_matching_values_send_nothing(self):
+        """Test no command is sent when the keg already has the user values"""
+        dev = MagicMock()
+        dev.to_dict.return_value = {"user_unit": "1"}
+
+        with patch("lib.devices.plaato_keg.data_processor.async_session_scope", fake_session_scope), patch(
+            "lib.devices.plaato_keg.data_processor.PlaatoDataDB.get_by_pkey", AsyncMock(return_value=dev)
+        ), patch("lib.devices.plaato_keg.service_handler") as service_handler:
+            run_async(DataProcessor._apply_user_overrides("keg1", {str(PlaatoPin.UNIT): "1"}))
+
+        service_handler.command_writer.send_commands.assert_not_called()
+        assert not DataProcessor._command_tasks
@@ -0,0 +1,158 @@
+"""Tests for ingestion_queue module"""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from lib.devices.plaato_keg.ingestion_queue import IngestionQueue, IngestionRecord, OverflowPolicy
+
+
+# Helper to run async functions in sync tests
+def run_async(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+class TestIngestionRecord:
+    """Tests for IngestionRecord"""
+
+    def test_merge_latest_value_wins(self):
+        """Test that merging keeps the newest value for each key"""
+        record = IngestionRecord("keg1", {"amount_left": "10", "keg_temperature": "4"}, {"71": "1"})
+        record.merge(IngestionRecord("keg1", {"amount_left": "9"}, {"71": "2"}))
+
+        assert record.data == {"amount_left": "9", "keg_temperature": "4"}
+        assert record.user_overrideable == {"71": "2"}
+
+    def test_user_overrideable_defaults_to_empty(self):
+        """Test user_overrideable defaults to an empty dict"""
+        record = IngestionRecord("keg1", {})
+        assert record.user_overrideable == {}
+
+
+class TestIngestionQueue:
+    """Tests for IngestionQueue"""
+
+    def test_init_from_args(self):
+        """Test explicit constructor arguments are used"""
+        queue = IngestionQueue(AsyncMock(), max_size=5, workers=2, overflow_policy="block")
+
+        assert queue.max_size == 5
+        assert queue.worker_count == 2
+        assert queue.overflow_policy == OverflowPolicy.BLOCK
+
+    def test_init_invalid_policy(self):
+        """Test an invalid overflow policy raises"""
+        with pytest.raises(ValueError):
+            IngestionQueue(AsyncMock(), max_size=5, workers=1, overflow_policy="nope")
+
+    def test_put_coalesces_per_device(self):
+        """Test multiple records for the same keg only take one queue slot"""
+        queue = IngestionQueue(AsyncMock(), max_size=5, workers=1)
+
+        async def _run():
+            await queue.put(IngestionRecord("keg1", {"amount_left": "10"}))
+            await queue.put(IngestionRecord("keg1", {"amount_left": "9"}))
+
+        run_async(_run())
+
+        assert queue.depth() == 1
+        assert queue.coalesced == 1
+        assert queue._pending["keg1"].data == {"amount_left": "9"}
+
+    def test_drop_oldest(self):
+        """Test the oldest keg is dropped when the queue is full"""
+        queue = IngestionQueue(AsyncMock(), max_size=2, workers=1, overflow_policy="drop_oldest")
+
+        async def _run():
+            for keg in ["keg1", "keg2", "keg3"]:
+                await queue.put(IngestionRecord(keg, {"amount_left": "1"}))
+
+        run_async(_run())
+
+        assert queue.depth() == 2
+        assert queue.dropped == 1
+        assert set(queue._pending.keys()) == {"keg2", "keg3"}
+
+    def test_drop_newest(self):
+        """Test the incoming keg is dropped when the queue is full"""
+        queue = IngestionQueue(AsyncMock(), max_size=2, workers=1, overflow_policy="drop_newest")
+
+        async def _run():
+            for keg in ["keg1", "keg2", "keg3"]:
+                await queue.put(IngestionRecord(keg, {"amount_left": "1"}))
+
+        run_async(_run())
+
+        assert queue.depth() == 2
+        assert queue.dropped == 1
+        assert set(queue._pending.keys()) == {"keg1", "keg2"}
+
+    def test_workers_persist_records(self):
+        """Test the workers drain the queue and persist each record"""
+        persist_fn = AsyncMock()
+        queue = IngestionQueue(persist_fn, max_size=10, workers=2)
+
+        async def _run():
+            queue.start()
+            await queue.put(IngestionRecord("keg1", {"amount_left": "10"}))
+            await queue.put(IngestionRecord("keg2", {"amount_left": "5"}))
+            await queue.stop()
+
+        run_async(_run())
+
+        assert persist_fn.call_count == 2
+        assert queue.processed == 2
+        assert queue.depth() == 0
+        assert not queue.running
+
+    def test_record_arriving_during_write_is_persisted_after(self):
+        """Test a record for a keg that is being written is persisted once the write finishes"""
+        persisted = []
+        queue = None
+
+        async def persist_fn(record):
+            persisted.append(dict(record.data))
+            if len(persisted) == 1:
+                await queue.put(IngestionRecord("keg1", {"amount_left": "8"}))
+
+        queue = IngestionQueue(persist_fn, max_size=10, workers=2)
+
+        async def _run():
+            queue.start()
+            await queue.put(IngestionRecord("keg1", {"amount_left": "10"}))
+            await queue.stop()
+
+        run_async(_run())
+
+        assert persisted == [{"amount_left": "10"}, {"amount_left": "8"}]
+
+    def test_persist_errors_are_counted(self):
+        """Test a failing write is counted and does not kill the worker"""
+        persist_fn = AsyncMock(side_effect=[Exception("db down"), None])
+        queue = IngestionQueue(persist_fn, max_size=10, workers=1)
+
+        async def _run():
+            queue.start()
+            await queue.put(IngestionRecord("keg1", {"amount_left": "10"}))
+            await queue.put(IngestionRecord("keg2", {"amount_left": "5"}))
+            await queue.stop()
+
+        run_async(_run())
+
+        assert queue.errors == 1
+        assert queue.processed == 1
+
+    def test_stats(self):
+        """Test stats reports the queue depth and counters"""
+        queue = IngestionQueue(AsyncMock(), max_size=10, workers=3, overflow_policy="drop_newest")
+        run_async(queue.put(IngestionRecord("keg1", {})))
+
+        stats = queue.stats()
+
+        assert stats["depth"] == 1
+        assert stats["max_size"] == 10
+        assert stats["workers"] == 3
+        assert stats["overflow_policy"] == "drop_newest"
+        assert stats["enqueued"] == 1
+        assert stats["dropped"] == 0
@@ -0,0 +1,57 @@
+"""Tests for lib/devices/plaato_keg/__init__.py module"""
+
+from unittest.mock import MagicMock, patch
+
+from lib.devices.plaato_keg import PlaatoServiceHandler, _LazyServiceHandler
+
+
+class TestLazyServiceHandler:
+    """Tests for the lazily built Plaato service handler"""
+
+    def test_not_built_until_used(self):
+        """Test the service handler is only built on first attribute access"""
+        with patch("lib.devices.plaato_keg.PlaatoServiceHandler") as mock_handler_class:
+            handler = _LazyServiceHandler()
+
+            mock_handler_class.assert_not_called()
+
+            connection_handler = handler.connection_handler
+
+            mock_handler_class.assert_called_once_with()
+            assert connection_handler is mock_handler_class.return_value.connection_handler
+
+    def test_delegates_to_singleton(self):
+        """Test every access goes to the same singleton handler"""
+        singleton = MagicMock()
+        with patch("lib.devices.plaato_keg.PlaatoServiceHandler", return_value=singleton):
+            handler = _LazyServiceHandler()
+
+            assert handler.command_writer is singleton.command_writer
+            assert handler.connection_handler is singleton.connection_handler
+
+
+class TestPlaatoServiceHandler:
+    """Tests for choosing the connection handler"""
+
+    def build(self):
+        return PlaatoServiceHandler.__new__(PlaatoServiceHandler)
+
+    def test_remote_handler_in_api_role(self):
+        """Test API processes reach the kegs through the ingest process"""
+        handler = self.build()
+        with patch("lib.devices.plaato_keg.roles.runs_ingestion", return_value=False), patch(
+            "lib.devices.plaato_keg.RemoteConnectionHandler"
+        ) as mock_remote, patch("lib.devices.plaato_keg.CommandWriter"):
+            handler.__init__()
+
+            assert handler.connection_handler is mock_remote.return_value
+
+    def test_local_handler_when_ingesting(self):
+        """Test processes running the ingestion own the keg connections"""
+        handler = self.build()
+        with patch("lib.devices.plaato_keg.roles.runs_ingestion", return_value=True), patch("lib.devices.plaato_keg.is_sharded", return_value=False), patch(
+            "lib.devices.plaato_keg.ConnectionHandler"
+        ) as mock_local, patch("lib.devices.plaato_keg.CommandWriter"):
+            handler.__init__()
+
+            assert handler.connection_handler is mock_local.return_value
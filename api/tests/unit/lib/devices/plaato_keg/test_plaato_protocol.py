@@ -78,6 +78,17 @@ class TestPlaatoMessage:
         assert msg.id_val == "48"
         assert msg.data == "50"
 
+    def test_wraps_the_blynk_message(self):
+        """Test the blynk fields are read from the wrapped message rather than copied"""
+        blynk_msg = BlynkMessage(command=BlynkCommand.HARDWARE, msg_id=1, length=10, body=b"vw\x0048\x0050")
+        msg = PlaatoMessage(blynk_msg, kind="vw", id_val="48", data="50")
+
+        assert msg.msg is blynk_msg
+        assert msg.length == 10
+        assert msg.body == b"vw\x0048\x0050"
+        assert msg.status is None
+        assert len(msg) == 10
+
     def test_repr_response(self):
         """Test __repr__ for response message"""
         blynk_msg = BlynkMessage(command=BlynkCommand.RESPONSE, msg_id=1, status=200)
@@ -0,0 +1,344 @@
+"""Tests for remote module"""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from lib.devices.plaato_keg import remote
+from lib.devices.plaato_keg.remote import IngestPublisher, RemoteConnectionHandler
+
+
+# Helper to run async functions in sync tests
+def run_async(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def make_conn():
+    conn = MagicMock()
+    conn.add_listener = AsyncMock()
+    conn.execute = AsyncMock()
+    conn.close = AsyncMock()
+    conn.is_closed.return_value = False
+    return conn
+
+
+def make_connect():
+    conn = make_conn()
+    return conn, AsyncMock(return_value=conn)
+
+
+def terminate(conn):
+    """Call the termination listener asyncpg calls when the connection is lost"""
+    conn.is_closed.return_value = True
+    [listener] = [c.args[0] for c in conn.add_termination_listener.call_args_list]
+    listener(conn)
+
+
+def notified(conn, channel):
+    """Get the payloads sent on a channel"""
+    return [json.loads(c.args[2]) for c in conn.execute.call_args_list if c.args[1] == channel]
+
+
+@pytest.fixture
+def local_handler():
+    handler = MagicMock()
+    handler.get_registered_device_ids.return_value = {"keg1"}
+    handler.get_connection_ids.return_value = {"1.2.3.4:5"}
+    handler.get_ingestion_stats.return_value = {"queue_depth": 0}
+    handler.send_hardware_commands = AsyncMock(return_value=True)
+    return handler
+
+
+class TestChannel:
+    """Tests for the LISTEN/NOTIFY connection"""
+
+    def test_reconnects_when_terminated(self):
+        """Test a lost connection is reopened with its listeners and the channel catches up"""
+        first, second = make_conn(), make_conn()
+        on_reconnect = AsyncMock()
+        channel = remote._Channel(AsyncMock(side_effect=[first, second]), on_reconnect=on_reconnect)
+        callback = MagicMock()
+
+        async def run():
+            await channel.open({"chan": callback})
+            terminate(first)
+            await channel._reconnect_task
+
+        run_async(run())
+
+        assert channel.conn is second
+        second.add_listener.assert_awaited_once_with("chan", callback)
+        second.add_termination_listener.assert_called_once()
+        on_reconnect.assert_awaited_once()
+
+    def test_reconnects_with_backoff(self):
+        """Test the reconnection is retried, waiting longer after each failed attempt"""
+        first, second = make_conn(), make_conn()
+        channel = remote._Channel(AsyncMock(side_effect=[first, OSError(), OSError(), OSError(), second]))
+        delays = []
+
+        async def sleep(delay):
+            delays.append(delay)
+
+        async def run():
+            await channel.open({})
+            with patch.object(remote, "RECONNECT_MAX_DELAY_SEC", 3), patch("lib.devices.plaato_keg.remote.asyncio.sleep", sleep):
+                terminate(first)
+                await channel._reconnect_task
+
+        run_async(run())
+
+        assert delays == [1, 2, 3]
+        assert channel.conn is second
+
+    def test_reconnects_when_notify_fails(self):
+        """Test a notification failing on a closed connection reopens it"""
+        first, second = make_conn(), make_conn()
+        first.execute.side_effect = ConnectionResetError()
+        first.is_closed.return_value = True
+        channel = remote._Channel(AsyncMock(side_effect=[first, second]))
+
+        async def run():
+            await channel.open({})
+            with pytest.raises(ConnectionResetError):
+                await channel.notify("chan", {"a": 1})
+            with pytest.raises(ConnectionError):
+                await channel.notify("chan", {"a": 2})
+            await channel._reconnect_task
+            await channel.notify("chan", {"a": 3})
+
+        run_async(run())
+
+        assert [json.loads(c.args[2]) for c in second.execute.call_args_list] == [{"a": 3}]
+
+    def test_close_stops_reconnecting(self):
+        """Test closing the channel cancels the reconnection"""
+        first = make_conn()
+        connect = AsyncMock(side_effect=[first, OSError()])
+        channel = remote._Channel(connect)
+
+        async def run():
+            await channel.open({})
+            terminate(first)
+            await asyncio.sleep(0)
+            await channel.close()
+
+        run_async(run())
+
+        assert channel.conn is None
+        assert channel._reconnect_task is None
+        assert connect.await_count == 2
+
+
+class TestIngestPublisher:
+    """Tests for the ingest side of the coordination"""
+
+    def test_start_listens_and_publishes(self, local_handler):
+        """Test start listens for commands and state requests and publishes the state"""
+        conn, connect = make_connect()
+        publisher = IngestPublisher(local_handler, connect=connect)
+
+        async def run():
+            await publisher.start()
+            await asyncio.sleep(0)
+            await publisher.stop()
+
+        run_async(run())
+
+        channels = [c.args[0] for c in conn.add_listener.call_args_list]
+        assert channels == [remote.COMMAND_CHANNEL, remote.STATE_REQUEST_CHANNEL]
+        local_handler.add_listener.assert_called_once()
+        [state] = notified(conn, remote.STATE_CHANNEL)
+        assert state["registered"] == ["keg1"]
+        assert state["connections"] == ["1.2.3.4:5"]
+        conn.close.assert_called_once()
+
+    def test_state_published_after_reconnecting(self, local_handler):
+        """Test the state is published again once the connection is back, the state requests were missed"""
+        first, second = make_conn(), make_conn()
+        publisher = IngestPublisher(local_handler, connect=AsyncMock(side_effect=[first, second]))
+
+        async def run():
+            await publisher.channel.open({})
+            terminate(first)
+            await publisher.channel._reconnect_task
+
+        run_async(run())
+
+        [state] = notified(second, remote.STATE_CHANNEL)
+        assert state["registered"] == ["keg1"]
+
+    def test_command_is_sent_and_answered(self, local_handler):
+        """Test the pin values from API processes are encoded and sent to the keg here, and the result is published"""
+        conn, connect = make_connect()
+        publisher = IngestPublisher(local_handler, connect=connect)
+        payload = json.dumps({"req_id": "abc", "device_id": "keg1", "pins": [[71, "01"], [73, "5.0"]], "ack_timeout": 5})
+
+        async def run():
+            await publisher.channel.open({})
+            publisher._on_command(None, 1, remote.COMMAND_CHANNEL, payload)
+            await asyncio.gather(*publisher._tasks)
+
+        run_async(run())
+
+        local_handler.send_hardware_commands.assert_called_once_with("keg1", [(71, "01"), (73, "5.0")], ack_timeout=5)
+        assert notified(conn, remote.RESULT_CHANNEL) == [{"req_id": "abc", "success": True}]
+
+    def test_failed_command_reports_failure(self, local_handler):
+        """Test an error sending the command is reported as a failure"""
+        conn, connect = make_connect()
+        local_handler.send_hardware_commands.side_effect = RuntimeError("boom")
+        publisher = IngestPublisher(local_handler, connect=connect)
+        payload = json.dumps({"req_id": "abc", "device_id": "keg1", "pins": [[71, "01"]]})
+
+        async def run():
+            await publisher.channel.open({})
+            publisher._on_command(None, 1, remote.COMMAND_CHANNEL, payload)
+            await asyncio.gather(*publisher._tasks)
+
+        run_async(run())
+
+        assert notified(conn, remote.RESULT_CHANNEL) == [{"req_id": "abc", "success": False}]
+
+    def test_malformed_command_ignored(self, local_handler):
+        """Test malformed commands are ignored"""
+        publisher = IngestPublisher(local_handler, connect=AsyncMock())
+
+        publisher._on_command(None, 1, remote.COMMAND_CHANNEL, "not json")
+
+        assert not publisher._tasks
+
+    def test_large_state_is_trimmed(self, local_handler):
+        """Test the connection ids are left out when the state does not fit in a notification"""
+        local_handler.get_connection_ids.return_value = {f"10.0.{i // 250}.{i % 250}:50000" for i in range(1000)}
+        publisher = IngestPublisher(local_handler, connect=AsyncMock())
+
+        state = publisher.get_state()
+
+        assert state["registered"] == ["keg1"]
+        assert state["connections"] == []
+
+    def test_state_publishes_are_debounced(self, local_handler):
+        """Test a burst of connection events results in a single publish"""
+        conn, connect = make_connect()
+        publisher = IngestPublisher(local_handler, connect=connect)
+
+        async def run():
+            await publisher.channel.open({})
+            with patch.object(remote, "PUBLISH_DEBOUNCE_SEC", 0):
+                publisher._schedule_publish("connected", "c1", None)
+                publisher._schedule_publish("registered", "c1", "keg1")
+                await asyncio.sleep(0.01)
+                await asyncio.gather(*publisher._tasks)
+
+        run_async(run())
+
+        assert len(notified(conn, remote.STATE_CHANNEL)) == 1
+
+
+class TestRemoteConnectionHandler:
+    """Tests for the API side of the coordination"""
+
+    def make_handler(self, registered=("keg1",), published_at=None):
+        conn, connect = make_connect()
+        handler = RemoteConnectionHandler(connect=connect)
+        state = {"pid": 10, "published_at": published_at or time.time(), "registered": list(registered), "connections": ["c1"], "stats": {"queue_depth": 2}}
+        handler._on_state(None, 10, remote.STATE_CHANNEL, json.dumps(state))
+        return handler, conn
+
+    def test_start_requests_state(self):
+        """Test start listens for the state and command results and asks for the current state"""
+        conn, connect = make_connect()
+        handler = RemoteConnectionHandler(connect=connect)
+
+        run_async(handler.start())
+
+        channels = [c.args[0] for c in conn.add_listener.call_args_list]
+        assert channels == [remote.STATE_CHANNEL, remote.RESULT_CHANNEL]
+        assert len(notified(conn, remote.STATE_REQUEST_CHANNEL)) == 1
+
+    def test_state(self):
+        """Test the published state is served"""
+        handler, _ = self.make_handler()
+
+        assert handler.get_registered_device_ids() == {"keg1"}
+        assert handler.get_connection_ids() == {"c1"}
+        assert handler.get_ingestion_stats()["queue_depth"] == 2
+        assert handler.get_ingestion_stats()["ingest_pid"] == 10
+
+    def test_stale_state(self):
+        """Test kegs are considered disconnected when the ingest process stops publishing"""
+        handler, _ = self.make_handler(published_at=time.time() - remote.STATE_INTERVAL_SEC * (remote.STALE_STATE_INTERVALS + 1))
+
+        assert handler.get_registered_device_ids() == set()
+        assert handler.get_connection_ids() == set()
+
+    def test_send_command(self):
+        """Test the pin values, not encoded commands, are sent to the ingest process and resolved by its reply"""
+        handler, conn = self.make_handler()
+
+        async def run():
+            await handler.channel.open({})
+            task = asyncio.create_task(handler.send_hardware_commands("keg1", [(71, "01")], ack_timeout=1))
+            await asyncio.sleep(0)
+            [msg] = notified(conn, remote.COMMAND_CHANNEL)
+            handler._on_result(None, 10, remote.RESULT_CHANNEL, json.dumps({"req_id": msg["req_id"], "success": True}))
+            return msg, await task
+
+        msg, result = run_async(run())
+
+        assert result is True
+        assert msg["device_id"] == "keg1"
+        assert msg["pins"] == [[71, "01"]]
+        assert msg["ack_timeout"] == 1
+        assert "ack_msg_ids" not in msg
+        assert not handler._pending_commands
+
+    def test_send_command_unregistered(self):
+        """Test commands for kegs that are not connected fail without a round trip"""
+        handler, conn = self.make_handler(registered=())
+
+        result = run_async(handler.send_hardware_commands("keg1", [(71, "01")]))
+
+        assert result is False
+        conn.execute.assert_not_called()
+
+    def test_send_command_timeout(self):
+        """Test commands fail when the ingest process does not reply"""
+        handler, _ = self.make_handler()
+
+        async def run():
+            await handler.channel.open({})
+            with patch.object(remote, "COMMAND_TIMEOUT_SEC", 0.01):
+                return await handler.send_hardware_commands("keg1", [(71, "01")])
+
+        assert run_async(run()) is False
+
+    def test_state_requested_after_reconnecting(self):
+        """Test the state is asked for again once the connection is back, the published ones were missed"""
+        first, second = make_conn(), make_conn()
+        handler = RemoteConnectionHandler(connect=AsyncMock(side_effect=[first, second]))
+
+        async def run():
+            await handler.start()
+            terminate(first)
+            await handler.channel._reconnect_task
+
+        run_async(run())
+
+        assert len(notified(first, remote.STATE_REQUEST_CHANNEL)) == 1
+        assert len(notified(second, remote.STATE_REQUEST_CHANNEL)) == 1
+        assert [c.args[0] for c in second.add_listener.call_args_list] == [remote.STATE_CHANNEL, remote.RESULT_CHANNEL]
+
+    def test_stop_fails_pending(self):
+        """Test pending commands fail when the handler stops"""
+        handler, _ = self.make_handler()
+        future = asyncio.get_event_loop().create_future()
+        handler._pending_commands["abc"] = future
+
+        run_async(handler.stop())
+
+        assert future.result() is False
@@ -0,0 +1,184 @@
+"""Tests for sharding module"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from lib.devices.plaato_keg import sharding
+from lib.devices.plaato_keg.sharding import ShardedConnectionHandler, ShardWorker, _Shard
+
+
+# Helper to run async functions in sync tests
+def run_async(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def add_shard(handler, shard_id):
+    shard = _Shard(shard_id, MagicMock(), MagicMock())
+    handler.shards[shard_id] = shard
+    return shard
+
+
+@pytest.fixture
+def handler():
+    handler = ShardedConnectionHandler(processes=2)
+    add_shard(handler, 0)
+    add_shard(handler, 1)
+    return handler
+
+
+class TestShardSelection:
+    """Tests for deciding whether to shard"""
+
+    def test_not_sharded_by_default(self, monkeypatch):
+        """Test a single process does not shard"""
+        monkeypatch.delenv(sharding.SHARD_ID_ENV, raising=False)
+        with patch.object(sharding, "get_process_count", return_value=1):
+            assert sharding.is_sharded() is False
+
+    def test_sharded_in_parent(self, monkeypatch):
+        """Test the parent process shards when more than one process is configured"""
+        monkeypatch.delenv(sharding.SHARD_ID_ENV, raising=False)
+        with patch.object(sharding, "get_process_count", return_value=3):
+            assert sharding.is_sharded() is True
+
+    def test_not_sharded_in_shard(self, monkeypatch):
+        """Test a shard process runs a local connection handler"""
+        monkeypatch.setenv(sharding.SHARD_ID_ENV, "1")
+        with patch.object(sharding, "get_process_count", return_value=3):
+            assert sharding.get_shard_id() == 1
+            assert sharding.is_sharded() is False
+
+
+class TestShardedRegistry:
+    """Tests for the aggregated device -> shard registry"""
+
+    def test_registered_devices_aggregate_across_shards(self, handler):
+        """Test devices registered on any shard are reported"""
+        handler.handle_message(0, ("connected", "1.1.1.1:1", None))
+        handler.handle_message(0, ("registered", "1.1.1.1:1", "keg1"))
+        handler.handle_message(1, ("connected", "1.1.1.1:2", None))
+        handler.handle_message(1, ("registered", "1.1.1.1:2", "keg2"))
+
+        assert handler.get_registered_device_ids() == {"keg1", "keg2"}
+        assert handler.get_connection_ids() == {"1.1.1.1:1", "1.1.1.1:2"}
+        assert handler.device_owner == {"keg1": 0, "keg2": 1}
+
+    def test_disconnect_falls_back_to_other_shard(self, handler):
+        """Test a keg connected through two shards stays registered when one connection closes"""
+        handler.handle_message(0, ("registered", "1.1.1.1:1", "keg1"))
+        handler.handle_message(1, ("registered", "1.1.1.1:2", "keg1"))
+
+        handler.handle_message(1, ("disconnected", "1.1.1.1:2", "keg1"))
+
+        assert handler.get_registered_device_ids() == {"keg1"}
+        assert handler.device_owner["keg1"] == 0
+
+    def test_last_disconnect_unregisters(self, handler):
+        """Test the keg is dropped when its last connection closes"""
+        handler.handle_message(0, ("connected", "1.1.1.1:1", None))
+        handler.handle_message(0, ("registered", "1.1.1.1:1", "keg1"))
+
+        handler.handle_message(0, ("disconnected", "1.1.1.1:1", "keg1"))
+
+        assert handler.get_registered_device_ids() == set()
+        assert handler.device_owner == {}
+        assert handler.get_connection_ids() == set()
+
+    def test_ingestion_stats_are_summed(self, handler):
+        """Test numeric stats are summed across shards"""
+        handler.handle_message(0, ("stats", {"processed": 2, "overflow_policy": "drop_oldest"}))
+        handler.handle_message(1, ("stats", {"processed": 3, "overflow_policy": "drop_oldest"}))
+
+        stats = handler.get_ingestion_stats()
+
+        assert stats["processed"] == 5
+        assert stats["shards"][1]["processed"] == 3
+
+
+class TestShardedCommands:
+    """Tests for routing commands to the owning shard"""
+
+    def test_command_routed_to_owner(self, handler):
+        """Test the pin values are sent to the shard holding the keg's socket, which encodes them, and its result returned"""
+        handler.handle_message(1, ("registered", "1.1.1.1:2", "keg1"))
+
+        def _send(msg):
+            req_id = msg[1]
+            asyncio.get_event_loop().call_soon(handler.handle_message, 1, ("command_result", req_id, True))
+
+        handler.shards[1].conn.send.side_effect = _send
+
+        result = run_async(handler.send_hardware_commands("keg1", [(71, "01")]))
+
+        assert result is True
+        handler.shards[0].conn.send.assert_not_called()
+        assert handler.shards[1].conn.send.call_args[0][0] == ("hardware_commands", 1, "keg1", [(71, "01")], None)
+        assert handler._pending_commands == {}
+
+    def test_command_to_unknown_keg(self, handler):
+        """Test a command for a keg no shard holds fails"""
+        assert run_async(handler.send_hardware_commands("keg1", [(71, "01")])) is False
+
+    def test_command_timeout(self, handler):
+        """Test a command the shard never answers fails"""
+        handler.handle_message(0, ("registered", "1.1.1.1:1", "keg1"))
+
+        with patch.object(sharding, "COMMAND_TIMEOUT_SEC", 0.01):
+            assert run_async(handler.send_hardware_commands("keg1", [(71, "01")])) is False
+        assert handler._pending_commands == {}
+
+
+class TestShardWorker:
+    """Tests for the shard side of the pipe"""
+
+    def test_events_forwarded(self):
+        """Test connection events are forwarded to the parent"""
+        conn = MagicMock()
+        worker = ShardWorker(0, conn, connection_handler=MagicMock())
+
+        worker._on_event("registered", "1.1.1.1:1", "keg1")
+
+        conn.send.assert_called_once_with(("registered", "1.1.1.1:1", "keg1"))
+
+    def test_command_result_sent_back(self):
+        """Test routed pin values are sent by the local handler, which allocates their message IDs, and the result reported"""
+        conn = MagicMock()
+        connection_handler = MagicMock()
+        connection_handler.send_hardware_commands = AsyncMock(return_value=True)
+        worker = ShardWorker(0, conn, connection_handler=connection_handler)
+
+        run_async(worker._send_hardware_commands(7, "keg1", [(71, "01")], 5))
+
+        connection_handler.send_hardware_commands.assert_awaited_once_with("keg1", [(71, "01")], ack_timeout=5)
+        conn.send.assert_called_once_with(("command_result", 7, True))
+
+    def test_command_tasks_are_tracked(self):
+        """Test the command tasks started from the pipe are kept until they are done"""
+        conn = MagicMock()
+        conn.recv.return_value = ("hardware_commands", 7, "keg1", [(71, "01")], 5)
+        connection_handler = MagicMock()
+        connection_handler.send_hardware_commands = AsyncMock(return_value=True)
+        worker = ShardWorker(0, conn, connection_handler=connection_handler)
+
+        async def read_and_settle():
+            worker._on_readable()
+            assert len(worker._tasks) == 1
+            await asyncio.gather(*worker._tasks)
+
+        run_async(read_and_settle())
+
+        assert not worker._tasks
+        conn.send.assert_called_once_with(("command_result", 7, True))
+
+    def test_command_failure_reported(self):
+        """Test an error sending the commands is reported as a failed command rather than left to time out"""
+        conn = MagicMock()
+        connection_handler = MagicMock()
+        connection_handler.send_hardware_commands = AsyncMock(side_effect=ConnectionResetError())
+        worker = ShardWorker(0, conn, connection_handler=connection_handler)
+
+        run_async(worker._send_hardware_commands(7, "keg1", [(71, "01")], 5))
+
+        conn.send.assert_called_once_with(("command_result", 7, False))
@@ -116,6 +116,28 @@ class TestBrewfatherAsync:
 
         assert result == ({"data": "test"}, 200)
 
+    @patch("lib.external_brew_tools.brewfather.AsyncClient")
+    def test_get_configured_api_url(self, mock_async_client, brewfather, mock_config):
+        """Test _get calls the configured API URL rather than api.brewfather.app"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {}
+
+        mock_client = MagicMock()
+        mock_client.get = AsyncMock(return_value=mock_response)
+        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
+        mock_client.__aexit__ = AsyncMock(return_value=None)
+        mock_async_client.return_value = mock_client
+        mock_config.get.side_effect = lambda key: {
+            "external_brew_tools.brewfather.username": "test_user",
+            "external_brew_tools.brewfather.api_key": "test_key",
+            "external_brew_tools.brewfather.api_url": "http://localhost:5061/",
+        }.get(key)
+
+        run_async(brewfather._get("v2/batches", {}))
+
+        assert mock_client.get.call_args[0][0] == "http://localhost:5061/v2/batches"
+
     @patch("lib.external_brew_tools.brewfather.AsyncClient")
     def test_get_not_found(self, mock_async_client, brewfather):
         """Test _get with 404 response"""
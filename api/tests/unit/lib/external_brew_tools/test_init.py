@@ -30,6 +30,17 @@ class TestExternalBrewTools:
         tool = get_tool("unknown_tool")
         assert tool is None
 
+    def test_get_tool_created_once(self):
+        """Test the tool is created on first use and reused after"""
+        from lib.external_brew_tools import get_tool
+
+        module = MagicMock()
+        with patch.dict("lib.external_brew_tools.TOOL_TYPES", {"fake": ("fake.module", "FakeTool")}), patch.dict("lib.external_brew_tools.TOOLS", {}), patch(
+            "lib.external_brew_tools.importlib.import_module", return_value=module
+        ):
+            assert get_tool("fake") is get_tool("fake")
+            module.FakeTool.assert_called_once_with()
+
 
 class TestExternalBrewToolBase:
     """Tests for ExternalBrewToolBase class"""
@@ -0,0 +1,136 @@
+"""Tests for lib/metrics/db.py module"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from lib.metrics import db as db_metrics
+
+
+@pytest.fixture
+def engine():
+    """An in-memory sqlite engine with the query metrics installed"""
+    engine = create_engine("sqlite://")
+    db_metrics.instrument_engine(engine, name="test")
+    yield engine
+    db_metrics._engines.pop("test", None)
+    engine.dispose()
+
+
+class TestQueryMetrics:
+    """Tests for the query timing"""
+
+    def test_counts_queries(self, engine):
+        """Test every query executed is counted and timed"""
+        queries = db_metrics.QUERIES.get()
+        observed, _ = db_metrics.QUERY_DURATION.get()
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+        assert db_metrics.QUERIES.get() == queries + 2
+        assert db_metrics.QUERY_DURATION.get()[0] == observed + 2
+
+    def test_counts_request_usage(self, engine):
+        """Test the queries are added to the tracker of the request being served"""
+        with db_metrics.track_queries() as queries:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        assert queries.count == 1
+        assert queries.seconds > 0
+        assert queries.statements == {"SELECT 1": 1}
+        assert db_metrics.request_queries.get() is None
+
+    def test_counts_errors(self, engine):
+        """Test failed queries are counted"""
+        errors = db_metrics.QUERY_ERRORS.get()
+
+        with engine.connect() as conn:
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM missing_table"))
+
+        assert db_metrics.QUERY_ERRORS.get() == errors + 1
+
+    def test_instrumenting_twice(self, engine):
+        """Test instrumenting the same engine again does not count the queries twice"""
+        db_metrics.instrument_engine(engine, name="test")
+        queries = db_metrics.QUERIES.get()
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        assert db_metrics.QUERIES.get() == queries + 1
+
+
+class TestPoolMetrics:
+    """Tests for the connection pool collector"""
+
+    def test_reports_pool_usage(self):
+        """Test the pool size and connections are reported when scraped"""
+        engine = MagicMock()
+        engine.pool.size.return_value = 5
+        engine.pool.checkedout.return_value = 2
+        engine.pool.checkedin.return_value = 3
+        engine.pool.overflow.return_value = -3
+        db_metrics._engines["pool_test"] = engine
+        try:
+            db_metrics._collect_pools()
+        finally:
+            db_metrics._engines.pop("pool_test")
+
+        assert db_metrics.POOL_SIZE.get(engine="pool_test") == 5
+        assert db_metrics.POOL_CONNECTIONS.get(engine="pool_test", state="checked_out") == 2
+        assert db_metrics.POOL_CONNECTIONS.get(engine="pool_test", state="idle") == 3
+        assert db_metrics.POOL_CONNECTIONS.get(engine="pool_test", state="overflow") == 0
+
+
+class TestTrackQueries:
+    """Tests for track_queries and RequestQueries"""
+
+    def test_captures_call_site_of_repeated_statement(self, engine):
+        """Test the call site is captured once a statement repeats, pointing at the application code"""
+        with db_metrics.track_queries(repeat_threshold=3) as queries:
+            with engine.connect() as conn:
+                for i in range(4):
+                    conn.execute(text("SELECT :i"), {"i": i})
+                conn.execute(text("SELECT 1"))
+
+        ((statement, runs, site),) = queries.repeated()
+        assert statement == "SELECT ?"
+        assert runs == 4
+        assert site.startswith("tests/unit/lib/metrics/test_db.py:")
+        assert "test_captures_call_site_of_repeated_statement" in site
+
+    def test_nested_trackers_are_shared(self):
+        """Test a nested block records into the outer tracker and keeps its repeat threshold"""
+        with db_metrics.track_queries() as outer:
+            with db_metrics.track_queries(repeat_threshold=2) as inner:
+                inner.record("SELECT 1", 0.1)
+
+        assert inner is outer
+        assert outer.count == 1
+        assert outer.repeat_threshold == 2
+
+    def test_no_repeats_without_threshold(self):
+        """Test no statement is reported when no repeat threshold is set"""
+        queries = db_metrics.RequestQueries()
+        for _ in range(10):
+            queries.record("SELECT 1", 0.01)
+
+        assert queries.repeated() == []
+        assert queries.call_sites == {}
+
+    def test_call_site_through_greenlet(self):
+        """Test the call site is found in the coroutine awaiting a query run in a greenlet, like the async sessions do"""
+        from sqlalchemy.util import greenlet_spawn
+
+        async def service_method():
+            return await greenlet_spawn(db_metrics.call_site)
+
+        site = asyncio.get_event_loop().run_until_complete(service_method())
+
+        assert "in service_method" in site
@@ -0,0 +1,118 @@
+"""Tests for lib/metrics/http.py module"""
+
+from unittest.mock import patch
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from lib.metrics import http as http_metrics
+from lib.metrics.db import request_queries
+
+
+def make_app(middleware=http_metrics.MetricsMiddleware, **options):
+    """Create an app with a prefixed router, served through the given middleware"""
+    app = FastAPI()
+    router = APIRouter()
+
+    @router.get("/{item_id}")
+    async def get_item(item_id: str):
+        queries = request_queries.get()
+        for _ in range(3):
+            queries.record("SELECT * FROM items WHERE id = $1", 0.1)
+        return {"id": item_id}
+
+    @router.get("/{item_id}/fail")
+    async def fail(item_id: str):
+        raise RuntimeError("boom")
+
+    app.include_router(router, prefix="/metrics-test/items")
+    app.add_middleware(middleware, **options)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+class TestMetricsMiddleware:
+    """Tests for MetricsMiddleware"""
+
+    def test_records_per_route_template(self):
+        """Test requests are recorded under the full route template rather than the path"""
+        client = make_app()
+        route = "/metrics-test/items/{item_id}"
+        before = http_metrics.REQUESTS.get(method="GET", route=route, status=200)
+
+        client.get("/metrics-test/items/1")
+        client.get("/metrics-test/items/2")
+
+        assert http_metrics.REQUESTS.get(method="GET", route=route, status=200) == before + 2
+        assert http_metrics.REQUEST_DURATION.get(method="GET", route=route)[0] >= 2
+
+    def test_records_db_usage(self):
+        """Test the database usage of the request is recorded"""
+        client = make_app()
+        route = "/metrics-test/items/{item_id}"
+        count, total = http_metrics.REQUEST_DB_QUERIES.get(route=route)
+
+        client.get("/metrics-test/items/1")
+
+        assert http_metrics.REQUEST_DB_QUERIES.get(route=route) == (count + 1, total + 3)
+        assert request_queries.get() is None
+
+    def test_records_errors(self):
+        """Test requests failing with an exception are recorded as a 500"""
+        client = make_app()
+        route = "/metrics-test/items/{item_id}/fail"
+
+        assert client.get("/metrics-test/items/1/fail").status_code == 500
+
+        assert http_metrics.REQUESTS.get(method="GET", route=route, status=500) >= 1
+        assert http_metrics.REQUESTS_IN_PROGRESS.get() == 0
+
+    def test_unmatched_route(self):
+        """Test requests not matching any route share a single series"""
+        client = make_app()
+        before = http_metrics.REQUESTS.get(method="GET", route=http_metrics.UNMATCHED_ROUTE, status=404)
+
+        client.get("/metrics-test/unknown")
+
+        assert http_metrics.REQUESTS.get(method="GET", route=http_metrics.UNMATCHED_ROUTE, status=404) == before + 1
+
+
+class TestQueryBudgetMiddleware:
+    """Tests for QueryBudgetMiddleware"""
+
+    def test_adds_headers(self):
+        """Test the query count and time are returned in the headers"""
+        client = make_app(http_metrics.QueryBudgetMiddleware, headers=True)
+
+        resp = client.get("/metrics-test/items/1")
+
+        assert resp.headers["X-DB-Queries"] == "3"
+        assert resp.headers["X-DB-Time"] == "300.0"
+
+    def test_no_headers_by_default(self):
+        """Test the headers are only returned when enabled"""
+        client = make_app(http_metrics.QueryBudgetMiddleware, max_queries=10)
+
+        resp = client.get("/metrics-test/items/1")
+
+        assert "X-DB-Queries" not in resp.headers
+
+    def test_logs_requests_over_budget(self):
+        """Test requests over the budget are logged with the statements they repeated"""
+        client = make_app(http_metrics.QueryBudgetMiddleware, max_queries=2, repeat_threshold=3)
+
+        with patch.object(http_metrics, "LOGGER") as mock_logger:
+            client.get("/metrics-test/items/1")
+
+        assert mock_logger.warning.call_count == 2
+        assert mock_logger.warning.call_args_list[0].args[3] == 3
+        assert mock_logger.warning.call_args_list[1].args[1] == 3
+        assert http_metrics.QUERY_BUDGET_EXCEEDED.get(route="/metrics-test/items/{item_id}") >= 1
+
+    def test_within_budget(self):
+        """Test requests within the budget are not logged"""
+        client = make_app(http_metrics.QueryBudgetMiddleware, max_queries=3)
+
+        with patch.object(http_metrics, "LOGGER") as mock_logger:
+            client.get("/metrics-test/items/1")
+
+        mock_logger.warning.assert_not_called()
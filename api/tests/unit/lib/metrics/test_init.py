@@ -0,0 +1,121 @@
+"""Tests for lib/metrics/__init__.py module"""
+
+import asyncio
+
+import pytest
+
+from lib import metrics
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def registry():
+    """An empty registry"""
+    return metrics.Registry()
+
+
+class TestCounter:
+    """Tests for Counter"""
+
+    def test_inc_per_labels(self, registry):
+        """Test every label combination is counted separately"""
+        counter = registry.counter("requests_total", "Requests", ["method"])
+
+        counter.inc(method="GET")
+        counter.inc(method="GET")
+        counter.inc(3, method="POST")
+
+        assert counter.get(method="GET") == 2
+        assert counter.get(method="POST") == 3
+
+    def test_rejects_wrong_labels(self, registry):
+        """Test recording with other labels than declared fails"""
+        counter = registry.counter("requests_total", "Requests", ["method"])
+
+        with pytest.raises(ValueError):
+            counter.inc(route="/")
+
+
+class TestHistogram:
+    """Tests for Histogram"""
+
+    def test_renders_cumulative_buckets(self, registry):
+        """Test the buckets are rendered cumulatively, with the sum and count"""
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+
+        histogram.observe(0.05)
+        histogram.observe(0.1)
+        histogram.observe(0.5)
+        histogram.observe(2)
+
+        lines = histogram.render()
+        assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+        assert 'latency_seconds_bucket{le="1"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert "latency_seconds_sum 2.65" in lines
+        assert "latency_seconds_count 4" in lines
+        assert histogram.get() == (4, 2.65)
+
+
+class TestRegistry:
+    """Tests for Registry"""
+
+    def test_render_format(self, registry):
+        """Test metrics are rendered in the Prometheus text format"""
+        counter = registry.counter("requests_total", "Number of requests", ["route"])
+        counter.inc(route='/a"b')
+
+        text = registry.render()
+
+        assert text == ('# HELP requests_total Number of requests\n# TYPE requests_total counter\nrequests_total{route="/a\\"b"} 1\n')
+
+    def test_same_name_returns_existing(self, registry):
+        """Test registering a metric twice returns the first one"""
+        assert registry.gauge("depth", "Depth") is registry.gauge("depth", "Depth")
+
+    def test_same_name_different_type(self, registry):
+        """Test a name can not be registered as two different metrics"""
+        registry.gauge("depth", "Depth")
+
+        with pytest.raises(ValueError):
+            registry.counter("depth", "Depth")
+
+    def test_collectors_run_on_render(self, registry):
+        """Test collectors refresh the metrics before they are rendered"""
+        gauge = registry.gauge("depth", "Depth")
+        registry.add_collector(lambda: gauge.set(7))
+
+        assert "depth 7" in registry.render()
+
+    def test_failing_collector_does_not_break_render(self, registry):
+        """Test a failing collector is logged and the other metrics still rendered"""
+        gauge = registry.gauge("depth", "Depth")
+        gauge.set(1)
+
+        def broken():
+            raise RuntimeError("boom")
+
+        registry.add_collector(broken)
+
+        assert "depth 1" in registry.render()
+
+
+class TestLoopLag:
+    """Tests for the event loop lag probe"""
+
+    def test_records_lag(self):
+        """Test the probe records how late the loop ran it"""
+        metrics.LOOP_LAG.set(-1)
+
+        async def run():
+            task = metrics.start_loop_lag_monitor(interval=0.01)
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        run_async(run())
+
+        assert metrics.LOOP_LAG.get() >= 0
@@ -0,0 +1,68 @@
+"""Tests for lib/metrics/upstream.py module"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from lib.metrics import upstream as upstream_metrics
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def make_client(upstream, handler):
+    """Create a client whose requests are answered by `handler` through the instrumented transport"""
+    transport = upstream_metrics.UpstreamTransport(upstream, wrapped=httpx.MockTransport(handler))
+    return httpx.AsyncClient(transport=transport)
+
+
+async def get(client, url="https://upstream.test/"):
+    async with client:
+        return await client.get(url)
+
+
+class TestUpstreamTransport:
+    """Tests for UpstreamTransport"""
+
+    def test_records_latency_and_status(self):
+        """Test successful calls are timed and counted by status"""
+        client = make_client("test-ok", lambda request: httpx.Response(200, json={}))
+
+        resp = run_async(get(client))
+
+        assert resp.status_code == 200
+        assert upstream_metrics.UPSTREAM_REQUESTS.get(upstream="test-ok", status=200) == 1
+        assert upstream_metrics.UPSTREAM_DURATION.get(upstream="test-ok")[0] == 1
+        assert upstream_metrics.UPSTREAM_ERRORS.get(upstream="test-ok", reason="http_5xx") == 0
+
+    def test_counts_server_errors(self):
+        """Test 5xx responses are counted as errors"""
+        client = make_client("test-5xx", lambda request: httpx.Response(503))
+
+        run_async(get(client))
+
+        assert upstream_metrics.UPSTREAM_ERRORS.get(upstream="test-5xx", reason="http_5xx") == 1
+
+    def test_counts_exceptions(self):
+        """Test failed requests are counted by exception type and re-raised"""
+
+        def handler(request):
+            raise httpx.ConnectTimeout("timed out", request=request)
+
+        client = make_client("test-timeout", handler)
+
+        with pytest.raises(httpx.ConnectTimeout):
+            run_async(get(client))
+
+        assert upstream_metrics.UPSTREAM_ERRORS.get(upstream="test-timeout", reason="ConnectTimeout") == 1
+        assert upstream_metrics.UPSTREAM_REQUESTS.get(upstream="test-timeout", status="error") == 1
+
+    def test_transport_applies_verify(self):
+        """Test the transport factory builds an instrumented transport"""
+        transport = upstream_metrics.transport("test-factory", verify=False)
+
+        assert isinstance(transport, upstream_metrics.UpstreamTransport)
+        assert transport.upstream == "test-factory"
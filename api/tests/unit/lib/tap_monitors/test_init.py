@@ -4,6 +4,7 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+from lib import tap_monitors
 from lib.exceptions import Error
 from lib.tap_monitors import InvalidDataType, TapMonitorBase, get_tap_monitor_lib, get_types
 
@@ -75,3 +76,48 @@ class TestGetTapMonitorLib:
         """Test get_tap_monitor_lib returns None for unknown type"""
         result = get_tap_monitor_lib("unknown-monitor-type")
         assert result is None
+
+
+class TestLazyLoading:
+    """Tests for loading the tap monitor types on first use"""
+
+    def test_instantiated_on_first_use(self):
+        """Test a registered type is only imported and created when it is first requested"""
+        module = MagicMock()
+        with patch.dict("lib.tap_monitors.TAP_MONITOR_TYPES", {"fake-monitor": ("fake.module", "FakeMonitor")}), patch.dict(
+            "lib.tap_monitors.TAP_MONITORS", {}
+        ), patch("lib.tap_monitors.importlib.import_module", return_value=module) as mock_import:
+            mock_import.assert_not_called()
+
+            first = get_tap_monitor_lib("fake-monitor")
+            second = get_tap_monitor_lib("fake-monitor")
+
+            mock_import.assert_called_once_with("fake.module")
+            module.FakeMonitor.assert_called_once_with()
+            assert first is second is module.FakeMonitor.return_value
+
+    def test_get_types_includes_registered(self):
+        """Test get_types lists the registered types"""
+        module = MagicMock()
+        module.FakeMonitor.return_value.supports_discovery.return_value = True
+        module.FakeMonitor.return_value.reports_online_status.return_value = False
+        with patch.dict("lib.tap_monitors.TAP_MONITOR_TYPES", {"fake-monitor": ("fake.module", "FakeMonitor")}, clear=True), patch.dict(
+            "lib.tap_monitors.TAP_MONITORS", {}
+        ), patch("lib.tap_monitors.importlib.import_module", return_value=module):
+            assert get_types() == [{"type": "fake-monitor", "supports_discovery": True, "reports_online_status": False}]
+
+    def test_get_types_is_built_once_per_registration(self):
+        """Test get_types does not ask the monitors again until the registered types change"""
+        module = MagicMock()
+        monitor = module.FakeMonitor.return_value
+        with patch.dict("lib.tap_monitors.TAP_MONITOR_TYPES", {"cached-monitor": ("fake.module", "FakeMonitor")}, clear=True), patch.dict(
+            "lib.tap_monitors.TAP_MONITORS", {}
+        ), patch("lib.tap_monitors.importlib.import_module", return_value=module):
+            first = get_types()
+            first[0]["type"] = "changed"
+            second = get_types()
+            assert second[0]["type"] == "cached-monitor"
+            monitor.supports_discovery.assert_called_once()
+
+            tap_monitors.TAP_MONITOR_TYPES["other-monitor"] = ("fake.module", "FakeMonitor")
+            assert [t["type"] for t in get_types()] == ["cached-monitor", "other-monitor"]
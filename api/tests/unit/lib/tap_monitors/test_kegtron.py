@@ -876,6 +876,16 @@ class TestKegtronPro:
         call_args = mock_client.post.call_args
         assert call_args[0][0] == "https://mdash.net/api/v2/m/device"
 
+    @patch("lib.tap_monitors.kegtron.AsyncClient")
+    def test_update_configured_api_url(self, mock_async_client, monitor, mock_config):
+        resp = _make_mock_response(200)
+        mock_client = _make_mock_http_client(mock_async_client, resp)
+        mock_config.get.side_effect = lambda key, default=None: {"tap_monitors.kegtron.pro.api_url": "http://localhost:5060"}.get(key, default)
+
+        run_async(monitor._update({"d": 1}, {"access_token": "tok"}))
+
+        assert mock_client.post.call_args[0][0] == "http://localhost:5060/api/v2/m/device"
+
     # ------------------------------------------------------------------
     # update_user_overrides
     # ------------------------------------------------------------------
@@ -0,0 +1,255 @@
+"""Tests for lib/compression.py module"""
+
+import gzip
+from unittest.mock import patch
+
+import brotli
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from lib import compression
+from lib.compression import CompressedSnapshot, CompressionMiddleware, no_compression
+from routers import FastJSONRoute
+
+ITEMS = [{"id": i, "name": f"Item {i}", "description": "A repetitive description"} for i in range(100)]
+TEXT = "brewhouse " * 200
+
+
+def make_client(file_path=None, **options):
+    """Create an app with a prefixed router, served through the compression middleware"""
+    app = FastAPI()
+    router = APIRouter(route_class=FastJSONRoute)
+
+    @router.get("/items")
+    async def list_items():
+        return ITEMS
+
+    @router.get("/small")
+    async def small():
+        return {"id": 1}
+
+    @router.get("/events")
+    async def events():
+        return StreamingResponse(iter(["data: 1\n\n", "data: 2\n\n"]), media_type="text/event-stream")
+
+    @router.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([TEXT, TEXT]), media_type="text/plain")
+
+    @router.get("/opted-out")
+    @no_compression
+    async def opted_out():
+        return PlainTextResponse(TEXT)
+
+    @router.get("/precompressed")
+    async def precompressed():
+        return Response(gzip.compress(TEXT.encode()), media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+    @router.get("/image")
+    async def image():
+        return Response(b"\x89PNG" * 1000, media_type="image/png", headers={"ETag": '"image"'})
+
+    @router.get("/tagged")
+    async def tagged():
+        return PlainTextResponse(TEXT, headers={"ETag": '"tagged"'})
+
+    @router.get("/partial")
+    async def partial():
+        return PlainTextResponse(TEXT[:1500], status_code=206, headers={"Content-Range": f"bytes 0-1499/{len(TEXT)}"})
+
+    @router.get("/file")
+    async def file():
+        return FileResponse(file_path, media_type="text/plain")
+
+    app.include_router(router, prefix="/compression-test")
+    app.add_middleware(CompressionMiddleware, **options)
+    return TestClient(app)
+
+
+class TestChooseEncoding:
+    """Tests for the Accept-Encoding negotiation"""
+
+    def test_prefers_brotli(self):
+        """Test brotli is preferred over gzip when both are accepted"""
+        assert compression.choose_encoding("gzip, deflate, br", {"br": "", "gzip": ""}) == "br"
+
+    def test_only_available_encodings(self):
+        """Test only the encodings with a variant are chosen"""
+        assert compression.choose_encoding("gzip, br", {"gzip": ""}) == "gzip"
+        assert compression.choose_encoding("gzip, br", {}) is None
+
+    def test_respects_q_values(self):
+        """Test the client preference and refusals are respected"""
+        assert compression.choose_encoding("br;q=0.5, gzip", {"br": "", "gzip": ""}) == "gzip"
+        assert compression.choose_encoding("br;q=0, gzip;q=0", {"br": "", "gzip": ""}) is None
+        assert compression.choose_encoding("*", {"gzip": ""}) == "gzip"
+
+    def test_no_header(self):
+        """Test files are sent as is without an Accept-Encoding header"""
+        assert compression.choose_encoding(None, {"gzip": ""}) is None
+
+
+class TestCompressionMiddleware:
+    """Tests for CompressionMiddleware"""
+
+    def test_compresses_json(self):
+        """Test a large JSON response is gzipped when accepted"""
+        client = make_client()
+
+        resp = client.get("/compression-test/items", headers={"Accept-Encoding": "gzip"})
+
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.headers["vary"] == "Accept-Encoding"
+        assert int(resp.headers["content-length"]) < len(resp.content)
+        assert resp.json() == ITEMS
+
+    def test_not_accepted(self):
+        """Test the response is sent as is when the client does not accept a supported encoding"""
+        client = make_client()
+
+        resp = client.get("/compression-test/items", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in resp.headers
+        assert resp.json() == ITEMS
+
+    def test_minimum_size(self):
+        """Test responses smaller than the minimum size are sent as is"""
+        client = make_client()
+
+        assert "content-encoding" not in client.get("/compression-test/small", headers={"Accept-Encoding": "gzip"}).headers
+        assert "content-encoding" not in make_client(minimum_size=100000).get("/compression-test/items", headers={"Accept-Encoding": "gzip"}).headers
+        assert make_client(minimum_size=1).get("/compression-test/small", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+
+    def test_event_streams_are_not_compressed(self):
+        """Test event streams are sent as they are produced"""
+        client = make_client(minimum_size=1)
+
+        resp = client.get("/compression-test/events", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in resp.headers
+        assert resp.text == "data: 1\n\ndata: 2\n\n"
+
+    def test_no_compression_route(self):
+        """Test the routes decorated with no_compression are sent as they are"""
+        client = make_client()
+
+        resp = client.get("/compression-test/opted-out", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in resp.headers
+        assert resp.text == TEXT
+
+    def test_compresses_streams(self):
+        """Test a body sent in several chunks is compressed as one stream"""
+        client = make_client()
+
+        resp = client.get("/compression-test/stream", headers={"Accept-Encoding": "gzip"})
+
+        assert resp.headers["content-encoding"] == "gzip"
+        assert "content-length" not in resp.headers
+        assert resp.text == TEXT * 2
+
+    def test_precompressed_responses_are_passed_through(self):
+        """Test a response already compressed is not compressed again"""
+        client = make_client()
+
+        resp = client.get("/compression-test/precompressed", headers={"Accept-Encoding": "gzip"})
+
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.text == TEXT
+
+    def test_incompressible_types(self):
+        """Test the media types that do not compress are sent as is"""
+        client = make_client()
+
+        resp = client.get("/compression-test/image", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in resp.headers
+        assert resp.headers["etag"] == '"image"'
+
+    def test_partial_responses_are_not_compressed(self):
+        """Test a range of the body is sent as is, its Content-Range is on the uncompressed body"""
+        client = make_client()
+
+        resp = client.get("/compression-test/partial", headers={"Accept-Encoding": "gzip"})
+
+        assert resp.status_code == 206
+        assert "content-encoding" not in resp.headers
+        assert resp.text == TEXT[:1500]
+
+    def test_file_ranges_are_not_compressed(self, tmp_path):
+        """Test the range requests of a file are answered with the bytes asked for"""
+        path = tmp_path / "brewhouse.txt"
+        path.write_text(TEXT)
+        client = make_client(file_path=str(path))
+
+        resp = client.get("/compression-test/file", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-1499"})
+
+        assert resp.status_code == 206
+        assert "content-encoding" not in resp.headers
+        assert resp.headers["content-range"] == f"bytes 0-1499/{len(TEXT)}"
+        assert resp.text == TEXT[:1500]
+
+    def test_etag_is_weakened(self):
+        """Test the ETag of a compressed response is made weak, the bytes sent are not the ones it was computed for"""
+        client = make_client()
+
+        resp = client.get("/compression-test/tagged", headers={"Accept-Encoding": "gzip"})
+
+        assert resp.headers["etag"] == 'W/"tagged"'
+
+    def test_prefers_brotli(self):
+        """Test brotli is used at the configured quality when accepted"""
+        client = make_client(brotli_quality=5)
+
+        with patch("lib.compression.brotli.compress", wraps=brotli.compress) as mock_compress:
+            resp = client.get("/compression-test/tagged", headers={"Accept-Encoding": "gzip, br"})
+
+        assert resp.headers["content-encoding"] == "br"
+        assert resp.text == TEXT
+        mock_compress.assert_called_once_with(TEXT.encode(), quality=5)
+
+    def test_gzip_without_brotli(self):
+        """Test the responses are gzipped when brotli can not be imported"""
+        client = make_client()
+
+        with patch("lib.compression.brotli", None):
+            resp = client.get("/compression-test/tagged", headers={"Accept-Encoding": "gzip, br"})
+
+        assert resp.headers["content-encoding"] == "gzip"
+
+
+class TestCompressedSnapshot:
+    """Tests for CompressedSnapshot"""
+
+    def test_compressed_once(self):
+        """Test the variants are compressed when the snapshot is taken and served as they are"""
+        snapshot = CompressedSnapshot(TEXT.encode(), "text/plain")
+
+        with patch("lib.compression.compress") as mock_compress:
+            resp = snapshot.response({"accept-encoding": "gzip"})
+
+        mock_compress.assert_not_called()
+        assert gzip.decompress(resp.body) == TEXT.encode()
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.headers["vary"] == "Accept-Encoding"
+
+    def test_not_accepted(self):
+        """Test the body is served as is when no variant is accepted"""
+        snapshot = CompressedSnapshot(TEXT.encode(), "text/plain")
+
+        resp = snapshot.response({}, response_headers={"Cache-Control": "no-cache"})
+
+        assert resp.body == TEXT.encode()
+        assert "content-encoding" not in resp.headers
+        assert resp.headers["cache-control"] == "no-cache"
+
+    def test_small_body(self):
+        """Test a body smaller than the minimum size is not compressed"""
+        snapshot = CompressedSnapshot(b"{}", "application/json")
+
+        resp = snapshot.response({"accept-encoding": "gzip"})
+
+        assert snapshot.variants == {}
+        assert resp.body == b"{}"
+        assert "vary" not in resp.headers
@@ -0,0 +1,182 @@
+"""Tests for lib/config.py module (Config snapshot, lookups and reload)"""
+
+import json
+import signal
+from unittest.mock import MagicMock
+
+import pytest
+
+from lib.config import Config, ConfigHelper, RequiredConfigKeyNotFound
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    """Write a config file and return a function to rewrite it"""
+    path = tmp_path / "test.json"
+
+    def write(data):
+        path.write_text(json.dumps(data), encoding="utf-8")
+        return path.name
+
+    write(
+        {
+            "__conversion_schema": {"api.port": "int", "api.debug": "bool", "api.hosts": "list|;"},
+            "api": {"port": "5000", "debug": "false", "hosts": "a;b"},
+            "group": {"child": "value"},
+        }
+    )
+    return write
+
+
+@pytest.fixture
+def make_config(tmp_path, config_file):
+    """Create a Config instance without going through the singleton"""
+
+    def make(**kwargs):
+        config = object.__new__(Config)
+        kwargs.setdefault("env_prefix", "CFGTEST")
+        kwargs.setdefault("config_files", ["test.json"])
+        kwargs.setdefault("base_dir", str(tmp_path))
+        config.__init__(**kwargs)
+        return config
+
+    return make
+
+
+class TestConfigSnapshot:
+    """Tests for the resolved config snapshot"""
+
+    def test_values_are_converted_once(self, make_config):
+        """Test converted values are stored in the snapshot"""
+        config = make_config()
+
+        assert config.snapshot["CFGTEST_API_PORT"] == 5000
+        assert config.snapshot["CFGTEST_API_DEBUG"] is False
+        assert config.snapshot["CFGTEST_API_HOSTS"] == ["a", "b"]
+
+    def test_snapshot_is_read_only(self, make_config):
+        """Test the snapshot can not be modified"""
+        config = make_config()
+
+        with pytest.raises(TypeError):
+            config.snapshot["CFGTEST_API_PORT"] = 1
+
+    def test_environment_takes_precedence(self, make_config, monkeypatch):
+        """Test environment variables override the config files"""
+        monkeypatch.setenv("CFGTEST_API_PORT", "6000")
+        config = make_config()
+
+        assert config.get("api.port") == 6000
+
+    def test_explicit_configs_take_precedence(self, make_config, monkeypatch):
+        """Test explicit configs override the environment"""
+        monkeypatch.setenv("CFGTEST_API_PORT", "6000")
+        config = make_config(explicit_configs={"api": {"port": 7000}})
+
+        assert config.get("api.port") == 7000
+
+    def test_environment_is_read_at_setup(self, make_config, monkeypatch):
+        """Test environment changes are only picked up by a reload"""
+        config = make_config()
+        monkeypatch.setenv("CFGTEST_API_PORT", "6000")
+
+        assert config.get("api.port") == 5000
+
+        config.reload()
+
+        assert config.get("api.port") == 6000
+
+    def test_set_updates_snapshot(self, make_config):
+        """Test set values are visible to lookups that were already made"""
+        config = make_config()
+        assert config.get("api.port") == 5000
+
+        config.set("api.port", "5001")
+
+        assert config.get("api.port") == 5001
+
+
+class TestConfigGet:
+    """Tests for Config.get"""
+
+    def test_default_is_converted(self, make_config):
+        """Test the default is converted when no value is set"""
+        config = make_config(conversion_schema={"missing.port": "int"})
+
+        assert config.get("missing.port", "42") == 42
+
+    def test_default_returned_when_missing(self, make_config):
+        """Test the default is returned when no value is set"""
+        config = make_config()
+
+        assert config.get("missing.key", "default") == "default"
+        assert config.get("missing.key") is None
+
+    def test_required_raises(self, make_config):
+        """Test missing required keys raise"""
+        config = make_config()
+
+        with pytest.raises(RequiredConfigKeyNotFound):
+            config.get("missing.key", required=True)
+
+    def test_required_with_default(self, make_config):
+        """Test required keys with a default do not raise"""
+        config = make_config()
+
+        assert config.get("missing.key", "x", required=True) == "x"
+
+    def test_parent_key_returns_helper(self, make_config):
+        """Test a key with only child values returns a ConfigHelper"""
+        config = make_config()
+
+        helper = config.get("group")
+
+        assert isinstance(helper, ConfigHelper)
+        assert helper.get("child") == "value"
+
+
+class TestConfigReload:
+    """Tests for Config.reload and the SIGHUP handler"""
+
+    def test_reload_reads_config_files(self, make_config, config_file):
+        """Test reload picks up changes to the config files"""
+        config = make_config()
+        config_file({"__conversion_schema": {"api.port": "int"}, "api": {"port": "5002"}})
+
+        assert config.reload() is True
+        assert config.get("api.port") == 5002
+        assert config.get("api.hosts") is None
+
+    def test_reload_keeps_previous_config_on_error(self, make_config, config_file):
+        """Test a failed reload keeps the previous configuration"""
+        config = make_config()
+        config_file({"__conversion_schema": {"api.port": "int"}, "api": {"port": "not a number"}})
+
+        assert config.reload() is False
+        assert config.get("api.port") == 5000
+        assert config.get("api.hosts") == ["a", "b"]
+
+    def test_reload_keeps_config_overrides(self, make_config):
+        """Test config overrides with a conversion schema survive a reload"""
+        config = make_config(config_overrides={"__conversion_schema": {"extra.count": "int"}, "extra": {"count": "3"}})
+
+        config.reload()
+
+        assert config.get("extra.count") == 3
+
+    def test_install_reload_handler(self, make_config):
+        """Test the reload is bound to SIGHUP"""
+        config = make_config()
+        loop = MagicMock()
+
+        assert config.install_reload_handler(loop) is True
+
+        loop.add_signal_handler.assert_called_once_with(signal.SIGHUP, config.reload)
+
+    def test_install_reload_handler_unsupported(self, make_config):
+        """Test loops without signal support are tolerated"""
+        config = make_config()
+        loop = MagicMock()
+        loop.add_signal_handler.side_effect = NotImplementedError()
+
+        assert config.install_reload_handler(loop) is False
@@ -1,12 +1,48 @@
 """Tests for lib/json.py module"""
 
 import datetime
+from decimal import Decimal
+from unittest.mock import patch
 from uuid import UUID
 
 import pytest
 
 from lib import UsefulEnum
-from lib.json import CloudCommonJsonEncoder, dumps
+from lib import json as lib_json
+from lib.json import CloudCommonJsonEncoder, dumps, dumps_bytes, fast_dumps
+
+
+class Status(UsefulEnum):
+    ACTIVE = "active"
+
+
+FAST_PAYLOAD = {
+    "createdOn": datetime.datetime(2024, 6, 20, 14, 45, 0, 120000, tzinfo=datetime.timezone.utc),
+    "brewDate": datetime.date(2024, 6, 1),
+    "id": UUID("550e8400-e29b-41d4-a716-446655440000"),
+    "status": Status.ACTIVE,
+    "abv": Decimal("6.5"),
+    "tags": {"ipa"},
+    "name": "Brü",
+    1: None,
+}
+
+FAST_JSON = (
+    '{"createdOn":"2024-06-20T14:45:00.120000+00:00","brewDate":"2024-06-01","id":"550e8400-e29b-41d4-a716-446655440000",'
+    '"status":"active","abv":6.5,"tags":["ipa"],"name":"Brü","1":null}'
+)
+
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request):
+    """Run the test with orjson and with the json module fallback"""
+    if request.param == "orjson":
+        if lib_json.orjson is None:
+            pytest.skip("orjson is not installed")
+        yield request.param
+    else:
+        with patch.object(lib_json, "orjson", None):
+            yield request.param
 
 
 class TestCloudCommonJsonEncoder:
@@ -105,3 +141,40 @@ class TestDumps:
         """Test dumps handles special characters"""
         result = dumps({"message": "Hello\nWorld"})
         assert "\\n" in result
+
+
+class TestDumpsBytes:
+    """Tests for dumps_bytes and fast_dumps"""
+
+    def test_serializes_native_types(self, encoder):
+        """Test datetimes, dates, UUIDs, enums, decimals and sets are serialized like jsonable_encoder does"""
+        assert dumps_bytes(FAST_PAYLOAD) == FAST_JSON.encode("utf-8")
+
+    def test_datetime_offsets(self, encoder):
+        """Test datetimes keep their offset as isoformat renders it, UTC included"""
+        result = dumps_bytes(
+            {
+                "utc": datetime.datetime(2024, 6, 20, 14, 45, tzinfo=datetime.timezone.utc),
+                "cest": datetime.datetime(2024, 6, 20, 14, 45, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+            }
+        )
+
+        assert result == b'{"utc":"2024-06-20T14:45:00+00:00","cest":"2024-06-20T14:45:00+02:00"}'
+
+    def test_json_repr(self, encoder):
+        """Test objects with a _json_repr_ method are serialized with it"""
+
+        class CustomObject:
+            def _json_repr_(self):
+                return {"custom": "test"}
+
+        assert dumps_bytes([CustomObject()]) == b'[{"custom":"test"}]'
+
+    def test_unsupported_type_raises(self, encoder):
+        """Test an object that can not be serialized raises a TypeError"""
+        with pytest.raises(TypeError):
+            dumps_bytes({"obj": object()})
+
+    def test_fast_dumps_returns_string(self, encoder):
+        """Test fast_dumps, the database JSON serializer, returns the JSON as a string"""
+        assert fast_dumps(FAST_PAYLOAD) == FAST_JSON
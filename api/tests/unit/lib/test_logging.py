@@ -0,0 +1,166 @@
+"""Tests for lib/logging.py module (background log queue and sampling)"""
+
+import importlib
+import logging as std_logging
+import queue
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# conftest replaces the `lib.logging` attribute with a stub, so load the real module
+log_module = importlib.import_module("lib.logging")
+
+
+def make_record(level=std_logging.DEBUG, msg="message %s", args=("arg",)):
+    """Create a log record"""
+    return std_logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+
+def make_config(values):
+    """Create a config mock returning the given values"""
+    config = MagicMock()
+    config.get.side_effect = lambda key, default=None: values.get(key, default)
+    return config
+
+
+@pytest.fixture
+def root_logger():
+    """Restore the root logger and stop the log queue after the test"""
+    root = std_logging.getLogger()
+    handlers = list(root.handlers)
+    level = root.level
+    yield root
+    log_module.stop_queue_listener()
+    for name, f in log_module._sampling_filters.items():
+        std_logging.getLogger(name).removeFilter(f)
+    log_module._sampling_filters.clear()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+class TestNonBlockingQueueHandler:
+    """Tests for NonBlockingQueueHandler"""
+
+    def test_renders_message_before_queuing(self):
+        """Test the message is rendered when the record is queued, so arguments mutated afterwards are logged as they were"""
+        handler = log_module.NonBlockingQueueHandler(queue.Queue())
+        data = {"volume": 1}
+
+        handler.emit(make_record(msg="data: %s", args=(data,)))
+        data["last_updated_on"] = "now"
+
+        queued = handler.queue.get_nowait()
+        assert queued.getMessage() == "data: {'volume': 1}"
+        assert queued.args is None
+
+    def test_drops_when_full(self):
+        """Test records are dropped and counted when the queue is full"""
+        handler = log_module.NonBlockingQueueHandler(queue.Queue(maxsize=1))
+
+        handler.emit(make_record())
+        handler.emit(make_record())
+        handler.emit(make_record())
+
+        assert handler.queue.qsize() == 1
+        assert handler.get_stats() == {"depth": 1, "max_size": 1, "dropped": 2}
+
+    def test_reports_dropped_records(self):
+        """Test a warning is queued once there is room again"""
+        handler = log_module.NonBlockingQueueHandler(queue.Queue(maxsize=2))
+        handler.emit(make_record())
+        handler.emit(make_record())
+        handler.emit(make_record())
+        handler.queue.get_nowait()
+        handler.queue.get_nowait()
+
+        handler.emit(make_record(msg="next", args=()))
+
+        warning = handler.queue.get_nowait()
+        assert warning.levelno == std_logging.WARNING
+        assert warning.getMessage() == "Dropped 1 log records because the log queue was full"
+        assert handler.queue.get_nowait().msg == "next"
+
+
+class TestSamplingFilter:
+    """Tests for SamplingFilter"""
+
+    def test_keeps_every_nth_record(self):
+        """Test sampling keeps one in every 1 / sample_rate records"""
+        f = log_module.SamplingFilter(sample_rate=0.25)
+
+        kept = [f.filter(make_record()) for _ in range(8)]
+
+        assert kept == [True, False, False, False, True, False, False, False]
+        assert f.suppressed == 6
+
+    def test_zero_rate_drops_all(self):
+        """Test a sample rate of 0 drops every sampled record"""
+        f = log_module.SamplingFilter(sample_rate=0)
+
+        assert not f.filter(make_record())
+
+    def test_higher_levels_always_pass(self):
+        """Test records above the sampled level are never dropped"""
+        f = log_module.SamplingFilter(sample_rate=0, max_per_sec=0)
+
+        assert f.filter(make_record(level=std_logging.INFO))
+        assert f.suppressed == 0
+
+    def test_rate_limit(self):
+        """Test at most max_per_sec records are kept each second"""
+        f = log_module.SamplingFilter(max_per_sec=2)
+
+        with patch.object(log_module.time, "monotonic", return_value=100.0):
+            kept = [f.filter(make_record()) for _ in range(4)]
+        with patch.object(log_module.time, "monotonic", return_value=101.0):
+            kept.append(f.filter(make_record()))
+
+        assert kept == [True, True, False, False, True]
+
+
+class TestInit:
+    """Tests for init"""
+
+    def test_uses_queue_handler(self, root_logger):
+        """Test the root logger hands records to the background queue"""
+        log_module.init(config=make_config({"logging.colored": False}))
+
+        assert len(root_logger.handlers) == 1
+        assert isinstance(root_logger.handlers[0], log_module.NonBlockingQueueHandler)
+        assert log_module.get_queue_stats()["enabled"] is True
+        assert log_module.get_queue_stats()["max_size"] == log_module.DEFAULT_QUEUE_SIZE
+
+    def test_queue_disabled(self, root_logger):
+        """Test the queue can be disabled"""
+        log_module.init(config=make_config({"logging.colored": False, "logging.queue.enabled": False}))
+
+        assert type(root_logger.handlers[0]) is std_logging.StreamHandler
+        assert log_module.get_queue_stats()["enabled"] is False
+
+    def test_installs_sampling_filters(self, root_logger):
+        """Test sampling and rate limits are installed on the configured loggers"""
+        config = make_config(
+            {
+                "logging.colored": False,
+                "logging.sampling": {"test.sampled": "0.5"},
+                "logging.rate_limits": {"test.sampled": "10", "test.limited": 5},
+            }
+        )
+
+        log_module.init(config=config)
+
+        sampled = log_module._sampling_filters["test.sampled"]
+        assert sampled.every == 2
+        assert sampled.max_per_sec == 10
+        assert log_module._sampling_filters["test.limited"].max_per_sec == 5
+        assert sampled in std_logging.getLogger("test.sampled").filters
+        assert set(log_module.get_queue_stats()["suppressed"]) == {"test.sampled", "test.limited"}
+
+    def test_writes_through_listener(self, root_logger, capsys):
+        """Test records reach stderr through the listener thread"""
+        log_module.init(config=make_config({"logging.colored": False, "logging.level": "INFO"}))
+
+        std_logging.getLogger("test.listener").info("hello %s", "world")
+        log_module.stop_queue_listener()
+
+        assert "hello world" in capsys.readouterr().err
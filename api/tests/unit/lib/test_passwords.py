@@ -0,0 +1,93 @@
+"""Tests for lib/passwords.py module"""
+
+import asyncio
+import threading
+
+import pytest
+from argon2 import PasswordHasher
+
+from lib.exceptions import PasswordHashingBusy
+from lib.passwords import PasswordService
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+# cheap parameters so the tests do not spend their time hashing
+def create_hasher(time_cost=1):
+    return PasswordHasher(time_cost=time_cost, memory_cost=8, parallelism=1)
+
+
+@pytest.fixture
+def service():
+    service = PasswordService(workers=1, max_pending=4, queue_timeout=1, hasher=create_hasher())
+    yield service
+    service.shutdown()
+
+
+class TestPasswordService:
+    """Tests for PasswordService"""
+
+    def test_hash_and_verify(self, service):
+        """Test a hashed password verifies"""
+        password_hash = run_async(service.hash("secret"))
+
+        assert password_hash.startswith("$argon2")
+        assert run_async(service.verify(password_hash, "secret")) is True
+
+    def test_verify_mismatch(self, service):
+        """Test a wrong password returns False instead of raising"""
+        password_hash = run_async(service.hash("secret"))
+
+        assert run_async(service.verify(password_hash, "wrong")) is False
+
+    def test_verify_invalid_hash(self, service):
+        """Test a malformed hash returns False instead of raising"""
+        assert run_async(service.verify("not-a-hash", "secret")) is False
+
+    def test_hashing_runs_off_the_event_loop(self, service):
+        """Test the hashing is done on the pool's threads"""
+        threads = []
+        hasher = service.hasher
+
+        def _hash(password):
+            threads.append(threading.current_thread().name)
+            return hasher.hash(password)
+
+        service.hasher = type("Hasher", (), {"hash": staticmethod(_hash)})()
+        run_async(service.hash("secret"))
+
+        assert threads[0].startswith("password-hasher")
+
+    def test_needs_rehash_when_parameters_change(self, service):
+        """Test hashes created with old parameters are flagged for rehashing"""
+        old_hash = create_hasher(time_cost=2).hash("secret")
+
+        assert service.needs_rehash(old_hash) is True
+        assert service.needs_rehash(run_async(service.hash("secret"))) is False
+
+    def test_busy_when_too_many_pending(self):
+        """Test operations past the pending limit fail once the queue timeout passes"""
+        service = PasswordService(workers=1, max_pending=1, queue_timeout=0.01, hasher=create_hasher())
+        release = threading.Event()
+
+        def _blocking_hash(password):
+            release.wait(5)
+            return "hash"
+
+        service.hasher = type("Hasher", (), {"hash": staticmethod(_blocking_hash)})()
+
+        async def _run():
+            first = asyncio.create_task(service.hash("one"))
+            await asyncio.sleep(0)
+            try:
+                with pytest.raises(PasswordHashingBusy):
+                    await service.hash("two")
+            finally:
+                release.set()
+            return await first
+
+        assert run_async(_run()) == "hash"
+        service.shutdown()
@@ -0,0 +1,70 @@
+"""Tests for lib/roles.py module"""
+
+from unittest.mock import patch
+
+import pytest
+
+from lib import roles
+
+
+class TestGetRole:
+    """Tests for get_role"""
+
+    def test_defaults_to_all(self, monkeypatch):
+        """Test the default role runs everything"""
+        monkeypatch.delenv(roles.ROLE_ENV, raising=False)
+        with patch.object(roles, "CONFIG") as mock_config:
+            mock_config.get.return_value = None
+
+            assert roles.get_role() == roles.ALL
+
+    def test_from_config(self, monkeypatch):
+        """Test the role is read from the config"""
+        monkeypatch.delenv(roles.ROLE_ENV, raising=False)
+        with patch.object(roles, "CONFIG") as mock_config:
+            mock_config.get.return_value = "INGEST"
+
+            assert roles.get_role() == roles.INGEST
+
+    def test_environment_wins(self, monkeypatch):
+        """Test the role set for worker processes takes precedence"""
+        monkeypatch.setenv(roles.ROLE_ENV, "api")
+        with patch.object(roles, "CONFIG") as mock_config:
+            mock_config.get.return_value = "ingest"
+
+            assert roles.get_role() == roles.API
+
+    def test_invalid(self, monkeypatch):
+        """Test unknown roles are rejected"""
+        monkeypatch.setenv(roles.ROLE_ENV, "worker")
+
+        with pytest.raises(ValueError):
+            roles.get_role()
+
+
+class TestSetRole:
+    """Tests for set_role"""
+
+    def test_sets_environment(self, monkeypatch):
+        """Test the role is passed on through the environment"""
+        monkeypatch.delenv(roles.ROLE_ENV, raising=False)
+
+        roles.set_role(roles.API)
+
+        assert roles.get_role() == roles.API
+        monkeypatch.delenv(roles.ROLE_ENV)
+
+    def test_invalid(self):
+        """Test unknown roles are rejected"""
+        with pytest.raises(ValueError):
+            roles.set_role("worker")
+
+
+class TestRoleChecks:
+    """Tests for serves_api and runs_ingestion"""
+
+    @pytest.mark.parametrize("role,api,ingest", [("all", True, True), ("api", True, False), ("ingest", False, True)])
+    def test_roles(self, role, api, ingest):
+        """Test what each role runs"""
+        assert roles.serves_api(role) is api
+        assert roles.runs_ingestion(role) is ingest
@@ -0,0 +1,118 @@
+"""Tests for lib/startup_profile.py module (import profiling and time to first request)"""
+
+import asyncio
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from lib.startup_profile import FirstRequestTimer, ImportProfiler
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+@pytest.fixture
+def fake_package(tmp_path, monkeypatch):
+    """Create a package importing a child module"""
+    pkg = tmp_path / "startup_profile_pkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("from startup_profile_pkg import child\n")
+    (pkg / "child.py").write_text("VALUE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "startup_profile_pkg"
+    for name in ["startup_profile_pkg", "startup_profile_pkg.child"]:
+        sys.modules.pop(name, None)
+
+
+class TestImportProfiler:
+    """Tests for ImportProfiler"""
+
+    def test_records_import_tree(self, fake_package):
+        """Test imports are recorded nested under the module importing them"""
+        profiler = ImportProfiler()
+        profiler.install()
+        try:
+            __import__(fake_package)
+        finally:
+            profiler.uninstall()
+
+        [node] = [n for n in profiler.root.children if n.name == fake_package]
+        assert [c.name for c in node.children] == [f"{fake_package}.child"]
+        assert node.elapsed >= node.children[0].elapsed > 0
+
+    def test_modules_keep_real_loader(self, fake_package):
+        """Test the imported modules do not see the timing wrapper"""
+        profiler = ImportProfiler()
+        profiler.install()
+        try:
+            module = __import__(fake_package)
+        finally:
+            profiler.uninstall()
+
+        assert type(module.__loader__).__name__ != "_TimedLoader"
+        assert module.__spec__.loader is module.__loader__
+        assert module.child.VALUE == 1
+
+    def test_uninstall(self):
+        """Test the profiler is removed from the import system"""
+        profiler = ImportProfiler()
+        profiler.install()
+        profiler.uninstall()
+
+        assert profiler not in sys.meta_path
+
+    def test_format_tree(self):
+        """Test the tree is rendered slowest first, leaving out fast imports"""
+        profiler = ImportProfiler()
+        slow = profiler.push("slow")
+        child = profiler.push("slow.child")
+        profiler.pop(child, 0.02)
+        profiler.pop(slow, 0.05)
+        fast = profiler.push("fast")
+        profiler.pop(fast, 0.0001)
+        medium = profiler.push("medium")
+        profiler.pop(medium, 0.01)
+
+        lines = profiler.format_tree(min_ms=1.0).splitlines()
+
+        assert [line.split("ms")[1].rstrip() for line in lines] == ["  <imports>", "    slow", "      slow.child", "    medium"]
+        assert lines[0].strip().startswith("60.1")
+
+
+class TestFirstRequestTimer:
+    """Tests for FirstRequestTimer"""
+
+    def test_reports_first_request_once(self):
+        """Test only the first completed response is reported"""
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        callback = MagicMock()
+        timer = FirstRequestTimer(app, on_first_request=callback)
+        send = MagicMock(side_effect=lambda msg: asyncio.sleep(0))
+
+        run_async(timer({"type": "http", "path": "/health"}, None, send))
+        run_async(timer({"type": "http", "path": "/other"}, None, send))
+
+        callback.assert_called_once()
+        assert callback.call_args[0][0] == "/health"
+        assert send.call_count == 4
+
+    def test_ignores_non_http(self):
+        """Test lifespan events are not reported"""
+
+        async def app(scope, receive, send):
+            pass
+
+        callback = MagicMock()
+        timer = FirstRequestTimer(app, on_first_request=callback)
+
+        run_async(timer({"type": "lifespan"}, None, None))
+
+        callback.assert_not_called()
+        assert timer.reported is False
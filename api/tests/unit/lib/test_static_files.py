@@ -0,0 +1,155 @@
+"""Tests for lib/static_files.py module"""
+
+import gzip
+import os
+
+import pytest
+
+from lib import static_files
+from lib.static_files import StaticSite
+
+BUNDLE = "console.log('brewhouse');\n" * 200
+
+
+@pytest.fixture
+def build_dir(tmp_path):
+    """An Angular build directory"""
+    (tmp_path / "index.html").write_text("<html><body><app-root></app-root></body></html>")
+    (tmp_path / "main-2KLUPYG5.js").write_text(BUNDLE)
+    (tmp_path / "favicon.ico").write_bytes(b"\x00" * 10)
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "logo-ABCD1234.png").write_bytes(b"png")
+    return tmp_path
+
+
+class TestPrecompress:
+    """Tests for precompress"""
+
+    def test_writes_compressed_variants(self, build_dir):
+        """Test compressible files get a gzip variant next to them, small and binary files are skipped"""
+        static_files.precompress(str(build_dir))
+
+        with open(build_dir / "main-2KLUPYG5.js.gz", "rb") as f:
+            assert gzip.decompress(f.read()).decode() == BUNDLE
+        assert not os.path.exists(build_dir / "favicon.ico.gz")
+        assert not os.path.exists(build_dir / "assets" / "logo-ABCD1234.png.gz")
+
+    def test_idempotent(self, build_dir):
+        """Test running it again does not compress the variants"""
+        static_files.precompress(str(build_dir))
+        static_files.precompress(str(build_dir))
+
+        assert not os.path.exists(build_dir / "main-2KLUPYG5.js.gz.gz")
+
+
+class TestStaticSite:
+    """Tests for StaticSite"""
+
+    def test_indexes_files(self, build_dir):
+        """Test the files are indexed with their variants, index.html is kept in memory"""
+        static_files.precompress(str(build_dir))
+
+        site = StaticSite(str(build_dir)).load()
+
+        assert set(site.files) == {"main-2KLUPYG5.js", "favicon.ico", "assets/logo-ABCD1234.png"}
+        assert site.get("/main-2KLUPYG5.js").variants["gzip"] == str(build_dir / "main-2KLUPYG5.js.gz")
+        assert site.index.body == b"<html><body><app-root></app-root></body></html>"
+        assert "gzip" in site.index.variants
+
+    def test_uploads_are_not_indexed(self, build_dir):
+        """Test the uploads are looked up when requested, including the ones added after the build was indexed"""
+        uploads_dir = build_dir / "assets" / "uploads"
+        (uploads_dir / "img" / "beer").mkdir(parents=True)
+        (uploads_dir / "img" / "beer" / "old.png").write_bytes(b"old")
+
+        site = StaticSite(str(build_dir)).load()
+        (uploads_dir / "img" / "beer" / "new.png").write_bytes(b"new")
+
+        assert "assets/uploads/img/beer/old.png" not in site.files
+        assert site.get_upload("assets/uploads/img/beer/old.png").path == str(uploads_dir / "img" / "beer" / "old.png")
+        assert site.get_upload("/assets/uploads/img/beer/new.png").media_type == "image/png"
+        assert site.get_upload("assets/uploads/img/beer/missing.png") is None
+
+    def test_uploads_dir(self, build_dir, tmp_path_factory):
+        """Test the uploads are served from the configured directory, without escaping it"""
+        uploads_dir = tmp_path_factory.mktemp("uploads")
+        (uploads_dir / "label.png").write_bytes(b"png")
+        (uploads_dir / ".label.part").write_bytes(b"partial")
+
+        site = StaticSite(str(build_dir), uploads_dir=str(uploads_dir)).load()
+
+        assert site.get_upload("assets/uploads/label.png").path == str(uploads_dir / "label.png")
+        assert site.get_upload("assets/uploads/.label.part") is None
+        assert site.get_upload("assets/uploads/../../index.html") is None
+        assert site.get_upload("main-2KLUPYG5.js") is None
+
+    def test_missing_directory(self):
+        """Test nothing is served when the build is missing"""
+        site = StaticSite("/nonexistent").load()
+
+        assert site.files == {}
+        assert site.index is None
+
+    def test_hashed_bundles_are_immutable(self, build_dir):
+        """Test only the bundles named after their hash are cached for good, copied assets are revalidated"""
+        site = StaticSite(str(build_dir)).load()
+
+        assert site.get("main-2KLUPYG5.js").cache_control == static_files.IMMUTABLE_CACHE_CONTROL
+        assert site.get("favicon.ico").cache_control == "no-cache"
+        assert site.get("assets/logo-ABCD1234.png").cache_control == "no-cache"
+
+    def test_path_traversal(self, build_dir):
+        """Test only indexed files can be served"""
+        site = StaticSite(str(build_dir / "assets")).load()
+
+        assert site.get("../main-2KLUPYG5.js") is None
+        assert site.get("/etc/passwd") is None
+
+    def test_file_response_negotiates_encoding(self, build_dir):
+        """Test the compressed variant is served to the clients accepting it"""
+        static_files.precompress(str(build_dir))
+        site = StaticSite(str(build_dir)).load()
+        static_file = site.get("main-2KLUPYG5.js")
+
+        compressed = site.file_response(static_file, {"accept-encoding": "gzip"})
+        plain = site.file_response(static_file, {})
+
+        assert compressed.path.endswith(".js.gz")
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert compressed.headers["vary"] == "Accept-Encoding"
+        assert compressed.media_type.startswith(("text/javascript", "application/javascript"))
+        assert plain.path.endswith(".js")
+        assert "content-encoding" not in plain.headers
+        assert compressed.headers["etag"] != plain.headers["etag"]
+
+    def test_not_modified(self, build_dir):
+        """Test a 304 is returned when the client has the current version"""
+        site = StaticSite(str(build_dir)).load()
+        static_file = site.get("favicon.ico")
+
+        resp = site.file_response(static_file, {"if-none-match": static_file.etag})
+
+        assert resp.status_code == 304
+
+    def test_not_modified_weak_etag(self, build_dir):
+        """Test the weak ETag sent back for a response the compression middleware weakened is matched"""
+        site = StaticSite(str(build_dir)).load()
+        static_file = site.get("favicon.ico")
+
+        assert site.file_response(static_file, {"if-none-match": f'"other", W/{static_file.etag}'}).status_code == 304
+        assert site.index_response({"if-none-match": f"W/{site.index_etag}"}).status_code == 304
+        assert site.file_response(static_file, {"if-none-match": 'W/"other"'}).status_code == 200
+
+    def test_index_response(self, build_dir):
+        """Test index.html is served from memory, compressed when accepted and always revalidated"""
+        site = StaticSite(str(build_dir)).load()
+
+        compressed = site.index_response({"accept-encoding": "gzip"})
+        plain = site.index_response({})
+        not_modified = site.index_response({"if-none-match": plain.headers["etag"]})
+
+        assert gzip.decompress(compressed.body) == site.index.body
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert plain.body == site.index.body
+        assert plain.headers["cache-control"] == "no-cache"
+        assert not_modified.status_code == 304
@@ -0,0 +1,165 @@
+"""Tests for routers/assets.py module - Assets router"""
+
+import asyncio
+from io import BytesIO
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from routers import assets as assets_router
+
+IMAGE_HASH = "a" * 64
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def make_request(accept="image/webp,*/*"):
+    """Create a request mock with the given Accept header"""
+    request = MagicMock()
+    request.headers = {"accept": accept}
+    return request
+
+
+def make_manager(serves_files=True, derivative=None, original=None):
+    """Create an asset manager mock"""
+    manager = MagicMock()
+    manager.serves_files = serves_files
+    manager.get_derivative = AsyncMock(return_value=derivative)
+    manager.read_original = AsyncMock(return_value=original)
+    return manager
+
+
+class TestUploadImage:
+    """Tests for upload_image endpoint"""
+
+    def test_returns_derivatives(self):
+        """Test the derivative URLs are returned for raster images"""
+        manager = make_manager()
+        manager.get_file_extension.return_value = "png"
+        manager.save = AsyncMock(return_value=("label.png", f"{IMAGE_HASH}.png", f"/assets/uploads/img/beer/{IMAGE_HASH}.png"))
+        manager.run_io = AsyncMock(side_effect=lambda fn, *args: fn(*args))
+        file = MagicMock()
+        file.filename = "label.png"
+        file.file = BytesIO(b"image")
+
+        with patch.object(assets_router, "get_asset_manager", return_value=manager), patch.object(assets_router, "CONFIG") as mock_config:
+            mock_config.get.return_value = ["png"]
+            with patch.object(assets_router.images, "create_derivatives", AsyncMock(return_value=True)) as mock_create:
+                result = run_async(assets_router.upload_image("beer", file, MagicMock()))
+
+        mock_create.assert_awaited_once_with(manager, "beer", IMAGE_HASH, b"image")
+        assert result["destinationPath"] == f"/assets/uploads/img/beer/{IMAGE_HASH}.png"
+        assert result["hash"] == IMAGE_HASH
+        assert result["derivatives"]["tile"] == f"/api/v1/uploads/images/beer/{IMAGE_HASH}?size=tile"
+
+    def test_vector_images_have_no_derivatives(self):
+        """Test no derivatives are rendered for SVG uploads"""
+        manager = make_manager()
+        manager.get_file_extension.return_value = "svg"
+        manager.save = AsyncMock(return_value=("label.svg", f"{IMAGE_HASH}.svg", f"/assets/uploads/img/beer/{IMAGE_HASH}.svg"))
+        file = MagicMock()
+        file.filename = "label.svg"
+
+        with patch.object(assets_router, "get_asset_manager", return_value=manager), patch.object(assets_router, "CONFIG") as mock_config:
+            mock_config.get.return_value = ["svg"]
+            with patch.object(assets_router.images, "create_derivatives", AsyncMock()) as mock_create:
+                result = run_async(assets_router.upload_image("beer", file, MagicMock()))
+
+        mock_create.assert_not_called()
+        assert "derivatives" not in result
+
+
+class TestGetImage:
+    """Tests for get_image endpoint"""
+
+    def test_serves_file(self, tmp_path):
+        """Test a stored derivative is served with immutable cache headers, as WebP when accepted"""
+        path = tmp_path / "tile.webp"
+        path.write_bytes(b"webp")
+        manager = make_manager(derivative=str(path))
+
+        with patch.object(assets_router, "get_asset_manager", return_value=manager):
+            resp = run_async(assets_router.get_image("beer", IMAGE_HASH, make_request(), size="tile"))
+
+        manager.get_derivative.assert_awaited_once_with("beer", IMAGE_HASH, "tile.webp")
+        assert resp.media_type == "image/webp"
+        assert resp.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert resp.headers["vary"] == "Accept"
+
+    def test_jpeg_fallback(self, tmp_path):
+        """Test JPEG is served to clients not accepting WebP"""
+        path = tmp_path / "full.jpg"
+        path.write_bytes(b"jpg")
+        manager = make_manager(derivative=str(path))
+
+        with patch.object(assets_router, "get_asset_manager", return_value=manager):
+            resp = run_async(assets_router.get_image("beer", IMAGE_HASH, make_request("image/jpeg")))
+
+        manager.get_derivative.assert_awaited_once_with("beer", IMAGE_HASH, "full.jpg")
+        assert resp.media_type == "image/jpeg"
+
+    def test_redirects_to_s3(self):
+        """Test derivatives stored in S3 are redirected to"""
+        manager = make_manager(serves_files=False, derivative="https://bucket.s3.amazonaws.com/beer/derived/tile.webp")
+
+        with patch.object(assets_router, "get_asset_manager", return_value=manager):
+            resp = run_async(assets_router.get_image("beer", IMAGE_HASH, make_request(), size="tile"))
+
+        assert resp.status_code == 307
+        assert resp.headers["location"] == "https://bucket.s3.amazonaws.com/beer/derived/tile.webp"
+
+    def test_renders_missing_derivatives(self, tmp_path):
+        """Test the derivatives of an image uploaded before they existed are rendered on first request"""
+        path = tmp_path / "thumb.webp"
+        path.write_bytes(b"webp")
+        manager = make_manager(original=b"original")
+        manager.get_derivative.side_effect = [None, str(path)]
+
+        with patch.object(assets_router, "get_asset_manager", return_value=manager):
+            with patch.object(assets_router.images, "create_derivatives", AsyncMock(return_value=True)) as mock_create:
+                resp = run_async(assets_router.get_image("beer", IMAGE_HASH, make_request(), size="thumb"))
+
+        mock_create.assert_awaited_once_with(manager, "beer", IMAGE_HASH, b"original")
+        assert resp.path == str(path)
+
+    def test_renders_legacy_uploads(self, tmp_path):
+        """Test the derivatives of an image stored under a UUID name are rendered from its original"""
+        legacy_id = "0b6f1a3c-5d2e-4f7a-9c8b-1e2d3f4a5b6c"
+        path = tmp_path / "full.webp"
+        path.write_bytes(b"webp")
+        manager = make_manager(original=b"original")
+        manager.get_derivative.side_effect = [None, str(path)]
+
+        with patch.object(assets_router, "get_asset_manager", return_value=manager):
+            with patch.object(assets_router.images, "create_derivatives", AsyncMock(return_value=True)) as mock_create:
+                resp = run_async(assets_router.get_image("beer", legacy_id, make_request()))
+
+        manager.read_original.assert_awaited_once_with("beer", legacy_id)
+        mock_create.assert_awaited_once_with(manager, "beer", legacy_id, b"original")
+        assert resp.path == str(path)
+
+    def test_not_found(self):
+        """Test a 404 is returned for unknown images"""
+        manager = make_manager()
+
+        with patch.object(assets_router, "get_asset_manager", return_value=manager):
+            with pytest.raises(HTTPException) as exc_info:
+                run_async(assets_router.get_image("beer", IMAGE_HASH, make_request()))
+
+        assert exc_info.value.status_code == 404
+
+    def test_invalid_parameters(self):
+        """Test invalid sizes and hashes are rejected before reaching the storage"""
+        with patch.object(assets_router, "get_asset_manager") as mock_get_manager:
+            with pytest.raises(HTTPException) as size_exc:
+                run_async(assets_router.get_image("beer", IMAGE_HASH, make_request(), size="huge"))
+            with pytest.raises(HTTPException) as hash_exc:
+                run_async(assets_router.get_image("beer", "../../etc/passwd", make_request()))
+
+        assert size_exc.value.status_code == 400
+        assert hash_exc.value.status_code == 404
+        mock_get_manager.assert_not_called()
@@ -77,16 +77,61 @@ class TestLogin:
         mock_session = AsyncMock()
         login_data = LoginRequest(email="test@example.com", password="password123")
 
-        with patch("routers.auth.UsersDB") as mock_users_db, patch("routers.auth.PasswordHasher") as mock_ph_class:
+        with patch("routers.auth.UsersDB") as mock_users_db, patch("routers.auth.get_password_service") as mock_get_service:
             mock_users_db.get_by_email = AsyncMock(return_value=mock_user)
+            mock_users_db.update = AsyncMock()
             mock_ph = MagicMock()
-            mock_ph.verify.return_value = True
-            mock_ph_class.return_value = mock_ph
+            mock_ph.verify = AsyncMock(return_value=True)
+            mock_ph.needs_rehash.return_value = False
+            mock_get_service.return_value = mock_ph
 
             result = run_async(login(mock_request, login_data, mock_session))
 
             assert result is True
             assert mock_request.session["user_id"] == "user-1"
+            mock_users_db.update.assert_not_called()
+
+    def test_login_rehashes_outdated_hash(self):
+        """Test the password is rehashed when the argon2 parameters changed"""
+        from routers.auth import LoginRequest, login
+
+        mock_request = create_mock_request()
+        mock_user = create_mock_user(password_hash="hashed_password")
+        mock_session = AsyncMock()
+        login_data = LoginRequest(email="test@example.com", password="password123")
+
+        with patch("routers.auth.UsersDB") as mock_users_db, patch("routers.auth.get_password_service") as mock_get_service:
+            mock_users_db.get_by_email = AsyncMock(return_value=mock_user)
+            mock_users_db.update = AsyncMock()
+            mock_ph = MagicMock()
+            mock_ph.verify = AsyncMock(return_value=True)
+            mock_ph.needs_rehash.return_value = True
+            mock_get_service.return_value = mock_ph
+
+            result = run_async(login(mock_request, login_data, mock_session))
+
+            assert result is True
+            mock_users_db.update.assert_called_once_with(mock_session, "user-1", password="password123")
+
+    def test_login_password_service_busy(self):
+        """Test login fails with a 503 when too many password operations are pending"""
+        from lib.exceptions import PasswordHashingBusy
+        from routers.auth import LoginRequest, login
+
+        mock_request = create_mock_request()
+        mock_user = create_mock_user(password_hash="hashed_password")
+        login_data = LoginRequest(email="test@example.com", password="password123")
+
+        with patch("routers.auth.UsersDB") as mock_users_db, patch("routers.auth.get_password_service") as mock_get_service:
+            mock_users_db.get_by_email = AsyncMock(return_value=mock_user)
+            mock_ph = MagicMock()
+            mock_ph.verify = AsyncMock(side_effect=PasswordHashingBusy())
+            mock_get_service.return_value = mock_ph
+
+            with pytest.raises(HTTPException) as exc_info:
+                run_async(login(mock_request, login_data, AsyncMock()))
+
+            assert exc_info.value.status_code == 503
 
     def test_login_user_not_found(self):
         """Test login fails when user not found"""
@@ -124,8 +169,6 @@ class TestLogin:
 
     def test_login_wrong_password(self):
         """Test login fails with wrong password"""
-        from argon2.exceptions import VerifyMismatchError
-
         from routers.auth import LoginRequest, login
 
         mock_request = create_mock_request()
@@ -133,11 +176,11 @@ class TestLogin:
         mock_session = AsyncMock()
         login_data = LoginRequest(email="test@example.com", password="wrong_password")
 
-        with patch("routers.auth.UsersDB") as mock_users_db, patch("routers.auth.PasswordHasher") as mock_ph_class:
+        with patch("routers.auth.UsersDB") as mock_users_db, patch("routers.auth.get_password_service") as mock_get_service:
             mock_users_db.get_by_email = AsyncMock(return_value=mock_user)
             mock_ph = MagicMock()
-            mock_ph.verify.side_effect = VerifyMismatchError()
-            mock_ph_class.return_value = mock_ph
+            mock_ph.verify = AsyncMock(return_value=False)
+            mock_get_service.return_value = mock_ph
 
             with pytest.raises(HTTPException) as exc_info:
                 run_async(login(mock_request, login_data, mock_session))
@@ -188,7 +231,7 @@ class TestGoogleLogin:
 
         mock_request = create_mock_request()
 
-        with patch("routers.auth.CONFIG") as mock_config, patch("routers.auth.Flow") as mock_flow_class:
+        with patch("routers.auth.CONFIG") as mock_config, patch("google_auth_oauthlib.flow.Flow") as mock_flow_class:
             mock_config.get.side_effect = lambda key: {
                 "auth.oidc.google.enabled": True,
                 "auth.oidc.google.client_id": "client_id",
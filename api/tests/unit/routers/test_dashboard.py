@@ -63,8 +63,8 @@ class TestListDashboardLocations:
         mock_session = AsyncMock()
         mock_location = create_mock_location()
 
-        with patch("routers.dashboard.LocationsDB") as mock_db, patch("routers.dashboard.LocationService") as mock_service:
-            mock_db.query = AsyncMock(return_value=[mock_location])
+        with patch("routers.dashboard.reference_data") as mock_reference_data, patch("routers.dashboard.LocationService") as mock_service:
+            mock_reference_data.get_locations = AsyncMock(return_value=[mock_location])
             mock_service.transform_response = AsyncMock(return_value={"id": "loc-1"})
 
             result = run_async(list_dashboard_locations(mock_session))
@@ -262,12 +262,14 @@ class TestGetDashboard:
         mock_location = create_mock_location(id_="loc-1")
         mock_tap = create_mock_tap()
 
-        with patch("routers.dashboard.get_location_id", new_callable=AsyncMock) as mock_get_loc, patch("routers.dashboard.LocationsDB") as mock_loc_db, patch(
-            "routers.dashboard.TapsDB"
-        ) as mock_taps_db, patch("routers.dashboard.LocationService") as mock_loc_service, patch("routers.dashboard.TapService") as mock_tap_service:
+        with patch("routers.dashboard.get_location_id", new_callable=AsyncMock) as mock_get_loc, patch(
+            "routers.dashboard.reference_data"
+        ) as mock_reference_data, patch("routers.dashboard.TapsDB") as mock_taps_db, patch("routers.dashboard.LocationService") as mock_loc_service, patch(
+            "routers.dashboard.TapService"
+        ) as mock_tap_service:
             mock_get_loc.return_value = "loc-1"
-            mock_loc_db.query = AsyncMock(return_value=[mock_location])
-            mock_loc_db.get_by_pkey = AsyncMock(return_value=mock_location)
+            mock_reference_data.get_locations = AsyncMock(return_value=[mock_location])
+            mock_reference_data.get_location = AsyncMock(return_value=mock_location)
             mock_taps_db.query = AsyncMock(return_value=[mock_tap])
             mock_loc_service.transform_response = AsyncMock(return_value={"id": "loc-1", "name": "Test Location"})
             mock_tap_service.transform_response = AsyncMock(return_value={"id": "tap-1"})
@@ -279,6 +281,30 @@ class TestGetDashboard:
             assert "location" in result
             assert result["location"]["id"] == "loc-1"
 
+    def test_falls_back_to_database_for_uncached_location(self):
+        """Test loads the location from the database when the reference data does not know it yet"""
+        from routers.dashboard import get_dashboard
+
+        mock_session = AsyncMock()
+        mock_location = create_mock_location(id_="loc-new")
+
+        with patch("routers.dashboard.get_location_id", new_callable=AsyncMock) as mock_get_loc, patch(
+            "routers.dashboard.reference_data"
+        ) as mock_reference_data, patch("routers.dashboard.LocationsDB") as mock_loc_db, patch("routers.dashboard.TapsDB") as mock_taps_db, patch(
+            "routers.dashboard.LocationService"
+        ) as mock_loc_service:
+            mock_get_loc.return_value = "loc-new"
+            mock_reference_data.get_locations = AsyncMock(return_value=[])
+            mock_reference_data.get_location = AsyncMock(return_value=None)
+            mock_loc_db.get_by_pkey = AsyncMock(return_value=mock_location)
+            mock_taps_db.query = AsyncMock(return_value=[])
+            mock_loc_service.transform_response = AsyncMock(return_value={"id": "loc-new"})
+
+            result = run_async(get_dashboard("loc-new", mock_session))
+
+            mock_loc_db.get_by_pkey.assert_called_once_with(mock_session, "loc-new")
+            assert result["location"] == {"id": "loc-new"}
+
     def test_raises_404_when_location_not_found(self):
         """Test raises 404 when location not found"""
         from routers.dashboard import get_dashboard
@@ -301,12 +327,14 @@ class TestGetDashboard:
         mock_location = create_mock_location(id_="loc-1")
         mock_tap = create_mock_tap()
 
-        with patch("routers.dashboard.get_location_id", new_callable=AsyncMock) as mock_get_loc, patch("routers.dashboard.LocationsDB") as mock_loc_db, patch(
-            "routers.dashboard.TapsDB"
-        ) as mock_taps_db, patch("routers.dashboard.LocationService") as mock_loc_service, patch("routers.dashboard.TapService") as mock_tap_service:
+        with patch("routers.dashboard.get_location_id", new_callable=AsyncMock) as mock_get_loc, patch(
+            "routers.dashboard.reference_data"
+        ) as mock_reference_data, patch("routers.dashboard.TapsDB") as mock_taps_db, patch("routers.dashboard.LocationService") as mock_loc_service, patch(
+            "routers.dashboard.TapService"
+        ) as mock_tap_service:
             mock_get_loc.return_value = "loc-1"
-            mock_loc_db.query = AsyncMock(return_value=[mock_location])
-            mock_loc_db.get_by_pkey = AsyncMock(return_value=mock_location)
+            mock_reference_data.get_locations = AsyncMock(return_value=[mock_location])
+            mock_reference_data.get_location = AsyncMock(return_value=mock_location)
             mock_taps_db.query = AsyncMock(return_value=[mock_tap])
             mock_loc_service.transform_response = AsyncMock(return_value={"id": "loc-1"})
             mock_tap_service.transform_response = AsyncMock(return_value={"id": "tap-1"})
@@ -324,12 +352,14 @@ class TestGetDashboard:
         mock_location = create_mock_location(id_="loc-1")
         mock_tap = create_mock_tap()
 
-        with patch("routers.dashboard.get_location_id", new_callable=AsyncMock) as mock_get_loc, patch("routers.dashboard.LocationsDB") as mock_loc_db, patch(
-            "routers.dashboard.TapsDB"
-        ) as mock_taps_db, patch("routers.dashboard.LocationService") as mock_loc_service, patch("routers.dashboard.TapService") as mock_tap_service:
+        with patch("routers.dashboard.get_location_id", new_callable=AsyncMock) as mock_get_loc, patch(
+            "routers.dashboard.reference_data"
+        ) as mock_reference_data, patch("routers.dashboard.TapsDB") as mock_taps_db, patch("routers.dashboard.LocationService") as mock_loc_service, patch(
+            "routers.dashboard.TapService"
+        ) as mock_tap_service:
             mock_get_loc.return_value = "loc-1"
-            mock_loc_db.query = AsyncMock(return_value=[mock_location])
-            mock_loc_db.get_by_pkey = AsyncMock(return_value=mock_location)
+            mock_reference_data.get_locations = AsyncMock(return_value=[mock_location])
+            mock_reference_data.get_location = AsyncMock(return_value=mock_location)
             mock_taps_db.query = AsyncMock(return_value=[mock_tap])
             mock_loc_service.transform_response = AsyncMock(return_value={"id": "loc-1"})
             mock_tap_service.transform_response = AsyncMock(return_value={"id": "tap-1"})
@@ -340,3 +370,31 @@ class TestGetDashboard:
             mock_tap_service.transform_response.assert_called_once_with(
                 mock_tap, db_session=mock_session, include_location=False, filter_unsupported_tap_monitor=True
             )
+
+    def test_uses_read_model_when_enabled(self):
+        """Test builds the taps with the dashboard read model when dashboard.read_model.enabled is set"""
+        from routers.dashboard import get_dashboard
+
+        mock_session = AsyncMock()
+        mock_location = create_mock_location(id_="loc-1")
+
+        with patch("routers.dashboard.get_location_id", new_callable=AsyncMock) as mock_get_loc, patch(
+            "routers.dashboard.reference_data"
+        ) as mock_reference_data, patch("routers.dashboard.TapsDB") as mock_taps_db, patch("routers.dashboard.LocationService") as mock_loc_service, patch(
+            "routers.dashboard.DashboardService"
+        ) as mock_dashboard_service, patch(
+            "routers.dashboard.CONFIG"
+        ) as mock_config:
+            mock_config.get.side_effect = lambda key, default=None: key == "dashboard.read_model.enabled" or default
+            mock_get_loc.return_value = "loc-1"
+            mock_reference_data.get_locations = AsyncMock(return_value=[mock_location])
+            mock_reference_data.get_location = AsyncMock(return_value=mock_location)
+            mock_taps_db.query = AsyncMock()
+            mock_loc_service.transform_response = AsyncMock(return_value={"id": "loc-1"})
+            mock_dashboard_service.get_location_taps = AsyncMock(return_value=[{"id": "tap-1"}])
+
+            result = run_async(get_dashboard("loc-1", mock_session))
+
+            assert result["taps"] == [{"id": "tap-1"}]
+            mock_dashboard_service.get_location_taps.assert_called_once_with("loc-1", mock_session)
+            mock_taps_db.query.assert_not_called()
@@ -35,59 +35,31 @@ class TestGetLocationId:
         assert result == uuid_str
         mock_is_valid.assert_called_once_with(uuid_str)
 
-    def test_queries_database_when_not_uuid(self):
-        """Test queries database by name when identifier is not a UUID"""
+    def test_resolves_name_through_reference_data(self):
+        """Test resolves the name through the reference data cache when identifier is not a UUID"""
         from routers import get_location_id
 
         mock_session = AsyncMock()
-        mock_location = create_mock_location(id_="found-loc-id", name="My Brewery")
 
-        with patch("routers.util.is_valid_uuid", return_value=False), patch("db.locations.Locations") as mock_db:
-            mock_db.query = AsyncMock(return_value=[mock_location])
+        with patch("routers.util.is_valid_uuid", return_value=False), patch(
+            "services.reference_data.reference_data.get_location_id", new_callable=AsyncMock
+        ) as mock_get:
+            mock_get.return_value = "found-loc-id"
 
             result = run_async(get_location_id("My Brewery", mock_session))
 
         assert result == "found-loc-id"
-        mock_db.query.assert_called_once_with(mock_session, name="My Brewery")
-
-    def test_returns_first_location_id_when_multiple_match(self):
-        """Test returns first location ID when multiple locations match name"""
-        from routers import get_location_id
-
-        mock_session = AsyncMock()
-        mock_location1 = create_mock_location(id_="first-loc-id", name="Duplicate")
-        mock_location2 = create_mock_location(id_="second-loc-id", name="Duplicate")
-
-        with patch("routers.util.is_valid_uuid", return_value=False), patch("db.locations.Locations") as mock_db:
-            mock_db.query = AsyncMock(return_value=[mock_location1, mock_location2])
-
-            result = run_async(get_location_id("Duplicate", mock_session))
-
-        assert result == "first-loc-id"
+        mock_get.assert_called_once_with("My Brewery", mock_session)
 
     def test_returns_none_when_name_not_found(self):
-        """Test returns None when location name not found in database"""
+        """Test returns None when the reference data does not know the location name"""
         from routers import get_location_id
 
         mock_session = AsyncMock()
 
-        with patch("routers.util.is_valid_uuid", return_value=False), patch("db.locations.Locations") as mock_db:
-            mock_db.query = AsyncMock(return_value=[])
-
-            result = run_async(get_location_id("Unknown Location", mock_session))
-
-        assert result is None
-        mock_db.query.assert_called_once_with(mock_session, name="Unknown Location")
-
-    def test_returns_none_when_query_returns_none(self):
-        """Test returns None when database query returns None instead of empty list"""
-        from routers import get_location_id
-
-        mock_session = AsyncMock()
-
-        with patch("routers.util.is_valid_uuid", return_value=False), patch("db.locations.Locations") as mock_db:
-            mock_db.query = AsyncMock(return_value=None)
-
+        with patch("routers.util.is_valid_uuid", return_value=False), patch(
+            "services.reference_data.reference_data.get_location_id", new_callable=AsyncMock, return_value=None
+        ):
             result = run_async(get_location_id("Unknown Location", mock_session))
 
         assert result is None
@@ -106,3 +78,119 @@ class TestGetLocationId:
 
         assert result == uuid_str
         mock_db.query.assert_not_called()
+
+
+def make_fast_json_client():
+    """Create an app whose router uses FastJSONRoute"""
+    from datetime import datetime, timezone
+    from typing import List
+
+    from fastapi import APIRouter, FastAPI
+    from fastapi.responses import PlainTextResponse
+    from fastapi.testclient import TestClient
+    from pydantic import BaseModel
+
+    from routers import FastJSONRoute
+
+    class Item(BaseModel):
+        id: int
+
+    router = APIRouter(route_class=FastJSONRoute)
+    created_on = datetime(2024, 6, 20, 14, 45, tzinfo=timezone.utc)
+
+    @router.get("/dict", response_model=dict)
+    async def get_dict():
+        return {"id": 1, "createdOn": created_on}
+
+    @router.get("/list", response_model=List[dict])
+    async def get_list():
+        return [{"id": 1}]
+
+    @router.get("/untyped")
+    async def get_untyped():
+        return {"createdOn": created_on}
+
+    @router.post("/created", response_model=dict, status_code=201)
+    async def create():
+        return {"id": 2}
+
+    @router.get("/typed", response_model=Item)
+    async def get_typed():
+        return {"id": "3", "extra": "dropped"}
+
+    @router.get("/response", response_model=dict)
+    async def get_response():
+        return PlainTextResponse("plain")
+
+    @router.delete("/deleted", status_code=204)
+    async def delete():
+        return None
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+class TestFastJSONRoute:
+    """Tests for FastJSONRoute and FastJSONResponse"""
+
+    def test_renders_dict_response_models(self):
+        """Test dict response models are rendered as returned, datetimes in their isoformat like jsonable_encoder renders them"""
+        client = make_fast_json_client()
+
+        resp = client.get("/dict")
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/json"
+        assert resp.content == b'{"id":1,"createdOn":"2024-06-20T14:45:00+00:00"}'
+        assert client.get("/list").json() == [{"id": 1}]
+
+    def test_renders_routes_without_response_model(self):
+        """Test routes without a response model are rendered without jsonable_encoder, the same way"""
+        client = make_fast_json_client()
+
+        assert client.get("/untyped").content == b'{"createdOn":"2024-06-20T14:45:00+00:00"}'
+
+    def test_skips_validation_of_untyped_models(self):
+        """Test the content of a dict response model is not validated, copied or passed through jsonable_encoder"""
+        from routers import FastJSONResponse
+
+        client = make_fast_json_client()
+
+        with patch("routers.FastJSONResponse", wraps=FastJSONResponse) as mock_response, patch("fastapi.routing.serialize_response") as mock_serialize:
+            client.get("/dict")
+
+        mock_serialize.assert_not_called()
+        mock_response.assert_called_once()
+
+    def test_keeps_status_code(self):
+        """Test the status code of the route is used"""
+        client = make_fast_json_client()
+
+        resp = client.post("/created")
+
+        assert resp.status_code == 201
+        assert resp.json() == {"id": 2}
+
+    def test_typed_models_are_validated(self):
+        """Test the responses of pydantic models are still validated and serialized by FastAPI"""
+        client = make_fast_json_client()
+
+        assert client.get("/typed").json() == {"id": 3}
+
+    def test_returned_responses_are_kept(self):
+        """Test a response returned by the endpoint is sent as is"""
+        client = make_fast_json_client()
+
+        resp = client.get("/response")
+
+        assert resp.text == "plain"
+
+    def test_no_body_status(self):
+        """Test routes whose status code has no body are left to FastAPI"""
+        client = make_fast_json_client()
+
+        resp = client.delete("/deleted")
+
+        assert resp.status_code == 204
+        assert resp.content == b""
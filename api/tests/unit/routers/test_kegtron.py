@@ -7,6 +7,8 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 from fastapi import HTTPException
 
+from lib.assets.files import FileAssetManager
+
 
 def run_async(coro):
     """Helper to run async functions in sync tests"""
@@ -405,6 +407,44 @@ class TestResetPort:
         assert port_data["srm"] == 40
         assert port_data["userName"] == "Cold Brew"
         assert port_data["style"] == "cold-brew"
+        assert port_data["labelUrl"] == "http://example.com/coffee.png"
+
+    def test_sends_uploaded_label_as_tile(self):
+        """Test an uploaded label is sent as its tile derivative rather than the original"""
+        from routers.kegtron import ResetPortRequest, reset_port
+
+        image_hash = "a" * 64
+        request_data = ResetPortRequest(volume_size=5.0, volume_unit="gal", batch_id="batch-2")
+        mock_monitor = MagicMock()
+        mock_monitor.meta = {"device_id": "dev-1", "port_num": 0}
+
+        mock_beverage = MagicMock()
+        mock_beverage.img_url = "http://example.com/coffee.png"
+        mock_batch = MagicMock()
+        mock_batch.beer_id = None
+        mock_batch.beverage_id = "bev-1"
+        mock_batch.beverage = mock_beverage
+        mock_batch.img_url = f"/assets/uploads/img/beverage/{image_hash}.png"
+        mock_batch.awaitable_attrs = MagicMock()
+        mock_batch.awaitable_attrs.beverage = AsyncMock(return_value=mock_beverage)()
+
+        mock_lib = MagicMock()
+        mock_lib.update_user_overrides = AsyncMock(return_value=True)
+        mock_lib.reset_volume = AsyncMock(return_value=True)
+        mock_lib.reset_kegs_served = AsyncMock(return_value=True)
+        mock_lib.update_port = AsyncMock(return_value=True)
+
+        with (
+            patch("routers.kegtron.get_tap_monitor_lib", return_value=mock_lib),
+            patch("routers.kegtron.get_monitor_from_device_and_port", new_callable=AsyncMock, return_value=mock_monitor),
+            patch("routers.kegtron.BatchesDB") as mock_batches_db,
+            patch("routers.kegtron.get_asset_manager", return_value=FileAssetManager()),
+        ):
+            mock_batches_db.get_by_pkey = AsyncMock(return_value=mock_batch)
+            run_async(reset_port("dev-1", 0, request_data, self._create_mock_request(), MagicMock(), AsyncMock()))
+
+        port_data = mock_lib.update_port.call_args[0][0]
+        assert port_data["labelUrl"] == f"/api/v1/uploads/images/beverage/{image_hash}?size=tile"
 
     def test_does_not_call_update_port_when_no_batch(self):
         from routers.kegtron import ResetPortRequest, reset_port
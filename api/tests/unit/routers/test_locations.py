@@ -81,13 +81,16 @@ class TestCreateLocation:
         mock_location = create_mock_location()
         location_data = LocationCreate(name="New Location")
 
-        with patch("routers.locations.LocationsDB") as mock_db, patch("routers.locations.LocationService") as mock_service:
+        with patch("routers.locations.LocationsDB") as mock_db, patch("routers.locations.LocationService") as mock_service, patch(
+            "routers.locations.reference_data"
+        ) as mock_reference_data:
             mock_db.create = AsyncMock(return_value=mock_location)
             mock_service.transform_response = AsyncMock(return_value={"id": "loc-1", "name": "New Location"})
 
             result = run_async(create_location(location_data, mock_user, mock_session))
 
             mock_db.create.assert_called_once()
+            mock_reference_data.invalidate_locations_on_commit.assert_called_once_with(mock_session)
             assert result["name"] == "New Location"
 
 
@@ -196,7 +199,7 @@ class TestUpdateLocation:
 
         with patch("routers.locations.get_location_id", new_callable=AsyncMock) as mock_get_id, patch("routers.locations.LocationsDB") as mock_db, patch(
             "routers.locations.LocationService"
-        ) as mock_service:
+        ) as mock_service, patch("routers.locations.reference_data") as mock_reference_data:
             mock_get_id.return_value = "loc-1"
             mock_db.get_by_pkey = AsyncMock(return_value=mock_location)
             mock_db.update = AsyncMock()
@@ -205,6 +208,7 @@ class TestUpdateLocation:
             result = run_async(update_location("loc-1", update_data, mock_user, mock_session))
 
             mock_db.update.assert_called_once()
+            mock_reference_data.invalidate_locations_on_commit.assert_called_once_with(mock_session)
 
     def test_raises_404_when_not_found(self):
         """Test raises 404 when location not found"""
@@ -237,7 +241,13 @@ class TestDeleteLocation:
 
         with patch("routers.locations.get_location_id", new_callable=AsyncMock) as mock_get_id, patch("routers.locations.LocationsDB") as mock_loc_db, patch(
             "routers.locations.TapsDB"
-        ) as mock_taps_db, patch("routers.locations.BatchLocationsDB") as mock_batch_loc_db, patch("routers.locations.UserLocationsDB") as mock_user_loc_db:
+        ) as mock_taps_db, patch("routers.locations.BatchLocationsDB") as mock_batch_loc_db, patch(
+            "routers.locations.UserLocationsDB"
+        ) as mock_user_loc_db, patch(
+            "routers.locations.reference_data"
+        ) as mock_reference_data, patch(
+            "routers.locations.auth_user_cache"
+        ) as mock_auth_user_cache:
             mock_get_id.return_value = "loc-1"
             mock_loc_db.get_by_pkey = AsyncMock(return_value=mock_location)
             mock_loc_db.delete = AsyncMock()
@@ -251,6 +261,8 @@ class TestDeleteLocation:
             mock_batch_loc_db.delete_by.assert_called_once()
             mock_user_loc_db.delete_by.assert_called_once()
             mock_loc_db.delete.assert_called_once()
+            mock_reference_data.invalidate_locations_on_commit.assert_called_once_with(mock_session)
+            mock_auth_user_cache.clear_on_commit.assert_called_once_with(mock_session)
 
     def test_raises_404_when_not_found(self):
         """Test raises 404 when location not found"""
@@ -0,0 +1,99 @@
+"""Tests for routers/metrics.py module - Prometheus metrics endpoint"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from routers import metrics as metrics_router
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def make_request(headers=None):
+    """Create a request mock with the given headers"""
+    request = MagicMock()
+    request.headers = headers or {}
+    return request
+
+
+def config_values(values):
+    """Config `get` side effect returning the given values"""
+    return lambda key, default=None: values.get(key, default)
+
+
+class TestGetMetrics:
+    """Tests for the /metrics endpoint"""
+
+    def test_renders_metrics(self):
+        """Test the metrics are served in the Prometheus text format"""
+        with patch.object(metrics_router, "CONFIG") as mock_config:
+            mock_config.get.side_effect = config_values({"metrics.enabled": True})
+
+            resp = run_async(metrics_router.get_metrics(make_request()))
+
+        assert resp.status_code == 200
+        assert resp.media_type == metrics_router.CONTENT_TYPE
+        assert b"# TYPE log_queue_depth gauge" in resp.body
+
+    def test_disabled(self):
+        """Test the endpoint is hidden when the metrics are disabled"""
+        with patch.object(metrics_router, "CONFIG") as mock_config:
+            mock_config.get.side_effect = config_values({"metrics.enabled": False})
+
+            resp = run_async(metrics_router.get_metrics(make_request()))
+
+        assert resp.status_code == 404
+
+    def test_disabled_by_default(self):
+        """Test the endpoint is not served unless the metrics are enabled"""
+        with patch.object(metrics_router, "CONFIG") as mock_config:
+            mock_config.get.side_effect = config_values({})
+
+            resp = run_async(metrics_router.get_metrics(make_request()))
+
+        assert resp.status_code == 404
+
+    def test_requires_token(self):
+        """Test the configured bearer token is required"""
+        with patch.object(metrics_router, "CONFIG") as mock_config:
+            mock_config.get.side_effect = config_values({"metrics.enabled": True, "metrics.auth_token": "secret"})
+
+            denied = run_async(metrics_router.get_metrics(make_request({"Authorization": "Bearer wrong"})))
+            allowed = run_async(metrics_router.get_metrics(make_request({"Authorization": "Bearer secret"})))
+
+        assert denied.status_code == 401
+        assert allowed.status_code == 200
+
+
+class TestCollectPlaato:
+    """Tests for the Plaato keg collector"""
+
+    def test_copies_connection_stats(self):
+        """Test the connected kegs, frames and decode errors are copied from the connection handler"""
+        handler = MagicMock()
+        handler.get_registered_device_ids.return_value = {"keg1", "keg2"}
+        handler.get_connection_ids.return_value = {"c1", "c2", "c3"}
+        handler.get_ingestion_stats.return_value = {"frames_received": 120, "decode_errors": 2, "depth": 4, "dropped": 1}
+
+        with patch.object(metrics_router, "CONFIG") as mock_config, patch("lib.devices.plaato_keg.service_handler") as mock_service:
+            mock_config.get.side_effect = config_values({"tap_monitors.plaato_keg.enabled": True})
+            mock_service.connection_handler = handler
+
+            metrics_router._collect_plaato()
+
+        assert metrics_router.PLAATO_KEGS.get() == 2
+        assert metrics_router.PLAATO_CONNECTIONS.get() == 3
+        assert metrics_router.PLAATO_FRAMES.get() == 120
+        assert metrics_router.PLAATO_DECODE_ERRORS.get() == 2
+        assert metrics_router.PLAATO_QUEUE_DEPTH.get() == 4
+
+    def test_skipped_when_disabled(self):
+        """Test the Plaato service is not loaded when Plaato is disabled"""
+        with patch.object(metrics_router, "CONFIG") as mock_config, patch("lib.devices.plaato_keg.service_handler") as mock_service:
+            mock_config.get.side_effect = config_values({})
+
+            metrics_router._collect_plaato()
+
+        mock_service.connection_handler.get_ingestion_stats.assert_not_called()
@@ -14,6 +14,22 @@ def run_async(coro):
 class TestGetSettings:
     """Tests for get_settings endpoint"""
 
+    def test_settings_built_once_per_config_snapshot(self):
+        """Test the settings are only built again once the configuration was reloaded"""
+        with patch("routers.settings.CONFIG") as mock_config:
+            mock_config.get.side_effect = lambda key, default=None: {"dashboard.refresh_sec": 30}.get(key, default)
+
+            from routers.settings import get_settings
+
+            first = run_async(get_settings())
+            calls = mock_config.get.call_count
+            assert run_async(get_settings()) is first
+            assert mock_config.get.call_count == calls
+
+            mock_config.snapshot = MagicMock()
+            mock_config.get.side_effect = lambda key, default=None: {"dashboard.refresh_sec": 10}.get(key, default)
+            assert run_async(get_settings())["dashboard"]["refreshSec"] == 10
+
     def test_returns_basic_settings(self):
         """Test returns basic application settings"""
         with patch("routers.settings.CONFIG") as mock_config:
@@ -92,3 +108,17 @@ class TestGetSettings:
 
         # Should have no parameters (no dependencies)
         assert len(params) == 0
+
+
+class TestGetLoggingStats:
+    """Tests for get_logging_stats endpoint"""
+
+    def test_returns_queue_stats(self):
+        """Test returns the log queue stats"""
+        stats = {"enabled": True, "depth": 3, "max_size": 10, "dropped": 1, "suppressed": {}}
+        with patch("routers.settings.get_queue_stats", return_value=stats):
+            from routers.settings import get_logging_stats
+
+            result = run_async(get_logging_stats(current_user=MagicMock()))
+
+            assert result == stats
@@ -175,12 +175,17 @@ class TestUpdateUser:
         mock_session = AsyncMock()
         update_data = UserUpdate(first_name="Updated")
 
-        with patch("routers.users.UsersDB") as mock_db, patch("routers.users.UserService") as mock_service:
+        with (
+            patch("routers.users.UsersDB") as mock_db,
+            patch("routers.users.UserService") as mock_service,
+            patch("routers.users.auth_user_cache") as mock_cache,
+        ):
             mock_db.get_by_pkey = AsyncMock(return_value=mock_user)
             mock_db.update = AsyncMock()
             mock_service.transform_response = AsyncMock(return_value={"id": "user-1", "firstName": "Updated"})
 
             result = run_async(update_user("user-1", update_data, mock_auth_user, mock_session))
+            mock_cache.invalidate_user_on_commit.assert_called_once_with(mock_session, "user-1")
 
             mock_db.update.assert_called_once()
 
@@ -208,12 +213,17 @@ class TestUpdateUser:
         mock_session = AsyncMock()
         update_data = UserUpdate(first_name="Updated")
 
-        with patch("routers.users.UsersDB") as mock_db, patch("routers.users.UserService") as mock_service:
+        with (
+            patch("routers.users.UsersDB") as mock_db,
+            patch("routers.users.UserService") as mock_service,
+            patch("routers.users.auth_user_cache") as mock_cache,
+        ):
             mock_db.get_by_pkey = AsyncMock(return_value=mock_user)
             mock_db.update = AsyncMock()
             mock_service.transform_response = AsyncMock(return_value={"id": "user-2"})
 
             result = run_async(update_user("user-2", update_data, mock_auth_user, mock_session))
+            mock_cache.invalidate_user_on_commit.assert_called_once_with(mock_session, "user-2")
 
             mock_db.update.assert_called_once()
 
@@ -250,11 +260,12 @@ class TestDeleteUser:
         mock_user = create_mock_user(id_="user-2")
         mock_session = AsyncMock()
 
-        with patch("routers.users.UsersDB") as mock_db:
+        with patch("routers.users.UsersDB") as mock_db, patch("routers.users.auth_user_cache") as mock_cache:
             mock_db.get_by_pkey = AsyncMock(return_value=mock_user)
             mock_db.delete = AsyncMock()
 
             result = run_async(delete_user("user-2", mock_auth_user, mock_session))
+            mock_cache.invalidate_user_on_commit.assert_called_once_with(mock_session, "user-2")
 
             mock_db.delete.assert_called_once()
 
@@ -331,12 +342,13 @@ class TestGenerateUserApiKey:
         mock_user = create_mock_user(id_="user-1")
         mock_session = AsyncMock()
 
-        with patch("routers.users.UsersDB") as mock_db, patch("routers.users.uuid") as mock_uuid:
+        with patch("routers.users.UsersDB") as mock_db, patch("routers.users.uuid") as mock_uuid, patch("routers.users.auth_user_cache") as mock_cache:
             mock_db.get_by_pkey = AsyncMock(return_value=mock_user)
             mock_db.update = AsyncMock()
             mock_uuid.uuid4.return_value = "new-uuid-key"
 
             result = run_async(generate_user_api_key("user-1", mock_auth_user, mock_session))
+            mock_cache.invalidate_user_on_commit.assert_called_once_with(mock_session, "user-1")
 
             assert result["apiKey"] == "new-uuid-key"
             mock_db.update.assert_called_once()
@@ -365,15 +377,31 @@ class TestDeleteUserApiKey:
         mock_user = create_mock_user(id_="user-1", api_key="old-key")
         mock_session = AsyncMock()
 
-        with patch("routers.users.UsersDB") as mock_db:
+        with patch("routers.users.UsersDB") as mock_db, patch("routers.users.auth_user_cache") as mock_cache:
             mock_db.get_by_pkey = AsyncMock(return_value=mock_user)
             mock_db.update = AsyncMock()
 
             result = run_async(delete_user_api_key("user-1", mock_auth_user, mock_session))
+            mock_cache.invalidate_user_on_commit.assert_called_once_with(mock_session, "user-1")
 
             assert result is True
             mock_db.update.assert_called_once_with(mock_session, "user-1", api_key=None)
 
+    def test_invalidates_cached_auth_user(self):
+        """Test the user's cached authentication is dropped so the old API key stops working"""
+        from routers.users import delete_user_api_key
+
+        mock_auth_user = create_mock_auth_user(id_="user-1", admin=False)
+        mock_session = AsyncMock()
+
+        with patch("routers.users.UsersDB") as mock_db, patch("routers.users.auth_user_cache") as mock_cache:
+            mock_db.get_by_pkey = AsyncMock(return_value=create_mock_user(id_="user-1", api_key="old-key"))
+            mock_db.update = AsyncMock()
+
+            run_async(delete_user_api_key("user-1", mock_auth_user, mock_session))
+
+            mock_cache.invalidate_user_on_commit.assert_called_once_with(mock_session, "user-1")
+
     def test_non_admin_cannot_delete_other_api_key(self):
         """Test non-admin cannot delete another user's API key"""
         from routers.users import delete_user_api_key
@@ -436,17 +464,44 @@ class TestUpdateUserLocations:
         mock_session = AsyncMock()
         location_data = UserLocationsUpdate(location_ids=["loc-1", "loc-2"])
 
-        with patch("routers.users.UsersDB") as mock_db, patch("routers.users.UserLocationsDB") as mock_user_loc_db:
+        with (
+            patch("routers.users.UsersDB") as mock_db,
+            patch("routers.users.UserLocationsDB") as mock_user_loc_db,
+            patch("routers.users.auth_user_cache") as mock_cache,
+        ):
             mock_db.get_by_pkey = AsyncMock(return_value=mock_user)
             mock_user_loc_db.delete_by = AsyncMock()
             mock_user_loc_db.create = AsyncMock()
 
             result = run_async(update_user_locations("user-2", location_data, mock_auth_user, mock_session))
+            mock_cache.invalidate_user_on_commit.assert_called_once_with(mock_session, "user-2")
 
             assert result is True
             mock_user_loc_db.delete_by.assert_called_once()
             assert mock_user_loc_db.create.call_count == 2
 
+    def test_invalidates_cached_auth_user(self):
+        """Test the user's cached authentication is dropped so the new locations apply immediately"""
+        from routers.users import update_user_locations
+        from schemas.users import UserLocationsUpdate
+
+        mock_auth_user = create_mock_auth_user(admin=True)
+        location_data = UserLocationsUpdate(location_ids=["loc-1"])
+
+        with (
+            patch("routers.users.UsersDB") as mock_db,
+            patch("routers.users.UserLocationsDB") as mock_user_loc_db,
+            patch("routers.users.auth_user_cache") as mock_cache,
+        ):
+            mock_db.get_by_pkey = AsyncMock(return_value=create_mock_user(id_="user-2"))
+            mock_user_loc_db.delete_by = AsyncMock()
+            mock_user_loc_db.create = AsyncMock()
+
+            mock_session = AsyncMock()
+            run_async(update_user_locations("user-2", location_data, mock_auth_user, mock_session))
+
+            mock_cache.invalidate_user_on_commit.assert_called_once_with(mock_session, "user-2")
+
     def test_raises_404_when_user_not_found(self):
         """Test raises 404 when user not found"""
         from routers.users import update_user_locations
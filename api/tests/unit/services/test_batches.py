@@ -234,6 +234,38 @@ class TestBatchServiceStoreMetadata:
         assert result["details"]["_last_refreshed_on"] == now.isoformat()
 
 
+class TestBatchServiceGetRefreshReason:
+    """Tests for BatchService.get_refresh_reason method"""
+
+    NOW = datetime(2024, 1, 15, 12, 0, 0, tzinfo=timezone.utc)
+
+    def test_no_reason_without_external_tool(self):
+        """Test a batch without external brewing tool is never refreshed"""
+        assert BatchService.get_refresh_reason(None, {"details": {}}) is None
+        assert BatchService.get_refresh_reason("brewfather", {}) is None
+
+    def test_refreshes_without_details(self):
+        """Test a batch without cached details is refreshed"""
+        assert BatchService.get_refresh_reason("brewfather", {"batch_id": "123"}) == "No cached details exist in DB."
+
+    def test_refreshes_when_marked(self):
+        """Test a batch marked for refresh by the external brewing tool is refreshed with its reason"""
+        meta = {"details": {"_refresh_on_next_check": True, "_refresh_reason": "Batch completed"}}
+
+        assert BatchService.get_refresh_reason("brewfather", meta, now=self.NOW) == "Batch completed"
+
+    def test_refreshes_after_buffer(self):
+        """Test the details are refreshed once the soft refresh buffer is exceeded"""
+        meta = {"details": {"_last_refreshed_on": "2024-01-15T11:00:00+00:00"}}
+
+        with patch("services.batches.CONFIG") as mock_config:
+            mock_config.get.return_value = 3600
+            assert BatchService.get_refresh_reason("brewfather", meta, now=self.NOW) is None
+
+            mock_config.get.return_value = 1800
+            assert BatchService.get_refresh_reason("brewfather", meta, now=self.NOW) == "Refresh skip buffer exceeded"
+
+
 class TestBatchServiceVerifyExternalBrewToolBatch:
     """Tests for BatchService.verify_and_update_external_brew_tool_batch method"""
 
@@ -0,0 +1,137 @@
+"""Tests for services/dashboard.py module - Dashboard read model"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from services.dashboard import LOCATION_TAPS, TAP, DashboardService, finish_tap
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def create_tap(**kwargs):
+    """Helper to create a tap as postgres returns it"""
+    tap = {"id": "tap-1", "tapNumber": 1, "locationId": "loc-1"}
+    tap.update(kwargs)
+    return tap
+
+
+def create_mock_session(taps):
+    """Helper to create a mock session returning the JSON array of taps"""
+    session = AsyncMock()
+    result = MagicMock()
+    result.scalar.return_value = taps
+    session.execute.return_value = result
+    return session
+
+
+class TestStatements:
+    """Tests for the read model statements"""
+
+    def test_single_statement(self):
+        """Test the taps and everything the dashboard shows of them are selected in one statement"""
+        sql = str(LOCATION_TAPS.compile(dialect=postgresql.asyncpg.dialect()))
+
+        assert sql.startswith("SELECT coalesce(json_agg(json_strip_nulls(")
+        for table in ("on_tap", "batches", "beers", "beverages", "tap_monitors", "batch_locations", "image_transitions"):
+            assert f"FROM {table}" in sql or f"JOIN {table}" in sql
+
+    def test_keys_are_camel_case(self):
+        """Test postgres builds the objects with the camelCase keys of the API"""
+        sql = str(TAP.compile(dialect=postgresql.asyncpg.dialect()))
+
+        for key in ("'tapNumber'", "'tapMonitor'", "'externalBrewingToolMeta'", "'imageTransitions'", "'locationIds'"):
+            assert key in sql
+        assert "'on_tap_id'" not in sql and "'onTapId'" not in sql
+
+
+class TestFinishTap:
+    """Tests for finish_tap"""
+
+    def test_camel_cases_metadata(self):
+        """Test the keys of the free form metadata are camelCased and its null values removed"""
+        tap = create_tap(
+            batch={"id": "batch-1", "externalBrewingToolMeta": {"batch_id": "b-1", "details": {"batch_no": 3, "notes": None}}},
+            beverage={"id": "bev-1", "meta": {"roast_level": "dark"}},
+        )
+
+        result = finish_tap(tap)
+
+        assert result["batch"]["externalBrewingToolMeta"] == {"batchId": "b-1", "details": {"batchNo": 3}}
+        assert result["beverage"]["meta"] == {"roastLevel": "dark"}
+
+    def test_adds_monitor_capabilities(self):
+        """Test adds whether the tap monitor reports its online status"""
+        tap = create_tap(tapMonitorId="monitor-1", tapMonitor={"id": "monitor-1", "monitorType": "kegtron-pro", "meta": {"port_num": 0}})
+        mock_lib = MagicMock()
+        mock_lib.reports_online_status.return_value = True
+
+        with patch("services.dashboard.get_tap_monitor_lib", return_value=mock_lib):
+            result = finish_tap(tap)
+
+        assert result["tapMonitor"]["reportsOnlineStatus"] is True
+        assert result["tapMonitor"]["meta"] == {"portNum": 0}
+
+    def test_removes_unsupported_monitor(self):
+        """Test removes a tap monitor whose type is not supported, like TapService does for the dashboard"""
+        tap = create_tap(tapMonitorId="monitor-1", tapMonitor={"id": "monitor-1", "monitorType": "unknown"})
+
+        with patch("services.dashboard.get_tap_monitor_lib", return_value=None):
+            result = finish_tap(tap)
+
+        assert "tapMonitor" not in result
+        assert "tapMonitorId" not in result
+
+    def test_tap_without_batch(self):
+        """Test an empty tap is returned as is"""
+        assert finish_tap(create_tap()) == create_tap()
+
+
+class TestDashboardService:
+    """Tests for DashboardService"""
+
+    def test_get_location_taps(self):
+        """Test returns the taps of the location built by postgres"""
+        session = create_mock_session([create_tap(), create_tap(id="tap-2", tapNumber=2)])
+
+        result = run_async(DashboardService.get_location_taps("loc-1", session))
+
+        assert [t["id"] for t in result] == ["tap-1", "tap-2"]
+        assert session.execute.call_args.args == (LOCATION_TAPS, {"location_id": "loc-1"})
+
+    def test_get_tap(self):
+        """Test returns the tap, or None when it does not exist"""
+        assert run_async(DashboardService.get_tap("tap-1", create_mock_session([create_tap()])))["id"] == "tap-1"
+        assert run_async(DashboardService.get_tap("tap-2", create_mock_session([]))) is None
+
+    def test_current_batch_is_not_refreshed(self):
+        """Test a batch with current external brewing tool details is not loaded again"""
+        batch = {"id": "batch-1", "externalBrewingTool": "brewfather", "externalBrewingToolMeta": {"details": {"_last_refreshed_on": "2024-01-15"}}}
+        session = create_mock_session([create_tap(batch=batch)])
+
+        with patch("services.dashboard.BatchService") as mock_batch_service:
+            mock_batch_service.get_refresh_reason.return_value = None
+            result = run_async(DashboardService.get_location_taps("loc-1", session))
+
+        mock_batch_service.transform_response.assert_not_called()
+        assert result[0]["batch"]["externalBrewingToolMeta"] == {"details": {"LastRefreshedOn": "2024-01-15"}}
+
+    def test_stale_batch_is_refreshed(self):
+        """Test a batch with stale external brewing tool details is read and refreshed by BatchService"""
+        batch = {"id": "batch-1", "externalBrewingTool": "brewfather", "externalBrewingToolMeta": {"batch_id": "b-1"}}
+        session = create_mock_session([create_tap(batch=batch)])
+        mock_batch = MagicMock()
+
+        with patch("services.dashboard.BatchService") as mock_batch_service, patch("services.dashboard.BatchesDB") as mock_batches_db:
+            mock_batch_service.get_refresh_reason.return_value = "No cached details exist in DB."
+            mock_batch_service.transform_response = AsyncMock(return_value={"id": "batch-1", "externalBrewingToolMeta": {"batchId": "b-1", "details": {}}})
+            mock_batches_db.get_by_pkey = AsyncMock(return_value=mock_batch)
+            result = run_async(DashboardService.get_location_taps("loc-1", session))
+
+        mock_batch_service.get_refresh_reason.assert_called_once_with("brewfather", {"batch_id": "b-1"}, batch_id="batch-1")
+        mock_batch_service.transform_response.assert_called_once_with(mock_batch, db_session=session, include_location=False)
+        assert result[0]["batch"] == {"id": "batch-1", "externalBrewingToolMeta": {"batchId": "b-1", "details": {}}}
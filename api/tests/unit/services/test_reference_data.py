@@ -0,0 +1,234 @@
+"""Tests for services/reference_data.py module - Reference data cache"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from services.locations import LocationService
+from services.reference_data import LocationSnapshot, ReferenceDataCache
+
+
+def run_async(coro):
+    """Helper to run async functions in sync tests"""
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def create_mock_location(id_="loc-1", name="main-taproom", description=None):
+    """Helper to create mock location"""
+    mock = MagicMock()
+    mock.id = id_
+    mock.name = name
+    mock.to_dict.return_value = {"id": id_, "name": name, "description": description}
+    return mock
+
+
+@pytest.fixture
+def mock_query():
+    with patch("services.reference_data.LocationsDB.query", new_callable=AsyncMock) as mock:
+        mock.return_value = [create_mock_location("loc-1", "main-taproom"), create_mock_location("loc-2", "annex")]
+        yield mock
+
+
+class TestLocationSnapshot:
+    """Tests for LocationSnapshot"""
+
+    def test_transforms_like_the_model(self):
+        """Test the location service transforms a snapshot like the model it was taken from"""
+        snapshot = LocationSnapshot({"id": "loc-1", "name": "main-taproom", "description": "Main"})
+
+        result = run_async(LocationService.transform_response(snapshot))
+
+        assert result == {"id": "loc-1", "name": "main-taproom", "description": "Main"}
+
+    def test_to_dict_returns_a_copy(self):
+        """Test changing the dict of a snapshot does not change the cached data"""
+        snapshot = LocationSnapshot({"id": "loc-1", "name": "main-taproom"})
+
+        snapshot.to_dict()["name"] = "changed"
+
+        assert snapshot.to_dict()["name"] == "main-taproom"
+
+
+class TestReferenceDataCacheLocations:
+    """Tests for the locations of ReferenceDataCache"""
+
+    def test_loads_locations_once(self, mock_query):
+        """Test the locations are queried once and then served from memory"""
+        cache = ReferenceDataCache(ttl=60)
+        session = AsyncMock()
+
+        first = run_async(cache.get_locations(session))
+        second = run_async(cache.get_locations(session))
+
+        assert [l.id for l in first] == ["loc-1", "loc-2"]
+        assert second is first
+        mock_query.assert_called_once_with(session)
+
+    def test_get_location_by_id(self, mock_query):
+        """Test gets a location by id, whether the id is a string or not"""
+        cache = ReferenceDataCache(ttl=60)
+
+        assert run_async(cache.get_location("loc-2", AsyncMock())).name == "annex"
+        assert run_async(cache.get_location("unknown", AsyncMock())) is None
+
+    def test_resolves_names_case_insensitively(self, mock_query):
+        """Test resolves a location name whatever its case without querying it"""
+        cache = ReferenceDataCache(ttl=60)
+
+        assert run_async(cache.get_location_id("Main-Taproom", AsyncMock())) == "loc-1"
+        assert run_async(cache.get_location_id("annex", AsyncMock())) == "loc-2"
+        mock_query.assert_called_once()
+
+    def test_unknown_name_is_looked_up_alone(self, mock_query):
+        """Test a name missing from the cache is queried on its own and the cache reloaded if it exists"""
+        cache = ReferenceDataCache(ttl=60)
+        session = AsyncMock()
+        run_async(cache.get_locations(session))
+
+        mock_query.reset_mock()
+        mock_query.return_value = [create_mock_location("loc-3", "new-taproom")]
+        result = run_async(cache.get_location_id("new-taproom", session))
+
+        assert result == "loc-3"
+        assert "q_fn" in mock_query.call_args.kwargs
+
+        mock_query.return_value = [create_mock_location("loc-1", "main-taproom"), create_mock_location("loc-3", "new-taproom")]
+        assert run_async(cache.get_location_id("new-taproom", session)) == "loc-3"
+        assert mock_query.call_count == 2
+
+    def test_returns_none_for_unknown_name(self, mock_query):
+        """Test returns None when the name is neither cached nor in the database"""
+        cache = ReferenceDataCache(ttl=60)
+        run_async(cache.get_locations(AsyncMock()))
+        mock_query.return_value = []
+
+        assert run_async(cache.get_location_id("unknown", AsyncMock())) is None
+
+    def test_invalidate_reloads(self, mock_query):
+        """Test the locations are loaded again after an invalidation"""
+        cache = ReferenceDataCache(ttl=60)
+        run_async(cache.get_locations(AsyncMock()))
+
+        cache.invalidate_locations()
+        run_async(cache.get_locations(AsyncMock()))
+
+        assert mock_query.call_count == 2
+
+    def test_invalidated_once_committed(self, mock_query):
+        """Test a location written through a session only invalidates the locations once it is committed"""
+        cache = ReferenceDataCache(ttl=60)
+        run_async(cache.get_locations(AsyncMock()))
+        db_session = MagicMock()
+        db_session.sync_session = Session()
+        db_session.sync_session.begin()
+
+        cache.invalidate_locations_on_commit(db_session)
+        run_async(cache.get_locations(AsyncMock()))
+        assert mock_query.call_count == 1
+
+        db_session.sync_session.commit()
+        run_async(cache.get_locations(AsyncMock()))
+        assert mock_query.call_count == 2
+
+    def test_not_invalidated_on_rollback(self, mock_query):
+        """Test the locations are kept when the changes are rolled back"""
+        cache = ReferenceDataCache(ttl=60)
+        run_async(cache.get_locations(AsyncMock()))
+        db_session = MagicMock()
+        db_session.sync_session = Session()
+        db_session.sync_session.begin()
+
+        cache.invalidate_locations_on_commit(db_session)
+        db_session.sync_session.rollback()
+        run_async(cache.get_locations(AsyncMock()))
+
+        assert mock_query.call_count == 1
+
+    def test_invalidated_when_already_committed(self, mock_query):
+        """Test the locations are invalidated right away when the write committed itself"""
+        cache = ReferenceDataCache(ttl=60)
+        run_async(cache.get_locations(AsyncMock()))
+        db_session = MagicMock()
+        db_session.sync_session = Session()
+
+        cache.invalidate_locations_on_commit(db_session)
+        run_async(cache.get_locations(AsyncMock()))
+
+        assert mock_query.call_count == 2
+
+    def test_reloads_after_ttl(self, mock_query):
+        """Test the locations are loaded again once the TTL expired"""
+        cache = ReferenceDataCache(ttl=60)
+
+        with patch("services.reference_data.time.monotonic", return_value=1000):
+            run_async(cache.get_locations(AsyncMock()))
+        with patch("services.reference_data.time.monotonic", return_value=1059):
+            run_async(cache.get_locations(AsyncMock()))
+        assert mock_query.call_count == 1
+
+        with patch("services.reference_data.time.monotonic", return_value=1061):
+            run_async(cache.get_locations(AsyncMock()))
+        assert mock_query.call_count == 2
+
+    def test_load_racing_an_invalidation_is_not_stored(self, mock_query):
+        """Test a load that was running when the locations were invalidated does not store what it read"""
+        cache = ReferenceDataCache(ttl=60)
+
+        async def query_then_invalidate(*args, **kwargs):
+            cache.invalidate_locations()
+            return [create_mock_location("loc-1", "stale-name")]
+
+        mock_query.side_effect = query_then_invalidate
+        assert run_async(cache.get_location("loc-1", AsyncMock())).name == "stale-name"
+
+        mock_query.side_effect = None
+        assert run_async(cache.get_location("loc-1", AsyncMock())).name == "main-taproom"
+
+    def test_disabled_cache_always_queries(self, mock_query):
+        """Test a TTL of 0 disables the cache"""
+        cache = ReferenceDataCache(ttl=0)
+
+        run_async(cache.get_locations(AsyncMock()))
+        assert run_async(cache.get_location("loc-1", AsyncMock())).name == "main-taproom"
+
+        assert mock_query.call_count == 2
+        assert not cache.enabled
+
+    def test_disabled_cache_looks_names_up_alone(self, mock_query):
+        """Test a TTL of 0 resolves names with a query on the name only"""
+        cache = ReferenceDataCache(ttl=0)
+        mock_query.return_value = [create_mock_location("loc-1", "main-taproom")]
+
+        assert run_async(cache.get_location_id("main-taproom", AsyncMock())) == "loc-1"
+        mock_query.assert_called_once()
+        assert "q_fn" in mock_query.call_args.kwargs
+
+
+class TestReferenceDataCachePreload:
+    """Tests for ReferenceDataCache.preload"""
+
+    def test_preload_loads_locations(self, mock_query):
+        """Test preloading fills the cache so the first request does not query the locations"""
+        cache = ReferenceDataCache(ttl=60)
+
+        @asynccontextmanager
+        async def session_scope(config):
+            yield AsyncMock()
+
+        with patch("services.reference_data.async_session_scope", session_scope):
+            run_async(cache.preload())
+
+        run_async(cache.get_locations(AsyncMock()))
+        mock_query.assert_called_once()
+
+    def test_preload_failure_is_not_raised(self, mock_query):
+        """Test the application still starts when the database can not be reached"""
+        cache = ReferenceDataCache(ttl=60)
+
+        with patch("services.reference_data.async_session_scope", side_effect=OSError("unreachable")):
+            run_async(cache.preload())
+
+        mock_query.assert_not_called()
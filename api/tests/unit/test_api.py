@@ -3,6 +3,7 @@
 import asyncio
 import os
 import sys
+from io import BytesIO
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -13,6 +14,8 @@ from schema import SchemaError
 from sqlalchemy.exc import DataError, IntegrityError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from lib.static_files import StaticSite
+
 
 def run_async(coro):
     """Helper to run async functions in sync tests"""
@@ -213,37 +216,74 @@ class TestHealthCheck:
 class TestServeSpa:
     """Tests for serve_spa endpoint"""
 
+    @pytest.fixture
+    def site(self, tmp_path):
+        """An indexed SPA build with a hashed bundle"""
+        (tmp_path / "index.html").write_text("<html></html>")
+        (tmp_path / "main-ABCD1234.js").write_text("console.log(1)")
+        return StaticSite(str(tmp_path)).load()
+
+    def make_request(self):
+        """Create a request mock without any conditional or encoding headers"""
+        request = MagicMock()
+        request.headers = {}
+        return request
+
     def test_returns_404_when_no_static_dir(self, api_module):
         """Test returns 404 when static directory doesn't exist"""
-        with patch.object(api_module, "STATIC_DIR", "/nonexistent"), patch("os.path.isfile", return_value=False), patch("os.path.exists", return_value=False):
-            result = run_async(api_module.serve_spa("some/path"))
+        with patch("lib.static_files.get_site", return_value=StaticSite("/nonexistent").load()):
+            result = run_async(api_module.serve_spa("some/path", self.make_request()))
 
         assert isinstance(result, JSONResponse)
         assert result.status_code == 404
 
-    def test_serves_static_file_when_exists(self, api_module):
+    def test_serves_static_file_when_exists(self, api_module, site, tmp_path):
         """Test serves static file when it exists"""
-        mock_file_response = MagicMock()
+        with patch("lib.static_files.get_site", return_value=site):
+            result = run_async(api_module.serve_spa("main-ABCD1234.js", self.make_request()))
 
-        with patch.object(api_module, "STATIC_DIR", "/static"), patch("os.path.isfile", return_value=True), patch(
-            "api.api.FileResponse", return_value=mock_file_response
-        ) as mock_fr_class:
-            result = run_async(api_module.serve_spa("js/app.js"))
+        assert result.path == str(tmp_path / "main-ABCD1234.js")
+        assert "immutable" in result.headers["cache-control"]
 
-        mock_fr_class.assert_called_once_with("/static/js/app.js")
-        assert result == mock_file_response
-
-    def test_serves_index_html_for_spa_routes(self, api_module):
+    def test_serves_index_html_for_spa_routes(self, api_module, site):
         """Test serves index.html for SPA routes"""
-        mock_file_response = MagicMock()
+        with patch("lib.static_files.get_site", return_value=site):
+            result = run_async(api_module.serve_spa("manage/locations", self.make_request()))
+
+        assert result.body == b"<html></html>"
+        assert result.media_type == "text/html"
+
+    def test_does_not_serve_outside_static_dir(self, api_module, site):
+        """Test paths escaping the static directory get the SPA rather than the file"""
+        with patch("lib.static_files.get_site", return_value=site):
+            result = run_async(api_module.serve_spa("../../etc/passwd", self.make_request()))
+
+        assert result.body == b"<html></html>"
+
+    def test_serves_upload_added_after_load(self, api_module, site, tmp_path):
+        """Test a file uploaded while the site is served is served rather than the SPA"""
+        from lib.assets.files import FileAssetManager
+
+        manager = FileAssetManager()
+        manager.assets_base_dir = str(tmp_path / "assets" / "uploads")
+        upload = MagicMock()
+        upload.filename = "label.png"
+        upload.file = BytesIO(b"png")
+        _, filename, url = run_async(manager.save("beer", upload))
 
-        with patch.object(api_module, "STATIC_DIR", "/static"), patch("os.path.isfile", return_value=False), patch("os.path.exists", return_value=True), patch(
-            "api.api.FileResponse", return_value=mock_file_response
-        ) as mock_fr_class:
-            result = run_async(api_module.serve_spa("manage/locations"))
+        with patch("lib.static_files.get_site", return_value=site):
+            result = run_async(api_module.serve_spa(url.lstrip("/"), self.make_request()))
 
-        mock_fr_class.assert_called_once_with("/static/index.html")
-        assert result == mock_file_response
+        assert result.path == str(tmp_path / "assets" / "uploads" / "img" / "beer" / filename)
+        assert result.headers["cache-control"] == "no-cache"
+
+    def test_missing_upload_is_not_found(self, api_module, site):
+        """Test a missing upload is a 404 rather than the SPA"""
+        with patch("lib.static_files.get_site", return_value=site):
+            result = run_async(api_module.serve_spa("assets/uploads/img/beer/missing.png", self.make_request()))
+
+        assert isinstance(result, JSONResponse)
+        assert result.status_code == 404
 
 
 class TestFastAPIAppConfiguration:
@@ -322,3 +362,86 @@ class TestFastAPIAppConfiguration:
         """Test API includes location-nested routes for tap_monitors"""
         routes = _collect_route_paths(api_module.api)
         assert "/api/v1/locations/{location}/tap_monitors" in routes
+
+    def test_routers_use_fast_json_route(self, api_module):
+        """Test the routes of every router render their untyped responses with FastJSONRoute"""
+        from routers import FastJSONRoute
+
+        routes = [
+            ctx.original_route for route in api_module.api.routes if hasattr(route, "effective_route_contexts") for ctx in route.effective_route_contexts()
+        ]
+
+        assert routes
+        assert all(isinstance(r, FastJSONRoute) for r in routes)
+
+
+class TestLifespan:
+    """Tests for the application lifespan"""
+
+    @pytest.fixture(autouse=True)
+    def mock_preload(self):
+        with patch("services.reference_data.reference_data.preload", new_callable=AsyncMock) as mock:
+            yield mock
+
+    def run_lifespan(self, api_module):
+        async def run():
+            async with api_module.lifespan(api_module.api):
+                pass
+
+        run_async(run())
+
+    def test_api_role_listens_for_plaato_state(self, api_module):
+        """Test API processes start listening for the Plaato state from the ingest process"""
+        with patch.object(api_module.roles, "runs_ingestion", return_value=False), patch.object(api_module, "CONFIG") as mock_config, patch(
+            "lib.devices.plaato_keg.service_handler"
+        ) as mock_handler:
+            mock_config.get.return_value = True
+            mock_handler.connection_handler.start = AsyncMock()
+            mock_handler.connection_handler.stop = AsyncMock()
+
+            self.run_lifespan(api_module)
+
+            mock_handler.connection_handler.start.assert_called_once()
+            mock_handler.connection_handler.stop.assert_called_once()
+
+    def test_ingesting_process_does_not_listen(self, api_module):
+        """Test processes running the ingestion use their local Plaato handler"""
+        with patch.object(api_module.roles, "runs_ingestion", return_value=True), patch("lib.devices.plaato_keg.service_handler") as mock_handler:
+            mock_handler.connection_handler.start = AsyncMock()
+
+            self.run_lifespan(api_module)
+
+            mock_handler.connection_handler.start.assert_not_called()
+
+    def test_listen_failure_does_not_stop_startup(self, api_module):
+        """Test the API still starts when the database can not be reached"""
+        with patch.object(api_module.roles, "runs_ingestion", return_value=False), patch.object(api_module, "CONFIG") as mock_config, patch(
+            "lib.devices.plaato_keg.service_handler"
+        ) as mock_handler:
+            mock_config.get.return_value = True
+            mock_handler.connection_handler.start = AsyncMock(side_effect=OSError("unreachable"))
+            mock_handler.connection_handler.stop = AsyncMock()
+
+            self.run_lifespan(api_module)
+
+            mock_handler.connection_handler.stop.assert_not_called()
+
+    def test_preloads_reference_data(self, api_module, mock_preload):
+        """Test the locations are loaded into the reference data cache before the first request"""
+        with patch.object(api_module.roles, "runs_ingestion", return_value=True):
+            self.run_lifespan(api_module)
+
+        mock_preload.assert_called_once()
+
+    def test_s3_storage_starts_listing_reconciler(self, api_module):
+        """Test the S3 image listings are reconciled in the background and the task cancelled on shutdown"""
+        task = MagicMock()
+        with patch.object(api_module.roles, "runs_ingestion", return_value=True), patch.object(api_module, "CONFIG") as mock_config, patch(
+            "lib.assets.listings.start_reconciler", return_value=task
+        ) as mock_start, patch("routers.assets.get_asset_manager") as mock_get_manager:
+            mock_config.get.side_effect = lambda key, default=None: "S3" if key == "uploads.storage_type" else default
+
+            self.run_lifespan(api_module)
+
+            mock_start.assert_called_once_with(mock_get_manager.return_value, ["beer", "user", "beverage"])
+            task.cancel.assert_called_once()
@@ -177,6 +177,24 @@ class TestApplicationStartPlaatoService:
             # Should use defaults
             mock_handler.connection_handler.start_server.assert_called_once_with(host="localhost", port=5001)
 
+    def test_ingest_role_publishes_state(self, app_module):
+        """Test the ingest role publishes the keg state to the API processes"""
+        app = app_module.Application(role="ingest")
+
+        with patch("lib.devices.plaato_keg.service_handler") as mock_handler, patch.object(app_module, "CONFIG") as mock_config, patch(
+            "asyncio.create_task"
+        ) as mock_create_task, patch("lib.devices.plaato_keg.remote.IngestPublisher") as mock_publisher_class:
+            mock_config.get.side_effect = lambda key, default=None: default
+            mock_handler.connection_handler.start_server = MagicMock()
+            mock_create_task.return_value = MagicMock()
+            mock_publisher_class.return_value.start = AsyncMock()
+
+            run_async(app.start_plaato_service())
+
+            mock_publisher_class.assert_called_once_with(mock_handler.connection_handler)
+            mock_publisher_class.return_value.start.assert_called_once()
+            assert app.ingest_publisher == mock_publisher_class.return_value
+
 
 class TestApplicationStartHttpServer:
     """Tests for Application.start_http_server"""
@@ -244,6 +262,37 @@ class TestApplicationStartHttpServer:
             call_kwargs = mock_uvicorn_config.call_args[1]
             assert call_kwargs["reload"] is True
 
+    def test_profile_startup_adds_first_request_timer(self, app_module):
+        """Test the first request timer is added when profiling startup"""
+        from lib.startup_profile import FirstRequestTimer
+
+        app = app_module.Application(profile_startup=True)
+
+        with patch("api.app.CONFIG") as mock_config, patch("api.app.uvicorn.Config"), patch("api.app.uvicorn.Server") as mock_uvicorn_server, patch(
+            "api.app.api"
+        ) as mock_api, patch("api.app.startup_profile.report"):
+            mock_config.get.side_effect = lambda key, default=None: default
+            mock_uvicorn_server.return_value.serve = AsyncMock()
+
+            run_async(app.start_http_server())
+
+            mock_api.add_middleware.assert_called_once()
+            assert mock_api.add_middleware.call_args[0][0] is FirstRequestTimer
+
+    def test_no_first_request_timer_by_default(self, app_module):
+        """Test the first request timer is not added unless profiling startup"""
+        app = app_module.Application()
+
+        with patch("api.app.CONFIG") as mock_config, patch("api.app.uvicorn.Config"), patch("api.app.uvicorn.Server") as mock_uvicorn_server, patch(
+            "api.app.api"
+        ) as mock_api:
+            mock_config.get.side_effect = lambda key, default=None: default
+            mock_uvicorn_server.return_value.serve = AsyncMock()
+
+            run_async(app.start_http_server())
+
+            mock_api.add_middleware.assert_not_called()
+
 
 class TestApplicationShutdown:
     """Tests for Application.shutdown"""
@@ -362,3 +411,119 @@ class TestApplicationRun:
             run_async(app.run())
 
             app.start_http_server.assert_called_once()
+
+    def test_run_installs_config_reload_handler(self, app_module):
+        """Test run reloads the configuration on SIGHUP"""
+        app = app_module.Application()
+        app.initialize_first_user = AsyncMock()
+        app.start_http_server = AsyncMock()
+        app.shutdown = AsyncMock()
+
+        with patch("api.app.CONFIG") as mock_config:
+            mock_config.get.return_value = False
+
+            run_async(app.run())
+
+            mock_config.install_reload_handler.assert_called_once()
+
+
+class TestApplicationRoles:
+    """Tests for running the api and ingest roles separately"""
+
+    def test_ingest_role_skips_http_server(self, app_module):
+        """Test the ingest role runs the Plaato server without serving the API"""
+        app = app_module.Application(role="ingest")
+        app.initialize_first_user = AsyncMock()
+        app.start_http_server = AsyncMock()
+        app.shutdown = AsyncMock()
+
+        async def start_plaato_service():
+            app.tcp_task = asyncio.ensure_future(asyncio.sleep(0))
+
+        app.start_plaato_service = AsyncMock(side_effect=start_plaato_service)
+
+        with patch("api.app.CONFIG") as mock_config:
+            mock_config.get.side_effect = lambda key, default=None: {"tap_monitors.plaato_keg.enabled": True}.get(key, default)
+
+            run_async(app.run())
+
+            app.start_plaato_service.assert_called_once()
+            app.start_http_server.assert_not_called()
+            app.initialize_first_user.assert_not_called()
+            app.shutdown.assert_called_once()
+
+    def test_ingest_role_without_ingestion(self, app_module):
+        """Test the ingest role exits when there is nothing to ingest"""
+        app = app_module.Application(role="ingest")
+        app.start_plaato_service = AsyncMock()
+        app.start_http_server = AsyncMock()
+        app.shutdown = AsyncMock()
+
+        with patch("api.app.CONFIG") as mock_config:
+            mock_config.get.return_value = False
+
+            run_async(app.run())
+
+            app.start_plaato_service.assert_not_called()
+            app.start_http_server.assert_not_called()
+
+    def test_api_role_skips_plaato(self, app_module):
+        """Test the api role leaves the Plaato server to the ingest process"""
+        app = app_module.Application(role="api")
+        app.initialize_first_user = AsyncMock()
+        app.start_plaato_service = AsyncMock()
+        app.start_http_server = AsyncMock()
+        app.shutdown = AsyncMock()
+
+        with patch("api.app.CONFIG") as mock_config:
+            mock_config.get.side_effect = lambda key, default=None: {"tap_monitors.plaato_keg.enabled": True}.get(key, default)
+
+            run_async(app.run())
+
+            app.start_plaato_service.assert_not_called()
+            app.start_http_server.assert_called_once()
+
+    def test_run_api_workers(self, app_module):
+        """Test several API workers are started through uvicorn"""
+        app = app_module.Application(log_level="WARNING", role="api", workers=4)
+        app.initialize_first_user = AsyncMock()
+
+        with patch("api.app.CONFIG") as mock_config, patch("api.app.uvicorn.run") as mock_run, patch("api.app.asyncio.run") as mock_asyncio_run, patch.dict(
+            "os.environ", {}
+        ):
+            mock_config.get.side_effect = lambda key, default=None: default
+
+            app.run_api_workers()
+
+            mock_asyncio_run.assert_called_once()
+            mock_asyncio_run.call_args[0][0].close()
+            mock_run.assert_called_once()
+            assert mock_run.call_args[0][0] == "api:api"
+            assert mock_run.call_args[1]["workers"] == 4
+            assert mock_run.call_args[1]["log_level"] == "warning"
+
+
+class TestMain:
+    """Tests for main"""
+
+    def test_multiple_workers_only_with_api_role(self, app_module):
+        """Test the application runs a single worker unless the role is api"""
+        with patch("sys.argv", ["app.py", "--role", "all", "--workers", "4"]), patch("api.app.Application") as mock_app, patch(
+            "api.app.asyncio.run"
+        ) as mock_asyncio_run, patch("api.app.roles.set_role"), patch("api.app.logging.set_log_level"):
+            app_module.main()
+
+        assert mock_app.call_args[1]["role"] == "all"
+        assert mock_app.call_args[1]["workers"] == 1
+        mock_asyncio_run.assert_called_once()
+        mock_app.return_value.run_api_workers.assert_not_called()
+
+    def test_api_role_workers(self, app_module):
+        """Test the api role serves the API from several workers"""
+        with patch("sys.argv", ["app.py", "--role", "api", "--workers", "4"]), patch("api.app.Application") as mock_app, patch("api.app.roles.set_role"), patch(
+            "api.app.logging.set_log_level"
+        ):
+            app_module.main()
+
+        assert mock_app.call_args[1]["workers"] == 4
+        mock_app.return_value.run_api_workers.assert_called_once()
@@ -6,4 +6,4 @@ fi
 
 . /.venv/bin/activate
 ./migrate.sh upgrade head
-python app.py
+python app.py "$@"